@@ -0,0 +1,141 @@
+"""Offline benchmark of GrindRefillLoop.CHECK latency, before vs. after StatusSnapshot.
+
+Both paths run against the same still frame (no screen, game or input needed):
+
+  before: revive probe polled until `revive.revive_timeout_s` (nothing visible, so
+          the full timeout is paid), then `empty_check_samples` potion probes
+          separated by `empty_check_interval_ms` sleeps.
+  after:  StatusProbe snapshots over consecutive frames of a stream running at
+          `watch.fps`, then the stability vote.
+
+Matching uses Vision.locate_in for both, which is cheaper than the pyautogui
+screenshots the old path really used, so "before" is a lower bound.
+
+Usage:
+  python benchmarks/bench_check.py [--frame debug/frame.png] [--runs 5] [--config l9/config.yaml]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+from l9.config_loader import load_config
+from l9.flows.status import PotionState, StatusProbe
+from l9.vision.match import Vision
+from l9.vision.poll import AdaptivePoller
+from l9.vision.stream import Frame
+
+
+class StillStream:
+    """FrameStream stand-in that yields the same image at a fixed rate."""
+
+    def __init__(self, image, fps: float) -> None:
+        self.image = image
+        self.period_s = 1.0 / max(0.5, fps)
+        self.seq = 0
+        self.next_t = time.perf_counter()
+
+    def latest(self):
+        return Frame(self.seq, time.perf_counter(), self.image, (0, 0)) if self.seq else None
+
+    def wait_next(self, after_seq: int, timeout_s: float):
+        delay = self.next_t - time.perf_counter()
+        if delay > timeout_s:
+            return None
+        if delay > 0:
+            time.sleep(delay)
+        self.next_t = max(self.next_t, time.perf_counter()) + self.period_s
+        self.seq = max(self.seq, after_seq) + 1
+        return Frame(self.seq, time.perf_counter(), self.image, (0, 0))
+
+
+def synthetic_frame(cfg: dict):
+    """1080p noise frame with the potion-empty icon pasted into the HUD ROI."""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    icon = cv2.imread(StatusProbe.T_POTION_EMPTY, cv2.IMREAD_COLOR)
+    if icon is not None:
+        rois = cfg.get("rois", {}) or {}
+        frac = rois.get("potion_slot") or rois.get("hud_anchor") or [0.0, 0.8, 1.0, 1.0]
+        x, y = int(frac[0] * 1920) + 8, int(frac[1] * 1080) + 8
+        h, w = icon.shape[:2]
+        frame[y:y + h, x:x + w] = icon
+    return frame
+
+
+def check_before(v: Vision, cfg: dict, image) -> bool:
+    rcfg = cfg.get("revive", {}) or {}
+    bcfg = cfg.get("buy_potions", {}) or {}
+    rois = cfg.get("rois", {}) or {}
+    t_revive = str(rcfg.get("revive_button", StatusProbe.T_REVIVE))
+    conf_revive = float(rcfg.get("pyauto_threshold", 0.9))
+    poller = AdaptivePoller.from_cfg(cfg)
+    poller.run(
+        lambda f: v.locate_in(f, t_revive, conf_revive, roi_name="revive_ui", origin=(0, 0)),
+        float(rcfg.get("revive_timeout_s", 2.0)),
+        grab=lambda: image,
+    )
+    conf = float(bcfg.get("pyauto_threshold", 0.9))
+    roi = "potion_slot" if rois.get("potion_slot") else "hud_anchor"
+    samples = int(bcfg.get("empty_check_samples", 3))
+    min_hits = max(1, int(bcfg.get("empty_check_min_matches", 2)))
+    gap = max(0.05, float(bcfg.get("empty_check_interval_ms", 150)) / 1000.0)
+    hits = 0
+    for _ in range(max(1, samples)):
+        if v.locate_in(image, StatusProbe.T_POTION_EMPTY, conf, roi_name=roi, origin=(0, 0)):
+            hits += 1
+        time.sleep(gap)
+    return hits >= min_hits
+
+
+def check_after(probe: StatusProbe, stream: StillStream) -> bool:
+    return probe.vote_potion(probe.collect(stream)) is PotionState.EMPTY
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark GrindRefillLoop.CHECK latency")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--frame", default=None, help="BGR screenshot to use (default: synthetic 1080p frame)")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    cfg = load_config(args.config)
+    image = cv2.imread(args.frame, cv2.IMREAD_COLOR) if args.frame else synthetic_frame(cfg)
+    if image is None:
+        print(f"Could not read frame: {args.frame}")
+        return 2
+    v = Vision(cfg)
+    probe = StatusProbe(v, cfg, names=("dead", "potion_empty", "potion_has"))
+    fps = float((cfg.get("watch", {}) or {}).get("fps", 10))
+
+    results = {}
+    for name, fn in (
+        ("before", lambda: check_before(v, cfg, image)),
+        ("after", lambda: check_after(probe, StillStream(image, fps))),
+    ):
+        times = []
+        verdict = None
+        for _ in range(max(1, args.runs)):
+            t0 = time.perf_counter()
+            verdict = fn()
+            times.append(time.perf_counter() - t0)
+        results[name] = statistics.median(times)
+        print(f"{name:>6}: median {results[name] * 1000:7.1f} ms  min {min(times) * 1000:7.1f} ms  potion_empty={verdict}")
+    if results["after"] > 0:
+        print(f"speedup: {results['before'] / results['after']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+"""Cost of config reads on the find-and-click path: chained dict lookups vs compiled settings.
+
+One "step" is what a flow reads from the config to find a template and click
+it: the locate confidence and detection timeout, the six poller timings, the
+six match options, the threshold override lookup and the ROI, and the input
+timings a click needs. `dict` does it the way flows did before l9.settings
+(`float(cfg.get("timings", {}).get(...))` with defaults and casts);
+`settings` reads the same values as attributes of the compiled tree.
+`compile` is the one-time cost of `compile_config`, `settings_for` the cost
+of fetching the shared tree for a dict that is already compiled.
+
+Usage:
+  python benchmarks/bench_config.py [--config l9/config.yaml] [--n 200000] [--out results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from l9.config_loader import load_config
+from l9.settings import compile_config, settings_for
+
+TEMPLATE = "l9/assets/grind/spots/spot1/teleporter.png"
+ROI = "hud_anchor"
+
+
+def step_dict(cfg: dict) -> float:
+    conf = float(cfg.get("grind", {}).get("pyauto_threshold", 0.9))
+    timeout = float(cfg.get("timings", {}).get("detection_timeout_s", 3.0))
+    t = cfg.get("timings", {}) or {}
+    poll = (
+        float(t.get("poll_min_ms", 20)) / 1000.0,
+        float(t.get("poll_max_ms", 250)) / 1000.0,
+        float(t.get("poll_backoff", 1.5)),
+        float(t.get("poll_cpu_budget", 0.5)),
+        float(t.get("poll_change_thresh", 2.0)),
+        float(t.get("poll_refresh_ms", 1000)) / 1000.0,
+    )
+    method = cfg.get("match", {}).get("method", "TM_CCOEFF_NORMED")
+    use_color = bool(cfg.get("match", {}).get("use_color", False))
+    multi_scale = bool(cfg.get("match", {}).get("multi_scale", True))
+    scales = list(cfg.get("match", {}).get("scales", [1.0]))
+    nms_iou = float(cfg.get("match", {}).get("nms_iou", 0.3))
+    max_results = int(cfg.get("match", {}).get("max_results", 5))
+    thr_map = cfg.get("threshold_overrides", {}) or {}
+    thr = float(thr_map.get(TEMPLATE, thr_map.get(os.path.basename(TEMPLATE), cfg.get("match", {}).get("default_threshold", 0.85))))
+    frac = (cfg.get("rois", {}) or {}).get(ROI)
+    icfg = cfg.get("input", {}) or {}
+    hold = max(0.0, int(icfg.get("mouse_hold_ms", 60)) / 1000.0)
+    gap = max(0.0, float(icfg.get("click_interval_ms", 80)) / 1000.0)
+    repeats = max(1, int(icfg.get("click_repeats", 1)))
+    return conf + timeout + sum(poll) + thr + hold + gap + repeats + nms_iou + max_results + len(scales) + len(frac) + use_color + multi_scale + len(method)
+
+
+def step_settings(s) -> float:
+    conf = s.grind.pyauto_threshold
+    t = s.timings
+    timeout = t.detection_timeout_s
+    poll = (
+        t.poll_min_ms / 1000.0,
+        t.poll_max_ms / 1000.0,
+        t.poll_backoff,
+        t.poll_cpu_budget,
+        t.poll_change_thresh,
+        t.poll_refresh_ms / 1000.0,
+    )
+    m = s.match
+    method = m.method
+    use_color = m.use_color
+    multi_scale = m.multi_scale
+    scales = m.scales
+    nms_iou = m.nms_iou
+    max_results = m.max_results
+    thr_map = s.threshold_overrides
+    thr = m.default_threshold if not thr_map else float(thr_map.get(TEMPLATE, thr_map.get(os.path.basename(TEMPLATE), m.default_threshold)))
+    frac = s.rois.get(ROI)
+    i = s.input
+    hold = i.mouse_hold_ms / 1000.0
+    gap = i.click_interval_ms / 1000.0
+    repeats = i.click_repeats
+    return conf + timeout + sum(poll) + thr + hold + gap + repeats + nms_iou + max_results + len(scales) + len(frac) + use_color + multi_scale + len(method)
+
+
+def ns_per_op(fn, n: int) -> float:
+    # Best of 5 runs of n calls
+    return 1e9 * min(timeit.repeat(fn, number=n, repeat=5)) / n
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark config access on the find-and-click path")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--n", type=int, default=200000, help="calls per timing run")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    cfg = load_config(args.config)
+    s = settings_for(cfg)
+    if step_dict(cfg) != step_settings(s):
+        print("dict and settings reads disagree; check the config")
+        return 1
+    n = max(1000, args.n)
+    results = {
+        "dict_step_ns": ns_per_op(lambda: step_dict(cfg), n),
+        "settings_step_ns": ns_per_op(lambda: step_settings(s), n),
+        "settings_for_ns": ns_per_op(lambda: settings_for(cfg), n),
+        "compile_us": ns_per_op(lambda: compile_config(cfg), max(100, n // 200)) / 1000.0,
+    }
+    speedup = results["dict_step_ns"] / max(1e-9, results["settings_step_ns"])
+    print(f"dict          {results['dict_step_ns']:8.0f} ns/step")
+    print(f"settings      {results['settings_step_ns']:8.0f} ns/step  ({speedup:.1f}x)")
+    print(f"settings_for  {results['settings_for_ns']:8.0f} ns (cached)")
+    print(f"compile       {results['compile_us']:8.1f} us (once per config)")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,142 @@
+"""Per-click latency of Actions.click for each input backend.
+
+Measures the time from calling `Actions.click` to it returning, with jitter,
+action pauses, repeats and the pre-click move zeroed, so what is left is the
+input path itself: profile lookups, window check and backend calls. Holds are
+0 by default, which lets SendInput send move+down+up as one batch; pass
+--hold-ms to measure the split path (the hold itself is subtracted).
+
+With --window the config's window guards stay on (foreground/maximized
+checks, auto-focus, click-to-focus), so the result includes the per-click cost
+of WindowManager; `enum_scans` counts full EnumWindows passes during the run.
+
+The `record` backend runs anywhere and isolates the Python overhead. Real
+backends (`sendinput`, `pydirectinput`, `pyautogui`, `legacy`) move and click
+the real cursor, so they only run with --live; they click at the current
+cursor position.
+
+Usage:
+  python benchmarks/bench_input.py [--backends record,sendinput] [--clicks 500] [--hold-ms 0] [--window] [--live] [--out results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import time
+from typing import List
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import percentile
+from l9.actions.input import Actions
+from l9.config_loader import load_config
+
+
+# Everything but the input path itself set to zero
+BENCH_INPUT = {
+    "click_repeats": 1,
+    "click_interval_ms": 0,
+    "mouse_move_duration_ms": 0,
+    "mouse_move_duration_ms_min": None,
+    "mouse_move_duration_ms_max": None,
+    "wiggle_before_click": False,
+    "use_wm_messages": False,
+}
+BENCH_TIMINGS = {"wait_min_ms": 0, "wait_max_ms": 0, "random_action_pause": False}
+
+
+def make_cfg(base: dict, backend: str, hold_ms: int, window: bool = False) -> dict:
+    cfg = copy.deepcopy(base)
+    cfg.setdefault("input", {}).update(BENCH_INPUT, backend=backend, mouse_hold_ms=hold_ms)
+    cfg.setdefault("timings", {}).update(BENCH_TIMINGS)
+    if not window:
+        # Window guards would measure focus checks, not input
+        cfg["window"] = {"require_foreground": False, "require_maximized": False, "auto_focus": False, "click_to_focus": False}
+    return cfg
+
+
+def bench_backend(base: dict, backend: str, clicks: int, hold_ms: int, window: bool = False) -> dict:
+    a = Actions(make_cfg(base, backend, hold_ms, window))
+    if a.backend is None and backend != "legacy":
+        raise RuntimeError("backend %s is not available here" % backend)
+    pos = a.cursor_pos() or (0, 0)
+    hold_s = hold_ms / 1000.0
+    # Warm up lazy imports and caches (scan codes, ctypes structures)
+    for _ in range(min(10, clicks)):
+        a.click(*pos)
+    lat: List[float] = []
+    t_start = time.perf_counter()
+    for _ in range(clicks):
+        t0 = time.perf_counter()
+        a.click(*pos)
+        lat.append(max(0.0, time.perf_counter() - t0 - hold_s))
+    wall = time.perf_counter() - t_start
+    out = {
+        "backend": backend,
+        "resolved": getattr(a.backend, "name", "legacy"),
+        "clicks": clicks,
+        "hold_ms": hold_ms,
+        "window_guards": window,
+        "mean_us": round(1e6 * sum(lat) / len(lat), 1),
+        "p50_us": round(1e6 * percentile(lat, 50), 1),
+        "p95_us": round(1e6 * percentile(lat, 95), 1),
+        "max_us": round(1e6 * max(lat), 1),
+        "per_s": round(clicks / wall, 1) if wall > 0 else 0.0,
+    }
+    if window and a._win is not None:
+        out["enum_scans"] = a._win.enum_count
+    events = getattr(a.backend, "events", None)
+    if events is not None:
+        out["events_per_click"] = round(len(events) / (clicks + min(10, clicks)), 2)
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark per-click input latency")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--backends", default="record", help="comma list: record, sendinput, pydirectinput, pyautogui, legacy")
+    ap.add_argument("--clicks", type=int, default=500)
+    ap.add_argument("--hold-ms", type=int, default=0, help="mouse hold per click (0 batches down+up)")
+    ap.add_argument("--window", action="store_true", help="keep the config's window guards (measures focus checks)")
+    ap.add_argument("--live", action="store_true", help="allow backends that click the real cursor")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    base = load_config(args.config)
+    results = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if backend != "record" and not args.live:
+            print(f"{backend:<14} skipped (clicks the real cursor; pass --live)")
+            continue
+        try:
+            r = bench_backend(base, backend, max(1, args.clicks), max(0, args.hold_ms), args.window)
+        except Exception as e:
+            print(f"{backend:<14} unavailable: {e}")
+            continue
+        results.append(r)
+        print(f"{backend:<14} p50 {r['p50_us']:9.1f} us  p95 {r['p95_us']:9.1f} us  max {r['max_us']:9.1f} us  {r['per_s']:9.1f}/s")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Wrote {args.out}")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+"""Startup cost: `scripts/run_flow.py --help` and time to first detection, against time budgets.
+
+Each measurement runs in a fresh interpreter with `python -X importtime`, so
+imports are timed and listed as they are paid. `help` is the wall time of
+`run_flow.py --help`, which must not load OpenCV, numpy or the input
+libraries at all. `first_detection` is the wall time from spawning a process
+to its first `Vision.locate_in` hit: import everything `run_flow.py` imports
+plus the refill loop flow, load the config, build Vision and Actions, and
+find a template pasted into a synthetic frame (no screen needed).
+
+Reports the median of --runs for each, the imports that took longest and
+any heavy module loaded where it should not be. Exits 1 if a median is over
+its budget or `--help` loaded a heavy module.
+
+Usage:
+  python benchmarks/bench_startup.py [--runs 5] [--help-budget-ms 300] [--detect-budget-ms 1500] [--top 8] [--out results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = ("cv2", "numpy", "mss", "pyautogui", "pydirectinput", "keyboard", "mouse", "PIL")
+TEMPLATE = "l9/assets/ui/hud/potion_empty.png"
+
+# Runs in the child; prints the wall clock at the first hit
+FIRST_DETECTION = r"""
+import sys, time
+sys.path.insert(0, {root!r})
+from l9.config_loader import load_config
+from l9.vision.match import Vision
+from l9.actions.input import Actions
+from l9.flows.runtime import FlowRuntime
+from l9.flows.grind_refill_loop import GrindRefillLoop
+import cv2, numpy as np
+
+cfg = load_config({config!r})
+vision = Vision(cfg)
+actions = Actions(cfg, dry_run=True)
+tpl = cv2.imread({template!r}, cv2.IMREAD_COLOR)
+frame = np.full((1080, 1920, 3), 40, dtype=np.uint8)
+frame[400:400 + tpl.shape[0], 700:700 + tpl.shape[1]] = tpl
+box = vision.locate_in(frame, {template!r}, 0.8)
+print("L9_FIRST_DETECTION", repr(time.time()), int(box is not None))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every line of `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            rows.append((parts[2][1:].rstrip(), int(parts[0]), int(parts[1])))
+        except (IndexError, ValueError):
+            continue
+    return rows
+
+
+def run(cmd: List[str]) -> Tuple[float, str, str, float]:
+    """Spawn `cmd`; (wall time s, stdout, stderr, spawn time as time.time())."""
+    t_spawn = time.time()
+    t0 = time.perf_counter()
+    p = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if p.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd[:4])} ... exited {p.returncode}:\n{p.stderr[-2000:]}")
+    return wall, p.stdout, p.stderr, t_spawn
+
+
+def measure_help(runs: int) -> Dict:
+    cmd = [sys.executable, "-X", "importtime", os.path.join("scripts", "run_flow.py"), "--help"]
+    walls, imports = [], []
+    for _ in range(runs):
+        wall, _out, err, _ = run(cmd)
+        walls.append(wall)
+        imports = parse_importtime(err)
+    return {"walls": walls, "imports": imports}
+
+
+def measure_first_detection(runs: int, config: str) -> Dict:
+    code = FIRST_DETECTION.format(root=REPO_ROOT, config=config, template=TEMPLATE)
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    walls, imports = [], []
+    for _ in range(runs):
+        _wall, out, err, t_spawn = run(cmd)
+        line = next((l for l in out.splitlines() if l.startswith("L9_FIRST_DETECTION")), None)
+        if line is None:
+            raise RuntimeError("first detection run printed no result")
+        _, t_hit, found = line.split()
+        if found != "1":
+            raise RuntimeError(f"{TEMPLATE} was not found in the synthetic frame")
+        walls.append(float(t_hit) - t_spawn)
+        imports = parse_importtime(err)
+    return {"walls": walls, "imports": imports}
+
+
+def summarize(name: str, res: Dict, budget_ms: float, top: int) -> Dict:
+    med = 1000.0 * statistics.median(res["walls"])
+    imports = res["imports"]
+    # Top-level entries (no indent) sum to the total import time
+    total = sum(cum for mod, _s, cum in imports if not mod.startswith(" "))
+    loaded = sorted({mod.strip().split(".")[0] for mod, _s, _c in imports} & set(HEAVY))
+    slowest = sorted(imports, key=lambda r: r[1], reverse=True)[:top]
+    ok = med <= budget_ms
+    print(f"{name:16s} {med:8.1f} ms median (min {1000.0 * min(res['walls']):.1f})  budget {budget_ms:.0f} ms  {'ok' if ok else 'OVER'}")
+    print(f"{'':16s} imports {total / 1000.0:.1f} ms; heavy modules: {', '.join(loaded) or 'none'}")
+    for mod, self_us, cum_us in slowest:
+        print(f"{'':18s}{self_us / 1000.0:7.1f} ms self {cum_us / 1000.0:8.1f} ms cum  {mod.strip()}")
+    return {
+        "median_ms": round(med, 2),
+        "min_ms": round(1000.0 * min(res["walls"]), 2),
+        "budget_ms": budget_ms,
+        "within_budget": ok,
+        "import_ms": round(total / 1000.0, 2),
+        "heavy_modules": loaded,
+        "slowest_imports": [{"module": m.strip(), "self_ms": s / 1000.0, "cum_ms": c / 1000.0} for m, s, c in slowest],
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark runner startup against time budgets")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--help-budget-ms", type=float, default=300.0)
+    ap.add_argument("--detect-budget-ms", type=float, default=1500.0)
+    ap.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    runs = max(1, args.runs)
+    results = {
+        "help": summarize("run_flow --help", measure_help(runs), args.help_budget_ms, args.top),
+        "first_detection": summarize("first detection", measure_first_detection(runs, args.config), args.detect_budget_ms, args.top),
+    }
+    failed = [k for k, r in results.items() if not r["within_budget"]]
+    if results["help"]["heavy_modules"]:
+        print(f"run_flow --help loaded {', '.join(results['help']['heavy_modules'])}")
+        failed.append("help_imports")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "runs": runs,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Wrote {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
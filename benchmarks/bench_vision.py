@@ -0,0 +1,215 @@
+"""Vision.detect throughput/latency over recorded frames, across matcher configurations.
+
+Runs headless: frames come from a corpus directory (default benchmarks/frames,
+then debug/) through a replay capture, templates from l9/assets. Falls back to
+synthetic noise frames with templates pasted in when no corpus frame is found.
+
+The matrix crosses:
+  color    gray | color                         (match.use_color)
+  scales   1 | 3 | cfg                          ([1.0], [0.9, 1.0, 1.1], match.scales)
+  roi      full | roi                           (whole frame vs. the center_ui ROI)
+  method   TM_CCOEFF_NORMED | TM_CCORR_NORMED | TM_SQDIFF_NORMED
+  cache    warm | cold                          (template cache kept vs. cleared per call)
+
+Usage:
+  python benchmarks/bench_vision.py run [--frames DIR] [--out results.json] [--repeat 3] [--templates GLOB]
+                                        [--only color=gray,method=TM_CCOEFF_NORMED]
+  python benchmarks/bench_vision.py compare base.json new.json [--tolerance 0.10]
+
+`compare` prints the change per configuration and exits 1 if any p50 latency
+grew by more than the tolerance (and by at least --min-ms). Runs on a busy
+machine vary by 10-20%; compare results from the same host, with --repeat >= 3.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import cv2  # type: ignore
+
+from benchmarks.corpus import ReplayCapture, list_images, load_frames, percentile, synthetic_frames
+from l9.config_loader import load_config
+from l9.vision.match import Vision
+
+
+AXES = {
+    "color": ["gray", "color"],
+    "scales": ["1", "3", "cfg"],
+    "roi": ["full", "roi"],
+    "method": ["TM_CCOEFF_NORMED", "TM_CCORR_NORMED", "TM_SQDIFF_NORMED"],
+    "cache": ["warm", "cold"],
+}
+ROI_NAME = "center_ui"
+
+
+def config_id(conf: Dict[str, str]) -> str:
+    return "|".join(f"{k}={conf[k]}" for k in AXES)
+
+
+def configs(only: Dict[str, List[str]]) -> List[Dict[str, str]]:
+    axes = [[v for v in vals if k not in only or v in only[k]] for k, vals in AXES.items()]
+    return [dict(zip(AXES, combo)) for combo in itertools.product(*axes)]
+
+
+def make_cfg(base: dict, conf: Dict[str, str]) -> dict:
+    cfg = copy.deepcopy(base)
+    m = cfg.setdefault("match", {})
+    m["use_color"] = conf["color"] == "color"
+    m["method"] = conf["method"]
+    if conf["scales"] == "1":
+        m["multi_scale"], m["scales"] = False, [1.0]
+    elif conf["scales"] == "3":
+        m["multi_scale"], m["scales"] = True, [0.9, 1.0, 1.1]
+    else:
+        m["multi_scale"] = True
+    cfg.setdefault("rois", {}).setdefault(ROI_NAME, [0.2, 0.2, 0.8, 0.8])
+    # Measure matching, not the exit dump
+    cfg["metrics"] = {"enabled": True, "dump_at_exit": False}
+    return cfg
+
+
+def bench_config(base: dict, conf: Dict[str, str], frames, templates: List[str], repeat: int) -> dict:
+    cfg = make_cfg(base, conf)
+    v = Vision(cfg)
+    cap = ReplayCapture()
+    v.capture = cap
+    roi = ROI_NAME if conf["roi"] == "roi" else None
+    cold = conf["cache"] == "cold"
+    if not cold:
+        for t in templates:
+            v._load_image(t)
+    lat: List[float] = []
+    hits = 0
+    t_start = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        for _name, frame in frames:
+            cap.frame = frame
+            for t in templates:
+                if cold:
+                    v._templates.clear()
+                t0 = time.perf_counter()
+                det = v.detect(t, roi_name=roi)
+                lat.append(time.perf_counter() - t0)
+                hits += 1 if det else 0
+    wall = time.perf_counter() - t_start
+    return {
+        "id": config_id(conf),
+        "config": conf,
+        "calls": len(lat),
+        "hits": hits,
+        "mean_ms": round(1000.0 * sum(lat) / len(lat), 3) if lat else 0.0,
+        "p50_ms": round(1000.0 * percentile(lat, 50), 3),
+        "p95_ms": round(1000.0 * percentile(lat, 95), 3),
+        "max_ms": round(1000.0 * max(lat), 3) if lat else 0.0,
+        "per_s": round(len(lat) / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def parse_only(spec: Optional[str]) -> Dict[str, List[str]]:
+    only: Dict[str, List[str]] = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            if k.strip() not in AXES:
+                raise SystemExit(f"unknown axis {k!r}; expected one of {', '.join(AXES)}")
+            only.setdefault(k.strip(), []).append(v.strip())
+    return only
+
+
+def cmd_run(args) -> int:
+    base = load_config(args.config)
+    templates = [t for t in list_images(args.assets) if fnmatch.fnmatch(t, args.templates)]
+    if not templates:
+        print(f"No templates under {args.assets} match {args.templates}")
+        return 2
+    frames = load_frames(args.frames) if os.path.exists(args.frames) else []
+    source = args.frames
+    if not frames and os.path.exists("debug"):
+        frames, source = load_frames("debug"), "debug"
+    if not frames:
+        frames, source = synthetic_frames(templates), "synthetic"
+    print(f"{len(frames)} frame(s) from {source}, {len(templates)} template(s), repeat={args.repeat}")
+
+    results = []
+    for conf in configs(parse_only(args.only)):
+        r = bench_config(base, conf, frames, templates, args.repeat)
+        results.append(r)
+        print(f"{r['id']:<80} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  {r['per_s']:8.1f}/s")
+
+    out = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": getattr(cv2, "__version__", "?"),
+            "frames": [name for name, _ in frames],
+            "frame_source": source,
+            "templates": len(templates),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = {r["id"]: r for r in json.load(f)["results"]}
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = {r["id"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for cid in sorted(set(base) & set(new)):
+        b, n = base[cid], new[cid]
+        change = (n["p50_ms"] - b["p50_ms"]) / b["p50_ms"] if b["p50_ms"] > 0 else 0.0
+        flag = ""
+        if change > args.tolerance and n["p50_ms"] - b["p50_ms"] >= args.min_ms:
+            flag = "REGRESSION"
+            regressions += 1
+        elif change < -args.tolerance:
+            flag = "improved"
+        print(f"{cid:<80} p50 {b['p50_ms']:8.2f} -> {n['p50_ms']:8.2f} ms ({change:+6.1%})  {flag}")
+    for cid in sorted(set(base) ^ set(new)):
+        print(f"{cid:<80} only in {'base' if cid in base else 'new'}")
+    print(f"{regressions} regression(s) over {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark Vision.detect over recorded frames")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run the matrix and write JSON results")
+    r.add_argument("--config", default="l9/config.yaml")
+    r.add_argument("--frames", default="benchmarks/frames", help="frame image or directory")
+    r.add_argument("--assets", default="l9/assets")
+    r.add_argument("--templates", default="*", help="glob over template paths")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--only", default=None, help="restrict axes, e.g. color=gray,scales=1")
+    r.add_argument("--out", default="benchmarks/results/latest.json")
+    c = sub.add_parser("compare", help="compare two result files")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--tolerance", type=float, default=0.10, help="relative p50 growth counted as a regression")
+    c.add_argument("--min-ms", type=float, default=0.5, help="ignore p50 growth smaller than this (timer noise)")
+    args = ap.parse_args(argv)
+    return cmd_run(args) if args.cmd == "run" else cmd_compare(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
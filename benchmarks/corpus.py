@@ -0,0 +1,85 @@
+"""Frame corpus and headless capture shared by the benchmarks."""
+
+from __future__ import annotations
+
+import glob
+import os
+from typing import List, Optional, Tuple
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+from l9.vision.capture import ROI
+
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class ReplayCapture:
+    """ScreenCapture stand-in that serves a loaded frame instead of the screen."""
+
+    def __init__(self, frame=None) -> None:
+        self.frame = frame
+        self.last_origin: Tuple[int, int] = (0, 0)
+
+    def monitor_rect(self) -> dict:
+        h, w = self.frame.shape[:2]
+        return {"left": 0, "top": 0, "width": int(w), "height": int(h)}
+
+    def grab(self, roi: Optional[ROI] = None):
+        self.last_origin = (roi.x, roi.y) if roi is not None else (0, 0)
+        if roi is None:
+            return self.frame
+        return self.frame[roi.y:roi.y + roi.h, roi.x:roi.x + roi.w]
+
+    def grab_region(self, region: Optional[Tuple[int, int, int, int]] = None):
+        if region is None:
+            return self.grab()
+        return self.grab(ROI(*(int(v) for v in region)))
+
+
+def list_images(root: str) -> List[str]:
+    if os.path.isfile(root):
+        return [root]
+    out: List[str] = []
+    for ext in IMAGE_EXTS:
+        out.extend(glob.glob(os.path.join(root, "**", "*" + ext), recursive=True))
+    return sorted(out)
+
+
+def load_frames(root: str, min_size: Tuple[int, int] = (640, 360)) -> List[Tuple[str, np.ndarray]]:
+    """BGR frames under `root` at least `min_size` (w, h); smaller images are skipped."""
+    frames = []
+    for p in list_images(root):
+        img = cv2.imread(p, cv2.IMREAD_COLOR)
+        if img is None or img.shape[1] < min_size[0] or img.shape[0] < min_size[1]:
+            continue
+        frames.append((p, img))
+    return frames
+
+
+def synthetic_frames(templates: List[str], count: int = 3, size: Tuple[int, int] = (1920, 1080), seed: int = 0):
+    """Noise frames with a few templates pasted at random spots, for when no corpus is recorded."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    frames = []
+    for i in range(count):
+        frame = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+        for p in rng.permutation(templates)[:8]:
+            t = cv2.imread(str(p), cv2.IMREAD_COLOR)
+            if t is None or t.shape[0] >= h or t.shape[1] >= w:
+                continue
+            y = int(rng.integers(0, h - t.shape[0]))
+            x = int(rng.integers(0, w - t.shape[1]))
+            frame[y:y + t.shape[0], x:x + t.shape[1]] = t
+        frames.append((f"synthetic-{i}", frame))
+    return frames
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, int(np.ceil(q / 100.0 * len(s))) - 1))
+    return float(s[k])
@@ -0,0 +1,255 @@
+"""Synthetic detection dataset: generate labelled frames, then score Vision.detect on them.
+
+`generate` composites l9/assets templates onto varied backgrounds (noise,
+gradients, blurred texture, or images from --backgrounds) at known positions,
+with random scale, brightness shift, sensor noise and partial occlusion, and
+writes the frames plus labels.json with the ground-truth boxes.
+
+`evaluate` runs Vision.detect (current config, replay capture) for every
+template on every frame and reports per template: precision, recall, mean
+center error of true positives in px, mean IoU and ms per frame. Templates
+with identical pixels (e.g. the same button saved for several spots) count as
+one, so a match on a twin is not a false positive.
+
+Usage:
+  python benchmarks/synth.py generate [--out benchmarks/synthetic] [--frames 40] [--seed 0]
+                                      [--size 1920x1080] [--per-frame 6] [--backgrounds DIR]
+  python benchmarks/synth.py evaluate [--data benchmarks/synthetic] [--config l9/config.yaml]
+                                      [--iou 0.5] [--out report.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import cv2  # type: ignore
+import numpy as np  # type: ignore
+
+from benchmarks.corpus import ReplayCapture, list_images, load_frames
+from l9.config_loader import load_config
+from l9.vision.match import Vision
+
+
+def file_hash(path: str) -> str:
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    return hashlib.md5(img.tobytes() + str(img.shape).encode()).hexdigest()
+
+
+# --- generation -------------------------------------------------------------
+
+def background(rng, w: int, h: int, pool) -> np.ndarray:
+    kind = rng.integers(0, 4 if pool else 3)
+    if kind == 0:
+        return rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    if kind == 1:
+        # Two-color gradient
+        a, b = rng.integers(0, 255, 3), rng.integers(0, 255, 3)
+        t = np.linspace(0.0, 1.0, w)[None, :, None]
+        return np.broadcast_to(a * (1 - t) + b * t, (h, w, 3)).astype(np.uint8)
+    if kind == 2:
+        # Smooth blotches: low-res noise upscaled, closer to game scenery than white noise
+        small = rng.integers(0, 255, (h // 40 + 1, w // 40 + 1, 3), dtype=np.uint8)
+        return cv2.GaussianBlur(cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC), (0, 0), 6)
+    img = pool[int(rng.integers(0, len(pool)))]
+    return cv2.resize(img, (w, h), interpolation=cv2.INTER_AREA)
+
+
+def overlaps(box: Tuple[int, int, int, int], boxes: List[Tuple[int, int, int, int]], pad: int = 8) -> bool:
+    x, y, w, h = box
+    return any(x < bx + bw + pad and bx < x + w + pad and y < by + bh + pad and by < y + h + pad for bx, by, bw, bh in boxes)
+
+
+def generate(args) -> int:
+    rng = np.random.default_rng(args.seed)
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    templates = list_images(args.assets)
+    images = {t: cv2.imread(t, cv2.IMREAD_COLOR) for t in templates}
+    pool = [img for _, img in load_frames(args.backgrounds)] if args.backgrounds else []
+    out_frames = os.path.join(args.out, "frames")
+    os.makedirs(out_frames, exist_ok=True)
+
+    labels = []
+    for i in range(args.frames):
+        frame = background(rng, w, h, pool).copy()
+        placed: List[Tuple[int, int, int, int]] = []
+        boxes = []
+        for t in rng.permutation(templates)[: args.per_frame]:
+            t = str(t)
+            scale = float(rng.choice(args.scales))
+            brightness = int(rng.integers(-args.max_brightness, args.max_brightness + 1))
+            occlusion = float(rng.uniform(0.0, args.max_occlusion)) if rng.random() < 0.5 else 0.0
+            img = images[t]
+            if not np.isclose(scale, 1.0):
+                img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            th, tw = img.shape[:2]
+            for _ in range(50):
+                box = (int(rng.integers(0, w - tw)), int(rng.integers(0, h - th)), tw, th)
+                if not overlaps(box, placed):
+                    break
+            else:
+                continue
+            patch = np.clip(img.astype(np.int16) + brightness, 0, 255).astype(np.uint8)
+            if occlusion > 0:
+                # Occluder along one edge, covering `occlusion` of the template area
+                ow = max(1, int(tw * occlusion)) if rng.random() < 0.5 else tw
+                oh = th if ow < tw else max(1, int(th * occlusion))
+                ox = 0 if rng.random() < 0.5 else tw - ow
+                oy = 0 if rng.random() < 0.5 else th - oh
+                patch[oy:oy + oh, ox:ox + ow] = rng.integers(0, 255, 3, dtype=np.uint8)
+            x, y = box[0], box[1]
+            frame[y:y + th, x:x + tw] = patch
+            placed.append(box)
+            boxes.append({
+                "template": t, "x": x, "y": y, "w": tw, "h": th,
+                "scale": scale, "brightness": brightness, "occlusion": round(occlusion, 3),
+            })
+        sigma = float(rng.uniform(0.0, args.max_noise))
+        if sigma > 0:
+            frame = np.clip(frame.astype(np.float32) + rng.normal(0.0, sigma, frame.shape), 0, 255).astype(np.uint8)
+        name = f"{i:05d}.png"
+        cv2.imwrite(os.path.join(out_frames, name), frame)
+        labels.append({"file": name, "noise_sigma": round(sigma, 2), "boxes": boxes})
+
+    meta = {
+        "seed": args.seed, "size": [w, h], "scales": args.scales, "max_brightness": args.max_brightness,
+        "max_noise": args.max_noise, "max_occlusion": args.max_occlusion, "templates": templates,
+        "template_hash": {t: file_hash(t) for t in templates},
+    }
+    with open(os.path.join(args.out, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "frames": labels}, f, indent=1)
+    print(f"Wrote {len(labels)} frames to {args.out}")
+    return 0
+
+
+# --- evaluation -------------------------------------------------------------
+
+def iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def evaluate(args) -> int:
+    with open(os.path.join(args.data, "labels.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    hashes: Dict[str, str] = data["meta"]["template_hash"]
+    # One representative template per distinct image
+    reps: Dict[str, str] = {}
+    for t, hsh in sorted(hashes.items()):
+        reps.setdefault(hsh, t)
+
+    cfg = load_config(args.config)
+    cfg["metrics"] = {"enabled": True, "dump_at_exit": False}
+    v = Vision(cfg)
+    cap = ReplayCapture()
+    v.capture = cap
+
+    st = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0, "err": [], "iou": [], "time_s": 0.0})
+    for fr in data["frames"]:
+        cap.frame = cv2.imread(os.path.join(args.data, "frames", fr["file"]), cv2.IMREAD_COLOR)
+        gt: Dict[str, List[dict]] = defaultdict(list)
+        for b in fr["boxes"]:
+            gt[hashes.get(b["template"], b["template"])].append(b)
+        for hsh, t in reps.items():
+            s = st[t]
+            t0 = time.perf_counter()
+            det = v.detect(t)
+            s["time_s"] += time.perf_counter() - t0
+            truth = gt.get(hsh, [])
+            if det is None:
+                s["fn"] += len(truth)
+                continue
+            dbox = (det.x, det.y, det.w, det.h)
+            best = max(truth, key=lambda b: iou(dbox, (b["x"], b["y"], b["w"], b["h"])), default=None)
+            ov = iou(dbox, (best["x"], best["y"], best["w"], best["h"])) if best else 0.0
+            if best is None or ov < args.iou:
+                s["fp"] += 1
+                s["fn"] += len(truth)
+                continue
+            s["tp"] += 1
+            s["fn"] += len(truth) - 1
+            s["iou"].append(ov)
+            s["err"].append(float(np.hypot(
+                det.x + det.w / 2 - (best["x"] + best["w"] / 2),
+                det.y + det.h / 2 - (best["y"] + best["h"] / 2),
+            )))
+
+    n_frames = max(1, len(data["frames"]))
+    rows = []
+    for t, s in sorted(st.items()):
+        tp, fp, fn = s["tp"], s["fp"], s["fn"]
+        rows.append({
+            "template": t,
+            "tp": tp, "fp": fp, "fn": fn,
+            "precision": round(tp / (tp + fp), 4) if tp + fp else None,
+            "recall": round(tp / (tp + fn), 4) if tp + fn else None,
+            "center_err_px": round(float(np.mean(s["err"])), 2) if s["err"] else None,
+            "mean_iou": round(float(np.mean(s["iou"])), 4) if s["iou"] else None,
+            "ms_per_frame": round(1000.0 * s["time_s"] / n_frames, 2),
+        })
+    tot = {k: sum(r[k] for r in rows) for k in ("tp", "fp", "fn")}
+    summary = {
+        "frames": len(data["frames"]),
+        "precision": round(tot["tp"] / (tot["tp"] + tot["fp"]), 4) if tot["tp"] + tot["fp"] else None,
+        "recall": round(tot["tp"] / (tot["tp"] + tot["fn"]), 4) if tot["tp"] + tot["fn"] else None,
+        "ms_per_frame": round(sum(r["ms_per_frame"] for r in rows), 2),
+        "match": {k: cfg.get("match", {}).get(k) for k in ("method", "use_color", "multi_scale", "scales", "default_threshold")},
+    }
+
+    def fmt(x, spec):
+        width = int(spec.split(".")[0] or 0)
+        return format(x, spec) if x is not None else "-".rjust(width)
+
+    print(f"{'template':<48} {'P':>6} {'R':>6} {'err_px':>7} {'IoU':>6} {'ms/frame':>9}")
+    for r in rows:
+        print(f"{r['template'][-48:]:<48} {fmt(r['precision'], '6.2f')} {fmt(r['recall'], '6.2f')} "
+              f"{fmt(r['center_err_px'], '7.1f')} {fmt(r['mean_iou'], '6.2f')} {r['ms_per_frame']:9.1f}")
+    print(f"\nall templates: precision {fmt(summary['precision'], '.3f')} recall {fmt(summary['recall'], '.3f')} "
+          f"{summary['ms_per_frame']:.0f} ms/frame over {summary['frames']} frames")
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "templates": rows}, f, indent=2)
+        print(f"Wrote {args.out}")
+    return 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Synthetic detection dataset generator and evaluator")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    g = sub.add_parser("generate", help="write labelled synthetic frames")
+    g.add_argument("--out", default="benchmarks/synthetic")
+    g.add_argument("--assets", default="l9/assets")
+    g.add_argument("--frames", type=int, default=40)
+    g.add_argument("--per-frame", type=int, default=6, help="templates placed per frame")
+    g.add_argument("--size", default="1920x1080")
+    g.add_argument("--seed", type=int, default=0)
+    g.add_argument("--scales", type=float, nargs="+", default=[0.8, 0.9, 1.0, 1.0, 1.1, 1.2])
+    g.add_argument("--max-brightness", type=int, default=40, help="largest +/- brightness shift")
+    g.add_argument("--max-noise", type=float, default=10.0, help="largest gaussian noise sigma")
+    g.add_argument("--max-occlusion", type=float, default=0.3, help="largest occluded fraction of a template")
+    g.add_argument("--backgrounds", default=None, help="directory of screenshots to use as backgrounds too")
+    e = sub.add_parser("evaluate", help="score Vision.detect on a generated dataset")
+    e.add_argument("--data", default="benchmarks/synthetic")
+    e.add_argument("--config", default="l9/config.yaml")
+    e.add_argument("--iou", type=float, default=0.5, help="IoU needed for a true positive")
+    e.add_argument("--out", default=None, help="write the report as JSON")
+    args = ap.parse_args(argv)
+    return generate(args) if args.cmd == "generate" else evaluate(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import functools
+import logging
+import random
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ..clock import CLOCK
+from ..lazy import optional
+from ..settings import settings_for
+
+
+def _no_pause(mod) -> None:
+    # Stealth optimizations: disable failsafe and pause for faster execution
+    mod.PAUSE = 0
+    mod.FAILSAFE = False  # Disable failsafe for stealth
+
+
+def _setup_pyautogui(mod) -> None:
+    from ..vision.capture import pyautogui_all_screens
+
+    _no_pause(mod)
+    pyautogui_all_screens(mod)
+
+
+# Imported on first use; the settings above apply to every user of the modules
+# (Actions, backends, the pyautogui locate fallbacks in flows and scripts)
+pyautogui = optional("pyautogui", on_load=_setup_pyautogui)
+pdi = optional("pydirectinput", on_load=_no_pause)
+
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "sendinput", "pydirectinput", "pyautogui", "record", "legacy")
+
+
+def _range_s(lo_ms, hi_ms) -> Optional[Tuple[float, float]]:
+    if lo_ms is None or hi_ms is None:
+        return None
+    try:
+        lo = max(0.0, float(lo_ms) / 1000.0)
+        return lo, max(lo, float(hi_ms) / 1000.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class InputProfile:
+    """`cfg["input"]` and the input-related `timings`, parsed once.
+
+    Durations are in seconds; a hold of 0 lets a backend send the down and up
+    events together. `action_pause_s` is None unless
+    `timings.random_action_pause` is on.
+    """
+
+    backend: str = "auto"
+    prefer_direct: bool = False
+    key_hold_s: float = 0.08
+    press_repeats: int = 1
+    press_gap_s: float = 0.07
+    mouse_hold_s: float = 0.06
+    move_s: float = 0.0
+    move_range_s: Optional[Tuple[float, float]] = None
+    wiggle: bool = False
+    click_repeats: int = 1
+    click_gap_s: float = 0.08
+    use_wm_messages: bool = False
+    jitter_s: Tuple[float, float] = (0.05, 0.12)
+    action_pause_s: Optional[Tuple[float, float]] = None
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> "InputProfile":
+        return cls.from_settings(settings_for(cfg))
+
+    @classmethod
+    def from_settings(cls, s) -> "InputProfile":
+        i, t = s.input, s.timings
+        backend = i.backend.lower()
+        if backend not in BACKENDS:
+            logger.warning("Unknown input.backend %r; using auto", backend)
+            backend = "auto"
+        pause = None
+        if t.random_action_pause:
+            pause = _range_s(t.action_pause_min_ms, t.action_pause_max_ms)
+        return cls(
+            backend=backend,
+            prefer_direct=i.prefer_direct,
+            key_hold_s=max(0.0, int(i.hold_ms) / 1000.0),
+            press_repeats=max(1, int(i.press_repeats)),
+            press_gap_s=max(0.0, i.repeat_interval_ms / 1000.0),
+            mouse_hold_s=max(0.0, int(i.mouse_hold_ms) / 1000.0),
+            move_s=max(0.0, i.mouse_move_duration_ms / 1000.0),
+            move_range_s=_range_s(i.mouse_move_duration_ms_min, i.mouse_move_duration_ms_max),
+            wiggle=i.wiggle_before_click,
+            click_repeats=max(1, int(i.click_repeats)),
+            click_gap_s=max(0.0, i.click_interval_ms / 1000.0),
+            use_wm_messages=i.use_wm_messages,
+            jitter_s=_range_s(t.wait_min_ms, t.wait_max_ms) or (0.0, 0.0),
+            action_pause_s=pause,
+        )
+
+    def move_duration(self) -> float:
+        """Pre-click move time: random within the configured range, else the fixed one."""
+        if self.move_range_s is not None:
+            return random.uniform(*self.move_range_s)
+        return self.move_s
+
+
+class InputEvent(NamedTuple):
+    t: float  # CLOCK.now()
+    kind: str  # move | down | up | kdown | kup | text
+    x: int = 0
+    y: int = 0
+    button: str = ""
+    key: str = ""
+
+
+class RecordingBackend:
+    """Backend that only records what it would send; for tests and benchmarks off Windows.
+
+    Holds and move durations pass on CLOCK, so a virtual clock makes them free.
+    """
+
+    name = "record"
+
+    def __init__(self, pos: Tuple[int, int] = (0, 0)) -> None:
+        self.pos = pos
+        self.events: List[InputEvent] = []
+
+    def _add(self, kind: str, **kw) -> None:
+        self.events.append(InputEvent(CLOCK.now(), kind, **kw))
+
+    def position(self) -> Tuple[int, int]:
+        return self.pos
+
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        if duration > 0:
+            CLOCK.sleep(duration)
+        self.pos = (int(x), int(y))
+        self._add("move", x=self.pos[0], y=self.pos[1])
+
+    def click(self, x: int, y: int, button: str = "left", hold_s: float = 0.0, move_s: float = 0.0, wiggle: bool = False) -> None:
+        self.move(x, y, move_s)
+        self._add("down", x=self.pos[0], y=self.pos[1], button=button)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        self._add("up", x=self.pos[0], y=self.pos[1], button=button)
+
+    def key_down(self, key: str) -> None:
+        self._add("kdown", key=key)
+
+    def key_up(self, key: str) -> None:
+        self._add("kup", key=key)
+
+    def press(self, key: str, hold_s: float = 0.0) -> None:
+        self.key_down(key)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        self.key_up(key)
+
+    def hotkey(self, *keys: str) -> None:
+        for k in keys:
+            self.key_down(k)
+        for k in reversed(keys):
+            self.key_up(k)
+
+    def type_text(self, text: str) -> None:
+        self._add("text", key=text)
+
+
+class LibraryBackend:
+    """pydirectinput or pyautogui, which share the moveTo/mouseDown/keyDown API."""
+
+    def __init__(self, lib, name: str) -> None:
+        self.lib = lib
+        self.name = name
+        lib.PAUSE = 0
+        lib.FAILSAFE = False
+
+    def position(self) -> Optional[Tuple[int, int]]:
+        if not pyautogui:
+            return None
+        p = pyautogui.position()
+        return int(p.x), int(p.y)
+
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        self.lib.moveTo(x, y, duration=duration)
+
+    def click(self, x: int, y: int, button: str = "left", hold_s: float = 0.0, move_s: float = 0.0, wiggle: bool = False) -> None:
+        if wiggle:
+            self.lib.moveRel(1, 0)
+            self.lib.moveRel(-1, 0)
+        self.lib.moveTo(x, y, duration=move_s)
+        self.lib.mouseDown(x=x, y=y, button=button)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        self.lib.mouseUp(x=x, y=y, button=button)
+
+    def key_down(self, key: str) -> None:
+        self.lib.keyDown(key)
+
+    def key_up(self, key: str) -> None:
+        self.lib.keyUp(key)
+
+    def press(self, key: str, hold_s: float = 0.0) -> None:
+        self.lib.keyDown(key)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        self.lib.keyUp(key)
+
+    def hotkey(self, *keys: str) -> None:
+        for k in keys:
+            self.lib.keyDown(k)
+        for k in reversed(keys):
+            self.lib.keyUp(k)
+
+    def type_text(self, text: str) -> None:
+        for ch in text:
+            self.press(ch)
+
+
+# Virtual-key codes for named keys; single characters go through VkKeyScanW
+_VK = {
+    "backspace": 0x08, "tab": 0x09, "enter": 0x0D, "return": 0x0D, "shift": 0x10, "ctrl": 0x11,
+    "alt": 0x12, "pause": 0x13, "capslock": 0x14, "esc": 0x1B, "escape": 0x1B, "space": 0x20,
+    "pageup": 0x21, "pagedown": 0x22, "end": 0x23, "home": 0x24, "left": 0x25, "up": 0x26,
+    "right": 0x27, "down": 0x28, "insert": 0x2D, "delete": 0x2E, "del": 0x2E,
+    **{"f%d" % i: 0x6F + i for i in range(1, 13)},
+}
+# Keys whose scan code needs KEYEVENTF_EXTENDEDKEY
+_EXTENDED = {0x21, 0x22, 0x23, 0x24, 0x25, 0x26, 0x27, 0x28, 0x2D, 0x2E}
+
+
+class _SendBlocked(OSError):
+    """SendInput inserted fewer events than it was given."""
+
+
+def _falls_back(fn):
+    """Run `fn`, or the same method of the fallback backend once SendInput is blocked."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self._fallen_back is None:
+            try:
+                return fn(self, *args, **kwargs)
+            except _SendBlocked:
+                if self._fallen_back is None:
+                    raise
+        return getattr(self._fallen_back, name)(*args, **kwargs)
+
+    return wrapper
+
+
+def _library_backend() -> Optional[LibraryBackend]:
+    """pydirectinput, else pyautogui, else None."""
+    if pdi:
+        return LibraryBackend(pdi, "pydirectinput")
+    if pyautogui:
+        return LibraryBackend(pyautogui, "pyautogui")
+    return None
+
+
+class SendInputBackend:
+    """Windows input through `user32.SendInput` with scan codes (what DirectInput games read).
+
+    A click is one SendInput array (move, down, up) when there is no hold time,
+    otherwise two (move+down, then up after the hold); a key press likewise. The
+    ctypes structures, screen metrics and scan codes are prepared once.
+
+    SendInput inserts fewer events than given when Windows blocks them, which
+    is typically UIPI: the game runs elevated and this process does not. With a
+    `fallback` factory, the first short insert logs a warning and every call from
+    then on, including the one that failed, goes to the backend it returns.
+    Without one, or if it returns None, the failure raises OSError.
+    """
+
+    name = "sendinput"
+
+    INPUT_MOUSE, INPUT_KEYBOARD = 0, 1
+    MOUSEEVENTF_MOVE, MOUSEEVENTF_ABSOLUTE, MOUSEEVENTF_VIRTUALDESK = 0x0001, 0x8000, 0x4000
+    BUTTON_FLAGS = {"left": (0x0002, 0x0004), "right": (0x0008, 0x0010), "middle": (0x0020, 0x0040)}
+    KEYEVENTF_EXTENDEDKEY, KEYEVENTF_KEYUP, KEYEVENTF_UNICODE, KEYEVENTF_SCANCODE = 0x0001, 0x0002, 0x0004, 0x0008
+
+    def __init__(self, fallback: Optional[Callable[[], Optional[LibraryBackend]]] = None) -> None:
+        if sys.platform[:3] != "win":
+            raise RuntimeError("SendInput is only available on Windows")
+        self._fallback = fallback
+        self._fallen_back: Optional[LibraryBackend] = None
+        import ctypes
+        from ctypes import wintypes
+
+        self._ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        ULONG_PTR = ctypes.c_size_t
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ULONG_PTR)]
+
+        class HARDWAREINPUT(ctypes.Structure):
+            _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+
+        class _U(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT), ("hi", HARDWAREINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("u", _U)]
+
+        class POINT(ctypes.Structure):
+            _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
+
+        self._MOUSEINPUT, self._KEYBDINPUT, self._U, self._INPUT, self._POINT = MOUSEINPUT, KEYBDINPUT, _U, INPUT, POINT
+        self._size = ctypes.sizeof(INPUT)
+        # Virtual desktop (all monitors): SM_XVIRTUALSCREEN .. SM_CYVIRTUALSCREEN
+        gsm = self.user32.GetSystemMetrics
+        self._vx, self._vy = gsm(76), gsm(77)
+        self._vw, self._vh = max(1, gsm(78)), max(1, gsm(79))
+        self._scan: Dict[str, Tuple[int, int]] = {}
+
+    # -- building blocks ------------------------------------------------------
+
+    def _mouse(self, flags: int, x: int = 0, y: int = 0):
+        return self._INPUT(type=self.INPUT_MOUSE, u=self._U(mi=self._MOUSEINPUT(dx=x, dy=y, mouseData=0, dwFlags=flags, time=0, dwExtraInfo=0)))
+
+    def _abs_move(self, x: int, y: int):
+        # Absolute coordinates are normalized to 0..65535 across the virtual desktop
+        nx = int(round((x - self._vx) * 65535 / max(1, self._vw - 1)))
+        ny = int(round((y - self._vy) * 65535 / max(1, self._vh - 1)))
+        return self._mouse(self.MOUSEEVENTF_MOVE | self.MOUSEEVENTF_ABSOLUTE | self.MOUSEEVENTF_VIRTUALDESK, nx, ny)
+
+    def _key(self, scan: int, flags: int):
+        return self._INPUT(type=self.INPUT_KEYBOARD, u=self._U(ki=self._KEYBDINPUT(wVk=0, wScan=scan, dwFlags=flags, time=0, dwExtraInfo=0)))
+
+    def _scan_code(self, key: str) -> Tuple[int, int]:
+        k = key.lower()
+        hit = self._scan.get(k)
+        if hit is not None:
+            return hit
+        vk = _VK.get(k)
+        if vk is None and len(k) == 1:
+            r = self.user32.VkKeyScanW(ord(k))
+            vk = None if r == -1 else r & 0xFF
+        if vk is None:
+            raise ValueError("No virtual-key code for %r" % key)
+        scan = self.user32.MapVirtualKeyW(vk, 0)  # MAPVK_VK_TO_VSC
+        if not scan:
+            raise ValueError("No scan code for %r" % key)
+        flags = self.KEYEVENTF_SCANCODE | (self.KEYEVENTF_EXTENDEDKEY if vk in _EXTENDED else 0)
+        self._scan[k] = (scan, flags)
+        return scan, flags
+
+    def _key_event(self, key: str, up: bool):
+        scan, flags = self._scan_code(key)
+        return self._key(scan, flags | (self.KEYEVENTF_KEYUP if up else 0))
+
+    def send(self, *inputs) -> None:
+        if self._fallen_back is not None:
+            raise _SendBlocked("SendInput is blocked; using %s" % self._fallen_back.name)
+        n = len(inputs)
+        sent = self.user32.SendInput(n, (self._INPUT * n)(*inputs), self._size)
+        if sent != n:
+            # Typically UIPI: the target runs elevated and this process doesn't
+            fb = self._fallback() if self._fallback is not None else None
+            if fb is not None:
+                logger.warning(
+                    "SendInput inserted %d of %d events (is the game running as administrator?); using %s from now on",
+                    sent, n, fb.name,
+                )
+                self._fallen_back = fb
+                self.name = fb.name
+            raise _SendBlocked("SendInput inserted %d of %d events" % (sent, n))
+
+    # -- backend interface ----------------------------------------------------
+
+    @_falls_back
+    def position(self) -> Optional[Tuple[int, int]]:
+        pt = self._POINT()
+        if self.user32.GetCursorPos(self._ctypes.byref(pt)):
+            return int(pt.x), int(pt.y)
+        return None
+
+    @_falls_back
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        start = self.position() if duration > 0 else None
+        if start is not None:
+            sx, sy = start
+            steps = max(5, int(duration / 0.01))  # ~100 Hz
+            for i in range(1, steps):
+                t = i / steps
+                self.send(self._abs_move(int(sx + (x - sx) * t), int(sy + (y - sy) * t)))
+                CLOCK.sleep(duration / steps)
+        self.send(self._abs_move(x, y))
+
+    @_falls_back
+    def click(self, x: int, y: int, button: str = "left", hold_s: float = 0.0, move_s: float = 0.0, wiggle: bool = False) -> None:
+        down, up = self.BUTTON_FLAGS.get(button, self.BUTTON_FLAGS["left"])
+        seq = []
+        if wiggle:
+            seq += [self._mouse(self.MOUSEEVENTF_MOVE, 1, 0), self._mouse(self.MOUSEEVENTF_MOVE, -1, 0)]
+        if move_s > 0:
+            if seq:
+                self.send(*seq)
+                seq = []
+            self.move(x, y, move_s)
+        else:
+            seq.append(self._abs_move(x, y))
+        seq.append(self._mouse(down))
+        if hold_s <= 0:
+            self.send(*seq, self._mouse(up))
+            return
+        self.send(*seq)
+        CLOCK.sleep(hold_s)
+        self.send(self._mouse(up))
+
+    @_falls_back
+    def key_down(self, key: str) -> None:
+        self.send(self._key_event(key, up=False))
+
+    @_falls_back
+    def key_up(self, key: str) -> None:
+        self.send(self._key_event(key, up=True))
+
+    @_falls_back
+    def press(self, key: str, hold_s: float = 0.0) -> None:
+        if hold_s <= 0:
+            self.send(self._key_event(key, up=False), self._key_event(key, up=True))
+            return
+        self.key_down(key)
+        CLOCK.sleep(hold_s)
+        self.key_up(key)
+
+    @_falls_back
+    def hotkey(self, *keys: str) -> None:
+        self.send(*[self._key_event(k, up=False) for k in keys], *[self._key_event(k, up=True) for k in reversed(keys)])
+
+    @_falls_back
+    def type_text(self, text: str) -> None:
+        if not text:
+            return
+        seq = []
+        for ch in text:
+            seq += [self._key(ord(ch), self.KEYEVENTF_UNICODE), self._key(ord(ch), self.KEYEVENTF_UNICODE | self.KEYEVENTF_KEYUP)]
+        self.send(*seq)
+
+
+def select_backend(profile: InputProfile):
+    """Build the backend `profile.backend` names, once per Actions.
+
+    "auto" prefers SendInput on Windows when `prefer_direct` is set, then
+    pydirectinput (if preferred), pyautogui and pydirectinput, and logs its
+    pick. SendInput picked by "auto" switches to pydirectinput or pyautogui
+    if Windows blocks its input. Returns None for "legacy" (Actions' per-call
+    fallback chain) or when nothing is available.
+    """
+    name = profile.backend
+    if name == "legacy":
+        return None
+    if name == "record":
+        return RecordingBackend()
+    if name == "auto":
+        if profile.prefer_direct and sys.platform[:3] == "win":
+            name = "sendinput"
+        elif profile.prefer_direct and pdi:
+            name = "pydirectinput"
+        elif pyautogui:
+            name = "pyautogui"
+        elif pdi:
+            name = "pydirectinput"
+        else:
+            logger.warning("input.backend auto: no input library available")
+            return None
+        logger.info("input.backend auto picked %s%s", name, " (prefer_direct)" if profile.prefer_direct else "")
+        if name == "sendinput":
+            # Chosen implicitly: blocked input falls back to a library rather than failing the flow
+            return SendInputBackend(fallback=_library_backend)
+    if name == "sendinput":
+        return SendInputBackend()
+    if name == "pydirectinput":
+        if not pdi:
+            raise RuntimeError("input.backend 'pydirectinput' requires 'pydirectinput' to be installed.")
+        return LibraryBackend(pdi, "pydirectinput")
+    if not pyautogui:
+        raise RuntimeError("input.backend 'pyautogui' requires 'pyautogui' to be installed.")
+    return LibraryBackend(pyautogui, "pyautogui")
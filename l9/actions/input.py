@@ -2,46 +2,72 @@ from __future__ import annotations
 
 import logging
 import random
-import time
 import sys
 from typing import Iterable, Optional
 
 
 logger = logging.getLogger(__name__)
 
-try:
-    import pyautogui  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    pyautogui = None
+from ..clock import CLOCK
+from ..lazy import optional
+from ..profiling import timed
+from ..reload import RELOADER
+from ..settings import settings_for
+from .backends import InputProfile, pdi, pyautogui, select_backend
 
-try:
-    import pydirectinput as pdi  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    pdi = None
-
-try:
-    import keyboard as kb  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    kb = None
+kb = optional("keyboard")
 
 
 class Actions:
-    def __init__(self, cfg: dict, dry_run: bool = False) -> None:
+    """Mouse and keyboard input for flows.
+
+    The input config is compiled once into `profile` and the backend is chosen
+    once from `input.backend` (see `backends.select_backend`); "legacy" keeps
+    the per-call fallback chain through pydirectinput, pyautogui, keyboard and
+    WinAPI. A `backend` passed in (e.g. `l9.sim.devices.SimInput`) receives
+    every input instead of the OS and skips window checks: it needs `move`,
+    `click`, `key_down`, `key_up`, `press`, `hotkey`, `type_text` and
+    `position`, as in `backends.RecordingBackend`. Jitter and action pauses
+    apply either way.
+    """
+
+    def __init__(self, cfg: dict, dry_run: bool = False, backend=None) -> None:
         self.cfg = cfg
+        self.s = settings_for(cfg)
         self.dry = dry_run
+        self.profile = InputProfile.from_cfg(cfg)
+        self.backend = backend
+        self._click_to_focus = self.s.window.click_to_focus
+        self._focus_clicked = -1
+        # Backend chosen here from `input.backend` (not passed in, not dry): re-chosen on reload
+        self._own_backend = backend is None and not dry_run
+        RELOADER.subscribe(self)
+        if backend is not None:
+            self._win = None
+            return
         self._set_dpi_aware()
         try:
             from .window import WindowManager
             self._win = WindowManager(cfg)
         except Exception:
             self._win = None  # Fallback if window checks unavailable
-        if pyautogui is not None:
-            # Stealth optimizations: disable failsafe and pause for faster execution
-            pyautogui.PAUSE = 0
-            pyautogui.FAILSAFE = False  # Disable failsafe for stealth
-        if pdi is not None:
-            pdi.PAUSE = 0
-            pdi.FAILSAFE = False
+        if not dry_run:
+            self.backend = select_backend(self.profile)
+            logger.info("Input backend: %s", getattr(self.backend, "name", "legacy"))
+
+    def apply_settings(self, s, changed) -> None:
+        """Take a reloaded config: recompile the profile and re-pick the backend only if they changed."""
+        self.s = s
+        if changed & {"input", "timings"}:
+            profile = InputProfile.from_settings(s)
+            old, self.profile = self.profile, profile
+            if self._own_backend and (profile.backend, profile.prefer_direct) != (old.backend, old.prefer_direct):
+                self.backend = select_backend(profile)
+                logger.info("Input backend: %s", getattr(self.backend, "name", "legacy"))
+        if "window" in changed:
+            self._click_to_focus = s.window.click_to_focus
+            if self._win is not None:
+                self._win.apply_settings(s)
 
     def _set_dpi_aware(self) -> None:
         if sys.platform[:3] != "win":
@@ -59,32 +85,22 @@ class Actions:
                 pass
 
     def _sleep_jitter(self) -> None:
-        tmin = float(self.cfg.get("timings", {}).get("wait_min_ms", 50)) / 1000.0
-        tmax = float(self.cfg.get("timings", {}).get("wait_max_ms", 120)) / 1000.0
-        dt = random.uniform(tmin, tmax)
-        time.sleep(dt)
+        CLOCK.sleep(random.uniform(*self.profile.jitter_s))
 
     def _action_pause(self) -> None:
         """Optional random pause after an action, for human-like timing.
 
         Controlled by timings.random_action_pause and min/max in ms.
         """
-        tcfg = self.cfg.get("timings", {}) or {}
-        if not bool(tcfg.get("random_action_pause", False)):
-            return
-        try:
-            lo_ms = int(tcfg.get("action_pause_min_ms", 1000))
-            hi_ms = int(tcfg.get("action_pause_max_ms", 3000))
-            if hi_ms < lo_ms:
-                hi_ms = lo_ms
-            time.sleep(random.uniform(lo_ms, hi_ms) / 1000.0)
-        except Exception:
-            pass
+        if self.profile.action_pause_s is not None:
+            CLOCK.sleep(random.uniform(*self.profile.action_pause_s))
 
     def _get_cursor_pos(self) -> Optional[tuple[int, int]]:
+        if self.backend is not None:
+            return self.backend.position()
         # Try pyautogui first
         try:
-            if pyautogui is not None:
+            if pyautogui:
                 p = pyautogui.position()
                 return int(p.x), int(p.y)
         except Exception:
@@ -113,12 +129,12 @@ class Actions:
         if duration <= 0:
             # best-effort: use backend immediate move
             try:
-                if pdi is not None:
+                if pdi:
                     pdi.moveTo(x, y)
                     return
             except Exception:
                 pass
-            if pyautogui is not None:
+            if pyautogui:
                 try:
                     pyautogui.moveTo(x, y)
                 except Exception:
@@ -133,7 +149,7 @@ class Actions:
             return
 
         # Use pyautogui if present for natural tweening
-        if pyautogui is not None:
+        if pyautogui:
             try:
                 pyautogui.moveTo(x, y, duration=duration)
                 return
@@ -145,9 +161,9 @@ class Actions:
         if not start:
             # As a last resort, just jump
             try:
-                if pdi is not None:
+                if pdi:
                     pdi.moveTo(x, y)
-                elif pyautogui is not None:
+                elif pyautogui:
                     pyautogui.moveTo(x, y)
             except Exception:
                 pass
@@ -163,15 +179,15 @@ class Actions:
                     nx = int(sx + (x - sx) * t)
                     ny = int(sy + (y - sy) * t)
                     user32.SetCursorPos(nx, ny)
-                    time.sleep(duration / steps)
+                    CLOCK.sleep(duration / steps)
                 return
         except Exception:
             pass
         # If all else fails
         try:
-            if pdi is not None:
+            if pdi:
                 pdi.moveTo(x, y)
-            elif pyautogui is not None:
+            elif pyautogui:
                 pyautogui.moveTo(x, y)
         except Exception:
             pass
@@ -185,21 +201,16 @@ class Actions:
         if not ok:
             logger.warning("Input blocked: target window not foreground/maximized as required")
             return False
-        # Optional click to solidify focus (some games need a click)
-        try:
-            if bool(self.cfg.get("window", {}).get("click_to_focus", False)):
-                # Prefer clicking center of the foreground window rectangle
-                import ctypes  # type: ignore
-                from ctypes import wintypes  # type: ignore
-                user32 = ctypes.windll.user32
-                hwnd = user32.GetForegroundWindow()
-                class RECT(ctypes.Structure):
-                    _fields_ = [("left", wintypes.LONG), ("top", wintypes.LONG), ("right", wintypes.LONG), ("bottom", wintypes.LONG)]
-                r = RECT()
-                ok = user32.GetWindowRect(hwnd, ctypes.byref(r))
-                if ok and r.right > r.left and r.bottom > r.top:
-                    cx = int((r.left + r.right) / 2)
-                    cy = int((r.top + r.bottom) / 2)
+        # Optional click to solidify focus (some games need a click), once each
+        # time the window (re)gains the foreground rather than before every input
+        if self._click_to_focus and self._win.focus_epoch != self._focus_clicked:
+            self._focus_clicked = self._win.focus_epoch
+            try:
+                # Prefer clicking center of the target window rectangle
+                rect = self._win.window_rect()
+                if rect is not None:
+                    cx = (rect[0] + rect[2]) // 2
+                    cy = (rect[1] + rect[3]) // 2
                 else:
                     # Fallback: click center of configured monitor
                     cx = cy = None
@@ -209,17 +220,17 @@ class Actions:
                         mss = None  # type: ignore
                     if mss is not None:
                         with mss.mss() as s:
-                            mon_idx = int(self.cfg.get("monitor_index", 1))
+                            mon_idx = int(self.s.monitor_index)
                             mons = s.monitors
                             i = max(1, min(mon_idx, len(mons) - 1))
                             mon = mons[i]
                             cx = int(mon["left"] + mon["width"] / 2)
                             cy = int(mon["top"] + mon["height"] / 2)
-                if cx is not None and pyautogui is not None:
+                if cx is not None and pyautogui:
                     pyautogui.click(x=cx, y=cy)
                     self._sleep_jitter()
-        except Exception:
-            pass
+            except Exception:
+                pass
         return True
 
     # Windows-only low-level fallback using SendInput with scan codes
@@ -241,7 +252,7 @@ class Actions:
             else:
                 down, up = 0x0002, 0x0004
             user32.mouse_event(down, 0, 0, 0, 0)
-            time.sleep(max(0.01, hold_ms / 1000.0))
+            CLOCK.sleep(max(0.01, hold_ms / 1000.0))
             user32.mouse_event(up, 0, 0, 0, 0)
             return True
         except Exception:
@@ -349,6 +360,7 @@ class Actions:
         except Exception:
             return False
 
+    @timed("input")
     def move(self, x: int, y: int, duration: float = 0.0) -> None:
         if self.dry:
             logger.info("[dry] move to x=%s y=%s dur=%.2f", x, y, duration)
@@ -356,30 +368,34 @@ class Actions:
             return
         if not self._window_ok():
             return
-        prefer_direct = bool(self.cfg.get("input", {}).get("prefer_direct", False))
+        if self.backend is not None:
+            self.backend.move(x, y, duration)
+            self._sleep_jitter()
+            self._action_pause()
+            return
         sent = False
-        if prefer_direct and pdi is not None:
+        if self.profile.prefer_direct and pdi:
             try:
                 pdi.moveTo(x, y, duration=duration)
                 logger.info("move backend=pydirectinput x=%s y=%s", x, y)
                 sent = True
             except Exception:
                 sent = False
-        if not sent and pyautogui is not None:
+        if not sent and pyautogui:
             try:
                 pyautogui.moveTo(x, y, duration=duration)
                 logger.info("move backend=pyautogui x=%s y=%s", x, y)
                 sent = True
             except Exception:
                 sent = False
-        if not sent and pdi is not None:
+        if not sent and pdi:
             try:
                 pdi.moveTo(x, y, duration=duration)
                 logger.info("move backend=pydirectinput-fallback x=%s y=%s", x, y)
             except Exception:
                 pass
         # Optionally also send WM_* messages to the window
-        if not self.dry and bool(self.cfg.get("input", {}).get("use_wm_messages", False)):
+        if not self.dry and self.profile.use_wm_messages:
             try:
                 self._send_mouse_wm(x, y, button=button)
                 logger.info("click backend=wm_message x=%s y=%s btn=%s", x, y, button)
@@ -388,6 +404,7 @@ class Actions:
         self._sleep_jitter()
         self._action_pause()
 
+    @timed("input")
     def click(self, x: int, y: int, button: str = "left", clicks: int = 1, interval: float = 0.1) -> None:
         if self.dry:
             logger.info("[dry] click x=%s y=%s button=%s clicks=%s", x, y, button, clicks)
@@ -395,47 +412,42 @@ class Actions:
             return
         if not self._window_ok():
             return
-        prefer_direct = bool(self.cfg.get("input", {}).get("prefer_direct", False))
-        fire_all = bool(self.cfg.get("input", {}).get("fire_all_click_backends", False))
-        wiggle = bool(self.cfg.get("input", {}).get("wiggle_before_click", False))
-        c_repeats = int(self.cfg.get("input", {}).get("click_repeats", 1))
-        c_gap = max(0, float(self.cfg.get("input", {}).get("click_interval_ms", 80)) / 1000.0)
-        hold_ms = int(self.cfg.get("input", {}).get("mouse_hold_ms", 60))
+        p = self.profile
+        if self.backend is not None:
+            for _ in range(p.click_repeats):
+                self.backend.click(x, y, button=button, hold_s=p.mouse_hold_s, move_s=p.move_duration(), wiggle=p.wiggle)
+                CLOCK.sleep(p.click_gap_s)
+            self._sleep_jitter()
+            self._action_pause()
+            return
+        prefer_direct = p.prefer_direct
+        wiggle = p.wiggle
+        c_repeats = p.click_repeats
+        c_gap = p.click_gap_s
+        hold_ms = int(p.mouse_hold_s * 1000)
 
         def do_click_once(cx: int, cy: int) -> bool:
             did = False
             # Optional wiggle before click
             if wiggle:
                 try:
-                    if prefer_direct and pdi is not None:
+                    if prefer_direct and pdi:
                         pdi.moveRel(1, 0)
                         pdi.moveRel(-1, 0)
-                    elif pyautogui is not None:
+                    elif pyautogui:
                         pyautogui.moveRel(1, 0)
                         pyautogui.moveRel(-1, 0)
                 except Exception:
                     pass
             # Optional smooth move duration before the click (supports per-click randomization)
-            in_cfg = self.cfg.get("input", {}) or {}
-            min_ms = in_cfg.get("mouse_move_duration_ms_min")
-            max_ms = in_cfg.get("mouse_move_duration_ms_max")
-            move_dur: float
-            if min_ms is not None and max_ms is not None:
-                try:
-                    lo = max(0.0, float(min_ms) / 1000.0)
-                    hi = max(lo, float(max_ms) / 1000.0)
-                    move_dur = random.uniform(lo, hi)
-                except Exception:
-                    move_dur = max(0.0, float(in_cfg.get("mouse_move_duration_ms", 0)) / 1000.0)
-            else:
-                move_dur = max(0.0, float(in_cfg.get("mouse_move_duration_ms", 0)) / 1000.0)
+            move_dur = p.move_duration()
             # Preferred backend: smooth move then DirectInput down/up with hold
-            if prefer_direct and pdi is not None:
+            if prefer_direct and pdi:
                 try:
                     # Smoothly move the cursor to target if duration > 0
                     self._smooth_move_to(cx, cy, move_dur)
                     pdi.mouseDown(x=cx, y=cy, button=button)
-                    time.sleep(max(0.01, hold_ms / 1000.0))
+                    CLOCK.sleep(max(0.01, hold_ms / 1000.0))
                     pdi.mouseUp(x=cx, y=cy, button=button)
                     logger.info("click backend=pydirectinput x=%s y=%s btn=%s", cx, cy, button)
                     did = True
@@ -446,7 +458,7 @@ class Actions:
             #     try:
             #         self._smooth_move_to(cx, cy, move_dur)
             #         pyautogui.mouseDown(x=cx, y=cy, button=button)
-            #         time.sleep(max(0.01, hold_ms / 1000.0))
+            #         CLOCK.sleep(max(0.01, hold_ms / 1000.0))
             #         pyautogui.mouseUp(x=cx, y=cy, button=button)
             #         logger.info("click backend=pyautogui x=%s y=%s btn=%s", cx, cy, button)
             #         did = True
@@ -472,28 +484,37 @@ class Actions:
         last = False
         for i in range(max(1, c_repeats)):
             last = do_click_once(x, y)
-            time.sleep(c_gap)
+            CLOCK.sleep(c_gap)
         self._sleep_jitter()
         self._action_pause()
 
+    @timed("input")
     def press(self, key: str) -> None:
-        if self.dry or pyautogui is None:
+        if self.dry or (not pyautogui and self.backend is None):
             logger.info("[dry] press key=%s", key)
             self._sleep_jitter()
             return
         if not self._window_ok():
             return
+        p = self.profile
+        if self.backend is not None:
+            for _ in range(p.press_repeats):
+                self.backend.press(key, hold_s=p.key_hold_s)
+                CLOCK.sleep(p.press_gap_s)
+            self._sleep_jitter()
+            self._action_pause()
+            return
         # Attempt chain with repeats and optional prefer_direct
         sent = False
-        prefer_direct = bool(self.cfg.get("input", {}).get("prefer_direct", False))
-        hold_ms = int(self.cfg.get("input", {}).get("hold_ms", 80))
-        repeats = int(self.cfg.get("input", {}).get("press_repeats", 1))
-        gap = max(0, float(self.cfg.get("input", {}).get("repeat_interval_ms", 70)) / 1000.0)
+        prefer_direct = p.prefer_direct
+        hold_ms = int(p.key_hold_s * 1000)
+        repeats = p.press_repeats
+        gap = p.press_gap_s
 
         def press_once_with(func_down, func_up) -> bool:
             try:
                 func_down(key)
-                time.sleep(max(0.01, hold_ms / 1000.0))
+                CLOCK.sleep(max(0.01, hold_ms / 1000.0))
                 func_up(key)
                 return True
             except Exception:
@@ -502,17 +523,17 @@ class Actions:
         for _ in range(max(1, repeats)):
             sent = False
             # Preferred DirectInput first
-            if prefer_direct and pdi is not None:
+            if prefer_direct and pdi:
                 sent = press_once_with(pdi.keyDown, pdi.keyUp)
                 if sent:
                     logger.info("press backend=pydirectinput key=%s", key)
             # PyAutoGUI
-            if not sent and pyautogui is not None:
+            if not sent and pyautogui:
                 sent = press_once_with(pyautogui.keyDown, pyautogui.keyUp)
                 if sent:
                     logger.info("press backend=pyautogui key=%s", key)
             # keyboard module
-            if not sent and kb is not None:
+            if not sent and kb:
                 try:
                     kb.press_and_release(key)
                     sent = True
@@ -525,53 +546,59 @@ class Actions:
                 if sent:
                     logger.info("press backend=winapi key=%s", key)
             # DirectInput fallback (if not preferred earlier)
-            if not sent and pdi is not None:
+            if not sent and pdi:
                 sent = press_once_with(pdi.keyDown, pdi.keyUp)
                 if sent:
                     logger.info("press backend=pydirectinput-fallback key=%s", key)
-            time.sleep(gap)
+            CLOCK.sleep(gap)
         if not sent:
             logger.warning("All key press backends failed for key=%s", key)
         self._sleep_jitter()
         self._action_pause()
 
+    @timed("input")
     def press_once(self, key: str) -> None:
         """Press a key exactly once, ignoring press_repeats in config.
 
         Keeps the same backend preference and hold timing as `press`, but forces a
         single down/up sequence. Useful for toggles like opening inventory.
         """
-        if self.dry or pyautogui is None:
+        if self.dry or (not pyautogui and self.backend is None):
             logger.info("[dry] press_once key=%s", key)
             self._sleep_jitter()
             return
         if not self._window_ok():
             return
+        if self.backend is not None:
+            self.backend.press(key, hold_s=self.profile.key_hold_s)
+            self._sleep_jitter()
+            self._action_pause()
+            return
         sent = False
-        prefer_direct = bool(self.cfg.get("input", {}).get("prefer_direct", False))
-        hold_ms = int(self.cfg.get("input", {}).get("hold_ms", 80))
+        prefer_direct = self.profile.prefer_direct
+        hold_ms = int(self.profile.key_hold_s * 1000)
 
         def press_once_with(func_down, func_up) -> bool:
             try:
                 func_down(key)
-                time.sleep(max(0.01, hold_ms / 1000.0))
+                CLOCK.sleep(max(0.01, hold_ms / 1000.0))
                 func_up(key)
                 return True
             except Exception:
                 return False
 
         # Preferred DirectInput first
-        if prefer_direct and pdi is not None:
+        if prefer_direct and pdi:
             sent = press_once_with(pdi.keyDown, pdi.keyUp)
             if sent:
                 logger.info("press_once backend=pydirectinput key=%s", key)
         # PyAutoGUI
-        if not sent and pyautogui is not None:
+        if not sent and pyautogui:
             sent = press_once_with(pyautogui.keyDown, pyautogui.keyUp)
             if sent:
                 logger.info("press_once backend=pyautogui key=%s", key)
         # keyboard module
-        if not sent and kb is not None:
+        if not sent and kb:
             try:
                 kb.press_and_release(key)
                 sent = True
@@ -584,7 +611,7 @@ class Actions:
             if sent:
                 logger.info("press_once backend=winapi key=%s", key)
         # DirectInput fallback (if not preferred earlier)
-        if not sent and pdi is not None:
+        if not sent and pdi:
             sent = press_once_with(pdi.keyDown, pdi.keyUp)
             if sent:
                 logger.info("press_once backend=pydirectinput-fallback key=%s", key)
@@ -593,23 +620,60 @@ class Actions:
         self._sleep_jitter()
         self._action_pause()
 
+    @timed("input")
     def hotkey(self, *keys: Iterable[str]) -> None:
-        if self.dry or pyautogui is None:
+        if self.dry or (not pyautogui and self.backend is None):
             logger.info("[dry] hotkey keys=%s", "+".join(keys))
             self._sleep_jitter()
             return
         if not self._window_ok():
             return
-        pyautogui.hotkey(*keys)
+        if self.backend is not None:
+            self.backend.hotkey(*keys)
+        else:
+            pyautogui.hotkey(*keys)
         self._sleep_jitter()
         self._action_pause()
 
+    @timed("input")
     def type_text(self, text: str, interval: Optional[float] = None) -> None:
-        if self.dry or pyautogui is None:
+        if self.dry or (not pyautogui and self.backend is None):
             logger.info("[dry] type text=%r", text)
             self._sleep_jitter()
             return
         if not self._window_ok():
             return
-        pyautogui.typewrite(text, interval=interval)
+        if self.backend is not None:
+            self.backend.type_text(text)
+        else:
+            pyautogui.typewrite(text, interval=interval)
         self._sleep_jitter()
+
+    @timed("input")
+    def key_down(self, key: str) -> None:
+        """Hold `key` down (no window check or jitter; for timed replays)."""
+        if self.dry:
+            logger.debug("[dry] key_down key=%s", key)
+            return
+        if self.backend is not None:
+            self.backend.key_down(key)
+        elif self.profile.prefer_direct and pdi:
+            pdi.keyDown(key)
+        elif pyautogui:
+            pyautogui.keyDown(key)
+
+    @timed("input")
+    def key_up(self, key: str) -> None:
+        if self.dry:
+            logger.debug("[dry] key_up key=%s", key)
+            return
+        if self.backend is not None:
+            self.backend.key_up(key)
+        elif self.profile.prefer_direct and pdi:
+            pdi.keyUp(key)
+        elif pyautogui:
+            pyautogui.keyUp(key)
+
+    def cursor_pos(self) -> Optional[tuple[int, int]]:
+        """Current cursor position in screen coordinates, or None if unknown."""
+        return self._get_cursor_pos()
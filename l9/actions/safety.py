@@ -1,30 +1,71 @@
 from __future__ import annotations
 
 import logging
+import threading
 from contextlib import contextmanager
 
+from ..clock import CLOCK
+from ..lazy import optional
+from ..profiling import timed
+from ..reload import RELOADER
+from ..settings import settings_for
+
+keyboard = optional("keyboard")
 
-logger = logging.getLogger(__name__)
 
-try:
-    import keyboard  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    keyboard = None
+logger = logging.getLogger(__name__)
 
 
 class Panic(Exception):
     pass
 
 
+class Stopped(Panic):
+    """Raised inside a flow once a stop was requested (runner signal, GUI stop, runtime cancel)."""
+
+
+# Process-wide stop request; every Safety shares it so nested flows unwind together.
+STOP_EVENT = threading.Event()
+# Set by FlowRuntime to cancel the flow it supervises (watcher preemption). Flows
+# unwind the same way as on stop, but outer supervisors don't treat it as a stop.
+CANCEL_EVENT = threading.Event()
+
+
+def request_stop(reason: str = "") -> None:
+    if not STOP_EVENT.is_set():
+        logger.info("Stop requested%s", f": {reason}" if reason else "")
+    STOP_EVENT.set()
+
+
+def clear_stop() -> None:
+    STOP_EVENT.clear()
+
+
+def stop_requested() -> bool:
+    return STOP_EVENT.is_set()
+
+
 class Safety:
+    # Panic-key/cancel poll period while sleeping; stop requests wake the sleep immediately.
+    PANIC_POLL_S = 0.02
+
     def __init__(self, cfg: dict) -> None:
         self.cfg = cfg
-        self.panic_combo = str(cfg.get("keybinds", {}).get("panic_key", "shift+escape"))
-        if keyboard is None:
+        self.panic_combo = settings_for(cfg).keybinds.panic_key
+        if not keyboard:
             logger.warning("keyboard module not installed; panic key disabled")
+        RELOADER.subscribe(self)
+
+    def apply_settings(self, s, changed) -> None:
+        self.panic_combo = s.keybinds.panic_key
 
     def check(self) -> None:
-        if keyboard is None:
+        if STOP_EVENT.is_set() or CANCEL_EVENT.is_set():
+            raise Stopped("Stop requested")
+        self.check_panic()
+
+    def check_panic(self) -> None:
+        if not keyboard:
             return
         try:
             if keyboard.is_pressed(self.panic_combo):
@@ -33,13 +74,25 @@ class Safety:
             # On some systems this may require elevated privileges; ignore
             pass
 
+    @timed("sleep")
+    def sleep(self, seconds: float) -> None:
+        """CLOCK.sleep that returns early with Stopped/Panic instead of finishing the wait."""
+        deadline = CLOCK.now() + max(0.0, seconds)
+        while True:
+            self.check()
+            remaining = deadline - CLOCK.now()
+            if remaining <= 0:
+                return
+            CLOCK.wait(STOP_EVENT, min(self.PANIC_POLL_S, remaining))
+
     @contextmanager
     def guard(self):
         try:
             self.check()
             yield
             self.check()
+        except Stopped:
+            raise
         except Panic:
             logger.error("Panic triggered; aborting flow")
             raise
-
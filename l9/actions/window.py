@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import logging
 import sys
-from typing import Optional
+import time
+from typing import Optional, Tuple
+
+from ..settings import settings_for
 
 
 logger = logging.getLogger(__name__)
@@ -11,16 +14,31 @@ logger = logging.getLogger(__name__)
 class WindowManager:
     """Minimal Windows-only window foreground/maximize helper via ctypes.
 
+    The target window handle is cached: while it is still a visible window
+    (IsWindow) and the foreground window is that handle, no title is read and
+    nothing is enumerated; EnumWindows runs again only when the handle went
+    stale. A passed `ensure_focus()` is trusted for `window.focus_check_ms`, so
+    a burst of clicks costs one check. `focus_epoch` changes whenever the
+    target (re)gains the foreground; with neither guard set it changes whenever
+    the foreground window does (every call off Windows, where that is unknown).
+
     Falls back to no-ops on non-Windows platforms.
     """
 
+    # Window rect reuse, for clicks at the window center
+    RECT_TTL_S = 1.0
+
     def __init__(self, cfg: dict) -> None:
         self.cfg = cfg
-        self.title_sub = str(cfg.get("window", {}).get("title", "") or "")
-        self.require_foreground = bool(cfg.get("window", {}).get("require_foreground", False))
-        self.require_maximized = bool(cfg.get("window", {}).get("require_maximized", False))
-        self.auto_focus = bool(cfg.get("window", {}).get("auto_focus", False))
-        self.force_monitor_index = cfg.get("window", {}).get("force_to_monitor_index", None)
+        self._configure(settings_for(cfg).window)
+        self._hwnd = None
+        self._rect: Optional[Tuple[int, int, int, int]] = None
+        self._rect_hwnd = None
+        self._rect_t = 0.0
+        self._checked_t = float("-inf")
+        self._last_fg = None
+        self.focus_epoch = 0
+        self.enum_count = 0  # full EnumWindows scans, for benchmarks
         self._is_windows = sys.platform.startswith("win32") or sys.platform.startswith("cygwin")
         if not self._is_windows and (self.require_foreground or self.require_maximized):
             logger.warning("Window guards requested but unsupported on this platform; proceeding without enforcement")
@@ -43,6 +61,8 @@ class WindowManager:
             self.user32.GetWindowTextW.restype = wintypes.INT
             self.user32.IsWindowVisible.argtypes = [wintypes.HWND]
             self.user32.IsWindowVisible.restype = wintypes.BOOL
+            self.user32.IsWindow.argtypes = [wintypes.HWND]
+            self.user32.IsWindow.restype = wintypes.BOOL
 
             # EnumWindows callback type
             self.EnumWindowsProc = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
@@ -120,6 +140,7 @@ class WindowManager:
     def _find_window_by_substring(self, substr: str):
         if not self._is_windows:
             return None
+        self.enum_count += 1
         substr_low = substr.lower()
         hwnd_match = None
 
@@ -137,28 +158,96 @@ class WindowManager:
         self.user32.EnumWindows(enum_proc, 0)
         return hwnd_match
 
+    def _configure(self, w) -> None:
+        self.title_sub = w.title
+        self.require_foreground = w.require_foreground
+        self.require_maximized = w.require_maximized
+        self.auto_focus = w.auto_focus
+        self.force_monitor_index = w.force_to_monitor_index
+        self.focus_check_s = max(0.0, w.focus_check_ms / 1000.0)
+
+    def apply_settings(self, s) -> None:
+        """Take a reloaded `window` section; the next check looks the window up again."""
+        self._configure(s.window)
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Forget the cached handle, rect and last focus check."""
+        self._hwnd = None
+        self._rect = None
+        self._checked_t = float("-inf")
+
+    def target_window(self):
+        """Handle of the window matching `window.title`, cached while IsWindow() holds."""
+        if not self._is_windows or not self.title_sub:
+            return None
+        hwnd = self._hwnd
+        if hwnd and self.user32.IsWindow(hwnd) and self.user32.IsWindowVisible(hwnd):
+            return hwnd
+        self._hwnd = hwnd = self._find_window_by_substring(self.title_sub)
+        return hwnd
+
+    def window_rect(self) -> Optional[Tuple[int, int, int, int]]:
+        """(left, top, right, bottom) of the target window (the foreground one without a title)."""
+        if not self._is_windows:
+            return None
+        hwnd = self.target_window() if self.title_sub else self.user32.GetForegroundWindow()
+        if not hwnd:
+            return None
+        now = time.perf_counter()
+        if self._rect is not None and hwnd == self._rect_hwnd and now - self._rect_t < self.RECT_TTL_S:
+            return self._rect
+        r = self.RECT()
+        if not self.user32.GetWindowRect(hwnd, self.ctypes.byref(r)) or r.right <= r.left or r.bottom <= r.top:
+            return None
+        self._rect, self._rect_hwnd, self._rect_t = (r.left, r.top, r.right, r.bottom), hwnd, now
+        return self._rect
+
     def is_expected_foreground(self) -> bool:
         if not (self.require_foreground or self.require_maximized):
             return True
         if not self._is_windows:
             return True
-        title = self.get_foreground_title()
-        if self.title_sub and self.title_sub.lower() not in title.lower():
-            return False
+        hwnd = self.user32.GetForegroundWindow()
+        if self.title_sub and (not hwnd or hwnd != self._hwnd):
+            # Only a new foreground handle needs its title read
+            if self.title_sub.lower() not in self._get_title(hwnd).lower():
+                self._last_fg = None
+                return False
+            self._hwnd = hwnd
         if self.require_maximized:
-            hwnd = self.user32.GetForegroundWindow()
             if not self._is_maximized(hwnd):
+                self._last_fg = None
                 return False
+        if hwnd != self._last_fg:
+            self._last_fg = hwnd
+            self.focus_epoch += 1
         return True
 
+    def _track_foreground(self) -> None:
+        # Unguarded: only advance focus_epoch, for click_to_focus; one GetForegroundWindow call
+        if not self._is_windows:
+            self.focus_epoch += 1
+            return
+        hwnd = self.user32.GetForegroundWindow()
+        if hwnd != self._last_fg:
+            self._last_fg = hwnd
+            self.focus_epoch += 1
+
     def ensure_focus(self) -> bool:
         if not (self.require_foreground or self.require_maximized):
+            self._track_foreground()
+            return True
+        now = time.perf_counter()
+        if now - self._checked_t < self.focus_check_s:
             return True
         if self.is_expected_foreground():
+            self._checked_t = now
             return True
+        self._checked_t = float("-inf")
         if not self.auto_focus or not self._is_windows or not self.title_sub:
             return False
-        hwnd = self._find_window_by_substring(self.title_sub)
+        hwnd = self.target_window()
         if not hwnd:
             return False
         # Optionally relocate to a specific monitor
@@ -214,4 +303,8 @@ class WindowManager:
             pass
         if self.require_maximized:
             self.user32.ShowWindow(hwnd, self.SW_SHOWMAXIMIZED)
-        return self.is_expected_foreground()
+        self._rect = None
+        ok = self.is_expected_foreground()
+        if ok:
+            self._checked_t = time.perf_counter()
+        return ok
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """Handle for a callback scheduled on a virtual clock."""
+
+    __slots__ = ("due", "period", "fn", "cancelled")
+
+    def __init__(self, due: float, period: Optional[float], fn: Callable[[], None]) -> None:
+        self.due = due
+        self.period = period
+        self.fn = fn
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class Clock:
+    """Time source for flows, input, path replay and Safety.
+
+    Real by default: `now()` is time.perf_counter(), `time()` is time.time(),
+    and `sleep()` / `wait()` block. `set_virtual()` switches the process to
+    virtual time, where sleeping advances the clock instantly and fires the
+    timers scheduled with `schedule()` on the way. The frame stream and watcher
+    run on such timers instead of threads in virtual mode, so a simulated run
+    (`l9.sim`) costs only its compute and is deterministic. Virtual time is
+    meant for one flow thread at a time; profiler and tracer spans keep
+    measuring real time.
+    """
+
+    def __init__(self) -> None:
+        self.virtual = False
+        self._t = 0.0
+        self._epoch = 0.0
+        self._lock = threading.RLock()
+        self._timers: List[Tuple[float, int, Timer]] = []
+        self._seq = itertools.count()
+        self._firing = False
+
+    def set_virtual(self, start: float = 0.0) -> "Clock":
+        with self._lock:
+            self.virtual = True
+            self._t = float(start)
+            self._epoch = time.time() - self._t
+            self._timers = []
+        logger.info("Virtual clock enabled")
+        return self
+
+    def set_real(self) -> "Clock":
+        with self._lock:
+            self.virtual = False
+            self._timers = []
+        return self
+
+    def now(self) -> float:
+        """Monotonic seconds (perf_counter() in real mode)."""
+        return self._t if self.virtual else time.perf_counter()
+
+    def time(self) -> float:
+        """Wall-clock seconds since the epoch."""
+        return self._epoch + self._t if self.virtual else time.time()
+
+    def sleep(self, seconds: float) -> None:
+        if not self.virtual:
+            # time.sleep(0) still yields the thread; skip it on hot input paths
+            if seconds > 0:
+                time.sleep(seconds)
+            return
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """`event.wait(timeout)`; in virtual mode the timeout elapses instantly."""
+        if not self.virtual:
+            return event.wait(max(0.0, timeout))
+        if event.is_set():
+            return True
+        self.advance(timeout)
+        return event.is_set()
+
+    def schedule(self, delay: float, fn: Callable[[], None], period: Optional[float] = None) -> Timer:
+        """Run `fn` once `delay` seconds of virtual time have passed, then every `period` if given."""
+        with self._lock:
+            t = Timer(self._t + max(0.0, delay), period, fn)
+            heapq.heappush(self._timers, (t.due, next(self._seq), t))
+        return t
+
+    def advance(self, seconds: float) -> None:
+        """Move virtual time forward, running due timers in order (in the calling thread)."""
+        with self._lock:
+            target = self._t + max(0.0, seconds)
+            # A timer callback that sleeps only moves time; it can't re-enter the timer queue
+            if self._firing:
+                self._t = target
+                return
+            self._firing = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._timers or self._timers[0][0] > target:
+                        self._t = max(self._t, target)
+                        return
+                    due, _, timer = heapq.heappop(self._timers)
+                    if timer.cancelled:
+                        continue
+                    self._t = max(self._t, due)
+                    if timer.period is not None:
+                        timer.due = due + max(1e-6, timer.period)
+                        heapq.heappush(self._timers, (timer.due, next(self._seq), timer))
+                try:
+                    timer.fn()
+                except Exception as e:  # pragma: no cover
+                    logger.warning("Virtual timer failed: %s", e)
+        finally:
+            with self._lock:
+                self._firing = False
+
+
+# Process-wide clock; switched to virtual time by the simulator runner
+CLOCK = Clock()
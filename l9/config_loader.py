@@ -18,6 +18,8 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "auto_focus": False,
         "force_to_monitor_index": 1,
         "click_to_focus": False,
+        # A passed focus check is trusted this long before the next one (0: check every input)
+        "focus_check_ms": 250,
     },
     "keybinds": {
         "interact": "e",
@@ -29,6 +31,10 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "move_down": "s",
         "move_right": "d",
         "panic_key": "shift+escape",
+        "return_to_town": "r",
+        "map": "m",
+        "autobattle": "g",
+        "inventory": "i",
     },
     "match": {
         "method": "TM_CCOEFF_NORMED",
@@ -62,9 +68,45 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "revive_timeout_s": 2.0,
         "reclaim_timeout_s": 3.0,
         "retrieve_timeout_s": 3.0,
+        # Loading completion after revive (HUD bag icon); no ROI searches the whole screen
+        "bag_icon_template": "l9/assets/ui/hud/bag_icon.png",
+        "bag_icon_roi": None,
+        "bag_icon_timeout_s": 12.0,
+    },
+    # Background watcher used by GrindRefillLoop (revive / potion empty / disconnect)
+    "watch": {
+        "enabled": True,
+        "fps": 10,                   # Frame stream capture rate
+        "revive_interval_ms": 250,   # Per-condition evaluation intervals
+        "disconnect_interval_ms": 1000,
+        "disconnect_template": "l9/assets/ui/disconnect.png",  # Optional; skipped if missing
+        "disconnect_threshold": 0.9,
+        "potion_empty_template": "l9/assets/ui/hud/potion_empty.png",
+        "cooldown_s": 2.0,           # Re-publish a still-true condition at most this often
+        "idle_wait_s": 5.0,          # Longest WAIT block between loop checks
+    },
+    # Per-template detection telemetry (l9.vision.metrics)
+    "metrics": {
+        "enabled": True,
+        "dump_at_exit": True,
+        "dump_path": "logs/detect_metrics.json",
+    },
+    # Live event batches for the GUI dashboard (l9.events; runner daemon or run_flow.py --events)
+    "events": {
+        "enabled": True,
+        "flush_ms": 250,             # One coalesced batch per interval at most
+    },
+    # Per-state cycle-time profiler (see scripts/profile_summary.py)
+    "profile": {
+        "enabled": False,            # Also enabled by run_flow.py --profile
+        "trace_path": "logs/profile.jsonl",
+        "max_mb": 5,                 # Rotate the trace at this size
+        "backups": 5,                # Rotated files kept (profile.jsonl.1 ...)
     },
     "input": {
-        "prefer_direct": False,   # Prefer pydirectinput if available
+        # auto | sendinput | pydirectinput | pyautogui | record | legacy (per-call fallback chain)
+        "backend": "auto",
+        "prefer_direct": False,   # Prefer pydirectinput if available (auto: SendInput on Windows)
         "hold_ms": 80,            # Key hold duration per press
         "press_repeats": 1,       # Number of times to press a key
         "repeat_interval_ms": 70, # Delay between repeats
@@ -73,8 +115,8 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         # Optional per-click randomization range (overrides fixed duration if both set)
         "mouse_move_duration_ms_min": None,
         "mouse_move_duration_ms_max": None,
-        "use_wm_messages": False, # Also send WM_* mouse messages to window
-        "fire_all_click_backends": False, # Fire all click backends sequentially
+        "use_wm_messages": False, # Also send WM_* mouse messages to window (legacy backend)
+        "fire_all_click_backends": False, # Fire all click backends sequentially (legacy backend)
         "wiggle_before_click": False,     # Send a tiny relative move before clicking
         "click_repeats": 1,               # Number of click repeats per call
         "click_interval_ms": 80,          # Delay between repeated clicks
@@ -97,6 +139,13 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "close_wait_s": 2.0,
         "post_store_delay_s": 1.0,
     "grind_action_min_s": 1.0,
+        # Adaptive detection polling (wait_for / locate loops)
+        "poll_min_ms": 20,          # Fastest re-check after the screen changed
+        "poll_max_ms": 250,         # Slowest re-check while the screen is static
+        "poll_backoff": 1.5,        # Interval growth factor per unchanged frame
+        "poll_cpu_budget": 0.5,     # Max fraction of wall time spent grabbing/matching
+        "poll_change_thresh": 2.0,  # Mean abs pixel diff in any 32x32 tile that counts as a change
+        "poll_refresh_ms": 1000,    # Re-match at least this often even if static
         # Optional human-like post-action pause (random per action)
         "random_action_pause": False,
         "action_pause_min_ms": 1000,
@@ -134,13 +183,34 @@ DEFAULT_CONFIG: Dict[str, Any] = {
             },
         ],
         "pyauto_threshold": 0.9,
+        # Legacy single-spot settings, used when the active spot doesn't set them
+        "area_id": None,  # Path file name (default: spot<active_spot_id>)
+        "region_template": None,
+        "area_template": None,
+        "teleporter_template": None,
+        "fast_travel_template": None,
+        "confirm_template": None,
         "record_stop_key": "f12",
+        "record_split_key": "f9",
+        "record_keys": None,  # Keys recorded into paths (default: w, a, s, d)
+        # Auto-gate recording: look for the gate's OK button once keys are idle this long, at most every interval
+        "record_gate_idle_ms": 600,
+        "record_gate_interval_ms": 500,
+        # New recordings: "v4" (binary, .l9p) or "json"; existing files are used in either format
+        "path_format": "v4",
+        # Path replay sleeps until this long before each event, then spins to the deadline
+        "replay_spin_ms": 2.0,
         # Loading completion indicator (HUD bag icon)
         "bag_icon_template": "l9/assets/ui/hud/bag_icon.png",
         "bag_icon_timeout_s": 12.0,
         # ROI name to search for bag icon (defaults to hud_anchor if None)
         "bag_icon_roi": "hud_anchor",
     },
+    "dismantle": {
+        "result_template": None,  # Result popup after dismantling (default: l9/assets/dismantle/result.png)
+    },
+    # Dungeon gates crossed during path replay: [{confirm_templates: [...], confirm_timeout_s: ...}]
+    "dungeon": {"gates": []},
     "rois": {
         "minimap_anchor": [0.80, 0.00, 1.00, 0.20],
         "hud_anchor": [0.00, 0.80, 1.00, 1.00],
@@ -157,6 +227,22 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "log_level": "WARNING",  # Reduced logging for stealth
         "screenshot_format": "png",
     },
+    # Runner: re-read the config file when it changes and apply it between flow states
+    "reload": {
+        "enabled": True,
+        "poll_ms": 250,
+    },
+    # Persistent runner (run_flow.py --serve) the GUI starts flows through
+    "daemon": {
+        "host": "127.0.0.1",
+        "port": 0,  # 0: any free port; clients find it in state_path
+        "state_path": "logs/runner_daemon.json",
+        "log_path": "logs/runner_daemon.log",
+        "idle_exit_s": 300.0,  # exit after this long with no client and no run
+        "spawn_timeout_s": 20.0,
+        "preload_flows": ["l9.flows.grind_refill_loop:GrindRefillLoop"],
+        "preload_templates": True,
+    },
     "stealth": {
         "enabled": True,
         "disable_logging": True,
@@ -190,9 +276,19 @@ def load_config(path: str = "l9/config.yaml") -> Dict[str, Any]:
         if not isinstance(user_cfg, dict):
             logging.getLogger(__name__).warning("Invalid config format; using defaults")
             return cfg
-        return deep_update(cfg, user_cfg)
+        cfg = deep_update(cfg, user_cfg)
     except ModuleNotFoundError:
         logging.getLogger(__name__).warning(
             "PyYAML not installed; using default config. To load %s, install pyyaml.", path,
         )
         return cfg
+    _report_problems(cfg, path)
+    return cfg
+
+
+def _report_problems(cfg: Dict[str, Any], path: str) -> None:
+    """Log unknown and mistyped keys once, at load time (see l9.settings)."""
+    from .settings import validate  # settings builds its classes from DEFAULT_CONFIG above
+
+    for problem in validate(cfg):
+        logging.getLogger(__name__).warning("%s: %s", path, problem)
@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+import hmac
+import itertools
+import json
+import logging
+import os
+import queue
+import secrets
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .actions.safety import clear_stop, request_stop
+from .events import EVENTS
+from .reload import RELOADER
+from .settings import settings_for
+
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL = 2
+RECORD_FLOW = "l9.flows.record_path:RecordPathFlow"
+TEST_PATH_FLOW = "l9.flows.test_path:TestPathFlow"
+
+
+def _asset_templates(root: str = os.path.join("l9", "assets")) -> List[str]:
+    """Every PNG under `root`, spelled with "/" as flows spell template paths."""
+    out = []
+    for dirpath, _dirs, files in os.walk(root):
+        for f in files:
+            if f.lower().endswith(".png"):
+                out.append(os.path.join(dirpath, f).replace(os.sep, "/"))
+    return sorted(out)
+
+
+def read_state(path: str) -> Optional[Dict[str, Any]]:
+    """The state file a running daemon wrote (pid, host, port, token, config), or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) and "port" in state and "token" in state else None
+
+
+class _Conn:
+    """One client connection; replies and pushed messages go out through a writer thread.
+
+    Pushes (logs, run events) to a client that stops reading are dropped once
+    `MAX_QUEUED` are waiting, so a stalled GUI can't stall the flow thread.
+    """
+
+    MAX_QUEUED = 2000
+
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+        self.subscribed = False
+        self.dropped = 0
+        self._q: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._write, name="l9-runner-conn", daemon=True)
+        self._thread.start()
+
+    def send(self, msg: dict, push: bool = False) -> None:
+        if push and self._q.qsize() >= self.MAX_QUEUED:
+            self.dropped += 1
+            return
+        self._q.put(msg)
+
+    def close(self) -> None:
+        self._q.put(None)
+
+    def _write(self) -> None:
+        while True:
+            msg = self._q.get()
+            if msg is None:
+                return
+            try:
+                self.wfile.write((json.dumps(msg, separators=(",", ":"), default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except (OSError, ValueError):
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        daemon: RunnerDaemon = self.server.runner  # type: ignore[attr-defined]
+        conn = _Conn(self.wfile)
+        daemon._attach(conn)
+        try:
+            for line in self.rfile:
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    conn.send({"ok": False, "error": "not JSON"})
+                    continue
+                if not isinstance(msg, dict):
+                    conn.send({"ok": False, "error": "expected an object"})
+                    continue
+                try:
+                    reply = daemon.handle(conn, msg)
+                except Exception as e:
+                    logger.exception("Runner command %r failed", msg.get("cmd"))
+                    reply = {"ok": False, "error": str(e)}
+                reply["id"] = msg.get("id")
+                conn.send(reply)
+        except OSError:
+            pass
+        finally:
+            daemon._detach(conn)
+            conn.close()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = False
+
+
+class _LogForwarder(logging.Handler):
+    """Sends formatted log records to subscribed clients."""
+
+    def __init__(self, runner: "RunnerDaemon") -> None:
+        super().__init__()
+        self.runner = runner
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            text = self.format(record)
+        except Exception:
+            return
+        self.runner.broadcast({"type": "log", "text": text + "\n"})
+
+
+class RunnerDaemon:
+    """Long-lived runner that starts flows on request over a localhost socket.
+
+    Started by `run_flow.py --serve`. It builds Vision and Actions once and keeps
+    them between runs, so their template cache stays warm. It imports the flow
+    modules in `daemon.preload_flows` and, with `daemon.preload_templates`,
+    loads every template under l9/assets before the first command arrives.
+    Starting a flow then costs its construction, not an interpreter plus
+    OpenCV start. The port and a random token go to `daemon.state_path`;
+    clients (`RunnerClient`) read them there.
+
+    The protocol is JSON lines. A request is `{"id", "cmd", "token", ...}` and
+    gets one reply with the same id. Commands:
+    - `ping`: liveness and status.
+    - `start {flow}`: run a flow by its "module:Class" name.
+    - `record`: record a grind path (RecordPathFlow).
+    - `test_path`: replay one (TestPathFlow).
+    - `stop {wait_s}`: stop the run.
+    - `reload`: apply config file changes now when idle, otherwise at the next state.
+    - `subscribe`: receive `{"type": "log"}`, `{"type": "run"}` and
+      `{"type": "events", "events": [...]}` pushes (batches from l9.events).
+    - `shutdown`: stop the daemon.
+    One flow runs at a time. The daemon exits after `daemon.idle_exit_s` with
+    no client connected and nothing running.
+    """
+
+    def __init__(self, cfg: Dict[str, Any], config_path: str, dry_run: bool = False) -> None:
+        from .actions.input import Actions
+        from .vision.match import Vision
+
+        self.cfg = cfg
+        self.config_path = config_path
+        self.dry_run = dry_run
+        self.vision = Vision(cfg, dry_run=dry_run)
+        self.actions = Actions(cfg, dry_run=dry_run)
+        self.token = secrets.token_hex(16)
+        self.runs = 0
+        # _lock guards the connection list and counters only; nothing that logs may run under it,
+        # since every log record is broadcast. _run_lock serializes starting a run against reloads.
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._conns: List[_Conn] = []
+        self._worker: Optional[threading.Thread] = None
+        self._current: Optional[str] = None
+        self._shutdown = threading.Event()
+        self._idle_since = time.monotonic()
+        self._state_path: Optional[str] = None
+        self._log_handler: Optional[_LogForwarder] = None
+
+    # --- lifecycle ---
+
+    def warm(self) -> None:
+        """Import the preload flows and load the templates now instead of on the first run."""
+        from .flows.runtime import load_flow
+
+        d = settings_for(self.cfg).daemon
+        t0 = time.perf_counter()
+        flows = 0
+        for spec in d.preload_flows:
+            try:
+                load_flow(spec)
+                flows += 1
+            except Exception as e:
+                logger.warning("Could not preload flow %s: %s", spec, e)
+        templates = self.vision.preload(_asset_templates()) if d.preload_templates else 0
+        logger.info("Runner warm: %d flow(s), %d template(s) in %.0f ms", flows, templates, 1000.0 * (time.perf_counter() - t0))
+
+    def serve(self) -> int:
+        """Listen until `shutdown` (command or signal) or the idle timeout; returns the exit code."""
+        d = settings_for(self.cfg).daemon
+        server = _Server((d.host, int(d.port)), _Handler)
+        server.runner = self  # type: ignore[attr-defined]
+        host, port = server.server_address[:2]
+        self._state_path = d.state_path
+        self._write_state(host, port)
+        root = logging.getLogger()
+        self._log_handler = _LogForwarder(self)
+        if root.handlers:
+            self._log_handler.setFormatter(root.handlers[0].formatter)
+        root.addHandler(self._log_handler)
+        EVENTS.subscribe(self._push_events)
+        thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.25}, name="l9-runner-server", daemon=True)
+        thread.start()
+        logger.info("Runner listening on %s:%d (pid %d)", host, port, os.getpid())
+        try:
+            while not self._shutdown.wait(1.0):
+                if self._idle_expired(d.idle_exit_s):
+                    logger.info("Runner idle for %.0f s with no client; exiting", d.idle_exit_s)
+                    break
+        finally:
+            worker = self._worker
+            if worker is not None and worker.is_alive():
+                request_stop("runner shutdown")
+                worker.join(5.0)
+            server.shutdown()
+            server.server_close()
+            EVENTS.unsubscribe(self._push_events)
+            root.removeHandler(self._log_handler)
+            self._remove_state()
+        return 0
+
+    def shutdown(self, reason: str = "") -> None:
+        if self.busy:
+            request_stop(reason or "runner shutdown")
+        self._shutdown.set()
+
+    def _idle_expired(self, idle_exit_s: float) -> bool:
+        if idle_exit_s <= 0:
+            return False
+        with self._lock:
+            if self._conns or self.busy:
+                self._idle_since = time.monotonic()
+                return False
+        return time.monotonic() - self._idle_since >= idle_exit_s
+
+    def _write_state(self, host: str, port: int) -> None:
+        state = {
+            "pid": os.getpid(),
+            "host": host,
+            "port": port,
+            "token": self.token,
+            "protocol": PROTOCOL,
+            "config": os.path.abspath(self.config_path),
+            "started": time.time(),
+        }
+        os.makedirs(os.path.dirname(self._state_path) or ".", exist_ok=True)
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path)
+
+    def _remove_state(self) -> None:
+        state = read_state(self._state_path) if self._state_path else None
+        if state is not None and state.get("token") == self.token:
+            try:
+                os.remove(self._state_path)
+            except OSError:
+                pass
+
+    # --- connections ---
+
+    def _attach(self, conn: _Conn) -> None:
+        with self._lock:
+            self._conns.append(conn)
+
+    def _detach(self, conn: _Conn) -> None:
+        with self._lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
+            self._idle_since = time.monotonic()
+
+    def broadcast(self, msg: dict) -> None:
+        """Push `msg` to every subscribed client (dropped for clients that fell behind)."""
+        with self._lock:
+            conns = [c for c in self._conns if c.subscribed]
+        for c in conns:
+            c.send(msg, push=True)
+
+    def _push_events(self, batch: List[dict]) -> None:
+        self.broadcast({"type": "events", "events": batch})
+
+    # --- commands ---
+
+    @property
+    def busy(self) -> bool:
+        w = self._worker
+        return w is not None and w.is_alive()
+
+    def handle(self, conn: _Conn, msg: dict) -> dict:
+        if not hmac.compare_digest(str(msg.get("token", "")), self.token):
+            return {"ok": False, "error": "bad token"}
+        cmd = msg.get("cmd")
+        fn = getattr(self, f"_cmd_{cmd}", None) if isinstance(cmd, str) else None
+        if fn is None:
+            return {"ok": False, "error": f"unknown command {cmd!r}"}
+        return fn(conn, msg)
+
+    def _cmd_ping(self, conn: _Conn, msg: dict) -> dict:
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "protocol": PROTOCOL,
+            "config": os.path.normcase(os.path.abspath(self.config_path)),
+            "running": self._current,
+            "runs": self.runs,
+            "templates": len(self.vision._templates),
+        }
+
+    def _cmd_subscribe(self, conn: _Conn, msg: dict) -> dict:
+        conn.subscribed = True
+        return {"ok": True, "running": self._current}
+
+    def _cmd_start(self, conn: _Conn, msg: dict) -> dict:
+        flow = msg.get("flow")
+        if not isinstance(flow, str) or not flow:
+            return {"ok": False, "error": "start needs a flow (module:Class)"}
+        return self._start(flow)
+
+    def _cmd_record(self, conn: _Conn, msg: dict) -> dict:
+        return self._start(RECORD_FLOW)
+
+    def _cmd_test_path(self, conn: _Conn, msg: dict) -> dict:
+        return self._start(TEST_PATH_FLOW)
+
+    def _cmd_stop(self, conn: _Conn, msg: dict) -> dict:
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return {"ok": True, "running": None}
+        request_stop("stop command")
+        wait_s = float(msg.get("wait_s") or 0.0)
+        if wait_s > 0:
+            worker.join(wait_s)
+        return {"ok": True, "running": self._current}
+
+    def _cmd_reload(self, conn: _Conn, msg: dict) -> dict:
+        if RELOADER.cfg is not self.cfg:
+            return {"ok": False, "error": "config reloading is off (reload.enabled or --no-reload)"}
+        RELOADER.check_now()
+        with self._run_lock:
+            # A running flow applies it at its next state; nothing else touches the config while idle
+            applied = False if self.busy else RELOADER.apply_pending()
+        return {"ok": True, "applied": applied, "running": self._current}
+
+    def _cmd_shutdown(self, conn: _Conn, msg: dict) -> dict:
+        self.shutdown("shutdown command")
+        return {"ok": True}
+
+    # --- runs ---
+
+    def _start(self, spec: str) -> dict:
+        from .flows.runtime import load_flow
+
+        t_cmd = time.perf_counter()
+        if self.busy:
+            return {"ok": False, "error": f"busy running {self._current}"}
+        try:
+            cls = load_flow(spec)
+        except Exception as e:
+            return {"ok": False, "error": f"cannot load {spec}: {e}"}
+        with self._run_lock:
+            if self.busy:
+                return {"ok": False, "error": f"busy running {self._current}"}
+            clear_stop()
+            self._current = spec
+            self._worker = threading.Thread(target=self._run, args=(spec, cls, t_cmd), name="l9-runner-flow", daemon=True)
+            self._worker.start()
+        return {"ok": True, "flow": spec}
+
+    def _run(self, spec: str, cls: type, t_cmd: float) -> None:
+        from .flows.runtime import FlowRuntime
+
+        outcome, elapsed_s, error = "failed", 0.0, None
+        try:
+            RELOADER.apply_pending()
+            flow = cls(self.vision, self.actions, self.cfg, dry_run=self.dry_run)
+            start_ms = 1000.0 * (time.perf_counter() - t_cmd)
+            logger.info("Flow %s started %.1f ms after the start command", spec, start_ms)
+            self.broadcast({"type": "run", "event": "started", "flow": spec, "start_ms": round(start_ms, 2)})
+            result = FlowRuntime(self.cfg).run(flow)
+            outcome, elapsed_s, error = result.outcome.name.lower(), result.elapsed_s, result.error
+        except Exception as e:
+            error = e
+        if error is not None:
+            logger.error("Flow %s failed: %s", spec, error, exc_info=error)
+        else:
+            logger.info("Flow %s %s after %.1fs", spec, outcome, elapsed_s)
+        with self._lock:
+            self._current = None
+            self.runs += 1
+            self._idle_since = time.monotonic()
+        self.broadcast({
+            "type": "run",
+            "event": "finished",
+            "flow": spec,
+            "outcome": outcome,
+            "elapsed_s": round(elapsed_s, 3),
+            "error": str(error) if error is not None else None,
+        })
+
+
+class RunnerClient:
+    """Connection to a RunnerDaemon.
+
+    `call` sends a command and waits for its reply; pushed messages (after
+    `call("subscribe")`) go to `on_message` on the reader thread, followed by
+    `{"type": "disconnected"}` when the connection drops.
+
+        client = RunnerClient.connect("logs/runner_daemon.json")
+        client.call("start", flow="l9.flows.grind_refill_loop:GrindRefillLoop")
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        token: str,
+        timeout_s: float = 2.0,
+        on_message: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        self.token = token
+        self.on_message = on_message
+        self.sock = socket.create_connection((host, int(port)), timeout=timeout_s)
+        self.sock.settimeout(None)
+        self.closed = threading.Event()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, list] = {}
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name="l9-runner-client", daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def connect(
+        cls,
+        state_path: str,
+        timeout_s: float = 2.0,
+        on_message: Optional[Callable[[dict], None]] = None,
+    ) -> Optional["RunnerClient"]:
+        """Client for the daemon recorded in `state_path`, or None if none is listening."""
+        state = read_state(state_path)
+        if state is None:
+            return None
+        try:
+            return cls(state.get("host", "127.0.0.1"), state["port"], state["token"], timeout_s, on_message)
+        except (OSError, ValueError):
+            return None
+
+    def call(self, cmd: str, timeout_s: float = 5.0, **args: Any) -> dict:
+        """Send `cmd` and return its reply; `{"ok": False, "error": ...}` on timeout or disconnect."""
+        if self.closed.is_set():
+            return {"ok": False, "error": "disconnected"}
+        i = next(self._ids)
+        slot: list = [threading.Event(), None]
+        self._pending[i] = slot
+        data = (json.dumps(dict(args, id=i, cmd=cmd, token=self.token)) + "\n").encode("utf-8")
+        try:
+            with self._send_lock:
+                self.sock.sendall(data)
+        except OSError as e:
+            self._pending.pop(i, None)
+            return {"ok": False, "error": f"disconnected: {e}"}
+        if not slot[0].wait(timeout_s):
+            self._pending.pop(i, None)
+            return {"ok": False, "error": f"no reply to {cmd} within {timeout_s:g}s"}
+        return slot[1]
+
+    def _read(self) -> None:
+        try:
+            with self.sock.makefile("rb") as rfile:
+                for line in rfile:
+                    try:
+                        msg = json.loads(line)
+                    except ValueError:
+                        continue
+                    slot = self._pending.pop(msg.get("id"), None) if "id" in msg else None
+                    if slot is not None:
+                        slot[1] = msg
+                        slot[0].set()
+                    elif self.on_message is not None and "type" in msg:
+                        self.on_message(msg)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.closed.set()
+            for slot in list(self._pending.values()):
+                slot[1] = {"ok": False, "error": "disconnected"}
+                slot[0].set()
+            self._pending.clear()
+            if self.on_message is not None:
+                try:
+                    self.on_message({"type": "disconnected"})
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def ensure_runner(
+    cmd: List[str],
+    state_path: str,
+    config_path: str,
+    timeout_s: float = 20.0,
+    cwd: Optional[str] = None,
+    log_path: Optional[str] = None,
+    on_message: Optional[Callable[[dict], None]] = None,
+) -> Optional[RunnerClient]:
+    """Client for a daemon serving `config_path`, starting `cmd` (a `--serve` runner) if none is.
+
+    A daemon for another config file is shut down first. The new process
+    writes its output to `log_path`; None if it doesn't come up within
+    `timeout_s`.
+    """
+    client = RunnerClient.connect(state_path, on_message=on_message)
+    if client is not None:
+        pong = client.call("ping")
+        if pong.get("ok") and pong.get("config") == os.path.normcase(os.path.abspath(config_path)) and pong.get("protocol") == PROTOCOL:
+            return client
+        if pong.get("ok"):
+            client.call("shutdown")
+        client.close()
+    try:
+        os.remove(state_path)
+    except OSError:
+        pass
+    out = subprocess.DEVNULL
+    if log_path:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        out = open(log_path, "ab")
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            # Own process group: console Ctrl+C in the GUI's terminal doesn't reach it
+            creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0) | getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    finally:
+        if out is not subprocess.DEVNULL:
+            out.close()
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            logger.error("Runner exited with code %s before listening; see %s", proc.returncode, log_path or "its output")
+            return None
+        client = RunnerClient.connect(state_path, on_message=on_message)
+        if client is not None:
+            return client
+        time.sleep(0.05)
+    logger.error("Runner did not start listening within %.0f s", timeout_s)
+    return None
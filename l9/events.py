@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .clock import CLOCK
+from .settings import settings_for
+
+
+logger = logging.getLogger(__name__)
+
+# Record separator that starts each batch written by `stream_sink` (RFC 7464
+# JSON text sequences), so event lines can share a stream with log lines
+RS = "\x1e"
+
+Sink = Callable[[List[dict]], None]
+
+
+class EventStream:
+    """Structured run events for live displays: state transitions, detections, cycles.
+
+    Flows report into the process-wide `EVENTS`. A background thread hands
+    sinks one batch every `events.flush_ms`, with everything since the last
+    batch folded together:
+    - `{"type": "state", "active": [...], "exits": {...}}`: the states running
+      now, outermost first as "Flow.STATE", and per state the visits that
+      ended as `[count, total_s, last_s]`.
+    - `{"type": "detect", "templates": {...}}`: per template `calls`, `hits`
+      and `judged` (calls with a threshold), and the `best` and `last` score.
+    - `{"type": "cycle", ...}`: one per refill/grind cycle as reported, with
+      `outcome` "done", or "aborted" when death or disconnect cut it short.
+    A loop that checks a template fifty times a second therefore costs one
+    entry per batch, not fifty messages. Every event carries `t` (CLOCK.time()).
+    With no sink subscribed, every hook is a single attribute check.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.flush_s = 0.25
+        self._allowed = True
+        self._lock = threading.Lock()
+        self._sinks: List[Sink] = []
+        self._active: "OrderedDict[str, str]" = OrderedDict()
+        self._active_changed = False
+        self._exits: Dict[str, list] = {}
+        self._detects: Dict[str, dict] = {}
+        self._cycles: List[dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, cfg: dict) -> "EventStream":
+        es = settings_for(cfg).events
+        self._allowed = es.enabled
+        self.flush_s = max(0.02, es.flush_ms / 1000.0)
+        self.enabled = self._allowed and bool(self._sinks)
+        return self
+
+    def subscribe(self, sink: Sink) -> None:
+        """Deliver batches to `sink(events)`, called on the flusher thread."""
+        with self._lock:
+            if sink not in self._sinks:
+                self._sinks.append(sink)
+            self.enabled = self._allowed
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="l9-events", daemon=True)
+            self._thread.start()
+
+    def unsubscribe(self, sink: Sink) -> None:
+        """Flush what is pending to `sink` one last time and stop delivering to it."""
+        self.flush()
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+            if self._sinks:
+                return
+            self.enabled = False
+            thread, self._thread = self._thread, None
+            self._active.clear()
+        self._stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    # --- hooks ---
+
+    def state_enter(self, flow: str, state: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._active.pop(flow, None)
+            self._active[flow] = state
+            self._active_changed = True
+
+    def state_exit(self, flow: str, state: str, dur_s: float) -> None:
+        if not self.enabled:
+            return
+        key = f"{flow}.{state}"
+        with self._lock:
+            if self._active.get(flow) == state:
+                del self._active[flow]
+                self._active_changed = True
+            e = self._exits.get(key)
+            if e is None:
+                self._exits[key] = [1, dur_s, dur_s]
+            else:
+                e[0] += 1
+                e[1] += dur_s
+                e[2] = dur_s
+
+    def detect(self, template: str, score: float, hit: Optional[bool]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            d = self._detects.get(template)
+            if d is None:
+                d = self._detects[template] = {"calls": 0, "hits": 0, "judged": 0, "best": score, "last": score}
+            d["calls"] += 1
+            if hit is not None:
+                d["judged"] += 1
+                d["hits"] += 1 if hit else 0
+            if score > d["best"]:
+                d["best"] = score
+            d["last"] = score
+
+    def cycle(self, **fields: Any) -> None:
+        """Report one ended refill/grind cycle (`n`, `outcome`, `dur_s`, `refill_s`, ...)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cycles.append(dict(fields, type="cycle", t=round(CLOCK.time(), 3)))
+
+    # --- delivery ---
+
+    def flush(self) -> List[dict]:
+        """Send everything pending as one batch now; returns the batch."""
+        with self._lock:
+            batch: List[dict] = []
+            t = round(CLOCK.time(), 3)
+            if self._active_changed or self._exits:
+                batch.append({
+                    "type": "state",
+                    "t": t,
+                    "active": [f"{f}.{s}" for f, s in self._active.items()],
+                    "exits": {k: [n, round(total, 4), round(last, 4)] for k, (n, total, last) in self._exits.items()},
+                })
+            if self._detects:
+                for d in self._detects.values():
+                    d["best"] = round(d["best"], 4)
+                    d["last"] = round(d["last"], 4)
+                batch.append({"type": "detect", "t": t, "templates": self._detects})
+            batch.extend(self._cycles)
+            self._active_changed = False
+            self._exits = {}
+            self._detects = {}
+            self._cycles = []
+            sinks = list(self._sinks)
+        if batch:
+            for sink in sinks:
+                try:
+                    sink(batch)
+                except Exception as e:  # pragma: no cover
+                    logger.debug("Event sink %r failed: %s", sink, e)
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_s):
+            self.flush()
+
+
+EVENTS = EventStream()
+
+
+def configure(cfg: dict) -> EventStream:
+    """Apply the `events` config section to EVENTS."""
+    return EVENTS.configure(cfg)
+
+
+def stream_sink(stream) -> Sink:
+    """Sink writing each batch to text `stream` as one RS-prefixed JSON line."""
+    lock = threading.Lock()
+
+    def sink(batch: List[dict]) -> None:
+        line = RS + json.dumps(batch, separators=(",", ":")) + "\n"
+        with lock:
+            stream.write(line)
+            stream.flush()
+
+    return sink
+
+
+def parse_line(line: str) -> Optional[List[dict]]:
+    """The batch in a line written by `stream_sink`, or None for any other line."""
+    if not line.startswith(RS):
+        return None
+    try:
+        batch = json.loads(line[1:])
+    except ValueError:
+        return None
+    return batch if isinstance(batch, list) else None
+
+
+class RunStats:
+    """Dashboard totals folded from event batches since the last `reset`.
+
+    `apply` runs on whatever thread receives batches; `view` is cheap and meant
+    for the UI thread, which can compare `version` to skip repainting when
+    nothing arrived.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.version = 0
+            self.t0: Optional[float] = None
+            self.t: Optional[float] = None
+            self.active: List[str] = []
+            self.templates: Dict[str, dict] = {}
+            self.cycles = 0
+            self.cycle_s = 0.0
+            self.aborted = 0
+            self.refills = 0
+            self.refill_s = 0.0
+
+    def apply(self, batch: List[dict]) -> None:
+        with self._lock:
+            for ev in batch:
+                t = ev.get("t")
+                if isinstance(t, (int, float)):
+                    if self.t0 is None:
+                        self.t0 = t
+                    self.t = t
+                kind = ev.get("type")
+                if kind == "state":
+                    self.active = list(ev.get("active") or [])
+                elif kind == "detect":
+                    for templ, d in (ev.get("templates") or {}).items():
+                        acc = self.templates.setdefault(templ, {"calls": 0, "hits": 0, "judged": 0, "best": 0.0, "last": 0.0})
+                        acc["calls"] += d.get("calls", 0)
+                        acc["hits"] += d.get("hits", 0)
+                        acc["judged"] += d.get("judged", 0)
+                        acc["best"] = max(acc["best"], d.get("best", 0.0))
+                        acc["last"] = d.get("last", 0.0)
+                elif kind == "cycle":
+                    # Rates and averages cover finished cycles; cut-short ones are only counted
+                    if ev.get("outcome", "done") == "done":
+                        self.cycles += 1
+                        self.cycle_s += float(ev.get("dur_s") or 0.0)
+                    else:
+                        self.aborted += 1
+                    if ev.get("refill_s") is not None:
+                        self.refills += 1
+                        self.refill_s += float(ev["refill_s"])
+            self.version += 1
+
+    def view(self, top: int = 6) -> Dict[str, Any]:
+        """Current state, cycle rates and the `top` templates by calls, as plain values."""
+        with self._lock:
+            elapsed = (self.t - self.t0) if self.t is not None and self.t0 is not None else 0.0
+            rows = sorted(self.templates.items(), key=lambda kv: kv[1]["calls"], reverse=True)[:top]
+            return {
+                "version": self.version,
+                "state": " > ".join(self.active) if self.active else None,
+                "elapsed_s": elapsed,
+                "cycles": self.cycles,
+                "aborted": self.aborted,
+                "cycles_per_hour": 3600.0 * self.cycles / elapsed if self.cycles and elapsed > 0 else None,
+                "cycle_avg_s": self.cycle_s / self.cycles if self.cycles else None,
+                "refill_avg_s": self.refill_s / self.refills if self.refills else None,
+                "detect": [
+                    {
+                        "template": templ,
+                        "calls": d["calls"],
+                        "hit_rate": d["hits"] / d["judged"] if d["judged"] else None,
+                        "best": d["best"],
+                        "last": d["last"],
+                    }
+                    for templ, d in rows
+                ],
+            }
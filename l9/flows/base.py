@@ -2,12 +2,23 @@ from __future__ import annotations
 
 import enum
 import logging
-import time
-from typing import Callable, Optional
+import os
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Sequence, Tuple, Union
 
+from ..actions.backends import pyautogui as pag
 from ..actions.input import Actions
 from ..actions.safety import Safety
-from ..vision.match import Vision, Detection
+from ..clock import CLOCK
+from ..events import EVENTS
+from ..profiling import PROFILER
+from ..reload import RELOADER
+from ..settings import settings_for
+from ..tracing import TRACER
+from ..vision.match import Box, Vision, Detection, MatchSpec, cv2
+from ..vision.poll import AdaptivePoller
+from .ready import LEDGER, Ready
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +29,179 @@ class State(enum.Enum):
     DONE = 1
 
 
+class StepFailed(Exception):
+    """Raised by a state handler; the engine retries the state or takes its fallback."""
+
+
+@dataclass(frozen=True)
+class StateSpec:
+    """How one state runs.
+
+    `handler` returns the next state, or None to end the machine in this state.
+    On StepFailed the state is re-entered up to `retries` times (None: use
+    `timings.action_retry_count`), sleeping `backoff_s * attempt` between tries
+    (None: `timings.action_retry_backoff_s`). No retry starts once the next one
+    would begin more than `retry_window_s` after first entry; the window only
+    limits retries and never interrupts a running handler, whose own waits
+    carry their timeouts. After that the machine moves to `on_fail` (default:
+    its fail state).
+    """
+
+    handler: Callable[[], Optional[enum.Enum]]
+    retry_window_s: Optional[float] = None
+    retries: Optional[int] = 0
+    backoff_s: Optional[float] = None
+    on_fail: Optional[enum.Enum] = None
+
+
+@dataclass
+class StateStats:
+    entries: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_s: float = 0.0
+    last_enter: float = 0.0  # CLOCK.time() of the latest entry
+    last_exit: float = 0.0
+
+
+class StateMachine:
+    """Dispatcher for Enum-based flows; records per-state timing and transitions."""
+
+    HISTORY = 256
+
+    def __init__(
+        self,
+        name: str,
+        start: enum.Enum,
+        fail: Optional[enum.Enum] = None,
+        cfg: Optional[dict] = None,
+        sleep: Callable[[float], None] = CLOCK.sleep,
+    ) -> None:
+        self.name = name
+        self.start = start
+        self.fail = fail
+        self.cfg = cfg or {}
+        self.sleep = sleep
+        self.specs: Dict[enum.Enum, StateSpec] = {}
+        self.stats: Dict[enum.Enum, StateStats] = {}
+        self.transitions: Counter = Counter()
+        # (state, entered, exited) in CLOCK.time()
+        self.history: Deque[Tuple[enum.Enum, float, float]] = deque(maxlen=self.HISTORY)
+        self.reason: Optional[str] = None
+        self.state: Optional[enum.Enum] = None
+        # Retry attempt of the current state visit (0 on first try)
+        self.attempt = 0
+
+    def add(
+        self,
+        state: enum.Enum,
+        handler: Callable[[], Optional[enum.Enum]],
+        retry_window_s: Optional[float] = None,
+        retries: Optional[int] = 0,
+        backoff_s: Optional[float] = None,
+        on_fail: Optional[enum.Enum] = None,
+    ) -> "StateMachine":
+        self.specs[state] = StateSpec(handler, retry_window_s, retries, backoff_s, on_fail)
+        return self
+
+    def _retry_policy(self, spec: StateSpec) -> Tuple[int, float]:
+        t = settings_for(self.cfg).timings
+        retries = int(t.action_retry_count if spec.retries is None else spec.retries)
+        backoff = float(t.action_retry_backoff_s if spec.backoff_s is None else spec.backoff_s)
+        return max(0, retries), max(0.0, backoff)
+
+    def _visit(self, state: enum.Enum) -> Optional[enum.Enum]:
+        # Between states: a reloaded config file takes effect here, all at once
+        RELOADER.apply_pending()
+        spec = self.specs[state]
+        st = self.stats.setdefault(state, StateStats())
+        retries, backoff = self._retry_policy(spec)
+        entered = CLOCK.time()
+        st.entries += 1
+        st.last_enter = entered
+        EVENTS.state_enter(self.name, state.name)
+        attempt = 0
+        try:
+            with TRACER.span(f"{self.name}.{state.name}", "state"), PROFILER.state(self.name, state.name):
+                while True:
+                    self.attempt = attempt
+                    try:
+                        return spec.handler()
+                    except StepFailed as e:
+                        self.reason = str(e) or state.name
+                        elapsed = CLOCK.time() - entered
+                        wait = backoff * (attempt + 1)
+                        over = spec.retry_window_s is not None and elapsed + wait >= spec.retry_window_s
+                        if attempt >= retries or over:
+                            st.failures += 1
+                            target = spec.on_fail or self.fail
+                            logger.debug("%s.%s failed (%s) -> %s", self.name, state.name, self.reason, target.name if target else None)
+                            if target is None:
+                                raise
+                            return target
+                        attempt += 1
+                        st.retries += 1
+                        logger.info("%s.%s failed (%s); retry %d/%d", self.name, state.name, self.reason, attempt, retries)
+                        self.sleep(wait)
+        finally:
+            st.last_exit = CLOCK.time()
+            st.total_s += st.last_exit - entered
+            self.history.append((state, entered, st.last_exit))
+            EVENTS.state_exit(self.name, state.name, st.last_exit - entered)
+
+    def run(self) -> Optional[enum.Enum]:
+        """Run from `start` until a handler returns None; return that final state."""
+        self.state = self.start
+        with TRACER.span(self.name, "flow"):
+            while True:
+                nxt = self._visit(self.state)
+                if nxt is None:
+                    logger.debug("%s finished in %s: %s", self.name, self.state.name, self.summary())
+                    return self.state
+                self.transitions[(self.state, nxt)] += 1
+                self.state = nxt
+
+    def summary(self) -> str:
+        return ", ".join(
+            "%s %dx %.2fs%s" % (s.name, st.entries, st.total_s, " (%d retries)" % st.retries if st.retries else "")
+            for s, st in self.stats.items()
+        )
+
+
 class Flow:
     def __init__(self, vision: Vision, actions: Actions, cfg: dict, dry_run: bool = False) -> None:
         self.v = vision
         self.a = actions
         self.cfg = cfg
+        # Typed, read-only view of cfg for per-poll and per-state reads (l9.settings)
+        self.s = settings_for(cfg)
         self.dry = dry_run
         self.safety = Safety(cfg)
+        RELOADER.subscribe(self)
+
+    def apply_settings(self, s, changed) -> None:
+        self.s = s
+
+    def sleep(self, seconds: float) -> None:
+        """Cancellable sleep: raises Stopped/Panic as soon as either is signalled."""
+        self.safety.sleep(seconds)
+
+    def machine(self, start: enum.Enum, fail: Optional[enum.Enum] = None) -> StateMachine:
+        """New StateMachine for this flow; register states with `.add()` then `.run()`."""
+        return StateMachine(type(self).__name__, start, fail=fail, cfg=self.cfg, sleep=self.sleep)
+
+    def _center(self, det: Optional[Detection]) -> Optional[Tuple[int, int]]:
+        # Compute center click point, adjusting for ROI offset if used.
+        if det is None:
+            return None
+        cx = det.x + det.w // 2
+        cy = det.y + det.h // 2
+        # Add absolute origin of last capture (monitor + ROI offset)
+        try:
+            ox, oy = getattr(self.v.capture, "last_origin", (0, 0))
+        except Exception:
+            ox, oy = (0, 0)
+        return cx + ox, cy + oy
 
     def wait_for(
         self,
@@ -32,17 +209,184 @@ class Flow:
         roi_name: Optional[str] = None,
         timeout_s: Optional[float] = None,
         threshold: Optional[float] = None,
-        poll_s: float = 0.2,
+        poll_s: Optional[float] = None,
     ) -> Optional[Detection]:
-        deadline = time.time() + (timeout_s or float(self.cfg.get("timings", {}).get("detection_timeout_s", 3.0)))
-        while time.time() < deadline:
+        timeout = timeout_s or self.s.timings.detection_timeout_s
+        if self.v.dry_run:
+            deadline = CLOCK.now() + timeout
+            while CLOCK.now() < deadline:
+                with self.safety.guard():
+                    self.v.detect(template_path, roi_name=roi_name, threshold=threshold)
+                    self.sleep(poll_s or 0.2)
+            return None
+
+        def grab():
+            return self.v.grab_roi_image(roi_name) if roi_name else self.v.grab_frame()
+
+        def probe(frame):
+            with self.safety.guard():
+                return self.v.detect_in(frame, template_path, threshold=threshold)
+
+        poller = AdaptivePoller.from_settings(self.s, max_interval_s=poll_s)
+        det = poller.run(probe, timeout, grab=grab, on_tick=self.safety.check, sleep=self.sleep, label=os.path.basename(template_path))
+        if det:
+            logger.info("detect ok template=%s score=%.3f x=%d y=%d w=%d h=%d", template_path, det.score, det.x, det.y, det.w, det.h)
+        return det
+
+    def locate(
+        self,
+        template_path: str,
+        confidence: float,
+        timeout_s: float,
+        region: Optional[Tuple[int, int, int, int]] = None,
+    ) -> Optional[Box]:
+        """Poll for a template with pyautogui-style matching; return an absolute Box.
+
+        `region` is an absolute (left, top, width, height) rectangle; None searches
+        all screens. Frames come from the screen capture so unchanged screens are
+        not re-matched; without a capture backend or OpenCV this falls back to pyautogui.
+        """
+        if self.v.dry_run:
+            logger.info("[dry] locate template=%s", template_path)
+            return None
+        poller = AdaptivePoller.from_settings(self.s)
+        label = os.path.basename(template_path)
+        if self.v.capture.available and cv2:
+            def probe_frame(frame):
+                try:
+                    return self.v.locate_in(frame, template_path, confidence)
+                except Exception:
+                    return None
+
+            return poller.run(
+                probe_frame,
+                timeout_s,
+                grab=lambda: self.v.capture.grab_region(region),
+                on_tick=self.safety.check,
+                label=label,
+                sleep=self.sleep,
+            )
+        if not pag:
+            logger.error("pyautogui not installed; cannot locate %s", template_path)
+            return None
+
+        def probe(_frame):
+            try:
+                if region is not None:
+                    return pag.locateOnScreen(template_path, confidence=confidence, region=region)
+                return pag.locateOnScreen(template_path, confidence=confidence)
+            except Exception:
+                return None
+
+        return poller.run(probe, timeout_s, on_tick=self.safety.check, sleep=self.sleep, label=label)
+
+    def exists(self, template_path: str, confidence: float, region: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """One-shot `locate`: is the template on screen right now?"""
+        if self.v.dry_run:
+            return False
+        if self.v.capture.available and cv2:
+            return self.v.locate_in(self.v.capture.grab_region(region), template_path, confidence) is not None
+        if not pag:
+            logger.warning("pyautogui not available for template check: %s", template_path)
+            return False
+        if region is not None:
+            return pag.locateOnScreen(template_path, confidence=confidence, region=region) is not None
+        return pag.locateOnScreen(template_path, confidence=confidence) is not None
+
+    def roi_region(self, roi_name: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+        """Absolute (left, top, width, height) of a `rois` entry on the configured monitor.
+
+        None if the ROI is not configured or the monitor can't be queried.
+        """
+        frac = self.s.rois.get(roi_name) if roi_name else None
+        if not frac:
+            return None
+        try:
+            mon = self.v.capture.monitor_rect(multi_screen=False)
+        except Exception:
+            return None
+        x1 = int(mon["left"] + frac[0] * mon["width"])
+        y1 = int(mon["top"] + frac[1] * mon["height"])
+        x2 = int(mon["left"] + frac[2] * mon["width"])
+        y2 = int(mon["top"] + frac[3] * mon["height"])
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    def wait_any(
+        self,
+        specs: Sequence[MatchSpec],
+        timeout_s: Optional[float] = None,
+        poll_s: Optional[float] = None,
+    ) -> Optional[Tuple[MatchSpec, Detection]]:
+        """Wait until any of `specs` is visible; return (spec, detection) of the first hit.
+
+        Every poll captures one frame and evaluates all specs against it, in the
+        given order, so listing specs by priority decides ties within a frame.
+        Polling is paced by `AdaptivePoller` like `wait_for`.
+        The worst case costs one timeout instead of the sum of per-template waits.
+        """
+        if self.v.dry_run:
+            logger.info("[dry] wait_any templates=%s", ", ".join(s.key for s in specs))
+            return None
+        timeout = timeout_s or self.s.timings.detection_timeout_s
+
+        def probe(frame):
             with self.safety.guard():
-                det = self.v.detect(template_path, roi_name=roi_name, threshold=threshold)
-                if det:
-                    logger.info("detect ok template=%s score=%.3f x=%d y=%d w=%d h=%d", template_path, det.score, det.x, det.y, det.w, det.h)
-                    return det
-                time.sleep(poll_s)
-        return None
+                for spec in specs:
+                    try:
+                        det = self.v.detect_in(frame, spec.template, roi_name=spec.roi_name, threshold=spec.threshold)
+                    except FileNotFoundError:
+                        continue
+                    if det:
+                        return spec, det
+            return None
+
+        poller = AdaptivePoller.from_settings(self.s, max_interval_s=poll_s)
+        hit = poller.run(probe, timeout, grab=self.v.grab_frame, on_tick=self.safety.check, sleep=self.sleep, label="|".join(s.key for s in specs))
+        if hit:
+            spec, det = hit
+            logger.info("detect ok template=%s score=%.3f x=%d y=%d w=%d h=%d", spec.template, det.score, det.x, det.y, det.w, det.h)
+        return hit
+
+    def wait_ready(self, name: str, steps: Union[Ready, Sequence[Ready]], max_s: float) -> bool:
+        """Wait for visual readiness instead of a fixed sleep of `max_s`.
+
+        `steps` are met in order (e.g. loading icon gone, then back) within one
+        `max_s` budget; the call returns as soon as the last one holds. If any
+        template is missing, or in dry-run, it falls back to sleeping `max_s`.
+        Time saved against `max_s` is recorded under `name` in `ready.LEDGER`.
+        """
+        steps = [steps] if isinstance(steps, Ready) else list(steps)
+        max_s = max(0.0, max_s)
+        start = CLOCK.now()
+        missing = [s.spec.template for s in steps if not os.path.exists(s.spec.template)]
+        if self.v.dry_run or missing:
+            if missing:
+                logger.info("Readiness template missing for %s (%s); sleeping %.1fs", name, ", ".join(missing), max_s)
+            self.sleep(max_s)
+            LEDGER.record(name, max_s, CLOCK.now() - start, False)
+            return False
+
+        poller = AdaptivePoller.from_settings(self.s)
+        met = True
+        for step in steps:
+            remaining = max_s - (CLOCK.now() - start)
+            if remaining <= 0:
+                met = False
+                break
+
+            def probe(frame, step=step):
+                with self.safety.guard():
+                    det = self.v.detect_in(frame, step.spec.template, roi_name=step.spec.roi_name, threshold=step.spec.threshold)
+                return not det if step.gone else det
+
+            if not poller.run(probe, remaining, grab=self.v.grab_frame, on_tick=self.safety.check, sleep=self.sleep, label="%s:%s" % (name, step.key)):
+                met = False
+                break
+        waited = CLOCK.now() - start
+        LEDGER.record(name, max_s, waited, met)
+        if met:
+            logger.info("ready %s after %.2fs (fixed wait %.1fs)", name, waited, max_s)
+        return met
 
     def run(self) -> None:
         raise NotImplementedError
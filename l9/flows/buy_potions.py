@@ -1,19 +1,15 @@
 from __future__ import annotations
 
 import logging
-import time
 import os
 from enum import Enum, auto
 from typing import Optional
 
-from .base import Flow
+from .base import Flow, StepFailed
+from ..clock import CLOCK
+from .ready import gone, hud_ready, teleport_done, visible
 from ..vision.color import red_ratio_bgr
 
-from PIL import ImageGrab
-from functools import partial
-ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
-
-
 logger = logging.getLogger(__name__)
 
 
@@ -57,19 +53,6 @@ class BuyPotionsFlow(Flow):
     T_CLOSE = "l9/assets/shop/close_button.png"
     T_POTION_HAS = "l9/assets/ui/hud/potion_has.png"
 
-    def _center(self, det):
-        # Compute center click point, adjusting for ROI offset if used.
-        if det is None:
-            return None
-        cx = det.x + det.w // 2
-        cy = det.y + det.h // 2
-        # Add absolute origin of last capture (monitor + ROI offset)
-        try:
-            ox, oy = getattr(self.v.capture, "last_origin", (0, 0))
-        except Exception:
-            ox, oy = (0, 0)
-        return cx + ox, cy + oy
-
     def _click_template(self, template: str, roi_name: Optional[str] = None, threshold: Optional[float] = None, timeout: Optional[float] = None) -> bool:
         if self.dry:
             logger.info("[dry] click_template %s roi=%s", template, roi_name)
@@ -88,9 +71,9 @@ class BuyPotionsFlow(Flow):
 
         Uses both empty/has templates if available to reduce false triggers.
         """
-        samples = int(self.cfg.get("buy_potions", {}).get("empty_check_samples", 5))
-        min_hits = int(self.cfg.get("buy_potions", {}).get("empty_check_min_matches", 4))
-        gap = max(0.0, float(self.cfg.get("buy_potions", {}).get("empty_check_interval_ms", 150)) / 1000.0)
+        samples = int(self.s.buy_potions.empty_check_samples)
+        min_hits = int(self.s.buy_potions.empty_check_min_matches)
+        gap = max(0.0, self.s.buy_potions.empty_check_interval_ms / 1000.0)
         empty_hits = 0
         has_hits = 0
         has_tpl_exists = os.path.exists(self.T_POTION_HAS)
@@ -110,7 +93,7 @@ class BuyPotionsFlow(Flow):
                     det_has = None
                 if det_has:
                     has_hits += 1
-            time.sleep(gap)
+            self.sleep(gap)
 
         # Potion status check completed
         if empty_hits >= min_hits and empty_hits >= has_hits:
@@ -121,177 +104,144 @@ class BuyPotionsFlow(Flow):
         return "UNKNOWN"
 
     def _exists_template(self, template_path: str, roi_name: Optional[str] = None) -> bool:
-        """Check for template via pyautogui.locateOnScreen if enabled, else Vision.detect."""
-        # Use pyautogui.locateOnScreen exclusively for potion checks
-        try:
-            import pyautogui as pag  # type: ignore
-        except ModuleNotFoundError:
-            logger.warning("pyautogui not available for template check: %s", template_path)
-            return False
-
+        """Single-frame check for a template, full screen or within a named ROI."""
+        conf = self.s.buy_potions.pyauto_threshold
         try:
-            # If fullscreen search requested, let pyautogui pick its own region (primary monitor)
-            if bool(self.cfg.get("buy_potions", {}).get("pyauto_fullscreen", False)):
-                conf = float(self.cfg.get("buy_potions", {}).get("pyauto_threshold", 0.9))
-                box = pag.locateOnScreen(template_path, confidence=conf)
-                return box is not None
-            # Else compute region from monitor + ROI fractions
-            import mss  # type: ignore
-            mon_idx = int(self.cfg.get("monitor_index", 1))
-            with mss.mss() as s:
-                mons = s.monitors
-                i = max(1, min(mon_idx, len(mons) - 1))
-                mon = mons[i]
-                region = (mon["left"], mon["top"], mon["width"], mon["height"])
-                frac = (self.cfg.get("rois", {}) or {}).get(roi_name) if roi_name else None
-                if frac:
-                    x1 = int(mon["left"] + frac[0] * mon["width"])
-                    y1 = int(mon["top"] + frac[1] * mon["height"])
-                    x2 = int(mon["left"] + frac[2] * mon["width"])
-                    y2 = int(mon["top"] + frac[3] * mon["height"])
-                    region = (x1, y1, x2 - x1, y2 - y1)
-                conf = float(self.cfg.get("buy_potions", {}).get("pyauto_threshold", 0.9))
-                box = pag.locateOnScreen(template_path, confidence=conf, region=region)
-                return box is not None
+            # Fullscreen search covers every screen; else the ROI on the configured monitor
+            region = None
+            if not self.s.buy_potions.pyauto_fullscreen:
+                region = self.roi_region(roi_name)
+                if region is None:
+                    mon = self.v.capture.monitor_rect(multi_screen=False)
+                    region = (mon["left"], mon["top"], mon["width"], mon["height"])
+            return self.exists(template_path, conf, region=region)
         except Exception as e:
-            logger.warning("pyautogui locate failed for %s: %s", template_path, e)
+            logger.warning("Template check failed for %s: %s", template_path, e)
             return False
 
     def run(self) -> None:
-        state: BuyState = BuyState.START
-        reason: Optional[str] = None
-
-        while True:
-            if state is BuyState.START:
-                # Buy potions flow started
-                state = BuyState.CHECK_POTIONS
-
-            elif state is BuyState.CHECK_POTIONS:
-                # Dry-run: exercise the flow without gating on emptiness
-                if self.dry:
-                    logger.info("[dry] assuming potions empty; skipping return-to-town for dry-run")
-                    state = BuyState.NAVIGATE_MERCHANT
-                    continue
-                # Quick, stable check: if NOT empty, skip this flow (avoid blocking)
-                status = self._potion_status_stable()
-                if status != "EMPTY":
-                    # Potions available, skipping refill
-                    state = BuyState.DONE
-                    continue
-                # Potions empty
-                # If already in town (merchant icon visible), skip return
-                try:
-                    in_town = self._exists_template(self.T_MERCHANT_ICON)
-                except Exception:
-                    in_town = False
-                if in_town or self.dry:
-                    # Already in town, skipping return
-                    state = BuyState.NAVIGATE_MERCHANT
-                else:
-                    state = BuyState.RETURN_TOWN
-
-            elif state is BuyState.RETURN_TOWN:
-                key = str(self.cfg.get("keybinds", {}).get("return_to_town", "r"))
-                self.a.press(key)
-                # Allow time for teleport animation/loading
-                min_wait = float(self.cfg.get("timings", {}).get("teleport_min_wait_s", 3.5))
-                time.sleep(max(0.0, min_wait))
-                # Use merchant icon as a town-only indicator
-                town_timeout = float(self.cfg.get("timings", {}).get("return_town_timeout_s", 20.0))
-                det_town = self.wait_for(self.T_MERCHANT_ICON, timeout_s=town_timeout)
-                if det_town or self.dry:
-                    # Arrived in town
-                    state = BuyState.NAVIGATE_MERCHANT
-                else:
-                    reason = "Timeout returning to town"
-                    state = BuyState.FAIL
-
-            elif state is BuyState.NAVIGATE_MERCHANT:
-                clicked = self._click_template(self.T_MERCHANT_ICON)  # full screen search by default
-                if not clicked and not self.dry:
-                    reason = "Merchant icon not found"
-                    state = BuyState.FAIL
-                else:
-                    # Allow time for auto-pathing to walk to the merchant
-                    path_wait = float(self.cfg.get("timings", {}).get("pathing_wait_s", 6.0))
-                    time.sleep(path_wait)
-                    state = BuyState.OPEN_SHOP
-
-            elif state is BuyState.OPEN_SHOP:
-                # Consider the shop open when the auto purchase button is visible
-                shop_timeout = float(self.cfg.get("timings", {}).get("shop_open_timeout_s", 12.0))
-                det_btn = self.wait_for(self.T_AUTO_PURCHASE, timeout_s=shop_timeout)
-                if det_btn or self.dry:
-                    state = BuyState.AUTO_PURCHASE
-                else:
-                    # If the button didn't appear yet, give pathing some time and retry once.
-                    time.sleep(2.0)
-                    det_btn = self.wait_for(self.T_AUTO_PURCHASE, timeout_s=3.0)
-                    if det_btn or self.dry:
-                        state = BuyState.AUTO_PURCHASE
-                    else:
-                        reason = "Auto purchase button not detected"
-                        state = BuyState.FAIL
-
-            elif state is BuyState.AUTO_PURCHASE:
-                if not self._click_template(self.T_AUTO_PURCHASE):
-                    if self.dry:
-                        logger.info("[dry] auto purchase clicked")
-                    else:
-                        reason = "Auto-purchase button not found"
-                        state = BuyState.FAIL
-                        continue
-                # Required confirm: wait then click OK
-                confirm_timeout = float(self.cfg.get("timings", {}).get("confirm_timeout_s", 8.0))
-                det_confirm = self.wait_for(self.T_CONFIRM, timeout_s=confirm_timeout)
-                if det_confirm or self.dry:
-                    if not self.dry:
-                        pt = self._center(det_confirm)
-                        if pt:
-                            self.a.click(pt[0], pt[1])
-                    # Purchase confirmed
-                else:
-                    reason = "Confirm dialog not detected"
-                    state = BuyState.FAIL
-                    continue
-                # Post-confirm delay
-                time.sleep(float(self.cfg.get("timings", {}).get("post_store_delay_s", 1.0)))
-                # Close shop via close button or Esc fallback
-                close_wait = float(self.cfg.get("timings", {}).get("close_wait_s", 2.0))
-                clicked_close = self._click_template(self.T_CLOSE, timeout=close_wait)
-                if not clicked_close and not self.dry:
-                    self.a.press(str(self.cfg.get("keybinds", {}).get("close_ui", "esc")))
-                # Post-close delay
-                time.sleep(float(self.cfg.get("timings", {}).get("post_store_delay_s", 1.0)))
-                state = BuyState.VERIFY
-
-            elif state is BuyState.VERIFY:
-                if self.dry:
-                    logger.info("[dry] assuming potions refilled")
-                    state = BuyState.DONE
-                else:
-                    # Allow HUD to settle, then wait up to a timeout for status to flip to HAS
-                    time.sleep(float(self.cfg.get("timings", {}).get("post_store_delay_s", 1.0)))
-                    deadline = time.time() + float(self.cfg.get("timings", {}).get("confirm_timeout_s", 8.0))
-                    ok = False
-                    while time.time() < deadline:
-                        status = self._potion_status_stable()
-                        if status == "HAS":
-                            ok = True
-                            break
-                        # UNKNOWN or EMPTY: keep waiting briefly
-                        time.sleep(0.3)
-                    if ok:
-                        # Refill succeeded
-                        state = BuyState.DONE
-                    else:
-                        reason = "potion still empty"
-                        state = BuyState.FAIL
-
-            elif state is BuyState.DONE:
-                # Buy potions flow completed
-                return
-
-            elif state is BuyState.FAIL:
-                # Buy potions flow failed
-                return
+        self.sm = (
+            self.machine(BuyState.START, fail=BuyState.FAIL)
+            .add(BuyState.START, self._s_start)
+            .add(BuyState.CHECK_POTIONS, self._s_check_potions)
+            .add(BuyState.RETURN_TOWN, self._s_return_town)
+            .add(BuyState.NAVIGATE_MERCHANT, self._s_navigate_merchant)
+            # If the button didn't appear yet, give pathing some time and retry once
+            .add(BuyState.OPEN_SHOP, self._s_open_shop, retries=1, backoff_s=2.0)
+            .add(BuyState.AUTO_PURCHASE, self._s_auto_purchase)
+            .add(BuyState.VERIFY, self._s_verify)
+            .add(BuyState.DONE, self._s_done)
+            .add(BuyState.FAIL, self._s_fail)
+        )
+        self.sm.run()
+
+    def _s_start(self) -> BuyState:
+        # Buy potions flow started
+        return BuyState.CHECK_POTIONS
+
+    def _s_check_potions(self) -> BuyState:
+        # Dry-run: exercise the flow without gating on emptiness
+        if self.dry:
+            logger.info("[dry] assuming potions empty; skipping return-to-town for dry-run")
+            return BuyState.NAVIGATE_MERCHANT
+        # Quick, stable check: if NOT empty, skip this flow (avoid blocking)
+        status = self._potion_status_stable()
+        if status != "EMPTY":
+            # Potions available, skipping refill
+            return BuyState.DONE
+        # Potions empty
+        # If already in town (merchant icon visible), skip return
+        try:
+            in_town = self._exists_template(self.T_MERCHANT_ICON)
+        except Exception:
+            in_town = False
+        if in_town or self.dry:
+            # Already in town, skipping return
+            return BuyState.NAVIGATE_MERCHANT
+        return BuyState.RETURN_TOWN
+
+    def _s_return_town(self) -> BuyState:
+        key = self.s.keybinds.return_to_town
+        self.a.press(key)
+        # Allow time for teleport animation/loading
+        min_wait = self.s.timings.teleport_min_wait_s
+        self.wait_ready("buy.teleport", teleport_done(self.cfg, visible(self.T_MERCHANT_ICON)), min_wait)
+        # Use merchant icon as a town-only indicator
+        town_timeout = self.s.timings.return_town_timeout_s
+        det_town = self.wait_for(self.T_MERCHANT_ICON, timeout_s=town_timeout)
+        if not det_town and not self.dry:
+            raise StepFailed("Timeout returning to town")
+        # Arrived in town
+        return BuyState.NAVIGATE_MERCHANT
+
+    def _s_navigate_merchant(self) -> BuyState:
+        clicked = self._click_template(self.T_MERCHANT_ICON)  # full screen search by default
+        if not clicked and not self.dry:
+            raise StepFailed("Merchant icon not found")
+        # Auto-pathing is done when the shop (auto purchase button) opens
+        path_wait = self.s.timings.pathing_wait_s
+        self.wait_ready("buy.pathing", visible(self.T_AUTO_PURCHASE), path_wait)
+        return BuyState.OPEN_SHOP
+
+    def _s_open_shop(self) -> BuyState:
+        # Consider the shop open when the auto purchase button is visible
+        if self.sm.attempt == 0:
+            timeout = self.s.timings.shop_open_timeout_s
+        else:
+            timeout = 3.0
+        det_btn = self.wait_for(self.T_AUTO_PURCHASE, timeout_s=timeout)
+        if not det_btn and not self.dry:
+            raise StepFailed("Auto purchase button not detected")
+        return BuyState.AUTO_PURCHASE
+
+    def _s_auto_purchase(self) -> BuyState:
+        if not self._click_template(self.T_AUTO_PURCHASE):
+            if not self.dry:
+                raise StepFailed("Auto-purchase button not found")
+            logger.info("[dry] auto purchase clicked")
+        # Required confirm: wait then click OK
+        confirm_timeout = self.s.timings.confirm_timeout_s
+        det_confirm = self.wait_for(self.T_CONFIRM, timeout_s=confirm_timeout)
+        if not det_confirm and not self.dry:
+            raise StepFailed("Confirm dialog not detected")
+        if not self.dry:
+            pt = self._center(det_confirm)
+            if pt:
+                self.a.click(pt[0], pt[1])
+        # Purchase confirmed
+        # Post-confirm: until the confirm dialog is dismissed
+        post_delay = self.s.timings.post_store_delay_s
+        self.wait_ready("buy.confirm_closed", gone(self.T_CONFIRM), post_delay)
+        # Close shop via close button or Esc fallback
+        close_wait = self.s.timings.close_wait_s
+        clicked_close = self._click_template(self.T_CLOSE, timeout=close_wait)
+        if not clicked_close and not self.dry:
+            self.a.press(self.s.keybinds.close_ui)
+        # Post-close: until the shop UI is gone
+        self.wait_ready("buy.shop_closed", gone(self.T_AUTO_PURCHASE), post_delay)
+        return BuyState.VERIFY
+
+    def _s_verify(self) -> BuyState:
+        if self.dry:
+            logger.info("[dry] assuming potions refilled")
+            return BuyState.DONE
+        # Allow HUD to settle (bag icon back), then wait up to a timeout for status to flip to HAS
+        post_delay = self.s.timings.post_store_delay_s
+        self.wait_ready("buy.hud_ready", hud_ready(self.cfg), post_delay)
+        deadline = CLOCK.now() + self.s.timings.confirm_timeout_s
+        while CLOCK.now() < deadline:
+            status = self._potion_status_stable()
+            if status == "HAS":
+                # Refill succeeded
+                return BuyState.DONE
+            # UNKNOWN or EMPTY: keep waiting briefly
+            self.sleep(0.3)
+        raise StepFailed("potion still empty")
+
+    def _s_done(self) -> None:
+        # Buy potions flow completed
+        return None
+
+    def _s_fail(self) -> None:
+        # Buy potions flow failed
+        return None
@@ -1,19 +1,17 @@
 from __future__ import annotations
 
 import logging
+import os
 import time
 from enum import Enum, auto
 from typing import Optional
 
-from PIL import ImageGrab  # type: ignore
-from functools import partial
-
-from .base import Flow
+from .base import Flow, StepFailed
 from .buy_potions import BuyPotionsFlow
+from ..vision.match import MatchSpec
+from .ready import gone, visible
 
 
-# Enable multi-monitor capture for pyautogui
-ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
 logger = logging.getLogger(__name__)
 
 
@@ -35,24 +33,12 @@ class DismantleFlow(Flow):
     T_DISMANTLE_HAS = "l9/assets/dismantle/dismantle_has.png"
     T_DISMANTLE_NONE = "l9/assets/dismantle/dismantle_none.png"
     T_CLOSE_INV = "l9/assets/dismantle/close_inventory.png"
+    # Optional result popup shown after dismantling (dismantle.result_template overrides)
+    T_RESULT = "l9/assets/dismantle/result.png"
 
     def _find(self, template: str, timeout_s: float) -> Optional[object]:
-        try:
-            import pyautogui as pag  # type: ignore
-        except ModuleNotFoundError:
-            logger.error("pyautogui not installed; cannot locate %s", template)
-            return None
-        conf = float(self.cfg.get("grind", {}).get("pyauto_threshold", 0.9))
-        end = time.time() + max(0.0, timeout_s)
-        while time.time() < end:
-            try:
-                box = pag.locateOnScreen(template, confidence=conf)
-                if box:
-                    return box
-            except Exception:
-                pass
-            time.sleep(0.15)
-        return None
+        conf = self.s.grind.pyauto_threshold
+        return self.locate(template, conf, timeout_s)
 
     def _click_box(self, box) -> None:
         if not box or self.dry:
@@ -61,6 +47,13 @@ class DismantleFlow(Flow):
         cy = box.top + box.height // 2
         self.a.click(cx, cy)
 
+    def _click_det(self, det) -> None:
+        if not det or self.dry:
+            return
+        pt = self._center(det)
+        if pt:
+            self.a.click(pt[0], pt[1])
+
     def _click_center_foreground(self):
         if self.dry:
             return
@@ -82,16 +75,14 @@ class DismantleFlow(Flow):
     def _click_at_cursor(self):
         """Click exactly where the mouse cursor currently is.
 
-        Tries pyautogui.position() first; falls back to WinAPI GetCursorPos.
+        Asks Actions for the cursor position first; falls back to WinAPI GetCursorPos.
         """
         if self.dry:
             return
-        # Try pyautogui for cursor position
         try:
-            import pyautogui as pag  # type: ignore
-            pos = pag.position()
+            pos = self.a.cursor_pos()
             if pos:
-                self.a.click(int(pos.x), int(pos.y))
+                self.a.click(pos[0], pos[1])
                 return
         except Exception:
             pass
@@ -109,70 +100,97 @@ class DismantleFlow(Flow):
             pass
 
     def run(self) -> None:
-        state = DState.START
-        reason: Optional[str] = None
-
-        while True:
-            if state is DState.START:
-                logger.info("Dismantle start")
-                state = DState.OPEN_INV
-
-            elif state is DState.OPEN_INV:
-                # Press inventory exactly once to avoid toggling issues
-                self.a.press_once(str(self.cfg.get("keybinds", {}).get("inventory", "i")))
-                time.sleep(0.3)
-                state = DState.OPEN_DISMANTLE
-
-            elif state is DState.OPEN_DISMANTLE:
-                box = self._find(self.T_ICON, timeout_s=8.0)
-                if not box and not self.dry:
-                    reason = "dismantle icon not found"
-                    state = DState.FAIL
-                    continue
-                self._click_box(box)
-                time.sleep(0.2)
-                state = DState.QUICK_ADD
-
-            elif state is DState.QUICK_ADD:
-                box = self._find(self.T_QUICK_ADD, timeout_s=8.0)
-                if box:
-                    self._click_box(box)
-                time.sleep(0.2)
-                state = DState.DISMANTLE
-
-            elif state is DState.DISMANTLE:
-                # Try the actionable dismantle button first
-                box = self._find(self.T_DISMANTLE_HAS, timeout_s=3.0)
-                if not box:
-                    # If none available, click the 'none' state button anyway to progress
-                    box = self._find(self.T_DISMANTLE_NONE, timeout_s=2.0)
-                if box:
-                    self._click_box(box)
-                # Click anywhere (center) to dismiss result
-                time.sleep(2)
-                # Replace center click with a click at current cursor position
-                self._click_at_cursor()
-                time.sleep(2)
-                state = DState.CLOSE_INV
-
-            elif state is DState.CLOSE_INV:
-                # Prefer clicking close, otherwise toggle inventory key
-                box = self._find(self.T_CLOSE_INV, timeout_s=2.0)
-                if box:
-                    self._click_box(box)
-                else:
-                    self.a.press_once(str(self.cfg.get("keybinds", {}).get("inventory", "i")))
-                time.sleep(float(self.cfg.get("timings", {}).get("post_store_delay_s", 1.0)))
-                state = DState.NEXT
-
-            elif state is DState.NEXT:
-                # Dismantle sequence complete; outer controller decides next step
-                state = DState.DONE
-
-            elif state is DState.DONE:
-                logger.info("Dismantle done")
-                return
+        self.sm = (
+            self.machine(DState.START, fail=DState.FAIL)
+            .add(DState.START, self._s_start)
+            .add(DState.OPEN_INV, self._s_open_inv)
+            .add(DState.OPEN_DISMANTLE, self._s_open_dismantle)
+            .add(DState.QUICK_ADD, self._s_quick_add)
+            .add(DState.DISMANTLE, self._s_dismantle)
+            .add(DState.CLOSE_INV, self._s_close_inv)
+            .add(DState.NEXT, self._s_next)
+            .add(DState.DONE, self._s_done)
+            .add(DState.FAIL, self._s_fail)
+        )
+        self.sm.run()
+
+    def _s_start(self) -> DState:
+        logger.info("Dismantle start")
+        return DState.OPEN_INV
+
+    def _s_open_inv(self) -> DState:
+        # Press inventory exactly once to avoid toggling issues
+        self.a.press_once(self.s.keybinds.inventory)
+        self.sleep(0.3)
+        return DState.OPEN_DISMANTLE
+
+    def _s_open_dismantle(self) -> DState:
+        box = self._find(self.T_ICON, timeout_s=8.0)
+        if not box and not self.dry:
+            raise StepFailed("dismantle icon not found")
+        self._click_box(box)
+        self.sleep(0.2)
+        return DState.QUICK_ADD
+
+    def _s_quick_add(self) -> DState:
+        box = self._find(self.T_QUICK_ADD, timeout_s=8.0)
+        if box:
+            self._click_box(box)
+        self.sleep(0.2)
+        return DState.DISMANTLE
+
+    def _s_dismantle(self) -> DState:
+        # Actionable button first; if none available, click the 'none' state
+        # button anyway to progress. Both are checked on every frame.
+        conf = self.s.grind.pyauto_threshold
+        hit = self.wait_any(
+            [
+                MatchSpec(self.T_DISMANTLE_HAS, threshold=conf),
+                MatchSpec(self.T_DISMANTLE_NONE, threshold=conf),
+            ],
+            timeout_s=3.0,
+        )
+        if hit:
+            self._click_det(hit[1])
+        # Result popup shown; without its template, the clicked button going away
+        t_result = str(self.s.dismantle.result_template or self.T_RESULT)
+        has_result = os.path.exists(t_result)
+        if has_result:
+            self.wait_ready("dismantle.result", visible(t_result), 2.0)
+        elif hit:
+            self.wait_ready("dismantle.result", gone(hit[0].template, threshold=conf), 2.0)
+        else:
+            self.sleep(2)
+        # Replace center click with a click at current cursor position
+        self._click_at_cursor()
+        # Dismissed: popup gone, else the inventory close button is reachable again
+        if has_result:
+            self.wait_ready("dismantle.dismissed", gone(t_result), 2.0)
+        else:
+            self.wait_ready("dismantle.dismissed", visible(self.T_CLOSE_INV, threshold=conf), 2.0)
+        return DState.CLOSE_INV
+
+    def _s_close_inv(self) -> DState:
+        # Prefer clicking close, otherwise toggle inventory key
+        box = self._find(self.T_CLOSE_INV, timeout_s=2.0)
+        if box:
+            self._click_box(box)
+        else:
+            self.a.press_once(self.s.keybinds.inventory)
+        # Until the inventory is closed
+        conf = self.s.grind.pyauto_threshold
+        post_delay = self.s.timings.post_store_delay_s
+        self.wait_ready("dismantle.closed", gone(self.T_CLOSE_INV, threshold=conf), post_delay)
+        return DState.NEXT
+
+    def _s_next(self) -> DState:
+        # Dismantle sequence complete; outer controller decides next step
+        return DState.DONE
+
+    def _s_done(self) -> None:
+        logger.info("Dismantle done")
+        return None
 
-            elif state is DState.FAIL:
-                logger.error("Dismantle failed: %s", reason or "unknown")
-                return
+    def _s_fail(self) -> None:
+        logger.error("Dismantle failed: %s", self.sm.reason or "unknown")
+        return None
@@ -1,23 +1,26 @@
 from __future__ import annotations
 
 import logging
-import time
 from enum import Enum, auto
-from typing import Optional
+from typing import List, Optional
 
-from PIL import ImageGrab  # type: ignore
-from functools import partial
-
-from .base import Flow
+from .base import Flow, StepFailed
+from ..actions.safety import Panic
+from ..clock import CLOCK
 from .buy_potions import BuyPotionsFlow
 from .dismantle import DismantleFlow
 from .return_town import ReturnTownFlow
 from .grind import GrindFlow
+from .ready import LEDGER as READY_LEDGER
 from .revive import ReviveFlow
+from .status import PotionState, StatusProbe, StatusSnapshot
+from .runtime import FlowRuntime
+from .watch import Watcher, WatchEvent, WatchKind
+from ..events import EVENTS
+from ..profiling import PROFILER
+from ..vision.stream import FrameStream
 
 
-# Ensure multi-monitor capture for pyautogui
-ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
 logger = logging.getLogger(__name__)
 
 
@@ -34,113 +37,260 @@ class LState(Enum):
 class GrindRefillLoop(Flow):
     T_POTION_EMPTY = "l9/assets/ui/hud/potion_empty.png"
 
+    # Shared frame stream (None in dry-run or without mss); set up in run()
+    _stream: Optional[FrameStream] = None
+    _status: Optional[StatusProbe] = None
+    _watcher: Optional[Watcher] = None
+
+    def _snapshots(self) -> List[StatusSnapshot]:
+        snaps = self._status.collect(self._stream)
+        if snaps:
+            last = snaps[-1]
+            logger.debug(
+                "status frame=%d dead=%s potion=%s in_town=%s hud=%s scores=%s",
+                last.frame_seq, last.dead, last.potion.value, last.in_town, last.hud_ready,
+                " ".join("%s=%.3f" % kv for kv in last.scores),
+            )
+        return snaps
+
     def _potion_empty(self) -> bool:
-        try:
-            import pyautogui as pag  # type: ignore
-        except ModuleNotFoundError:
-            logger.error("pyautogui not available; cannot check potions")
-            return False
-        conf = float(self.cfg.get("buy_potions", {}).get("pyauto_threshold", 0.9))
-        samples = int(self.cfg.get("buy_potions", {}).get("empty_check_samples", 3))
-        min_hits = max(1, int(self.cfg.get("buy_potions", {}).get("empty_check_min_matches", 2)))
-        gap = max(0.05, float(self.cfg.get("buy_potions", {}).get("empty_check_interval_ms", 150)) / 1000.0)
+        if self._stream is not None and self._status is not None:
+            return self._status.vote_potion(self._snapshots()) is PotionState.EMPTY
+        return self._potion_empty_sampled()
 
-        # Compute search region: prefer potion_slot ROI, else hud_anchor, else full monitor
-        region = None
-        try:
-            import mss  # type: ignore
-            mon_idx = int(self.cfg.get("monitor_index", 1))
-            with mss.mss() as s:
-                mons = s.monitors
-                i = max(1, min(mon_idx, len(mons) - 1))
-                mon = mons[i]
-                region = (mon["left"], mon["top"], mon["width"], mon["height"])  # default full monitor
-                frac = (self.cfg.get("rois", {}) or {}).get("potion_slot")
-                if frac is None:
-                    frac = (self.cfg.get("rois", {}) or {}).get("hud_anchor")
-                if frac is not None:
-                    x1 = int(mon["left"] + frac[0] * mon["width"])
-                    y1 = int(mon["top"] + frac[1] * mon["height"])
-                    x2 = int(mon["left"] + frac[2] * mon["width"])
-                    y2 = int(mon["top"] + frac[3] * mon["height"])
-                    region = (x1, y1, x2 - x1, y2 - y1)
-        except Exception:
-            region = None
+    def _potion_empty_sampled(self) -> bool:
+        conf = self.s.buy_potions.pyauto_threshold
+        samples = int(self.s.buy_potions.empty_check_samples)
+        min_hits = max(1, int(self.s.buy_potions.empty_check_min_matches))
+        gap = max(0.05, self.s.buy_potions.empty_check_interval_ms / 1000.0)
+
+        # Search region: prefer potion_slot ROI, else hud_anchor, else full monitor
+        region = self.roi_region("potion_slot") or self.roi_region("hud_anchor")
+        if region is None:
+            try:
+                mon = self.v.capture.monitor_rect(multi_screen=False)
+                region = (mon["left"], mon["top"], mon["width"], mon["height"])
+            except Exception:
+                region = None
 
         hits = 0
         for _ in range(max(1, samples)):
             try:
-                if region is not None:
-                    box = pag.locateOnScreen(self.T_POTION_EMPTY, confidence=conf, region=region)
-                else:
-                    box = pag.locateOnScreen(self.T_POTION_EMPTY, confidence=conf)
-                if box is not None:
+                if self.exists(self.T_POTION_EMPTY, conf, region=region):
                     hits += 1
             except Exception:
                 pass
-            time.sleep(gap)
+            self.sleep(gap)
         return hits >= min_hits
 
-    def run(self) -> None:
-        state = LState.START
-        reason: Optional[str] = None
+    def _start_stream(self) -> Optional[FrameStream]:
+        if self.dry:
+            return None
+        try:
+            fps = self.s.watch.fps
+            return FrameStream(self.cfg, fps=fps, capture=self.v.capture.fork(multi_screen=False)).start()
+        except Exception as e:
+            logger.warning("Frame stream unavailable (%s); using sampled checks", e)
+            return None
+
+    def _start_watcher(self) -> Optional[Watcher]:
+        if self._stream is None or not self.s.watch.enabled:
+            return None
+        try:
+            return Watcher.from_cfg(self.v, self.cfg, stream=self._stream).start()
+        except Exception as e:
+            logger.warning("Watcher unavailable (%s); using blocking checks", e)
+            return None
 
+    def _wait_event(self, watcher: Watcher, timeout_s: float) -> Optional[WatchEvent]:
+        # Block on the event queue in short slices so the panic key stays live
+        deadline = CLOCK.now() + timeout_s
         while True:
-            if state is LState.START:
-                # Loop started
-                state = LState.CHECK
-
-            elif state is LState.CHECK:
-                # Priority: handle death/revive first if visible
-                try:
-                    revived = ReviveFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
-                except Exception:
-                    revived = False
-                if revived:
-                    # After revive, immediately check potions and branch
-                    time.sleep(0.5)
-                    if self._potion_empty():
-                        # Potions empty
-                        state = LState.REFILL
-                    else:
-                        state = LState.GRIND
-                else:
-                    # Normal loop: just check potions
-                    empty = self._potion_empty()
-                    if empty:
-                        # Potions empty
-                        state = LState.REFILL
-                    else:
-                        state = LState.WAIT
-
-            elif state is LState.REFILL:
-                # Full sequence when out of potions: return -> dismantle -> buy -> grind
-                # Returning to town
-                ReturnTownFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
-                # Dismantling items
-                DismantleFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
-                # Buying potions
-                BuyPotionsFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
-                # After sequence, go to grind
-                state = LState.GRIND
-
-            elif state is LState.GRIND:
-                # Running grind flow
-                GrindFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
-                # After grind step, loop back to check potions
-                # Small pause to allow HUD to update
-                time.sleep(0.5)
-                state = LState.CHECK
-
-            elif state is LState.WAIT:
-                # Idle and re-check later; do NOT move to grind map if potions remain
-                interval_s = max(0.1, float(self.cfg.get("buy_potions", {}).get("empty_check_interval_ms", 150)) / 1000.0)
-                time.sleep(interval_s)
-                state = LState.CHECK
-
-            elif state is LState.DONE:
-                return
-
-            elif state is LState.FAIL:
-                # Loop failed
-                return
+            self.safety.check()
+            remaining = deadline - CLOCK.now()
+            if remaining <= 0:
+                return None
+            ev = watcher.get(min(0.05, remaining))
+            if ev is not None:
+                return ev
+
+    def _run_preemptible(self, flow: Flow, watcher: Optional[Watcher]) -> Optional[WatchEvent]:
+        """Run `flow`; with a watcher, death or disconnect cancels it mid-way.
+
+        Returns the preempting event, if any.
+        """
+        if watcher is None:
+            flow.run()
+            return None
+        return FlowRuntime(self.cfg, watcher, preempt_on=(WatchKind.REVIVE, WatchKind.DISCONNECT)).run(flow).raise_for_outcome()
+
+    def _revive_then_branch(self) -> LState:
+        # After revive, immediately check potions and branch
+        self.sleep(0.5)
+        if self._potion_empty():
+            # Potions empty
+            return LState.REFILL
+        return LState.GRIND
+
+    def run(self) -> None:
+        self._stream = self._start_stream()
+        # CHECK only branches on death and potions; the full-frame town match is left out
+        self._status = (
+            StatusProbe(self.v, self.cfg, names=("dead", "potion_empty", "potion_has"))
+            if self._stream is not None
+            else None
+        )
+        self._watcher = self._start_watcher()
+        self._pending: List[WatchEvent] = []
+        self._idle_s = self.s.watch.idle_wait_s
+        # Cycle bookkeeping for the live event stream (l9.events)
+        self._cycles = 0
+        self._cycle_t0: Optional[float] = None
+        self._refill_s: Optional[float] = None
+        try:
+            self.sm = (
+                self.machine(LState.START, fail=LState.FAIL)
+                .add(LState.START, self._s_start)
+                .add(LState.CHECK, self._s_check)
+                .add(LState.REFILL, self._s_refill)
+                .add(LState.GRIND, self._s_grind)
+                .add(LState.WAIT, self._s_wait)
+                .add(LState.DONE, self._s_done)
+                .add(LState.FAIL, self._s_fail)
+            )
+            self.sm.run()
+        finally:
+            if self._watcher is not None:
+                self._watcher.stop()
+                self._watcher = None
+            if self._stream is not None:
+                self._stream.stop()
+                self._stream = None
+
+    def _revive(self) -> bool:
+        try:
+            return ReviveFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
+        except Panic:
+            raise
+        except Exception:
+            return False
+
+    def _s_start(self) -> LState:
+        # Loop started
+        return LState.CHECK
+
+    def _s_check(self) -> LState:
+        nxt = self._check()
+        if nxt in (LState.REFILL, LState.GRIND):
+            # A cycle runs from leaving CHECK for work until grinding ends
+            self._begin_cycle()
+        return nxt
+
+    def _check(self) -> LState:
+        if self._watcher is not None:
+            return self._check_events()
+        if self._stream is not None:
+            return self._check_snapshots()
+        # Priority: handle death/revive first if visible
+        if self._revive():
+            return self._revive_then_branch()
+        # Normal loop: just check potions
+        if self._potion_empty():
+            # Potions empty
+            return LState.REFILL
+        return LState.WAIT
+
+    def _check_events(self) -> LState:
+        # Events were published by the watcher as soon as a frame showed them
+        kinds = {e.kind for e in self._pending + self._watcher.drain()}
+        self._pending = []
+        if WatchKind.DISCONNECT in kinds:
+            raise StepFailed("disconnect dialog visible")
+        if WatchKind.REVIVE in kinds:
+            revived = self._revive()
+            self._watcher.reset()
+            return self._revive_then_branch() if revived else LState.CHECK
+        if WatchKind.POTION_EMPTY in kinds:
+            return LState.REFILL
+        return LState.WAIT
+
+    def _check_snapshots(self) -> LState:
+        # One snapshot per stream frame covers revive and potion status together
+        snaps = self._snapshots()
+        if snaps and snaps[-1].dead:
+            return self._revive_then_branch() if self._revive() else LState.WAIT
+        if self._status.vote_potion(snaps) is PotionState.EMPTY:
+            return LState.REFILL
+        return LState.WAIT
+
+    def _s_refill(self) -> LState:
+        # Full sequence when out of potions: return -> dismantle -> buy -> grind
+        t0 = CLOCK.time()
+        # Returning to town
+        ReturnTownFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
+        # Dismantling items
+        DismantleFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
+        # Buying potions
+        BuyPotionsFlow(self.v, self.a, self.cfg, dry_run=self.dry).run()
+        self._refill_s = CLOCK.time() - t0
+        # After sequence, go to grind
+        return LState.GRIND
+
+    def _s_grind(self) -> LState:
+        # Running grind flow
+        t0 = CLOCK.time()
+        ev = self._run_preemptible(GrindFlow(self.v, self.a, self.cfg, dry_run=self.dry), self._watcher)
+        if ev is not None:
+            # Died or disconnected mid-grind: close the cycle unfinished and handle it right away
+            self._end_cycle(CLOCK.time() - t0, outcome="aborted")
+            self._pending.append(ev)
+            return LState.CHECK
+        # Per-cycle wall time saved by readiness waits vs. the old fixed sleeps
+        READY_LEDGER.log_summary("Refill/grind cycle")
+        self._end_cycle(CLOCK.time() - t0)
+        # After grind step, loop back to check potions
+        # Small pause to allow HUD to update
+        self.sleep(0.5)
+        if self._watcher is not None:
+            # Events queued during refill/grind describe screens that are gone
+            self._watcher.reset()
+        return LState.CHECK
+
+    def _begin_cycle(self) -> None:
+        PROFILER.begin_cycle()
+        self._cycle_t0 = CLOCK.time()
+        self._refill_s = None
+
+    def _end_cycle(self, grind_s: float, outcome: str = "done") -> None:
+        """Close the cycle: "done" once grinding finished, "aborted" when death or disconnect cut it short."""
+        PROFILER.end_cycle(outcome)
+        self._cycles += 1
+        EVENTS.cycle(
+            n=self._cycles,
+            outcome=outcome,
+            dur_s=round(CLOCK.time() - self._cycle_t0, 3),
+            refill_s=round(self._refill_s, 3) if self._refill_s is not None else None,
+            grind_s=round(grind_s, 3),
+        )
+        self._cycle_t0 = None
+        self._refill_s = None
+
+    def _s_wait(self) -> LState:
+        if self._watcher is not None:
+            # Sleep until the watcher reports something (or idle timeout)
+            ev = self._wait_event(self._watcher, self._idle_s)
+            if ev is not None:
+                self._pending.append(ev)
+            return LState.CHECK
+        # Idle and re-check later; do NOT move to grind map if potions remain
+        interval_s = max(0.1, self.s.buy_potions.empty_check_interval_ms / 1000.0)
+        self.sleep(interval_s)
+        return LState.CHECK
+
+    def _s_done(self) -> None:
+        return None
+
+    def _s_fail(self) -> None:
+        # Loop failed
+        logger.error("Grind/refill loop failed: %s", self.sm.reason or "unknown")
+        return None
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ..settings import settings_for
+from ..vision.match import MatchSpec
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Ready:
+    """Visual condition that ends a wait: `spec` visible, or gone when `gone` is set."""
+
+    spec: MatchSpec
+    gone: bool = False
+
+    @property
+    def key(self) -> str:
+        return ("!" if self.gone else "") + self.spec.key
+
+
+def visible(template: str, roi_name: Optional[str] = None, threshold: Optional[float] = None) -> Ready:
+    return Ready(MatchSpec(template, roi_name=roi_name, threshold=threshold))
+
+
+def gone(template: str, roi_name: Optional[str] = None, threshold: Optional[float] = None) -> Ready:
+    return Ready(MatchSpec(template, roi_name=roi_name, threshold=threshold), gone=True)
+
+
+@dataclass
+class ReadyStat:
+    name: str
+    count: int = 0
+    met: int = 0
+    baseline_s: float = 0.0  # sum of the fixed sleeps these waits replaced
+    waited_s: float = 0.0
+
+    @property
+    def saved_s(self) -> float:
+        return self.baseline_s - self.waited_s
+
+
+class ReadyLedger:
+    """Per-wait wall time saved versus the fixed sleeps, accumulated until `take()`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, ReadyStat] = {}
+
+    def record(self, name: str, baseline_s: float, waited_s: float, met: bool) -> None:
+        with self._lock:
+            st = self._stats.setdefault(name, ReadyStat(name))
+            st.count += 1
+            st.met += 1 if met else 0
+            st.baseline_s += baseline_s
+            st.waited_s += waited_s
+
+    def take(self) -> List[ReadyStat]:
+        with self._lock:
+            out = sorted(self._stats.values(), key=lambda s: s.saved_s, reverse=True)
+            self._stats = {}
+        return out
+
+    def log_summary(self, title: str) -> None:
+        stats = self.take()
+        if not stats:
+            return
+        total = sum(s.saved_s for s in stats)
+        logger.info(
+            "%s: readiness waits saved %.1fs (%s)",
+            title,
+            total,
+            ", ".join("%s %.1fs %d/%d met" % (s.name, s.saved_s, s.met, s.count) for s in stats),
+        )
+
+
+# Shared by every flow in the process; GrindRefillLoop logs and resets it once per cycle.
+LEDGER = ReadyLedger()
+
+
+def _bag_icon(cfg: dict):
+    g = settings_for(cfg).grind
+    return g.bag_icon_template, g.bag_icon_roi, g.pyauto_threshold
+
+
+def hud_ready(cfg: dict) -> Ready:
+    """HUD is up: the bag icon is visible."""
+    bag, roi, thr = _bag_icon(cfg)
+    return visible(bag, roi_name=roi, threshold=thr)
+
+
+def teleport_done(cfg: dict, arrived: Optional[Ready] = None) -> List[Ready]:
+    """Loading screen seen and gone: HUD bag icon disappears, then `arrived` (default: HUD back)."""
+    bag, roi, thr = _bag_icon(cfg)
+    return [gone(bag, roi_name=roi, threshold=thr), arrived or hud_ready(cfg)]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import logging
+
+from .base import Flow
+from .grind import GrindFlow
+
+
+logger = logging.getLogger(__name__)
+
+
+class RecordPathFlow(Flow):
+    """Record the grind path of the active spot until the stop key (or a stop request).
+
+    Uses GrindFlow's path naming and recorder, so the file is the one
+    GrindFlow and TestPathFlow replay.
+    """
+
+    def run(self) -> None:  # type: ignore[override]
+        gf = GrindFlow(self.v, self.a, self.cfg, dry_run=self.dry)
+        gf._record_path(gf._path_file())
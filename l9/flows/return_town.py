@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import logging
-import time
+from enum import Enum, auto
 
-from .base import Flow
+from .base import Flow, StepFailed
+from .ready import teleport_done, visible
 from ..actions.window import WindowManager
 
 
 logger = logging.getLogger(__name__)
 
 
+class RState(Enum):
+    FOCUS = auto()
+    TELEPORT = auto()
+    CONFIRM = auto()
+    DONE = auto()
+    FAIL = auto()
+
+
 class ReturnTownFlow(Flow):
     """Return to town by pressing the configured key and confirming arrival.
 
@@ -22,16 +31,28 @@ class ReturnTownFlow(Flow):
     T_MERCHANT_ICON = "l9/assets/npc/general_merchant_icon.png"
 
     def run(self) -> None:
-        # Focus window
+        self.sm = (
+            self.machine(RState.FOCUS, fail=RState.FAIL)
+            .add(RState.FOCUS, self._s_focus)
+            .add(RState.TELEPORT, self._s_teleport)
+            .add(RState.CONFIRM, self._s_confirm)
+            .add(RState.DONE, self._s_done)
+            .add(RState.FAIL, self._s_fail)
+        )
+        self.sm.run()
+
+    def _s_focus(self) -> RState:
         try:
             wm = WindowManager(self.cfg)
             ok = wm.ensure_focus()
             logger.info("Window focus %s (fg=%r)", "OK" if ok else "FAILED", wm.get_foreground_title())
         except Exception as e:
             logger.warning("Window focus attempt failed: %s", e)
+        return RState.TELEPORT
 
+    def _s_teleport(self) -> RState:
         # Press return-to-town key
-        key = str(self.cfg.get("keybinds", {}).get("return_to_town", "r"))
+        key = self.s.keybinds.return_to_town
         try:
             # Use single press to avoid repeats
             self.a.press_once(key)
@@ -39,16 +60,24 @@ class ReturnTownFlow(Flow):
             # Fallback to standard press
             self.a.press(key)
 
-        # Allow teleport animation/loading to complete
-        min_wait = float(self.cfg.get("timings", {}).get("teleport_min_wait_s", 3.5))
-        time.sleep(max(0.0, min_wait))
+        # Allow teleport animation/loading to complete; done once the loading
+        # screen has come and gone and the town marker is up
+        min_wait = self.s.timings.teleport_min_wait_s
+        self.wait_ready("return_town.teleport", teleport_done(self.cfg, visible(self.T_MERCHANT_ICON)), min_wait)
+        return RState.CONFIRM
 
+    def _s_confirm(self) -> RState:
         # Confirm arrival in town via merchant icon
-        town_timeout = float(self.cfg.get("timings", {}).get("return_town_timeout_s", 20.0))
+        town_timeout = self.s.timings.return_town_timeout_s
         det = self.wait_for(self.T_MERCHANT_ICON, timeout_s=town_timeout)
-        if det or self.dry:
-            logger.info("ReturnTownFlow: Arrived in town")
-            return
-        logger.error("ReturnTownFlow: Timeout waiting for town indicator")
-        return
+        if not det and not self.dry:
+            raise StepFailed("Timeout waiting for town indicator")
+        return RState.DONE
+
+    def _s_done(self) -> None:
+        logger.info("ReturnTownFlow: Arrived in town")
+        return None
 
+    def _s_fail(self) -> None:
+        logger.error("ReturnTownFlow: %s", self.sm.reason)
+        return None
@@ -6,14 +6,9 @@ import time
 from enum import Enum, auto
 from typing import Optional, Tuple
 
-from PIL import ImageGrab  # type: ignore
-from functools import partial
-
 from .base import Flow
 
 
-# Enable multi-monitor capture for pyautogui consistency
-ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
 logger = logging.getLogger(__name__)
 
 
@@ -50,49 +45,11 @@ class ReviveFlow(Flow):
 
     def _roi_region(self) -> Optional[Tuple[int, int, int, int]]:
         """Compute absolute pixel region from configured ROI name 'revive_ui'."""
-        try:
-            import mss  # type: ignore
-        except ModuleNotFoundError:
-            mss = None  # type: ignore
-        try:
-            frac = (self.cfg.get("rois", {}) or {}).get("revive_ui")
-            mon_idx = int(self.cfg.get("monitor_index", 1))
-            if mss is None or not frac:
-                return None
-            with mss.mss() as s:
-                mons = s.monitors
-                i = max(1, min(mon_idx, len(mons) - 1))
-                mon = mons[i]
-                x1 = int(mon["left"] + frac[0] * mon["width"])
-                y1 = int(mon["top"] + frac[1] * mon["height"])
-                x2 = int(mon["left"] + frac[2] * mon["width"])
-                y2 = int(mon["top"] + frac[3] * mon["height"])
-                return (x1, y1, x2 - x1, y2 - y1)
-        except Exception:
-            return None
+        return self.roi_region("revive_ui")
 
     def _locate(self, template: str, timeout_s: float) -> Optional[object]:
-        try:
-            import pyautogui as pag  # type: ignore
-        except ModuleNotFoundError:
-            logger.error("pyautogui not installed; cannot locate %s", template)
-            return None
-        conf = float(self.cfg.get("revive", {}).get("pyauto_threshold", 0.9))
-        end = time.time() + max(0.0, timeout_s)
-        region = self._roi_region()
-        while time.time() < end:
-            try:
-                box = (
-                    pag.locateOnScreen(template, confidence=conf, region=region)
-                    if region is not None
-                    else pag.locateOnScreen(template, confidence=conf)
-                )
-                if box:
-                    return box
-            except Exception:
-                pass
-            time.sleep(0.15)
-        return None
+        conf = self.s.revive.pyauto_threshold
+        return self.locate(template, conf, timeout_s, region=self._roi_region())
 
     def _click_box(self, box) -> None:
         if not box or self.dry:
@@ -103,14 +60,8 @@ class ReviveFlow(Flow):
 
     def _wait_bag_icon(self, timeout_s: float) -> bool:
         """Wait for bag icon to appear, indicating HUD is ready."""
-        try:
-            import pyautogui as pag  # type: ignore
-        except ModuleNotFoundError:
-            logger.error("pyautogui not available; skipping bag icon wait")
-            return True
-        
-        rcfg = self.cfg.get("revive", {}) or {}
-        t_path = str(rcfg.get("bag_icon_template", "l9/assets/ui/hud/bag_icon.png"))
+        r = self.s.revive
+        t_path = r.bag_icon_template
         
         try:
             import os
@@ -120,103 +71,101 @@ class ReviveFlow(Flow):
         except Exception:
             pass
         
-        conf = float(rcfg.get("pyauto_threshold", 0.9))
-        roi_name = str(rcfg.get("bag_icon_roi", "hud_anchor")) if rcfg.get("bag_icon_roi") is not None else None
+        conf = r.pyauto_threshold
+        roi_name = str(r.bag_icon_roi) if r.bag_icon_roi is not None else None
         region = self._roi_region() if roi_name == "hud_anchor" else None
         
-        end = time.time() + max(0.0, timeout_s)
-        while time.time() < end:
-            try:
-                box = pag.locateOnScreen(t_path, confidence=conf, region=region) if region else pag.locateOnScreen(t_path, confidence=conf)
-                if box:
-                    return True
-            except Exception:
-                pass
-            time.sleep(0.15)
+        if self.locate(t_path, conf, timeout_s, region=region):
+            return True
         
         logger.warning("Bag icon not detected within %.1fs; continuing", timeout_s)
         return False
 
     def run(self) -> bool:  # type: ignore[override]
-        rcfg = self.cfg.get("revive", {}) or {}
-        t_revive = str(rcfg.get("revive_button", self.T_REVIVE))
-        t_reclaim = str(rcfg.get("stat_reclaim_button", self.T_STAT_RECLAIM))
-        t_retrieve = str(rcfg.get("retrieve_button", self.T_RETRIEVE))
+        r = self.s.revive
+        self._t_revive = r.revive_button or self.T_REVIVE
+        self._t_reclaim = r.stat_reclaim_button or self.T_STAT_RECLAIM
+        self._t_retrieve = r.retrieve_button or self.T_RETRIEVE
         try:
             import os
-            if not os.path.exists(t_revive):
-                logger.warning("Revive template missing: %s", t_revive)
-            if not os.path.exists(t_reclaim):
-                logger.info("Stat reclaim template not found (optional): %s", t_reclaim)
-            if not os.path.exists(t_retrieve):
-                logger.info("Retrieve template not found (optional): %s", t_retrieve)
+            if not os.path.exists(self._t_revive):
+                logger.warning("Revive template missing: %s", self._t_revive)
+            if not os.path.exists(self._t_reclaim):
+                logger.info("Stat reclaim template not found (optional): %s", self._t_reclaim)
+            if not os.path.exists(self._t_retrieve):
+                logger.info("Retrieve template not found (optional): %s", self._t_retrieve)
         except Exception:
             pass
 
-        t_revive_timeout = float(rcfg.get("revive_timeout_s", 2.0))
-        t_reclaim_timeout = float(rcfg.get("reclaim_timeout_s", 3.0))
-        t_retrieve_timeout = float(rcfg.get("retrieve_timeout_s", 3.0))
-
-        state = RState.START
-        reason: Optional[str] = None
-        revived = False
-
-        while True:
-            if state is RState.START:
-                if not ReviveFlow._start_logged:
-                    logger.info("Revive check start")
-                    ReviveFlow._start_logged = True
-                state = RState.CHECK_REVIVE
-
-            elif state is RState.CHECK_REVIVE:
-                box = self._locate(t_revive, timeout_s=t_revive_timeout)
-                if not box:
-                    # No revive UI visible; no-op
-                    state = RState.DONE
-                    continue
-                self._click_box(box)
-                revived = True
-                time.sleep(0.3)
-                state = RState.CHECK_RECLAIM
-
-            elif state is RState.CHECK_RECLAIM:
-                # Optional step: if a stat reclaim button exists, click it
-                box = self._locate(t_reclaim, timeout_s=t_reclaim_timeout)
-                if box:
-                    self._click_box(box)
-                    time.sleep(0.25)
-                    state = RState.CHECK_RETRIEVE
-                else:
-                    state = RState.WAIT_HUD
-
-            elif state is RState.CHECK_RETRIEVE:
-                # Optional confirm/accept/retrieve
-                box = self._locate(t_retrieve, timeout_s=t_retrieve_timeout)
-                if box:
-                    self._click_box(box)
-                    time.sleep(0.25)
-                state = RState.WAIT_HUD
-
-            elif state is RState.WAIT_HUD:
-                # Wait for HUD to be ready after revive
-                if revived:
-                    # Randomized wait: 1-2 seconds
-                    wait_time = random.uniform(1.0, 2.0)
-                    time.sleep(wait_time)
-                    
-                    # Check for bag icon to ensure HUD is ready
-                    timeout = float(rcfg.get("bag_icon_timeout_s", 12.0))
-                    self._wait_bag_icon(timeout)
-                
-                state = RState.DONE
-
-            elif state is RState.DONE:
-                if revived:
-                    logger.info("Revive flow completed")
-                    # Reset the start logged flag so we can log again if needed
-                    ReviveFlow._start_logged = False
-                return revived
-
-            elif state is RState.FAIL:
-                logger.error("Revive flow failed: %s", reason or "unknown")
-                return revived
+        self._revived = False
+        self.sm = (
+            self.machine(RState.START, fail=RState.FAIL)
+            .add(RState.START, self._s_start)
+            .add(RState.CHECK_REVIVE, self._s_check_revive)
+            .add(RState.CHECK_RECLAIM, self._s_check_reclaim)
+            .add(RState.CHECK_RETRIEVE, self._s_check_retrieve)
+            .add(RState.WAIT_HUD, self._s_wait_hud)
+            .add(RState.DONE, self._s_done)
+            .add(RState.FAIL, self._s_fail)
+        )
+        self.sm.run()
+        return self._revived
+
+    def _s_start(self) -> RState:
+        if not ReviveFlow._start_logged:
+            logger.info("Revive check start")
+            ReviveFlow._start_logged = True
+        return RState.CHECK_REVIVE
+
+    def _s_check_revive(self) -> RState:
+        t_revive_timeout = self.s.revive.revive_timeout_s
+        box = self._locate(self._t_revive, timeout_s=t_revive_timeout)
+        if not box:
+            # No revive UI visible; no-op
+            return RState.DONE
+        self._click_box(box)
+        self._revived = True
+        self.sleep(0.3)
+        return RState.CHECK_RECLAIM
+
+    def _s_check_reclaim(self) -> RState:
+        # Optional step: if a stat reclaim button exists, click it
+        t_reclaim_timeout = self.s.revive.reclaim_timeout_s
+        box = self._locate(self._t_reclaim, timeout_s=t_reclaim_timeout)
+        if box:
+            self._click_box(box)
+            self.sleep(0.25)
+            return RState.CHECK_RETRIEVE
+        return RState.WAIT_HUD
+
+    def _s_check_retrieve(self) -> RState:
+        # Optional confirm/accept/retrieve
+        t_retrieve_timeout = self.s.revive.retrieve_timeout_s
+        box = self._locate(self._t_retrieve, timeout_s=t_retrieve_timeout)
+        if box:
+            self._click_box(box)
+            self.sleep(0.25)
+        return RState.WAIT_HUD
+
+    def _s_wait_hud(self) -> RState:
+        # Wait for HUD to be ready after revive
+        if self._revived:
+            # Randomized wait: 1-2 seconds
+            wait_time = random.uniform(1.0, 2.0)
+            self.sleep(wait_time)
+
+            # Check for bag icon to ensure HUD is ready
+            timeout = self.s.revive.bag_icon_timeout_s
+            self._wait_bag_icon(timeout)
+        return RState.DONE
+
+    def _s_done(self) -> None:
+        if self._revived:
+            logger.info("Revive flow completed")
+            # Reset the start logged flag so we can log again if needed
+            ReviveFlow._start_logged = False
+        return None
+
+    def _s_fail(self) -> None:
+        logger.error("Revive flow failed: %s", self.sm.reason or "unknown")
+        return None
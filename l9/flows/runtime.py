@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import importlib
+import logging
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Collection, Optional
+
+from ..actions.safety import CANCEL_EVENT, Panic, Safety, Stopped, request_stop, stop_requested
+from ..clock import CLOCK
+from .base import Flow
+from .watch import Watcher, WatchEvent, WatchKind
+
+
+logger = logging.getLogger(__name__)
+
+
+class Outcome(Enum):
+    DONE = auto()
+    STOPPED = auto()  # stop signal (runner signal, GUI stop)
+    PANIC = auto()  # panic key
+    PREEMPTED = auto()  # a watcher event listed in `preempt_on`
+    FAILED = auto()  # the flow raised
+
+
+@dataclass(frozen=True)
+class RunResult:
+    outcome: Outcome
+    elapsed_s: float
+    event: Optional[WatchEvent] = None
+    error: Optional[BaseException] = None
+
+    def raise_for_outcome(self) -> Optional[WatchEvent]:
+        """Re-raise a failed, stopped or panicked run in the caller; else the preempting event, if any."""
+        if self.outcome is Outcome.FAILED and self.error is not None:
+            raise self.error
+        if self.outcome is Outcome.STOPPED:
+            raise Stopped("stopped")
+        if self.outcome is Outcome.PANIC:
+            raise Panic("panic")
+        return self.event
+
+
+class AsyncFlow(Flow):
+    """Flow whose states are coroutines.
+
+    Detection runs on the runtime's thread pool, so awaiting it never blocks the
+    supervisor; `asleep` is a plain asyncio sleep and is cancelled instantly
+    (under a virtual CLOCK it advances the clock and yields).
+    `run()` keeps the synchronous Flow interface by driving `arun()` through
+    FlowRuntime.
+    """
+
+    # Set by FlowRuntime for the duration of a run
+    _executor: Optional[concurrent.futures.Executor] = None
+
+    async def arun(self) -> None:
+        raise NotImplementedError
+
+    def run(self) -> None:
+        FlowRuntime(self.cfg).run(self).raise_for_outcome()
+
+    async def asleep(self, seconds: float) -> None:
+        self.safety.check()
+        if CLOCK.virtual:
+            CLOCK.sleep(seconds)
+            await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(max(0.0, seconds))
+        self.safety.check()
+
+    async def _offload(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (profiler state span) into the worker thread
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+    async def await_for(self, *args, **kwargs):
+        return await self._offload(self.wait_for, *args, **kwargs)
+
+    async def await_any(self, *args, **kwargs):
+        return await self._offload(self.wait_any, *args, **kwargs)
+
+    async def await_locate(self, *args, **kwargs):
+        return await self._offload(self.locate, *args, **kwargs)
+
+    async def await_ready(self, *args, **kwargs):
+        return await self._offload(self.wait_ready, *args, **kwargs)
+
+
+class FlowRuntime:
+    """Runs one top-level flow under a supervisor.
+
+    Every `tick_s` the supervisor checks the panic key and the process stop
+    event and, if a watcher is given, looks for events of a `preempt_on` kind.
+    On any of these it cancels the flow. Synchronous flows run on an executor
+    thread (the adapter); the shared stop/cancel events make their `Flow.sleep`
+    and detection polls raise Stopped, so they unwind within one poll interval.
+
+    Under a virtual CLOCK a synchronous flow runs inline in the caller's thread
+    instead: stop and panic surface through the flow's own Safety checks, and
+    the preemption check runs on a clock timer every `tick_s` of virtual time,
+    so a watcher event cancels the flow at its next sleep or poll.
+    """
+
+    def __init__(
+        self,
+        cfg: dict,
+        watcher: Optional[Watcher] = None,
+        preempt_on: Collection[WatchKind] = (),
+        tick_s: float = 0.02,
+    ) -> None:
+        self.cfg = cfg
+        self.watcher = watcher
+        self.preempt_on = frozenset(preempt_on)
+        self.tick_s = tick_s
+        self.safety = Safety(cfg)
+
+    def run(self, flow: Flow) -> RunResult:
+        if CLOCK.virtual and not isinstance(flow, AsyncFlow):
+            return self._run_inline(flow)
+        return asyncio.run(self.run_async(flow))
+
+    def _run_inline(self, flow: Flow) -> RunResult:
+        start = CLOCK.now()
+        preempted: list = []
+
+        def supervise() -> None:
+            if preempted:
+                return
+            event = self._preempting_event()
+            if event is not None:
+                preempted.append(event)
+                logger.info("Flow preempted by %s", event.kind.name)
+                CANCEL_EVENT.set()
+
+        timer = CLOCK.schedule(self.tick_s, supervise, period=self.tick_s) if self.watcher is not None and self.preempt_on else None
+        error: Optional[BaseException] = None
+        try:
+            flow.run()
+            outcome = Outcome.DONE
+        except Stopped:
+            outcome = Outcome.PREEMPTED if preempted else Outcome.STOPPED
+        except Panic:
+            outcome = Outcome.PANIC
+        except Exception as e:
+            outcome = Outcome.FAILED
+            error = e
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if outcome is Outcome.PREEMPTED:
+            CANCEL_EVENT.clear()
+        return RunResult(outcome, CLOCK.now() - start, event=preempted[0] if preempted else None, error=error)
+
+    def _preempting_event(self) -> Optional[WatchEvent]:
+        if self.watcher is None or not self.preempt_on:
+            return None
+        return self.watcher.take(self.preempt_on)
+
+    async def run_async(self, flow: Flow) -> RunResult:
+        start = CLOCK.now()
+        loop = asyncio.get_running_loop()
+        # Own pool so the run can wait for every flow thread before returning
+        pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="l9-flow")
+        if isinstance(flow, AsyncFlow):
+            flow._executor = pool
+            task = asyncio.ensure_future(flow.arun())
+        else:
+            task = asyncio.wrap_future(pool.submit(contextvars.copy_context().run, flow.run))
+
+        outcome: Optional[Outcome] = None
+        event: Optional[WatchEvent] = None
+        while not task.done():
+            if stop_requested():
+                outcome = Outcome.STOPPED
+            else:
+                try:
+                    self.safety.check_panic()
+                except Panic:
+                    outcome = Outcome.PANIC
+            if outcome is None:
+                event = self._preempting_event()
+                if event is not None:
+                    outcome = Outcome.PREEMPTED
+                    logger.info("Flow preempted by %s", event.kind.name)
+            if outcome is not None:
+                # Executor threads (sleeps, detection polls) notice within one poll tick
+                if outcome is Outcome.PREEMPTED:
+                    CANCEL_EVENT.set()
+                else:
+                    request_stop(outcome.name.lower())
+                task.cancel()
+                break
+            await asyncio.wait({task}, timeout=self.tick_s)
+
+        error: Optional[BaseException] = None
+        try:
+            await task
+            outcome = outcome or Outcome.DONE
+        except asyncio.CancelledError:
+            outcome = outcome or Outcome.STOPPED
+        except Stopped:
+            outcome = outcome or Outcome.STOPPED
+        except Panic:
+            outcome = outcome or Outcome.PANIC
+        except Exception as e:
+            outcome = outcome or Outcome.FAILED
+            error = e
+        # Cancelling the task doesn't stop threads; they exit on the stop event
+        await loop.run_in_executor(None, pool.shutdown)
+        if isinstance(flow, AsyncFlow):
+            flow._executor = None
+        if outcome is Outcome.PREEMPTED:
+            # The caller handles the event and may run another flow
+            CANCEL_EVENT.clear()
+        return RunResult(outcome, CLOCK.now() - start, event=event, error=error)
+
+
+def load_flow(spec: str) -> type:
+    """Flow class for "module:Class" ("module" alone means its `Flow` class)."""
+    if ":" in spec:
+        mod_name, cls_name = spec.split(":", 1)
+    else:
+        mod_name, cls_name = spec, "Flow"
+    return getattr(importlib.import_module(mod_name), cls_name)
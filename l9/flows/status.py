@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..clock import CLOCK
+from ..settings import settings_for
+from ..vision.match import Vision
+from ..vision.stream import Frame, FrameStream
+
+
+logger = logging.getLogger(__name__)
+
+
+class PotionState(Enum):
+    EMPTY = "EMPTY"
+    HAS = "HAS"
+    UNKNOWN = "UNKNOWN"
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Everything GrindRefillLoop.CHECK needs, evaluated over one frame."""
+
+    frame_seq: int
+    frame_t: float
+    dead: bool
+    potion: PotionState
+    in_town: bool
+    hud_ready: bool
+    # (predicate, best match score) pairs; 0.0 when the template is missing
+    scores: Tuple[Tuple[str, float], ...] = ()
+
+    def score(self, name: str) -> float:
+        for k, v in self.scores:
+            if k == name:
+                return v
+        return 0.0
+
+
+@dataclass(frozen=True)
+class _Predicate:
+    name: str
+    template: str
+    confidence: float
+    roi_name: Optional[str]
+
+
+class StatusProbe:
+    """Builds StatusSnapshots from frames and votes over consecutive ones.
+
+    `names` limits which predicates are evaluated (all by default); skipped
+    predicates, and those whose template is missing on disk, read as False and
+    have no score.
+    """
+
+    T_REVIVE = "l9/assets/revive/revive_button.png"
+    T_POTION_EMPTY = "l9/assets/ui/hud/potion_empty.png"
+    T_POTION_HAS = "l9/assets/ui/hud/potion_has.png"
+    T_MERCHANT_ICON = "l9/assets/npc/general_merchant_icon.png"
+    T_BAG_ICON = "l9/assets/ui/hud/bag_icon.png"
+
+    NAMES = ("dead", "potion_empty", "potion_has", "in_town", "hud_ready")
+
+    def __init__(self, vision: Vision, cfg: dict, names: Optional[Sequence[str]] = None) -> None:
+        self.v = vision
+        self.cfg = cfg
+        s = settings_for(cfg)
+        r, b, g = s.revive, s.buy_potions, s.grind
+        potion_roi = "potion_slot" if s.rois.get("potion_slot") else "hud_anchor"
+        potion_conf = b.pyauto_threshold
+        preds = [
+            _Predicate("dead", r.revive_button or self.T_REVIVE, r.pyauto_threshold, "revive_ui"),
+            _Predicate("potion_empty", self.T_POTION_EMPTY, potion_conf, potion_roi),
+            _Predicate("potion_has", self.T_POTION_HAS, potion_conf, potion_roi),
+            _Predicate("in_town", self.T_MERCHANT_ICON, potion_conf, None),
+            _Predicate(
+                "hud_ready",
+                g.bag_icon_template or self.T_BAG_ICON,
+                g.pyauto_threshold,
+                str(g.bag_icon_roi or "hud_anchor"),
+            ),
+        ]
+        wanted = set(names) if names is not None else set(self.NAMES)
+        self.predicates = [p for p in preds if p.name in wanted and os.path.exists(p.template)]
+        self.samples = max(1, int(b.empty_check_samples))
+        self.min_hits = max(1, int(b.empty_check_min_matches))
+
+    def snapshot(self, frame: Frame) -> StatusSnapshot:
+        scores: Dict[str, float] = {}
+        hits: Dict[str, bool] = {}
+        for p in self.predicates:
+            try:
+                score, _ = self.v.best_in(
+                    frame.image, p.template, roi_name=p.roi_name, origin=frame.origin, confidence=p.confidence
+                )
+            except Exception as e:
+                logger.debug("status predicate %s failed: %s", p.name, e)
+                score = 0.0
+            scores[p.name] = score
+            hits[p.name] = score >= p.confidence
+        empty = hits.get("potion_empty", False)
+        has = hits.get("potion_has", False)
+        if empty and (not has or scores["potion_empty"] >= scores.get("potion_has", 0.0)):
+            potion = PotionState.EMPTY
+        elif has:
+            potion = PotionState.HAS
+        else:
+            potion = PotionState.UNKNOWN
+        return StatusSnapshot(
+            frame_seq=frame.seq,
+            frame_t=frame.t,
+            dead=hits.get("dead", False),
+            potion=potion,
+            in_town=hits.get("in_town", False),
+            hud_ready=hits.get("hud_ready", False),
+            scores=tuple(scores.items()),
+        )
+
+    def collect(self, stream: FrameStream, samples: Optional[int] = None, timeout_s: float = 2.0) -> List[StatusSnapshot]:
+        """Snapshots of up to `samples` consecutive stream frames.
+
+        Stops early once the first snapshot shows the revive UI: the caller acts
+        on that immediately, no vote needed.
+        """
+        n = samples or self.samples
+        out: List[StatusSnapshot] = []
+        latest = stream.latest()
+        seq = latest.seq - 1 if latest is not None else 0
+        deadline = CLOCK.now() + timeout_s
+        while len(out) < n:
+            frame = stream.wait_next(seq, timeout_s=max(0.0, deadline - CLOCK.now()))
+            if frame is None:
+                break
+            seq = frame.seq
+            snap = self.snapshot(frame)
+            out.append(snap)
+            if snap.dead:
+                break
+        return out
+
+    def vote_potion(self, snaps: List[StatusSnapshot]) -> PotionState:
+        """Same rule as BuyPotionsFlow._potion_status_stable, over snapshots instead of sleeps."""
+        empty_hits = sum(1 for s in snaps if s.potion is PotionState.EMPTY)
+        has_hits = sum(1 for s in snaps if s.potion is PotionState.HAS)
+        if empty_hits >= self.min_hits and empty_hits >= has_hits:
+            return PotionState.EMPTY
+        if has_hits >= self.min_hits and has_hits > empty_hits:
+            return PotionState.HAS
+        return PotionState.UNKNOWN
@@ -66,7 +66,7 @@ class ClickCenterFlow(Flow):
         # Fallback: center of configured monitor
         try:
             import mss  # type: ignore
-            mon_idx = int(self.cfg.get("monitor_index", 1))
+            mon_idx = int(self.s.monitor_index)
             with mss.mss() as s:
                 mons = s.monitors
                 i = max(1, min(mon_idx, len(mons) - 1))
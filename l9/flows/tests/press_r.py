@@ -25,7 +25,7 @@ class PressRFlow(Flow):
         logger.info("Window focus %s (foreground=%r)", "OK" if ok else "FAILED", wm.get_foreground_title())
         # Wait 2 seconds as requested
         time.sleep(2.0)
-        key = str(self.cfg.get("keybinds", {}).get("return_to_town", "r"))
+        key = self.s.keybinds.return_to_town
         logger.info("Pressing key: %s", key)
         self.a.press(key)
         logger.info("PressRFlow done")
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Collection, Dict, List, Optional
+
+from ..clock import CLOCK, Timer
+from ..settings import settings_for
+from ..vision.match import Box, Vision
+from ..vision.stream import Frame, FrameStream
+
+
+logger = logging.getLogger(__name__)
+
+
+class WatchKind(Enum):
+    REVIVE = auto()
+    POTION_EMPTY = auto()
+    DISCONNECT = auto()
+
+
+@dataclass(frozen=True)
+class WatchEvent:
+    kind: WatchKind
+    box: Box  # absolute screen box of the match
+    frame_seq: int
+    frame_t: float  # CLOCK.now() of the frame that confirmed the condition
+    t: float  # CLOCK.now() when published
+
+
+@dataclass(frozen=True)
+class WatchCondition:
+    """A template that, once seen on `min_hits` consecutive evaluations, raises `kind`.
+
+    While the condition stays true it is re-published at most every `cooldown_s`.
+    """
+
+    kind: WatchKind
+    template: str
+    confidence: float
+    roi_name: Optional[str] = None
+    interval_s: float = 0.25
+    min_hits: int = 1
+    cooldown_s: float = 2.0
+
+
+@dataclass
+class _CondState:
+    next_due: float = 0.0
+    hits: int = 0
+    active: bool = False
+    last_emit: float = float("-inf")
+
+
+def default_conditions(cfg: dict) -> List[WatchCondition]:
+    """Revive UI, empty potion slot and (if its template exists) disconnect dialog."""
+    s = settings_for(cfg)
+    w, r, b = s.watch, s.revive, s.buy_potions
+    cooldown = w.cooldown_s
+    conds = [
+        WatchCondition(
+            kind=WatchKind.REVIVE,
+            template=r.revive_button,
+            confidence=r.pyauto_threshold,
+            roi_name="revive_ui",
+            interval_s=w.revive_interval_ms / 1000.0,
+            cooldown_s=cooldown,
+        ),
+        WatchCondition(
+            kind=WatchKind.POTION_EMPTY,
+            template=w.potion_empty_template,
+            confidence=b.pyauto_threshold,
+            roi_name="potion_slot" if s.rois.get("potion_slot") else "hud_anchor",
+            interval_s=b.empty_check_interval_ms / 1000.0,
+            min_hits=max(1, int(b.empty_check_min_matches)),
+            cooldown_s=cooldown,
+        ),
+        WatchCondition(
+            kind=WatchKind.DISCONNECT,
+            template=w.disconnect_template,
+            confidence=w.disconnect_threshold,
+            interval_s=w.disconnect_interval_ms / 1000.0,
+            cooldown_s=cooldown,
+        ),
+    ]
+    out = []
+    for c in conds:
+        if os.path.exists(c.template):
+            out.append(c)
+        else:
+            logger.info("Watch template missing; not watching %s: %s", c.kind.name, c.template)
+    return out
+
+
+class Watcher:
+    """Evaluates conditions against a FrameStream on a background thread.
+
+    Each condition runs at its own `interval_s` against the newest frame and
+    publishes `WatchEvent`s to `events`. Consumers drain the queue instead of
+    running their own blocking probes. Under a virtual CLOCK the conditions are
+    evaluated on a clock timer right after each frame is grabbed, in whichever
+    thread sleeps the clock, and `get()` sleeps the clock while it waits.
+    """
+
+    def __init__(self, vision: Vision, stream: FrameStream, conditions: List[WatchCondition]) -> None:
+        self.v = vision
+        self.stream = stream
+        self.conditions = list(conditions)
+        self.events: "queue.Queue[WatchEvent]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._state: Dict[WatchKind, _CondState] = {c.kind: _CondState() for c in self.conditions}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[Timer] = None
+        self._seq = 0
+        # Newest frame seq at the last reset(); results from frames up to it are dropped
+        self._reset_seq = 0
+
+    @classmethod
+    def from_cfg(cls, vision: Vision, cfg: dict, stream: Optional[FrameStream] = None) -> "Watcher":
+        if stream is None:
+            stream = FrameStream(cfg, fps=settings_for(cfg).watch.fps)
+        return cls(vision, stream, default_conditions(cfg))
+
+    def start(self) -> "Watcher":
+        self.stream.start()
+        self._stop.clear()
+        self._seq = 0
+        self._reset_seq = 0
+        if CLOCK.virtual:
+            # Same period as the stream and scheduled after it: runs right after each grab
+            self._timer = CLOCK.schedule(self.stream.period_s, self._tick, period=self.stream.period_s)
+        else:
+            self._thread = threading.Thread(target=self._run, name="l9-watch", daemon=True)
+            self._thread.start()
+        logger.info("Watcher started: %s", ", ".join(c.kind.name for c in self.conditions) or "(none)")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.stream.stop()
+
+    def get(self, timeout_s: float) -> Optional[WatchEvent]:
+        if self._timer is not None:
+            deadline = CLOCK.now() + max(0.0, timeout_s)
+            while True:
+                try:
+                    return self.events.get_nowait()
+                except queue.Empty:
+                    pass
+                remaining = deadline - CLOCK.now()
+                if remaining <= 0:
+                    return None
+                CLOCK.sleep(min(self.stream.period_s, remaining))
+        try:
+            return self.events.get(timeout=max(0.0, timeout_s))
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[WatchEvent]:
+        out: List[WatchEvent] = []
+        while True:
+            try:
+                out.append(self.events.get_nowait())
+            except queue.Empty:
+                return out
+
+    def take(self, kinds: Collection[WatchKind]) -> Optional[WatchEvent]:
+        """Remove and return the oldest queued event of one of `kinds`; the rest stay queued in order."""
+        with self._lock, self.events.mutex:
+            queued = self.events.queue
+            for i, ev in enumerate(queued):
+                if ev.kind in kinds:
+                    del queued[i]
+                    return ev
+        return None
+
+    def reset(self) -> None:
+        """Drop queued events and forget condition history.
+
+        Call after acting on the world (revive, refill, teleport): anything queued
+        describes the old screen, and conditions that still hold re-publish once
+        confirmed on fresh frames. A frame grabbed before the reset that is being
+        evaluated right now cannot publish either.
+        """
+        latest = self.stream.latest()
+        with self._lock:
+            self._reset_seq = max(self._seq, latest.seq if latest is not None else 0)
+            for st in self._state.values():
+                st.hits = 0
+                st.active = False
+                st.next_due = 0.0
+                st.last_emit = float("-inf")
+            self.drain()
+
+    def is_active(self, kind: WatchKind) -> bool:
+        with self._lock:
+            st = self._state.get(kind)
+            return bool(st and st.active)
+
+    def _evaluate(self, cond: WatchCondition, frame: Frame) -> Optional[Box]:
+        try:
+            return self.v.locate_in(frame.image, cond.template, cond.confidence, roi_name=cond.roi_name, origin=frame.origin)
+        except Exception as e:
+            logger.debug("Watch %s evaluation failed: %s", cond.kind.name, e)
+            return None
+
+    def _tick(self) -> None:
+        frame = self.stream.latest()
+        if frame is not None and frame.seq > self._seq:
+            self._process(frame)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            frame = self.stream.wait_next(self._seq, timeout_s=0.5)
+            if frame is not None:
+                self._process(frame)
+
+    def _process(self, frame: Frame) -> None:
+        self._seq = frame.seq
+        if frame.seq <= self._reset_seq:
+            return
+        for cond in self.conditions:
+            now = CLOCK.now()
+            with self._lock:
+                st = self._state[cond.kind]
+                if now < st.next_due:
+                    continue
+                st.next_due = now + cond.interval_s
+            box = self._evaluate(cond, frame)
+            with self._lock:
+                if frame.seq <= self._reset_seq:
+                    # reset() ran while this frame was evaluated: it shows the old screen
+                    return
+                if box is None:
+                    st.hits = 0
+                    st.active = False
+                    continue
+                st.hits += 1
+                if st.hits < cond.min_hits:
+                    continue
+                st.active = True
+                now = CLOCK.now()
+                if now - st.last_emit < cond.cooldown_s:
+                    continue
+                st.last_emit = now
+                self.events.put(WatchEvent(cond.kind, box, frame.seq, frame.t, now))
+            logger.info("watch %s at (%d,%d) frame=%d", cond.kind.name, box.left, box.top, frame.seq)
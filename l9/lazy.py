@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import importlib
+import threading
+import types
+from typing import Any, Callable, Optional
+
+
+class LazyModule:
+    """Stand-in for an optional dependency that is imported on first use.
+
+    Replaces the `try: import x / except ModuleNotFoundError: x = None`
+    pattern for heavy modules (cv2, numpy, mss, pyautogui, keyboard) so that
+    importing l9 costs nothing until a frame is grabbed or a key is sent.
+    Truthiness means "importable": `if not cv2:` takes the place of
+    `if cv2 is None:` and triggers the import. Attribute access imports the
+    module too and raises ModuleNotFoundError if it is missing. Functions,
+    classes and submodules are cached on the proxy after the first lookup, so
+    hot paths pay the indirection once per name.
+
+        cv2 = optional("cv2")
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None) -> None:
+        self.__dict__.update(_name=name, _on_load=on_load, _module=None, _tried=False, _lock=threading.Lock())
+
+    def _load(self) -> Any:
+        if self._tried:
+            return self._module
+        with self._lock:
+            if not self._tried:
+                try:
+                    mod = importlib.import_module(self._name)
+                except ModuleNotFoundError:
+                    mod = None
+                if mod is not None and self._on_load is not None:
+                    self._on_load(mod)
+                self.__dict__["_module"] = mod
+                self.__dict__["_tried"] = True
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """True once the module has been imported (without importing it)."""
+        return self._module is not None
+
+    def __bool__(self) -> bool:
+        return self._load() is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        mod = self._load()
+        if mod is None:
+            raise ModuleNotFoundError(f"No module named {self._name!r}", name=self._name)
+        value = getattr(mod, attr)
+        if callable(value) or isinstance(value, types.ModuleType):
+            self.__dict__[attr] = value
+        return value
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        mod = self._load()
+        if mod is None:
+            raise ModuleNotFoundError(f"No module named {self._name!r}", name=self._name)
+        setattr(mod, attr, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else ("missing" if self._tried else "not loaded")
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def optional(name: str, on_load: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    """Lazy handle on optional module `name`; `on_load(module)` runs once after the first import."""
+    return LazyModule(name, on_load)
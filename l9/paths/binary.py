@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+from typing import List, Tuple, Union
+
+from .compiled import OP_CLICK, CompiledPath, load_path
+
+
+# Binary path file (version 4), little-endian:
+#
+#   header    "<4sHHHHI" magic, version, flags (0), segment count, name count,
+#             name table size in bytes
+#   names     per name: varint length + UTF-8 bytes (keys and mouse buttons)
+#   index     per segment "<IIId": payload offset from the file start, payload
+#             size in bytes, event count, duration in seconds
+#   payloads  per event: varint time delta in microseconds from the previous
+#             event of the segment, varint (name id << 2 | opcode); clicks add
+#             zigzag varint x and y deltas from the previous click
+#
+# The index lets a reader decode one segment at a time without touching the rest.
+MAGIC = b"L9PT"
+VERSION = 4
+EXT = ".l9p"
+_HEADER = struct.Struct("<4sHHHHI")
+_INDEX = struct.Struct("<IIId")
+_US = 1_000_000
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_zigzag(out: bytearray, n: int) -> None:
+    _put_varint(out, (n << 1) if n >= 0 else ((-n << 1) - 1))
+
+
+def _encode_segment(cp: CompiledPath, start: int, end: int) -> bytes:
+    out = bytearray()
+    t, op, arg, xs, ys = cp.t, cp.op, cp.arg, cp.x, cp.y
+    prev_us = 0
+    px = py = 0
+    for i in range(start, end):
+        us = max(prev_us, int(round(t[i] * _US)))
+        _put_varint(out, us - prev_us)
+        prev_us = us
+        _put_varint(out, (arg[i] << 2) | op[i])
+        if op[i] == OP_CLICK:
+            _put_zigzag(out, xs[i] - px)
+            _put_zigzag(out, ys[i] - py)
+            px, py = xs[i], ys[i]
+    return bytes(out)
+
+
+def dumps(cp: CompiledPath) -> bytes:
+    """Encode a compiled path as a v4 file (timestamps rounded to 1 µs)."""
+    names = bytearray()
+    for name in cp.names:
+        raw = name.encode("utf-8")
+        _put_varint(names, len(raw))
+        names += raw
+    payloads = [_encode_segment(cp, s, e) for s, e in cp.segments]
+    offset = _HEADER.size + len(names) + _INDEX.size * len(payloads)
+    index = bytearray()
+    for i, ((s, e), p) in enumerate(zip(cp.segments, payloads)):
+        index += _INDEX.pack(offset, len(p), e - s, cp.duration(i))
+        offset += len(p)
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(payloads), len(cp.names), len(names))
+    return b"".join([header, bytes(names), bytes(index)] + payloads)
+
+
+def _get_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _decode_segment(cp: CompiledPath, buf: bytes, count: int) -> None:
+    start = len(cp)
+    t, op, arg, xs, ys = cp.t, cp.op, cp.arg, cp.x, cp.y
+    pos = 0
+    us = 0
+    px = py = 0
+    for _ in range(count):
+        # Most deltas and codes fit one byte; only longer ones take the call
+        d = buf[pos]
+        if d < 0x80:
+            pos += 1
+        else:
+            d, pos = _get_varint(buf, pos)
+        us += d
+        code = buf[pos]
+        if code < 0x80:
+            pos += 1
+        else:
+            code, pos = _get_varint(buf, pos)
+        o = code & 3
+        if o == OP_CLICK:
+            dx, pos = _get_varint(buf, pos)
+            dy, pos = _get_varint(buf, pos)
+            px += (dx >> 1) ^ -(dx & 1)
+            py += (dy >> 1) ^ -(dy & 1)
+        t.append(us / _US)
+        op.append(o)
+        arg.append(code >> 2)
+        xs.append(px if o == OP_CLICK else 0)
+        ys.append(py if o == OP_CLICK else 0)
+    cp.end_segment(start)
+
+
+def _read_header(head: bytes) -> Tuple[int, int, int]:
+    if len(head) < _HEADER.size:
+        raise ValueError("truncated path file")
+    magic, version, _flags, n_seg, n_names, names_size = _HEADER.unpack_from(head, 0)
+    if magic != MAGIC:
+        raise ValueError("not a binary path file")
+    if version != VERSION:
+        raise ValueError(f"unsupported binary path version {version}")
+    return n_seg, n_names, names_size
+
+
+def _read_names(buf: bytes, count: int, size: int) -> List[str]:
+    if len(buf) < size:
+        raise ValueError("truncated path file")
+    names = []
+    pos = 0
+    for _ in range(count):
+        n, pos = _get_varint(buf, pos)
+        names.append(buf[pos:pos + n].decode("utf-8"))
+        pos += n
+    return names
+
+
+def _read_index(buf: bytes, count: int) -> List[Tuple[int, int, int, float]]:
+    if len(buf) < count * _INDEX.size:
+        raise ValueError("truncated path file")
+    return [_INDEX.unpack_from(buf, i * _INDEX.size) for i in range(count)]
+
+
+def _new_path(names: List[str]) -> CompiledPath:
+    cp = CompiledPath()
+    for name in names:
+        cp.name_id(name)
+    return cp
+
+
+def loads(data: bytes) -> CompiledPath:
+    """Decode a whole v4 file."""
+    n_seg, n_names, names_size = _read_header(data)
+    pos = _HEADER.size
+    names = _read_names(data[pos:pos + names_size], n_names, names_size)
+    index = _read_index(data[pos + names_size:], n_seg)
+    cp = _new_path(names)
+    for i, (offset, size, count, _) in enumerate(index):
+        if offset + size > len(data):
+            raise ValueError(f"truncated segment {i}")
+        _decode_segment(cp, data[offset:offset + size], count)
+    return cp
+
+
+class PathReader:
+    """Streams a v4 path file one segment at a time.
+
+    Only the header, name table and segment index are read up front;
+    `read_segment(i)` seeks to the segment's payload and decodes just that. Has
+    the same `segment_count` / `read_segment` interface as CompiledPath.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            n_seg, n_names, names_size = _read_header(f.read(_HEADER.size))
+            self.names = _read_names(f.read(names_size), n_names, names_size)
+            self.index = _read_index(f.read(n_seg * _INDEX.size), n_seg)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.index)
+
+    def duration(self, segment: int) -> float:
+        return self.index[segment][3]
+
+    def read_segment(self, segment: int) -> CompiledPath:
+        offset, size, count, _ = self.index[segment]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            buf = f.read(size)
+        if len(buf) != size:
+            raise ValueError(f"truncated segment {segment} in {self.path}")
+        cp = _new_path(self.names)
+        _decode_segment(cp, buf, count)
+        return cp
+
+
+def is_binary(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def open_path(path: str) -> Union[PathReader, CompiledPath]:
+    """A segment source for replay: a streaming reader for v4 files, else the compiled JSON path."""
+    return PathReader(path) if is_binary(path) else load_path(path)
+
+
+def save_path(path: str, data: Union[dict, CompiledPath]) -> CompiledPath:
+    """Write a path (v2/v3 JSON dict or CompiledPath); `.json` targets stay JSON, anything else is v4.
+
+    Written to a temporary file and renamed, so a replay never sees half a file.
+    """
+    cp = data if isinstance(data, CompiledPath) else CompiledPath.from_json(data)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    if path.lower().endswith(".json"):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data if isinstance(data, dict) else cp.to_json(), f, indent=2)
+    else:
+        with open(tmp, "wb") as f:
+            f.write(dumps(cp))
+    os.replace(tmp, path)
+    return cp
+
+
+def resolve_path_file(root: str, name: str, fmt: str = "v4") -> str:
+    """Path file for `name` under `root`: an existing v4 or JSON file, else a new one in `fmt` ("v4" or "json")."""
+    binary = os.path.join(root, name + EXT)
+    legacy = os.path.join(root, name + ".json")
+    if os.path.exists(binary):
+        return binary
+    if os.path.exists(legacy):
+        return legacy
+    return legacy if str(fmt).lower() == "json" else binary
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..clock import CLOCK
+
+
+logger = logging.getLogger(__name__)
+
+OP_KEY_DOWN, OP_KEY_UP, OP_CLICK = 1, 2, 3
+# Event "type" in the JSON path files -> opcode
+OPS = {"down": OP_KEY_DOWN, "kdown": OP_KEY_DOWN, "up": OP_KEY_UP, "kup": OP_KEY_UP, "mclick": OP_CLICK}
+OP_TYPES = {OP_KEY_DOWN: "down", OP_KEY_UP: "up", OP_CLICK: "mclick"}
+
+
+class CompiledPath:
+    """A recorded path as parallel arrays, ready to replay.
+
+    Event `i` happens `t[i]` seconds after the start of its segment; `op[i]` is
+    an OP_* code and `arg[i]` indexes `names` (the key, or the button of a
+    click). `x`/`y` are the screen point of clicks (0 otherwise). Segments are
+    `[start, end)` ranges over the arrays, in order; v3 files have one per
+    gate, v2 files a single one.
+    """
+
+    __slots__ = ("t", "op", "arg", "x", "y", "names", "segments", "_ids")
+
+    def __init__(self) -> None:
+        self.t = array("d")
+        self.op = array("B")
+        self.arg = array("H")
+        self.x = array("i")
+        self.y = array("i")
+        self.names: List[str] = []
+        self.segments: List[Tuple[int, int]] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def name_id(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            i = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def append(self, t: float, op: int, name: str, x: int = 0, y: int = 0) -> None:
+        self.t.append(t)
+        self.op.append(op)
+        self.arg.append(self.name_id(name))
+        self.x.append(x)
+        self.y.append(y)
+
+    def end_segment(self, start: int) -> None:
+        self.segments.append((start, len(self.t)))
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.segments)
+
+    def read_segment(self, segment: int) -> "CompiledPath":
+        """One segment as its own single-segment path (same interface as binary.PathReader)."""
+        start, end = self.segments[segment]
+        cp = CompiledPath()
+        cp.t = self.t[start:end]
+        cp.op = self.op[start:end]
+        cp.arg = self.arg[start:end]
+        cp.x = self.x[start:end]
+        cp.y = self.y[start:end]
+        cp.names = self.names
+        cp._ids = self._ids
+        cp.segments = [(0, end - start)]
+        return cp
+
+    def duration(self, segment: int) -> float:
+        start, end = self.segments[segment]
+        return self.t[end - 1] if end > start else 0.0
+
+    def events(self, segment: int) -> Iterator[dict]:
+        """Events of one segment as JSON-style dicts (the v2 event schema)."""
+        start, end = self.segments[segment]
+        for i in range(start, end):
+            op = self.op[i]
+            if op == OP_CLICK:
+                yield {"t": self.t[i], "type": "mclick", "button": self.names[self.arg[i]], "x": self.x[i], "y": self.y[i]}
+            else:
+                yield {"t": self.t[i], "type": OP_TYPES[op], "key": self.names[self.arg[i]]}
+
+    def to_json(self) -> dict:
+        """The path as a v2 (one segment) or v3 JSON document."""
+        if len(self.segments) == 1:
+            return {"version": 2, "events": list(self.events(0))}
+        return {"version": 3, "segments": [
+            {"id": f"segment{i + 1}", "events": list(self.events(i))} for i in range(len(self.segments))]}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "CompiledPath":
+        """Compile a v2 (`events`) or v3 (`segments`) path; unknown or malformed events are dropped."""
+        if isinstance(data, dict) and isinstance(data.get("segments"), list):
+            segments = [s.get("events", []) if isinstance(s, dict) else [] for s in data["segments"]]
+        elif isinstance(data, dict):
+            segments = [data.get("events", []) or []]
+        else:
+            raise ValueError("path data must be a JSON object")
+        cp = cls()
+        dropped = 0
+        for events in segments:
+            rows = []
+            for n, e in enumerate(events):
+                try:
+                    op = OPS[e.get("type")]
+                    t = float(e.get("t", 0.0))
+                    if op == OP_CLICK:
+                        rows.append((t, n, op, str(e.get("button", "left")), int(e["x"]), int(e["y"])))
+                    elif e.get("key"):
+                        rows.append((t, n, op, str(e["key"]), 0, 0))
+                    else:
+                        dropped += 1
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    dropped += 1
+            # Recorders append in order, but hook threads can interleave slightly
+            rows.sort(key=lambda r: (r[0], r[1]))
+            start = len(cp)
+            for t, _, op, name, x, y in rows:
+                cp.append(max(0.0, t), op, name, x, y)
+            cp.end_segment(start)
+        if dropped:
+            logger.warning("Dropped %d malformed path event(s)", dropped)
+        return cp
+
+
+_CACHE: Dict[str, Tuple[float, CompiledPath]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def load_path(path: str) -> CompiledPath:
+    """Compile a path file (JSON v2/v3 or binary v4), reusing the result until the file changes."""
+    mtime = os.path.getmtime(path)
+    with _CACHE_LOCK:
+        hit = _CACHE.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    with open(path, "rb") as f:
+        data = f.read()
+    from .binary import MAGIC, loads
+
+    if data[:len(MAGIC)] == MAGIC:
+        cp = loads(data)
+    else:
+        cp = CompiledPath.from_json(json.loads(data.decode("utf-8")))
+    with _CACHE_LOCK:
+        _CACHE[path] = (mtime, cp)
+    return cp
+
+
+@dataclass
+class ReplayStats:
+    """Dispatch lateness of one replayed segment, in seconds.
+
+    `late` is how long after its recorded time an event was sent: positive is
+    late; a coarse sleep that overshoots shows up here.
+    """
+
+    events: int = 0
+    mean_late_s: float = 0.0
+    max_late_s: float = 0.0
+    min_late_s: float = 0.0
+    end_drift_s: float = 0.0  # lateness of the last event
+    spins: int = 0  # events whose wait ended in the spin phase
+
+    def summary(self) -> str:
+        return "%d event(s), drift mean %.2f ms, max %.2f ms, min %.2f ms, end %.2f ms" % (
+            self.events, 1000 * self.mean_late_s, 1000 * self.max_late_s, 1000 * self.min_late_s, 1000 * self.end_drift_s)
+
+
+@contextmanager
+def _timer_resolution_1ms():
+    """Raise the Windows timer resolution to 1 ms for the duration (default is ~15.6 ms)."""
+    if sys.platform[:3] != "win":
+        yield
+        return
+    try:
+        import ctypes
+        winmm = ctypes.windll.winmm
+        winmm.timeBeginPeriod(1)
+    except Exception:
+        yield
+        return
+    try:
+        yield
+    finally:
+        winmm.timeEndPeriod(1)
+
+
+class PathPlayer:
+    """Replays CompiledPath segments on time.
+
+    Each event waits with a coarse `sleep` (the flow's cancellable one) until
+    `spin_s` before its deadline, then spins on CLOCK.now() for the rest, so key
+    holds and route timing don't stretch with sleep overshoot. Keys still held
+    when a segment ends or is interrupted are released.
+    """
+
+    def __init__(
+        self,
+        key_down: Callable[[str], None],
+        key_up: Callable[[str], None],
+        click: Optional[Callable[[int, int, str], None]] = None,
+        sleep: Callable[[float], None] = CLOCK.sleep,
+        spin_s: float = 0.002,
+    ) -> None:
+        self.key_down = key_down
+        self.key_up = key_up
+        self.click = click
+        self.sleep = sleep
+        self.spin_s = max(0.0, spin_s)
+
+    def play(self, path: CompiledPath, segment: int = 0) -> ReplayStats:
+        start, end = path.segments[segment]
+        t, op, arg, xs, ys, names = path.t, path.op, path.arg, path.x, path.y, path.names
+        kd, ku, click, sleep, spin_s = self.key_down, self.key_up, self.click, self.sleep, self.spin_s
+        now = CLOCK.now
+        # Spinning can't move a virtual clock forward
+        spin = not CLOCK.virtual
+        stats = ReplayStats()
+        late_sum = 0.0
+        late_max = float("-inf")
+        late_min = float("inf")
+        late = 0.0
+        pressed = set()
+        with _timer_resolution_1ms():
+            base = now()
+            try:
+                for i in range(start, end):
+                    target = base + t[i]
+                    remaining = target - now()
+                    if remaining > spin_s or (remaining > 0 and not spin):
+                        sleep(remaining - spin_s if spin else remaining)
+                    if spin and now() < target:
+                        stats.spins += 1
+                        while now() < target:
+                            pass
+                    late = now() - target
+                    o = op[i]
+                    if o == OP_KEY_DOWN:
+                        k = names[arg[i]]
+                        kd(k)
+                        pressed.add(k)
+                    elif o == OP_KEY_UP:
+                        k = names[arg[i]]
+                        ku(k)
+                        pressed.discard(k)
+                    elif click is not None:
+                        click(xs[i], ys[i], names[arg[i]])
+                    late_sum += late
+                    if late > late_max:
+                        late_max = late
+                    if late < late_min:
+                        late_min = late
+                    stats.events += 1
+            finally:
+                # Never leave movement keys held, including when stopped mid-path
+                for k in list(pressed):
+                    try:
+                        ku(k)
+                    except Exception:
+                        pass
+        if stats.events:
+            stats.mean_late_s = late_sum / stats.events
+            stats.max_late_s = late_max
+            stats.min_late_s = late_min
+            stats.end_drift_s = late
+        return stats
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from .compiled import OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, CompiledPath
+
+
+@dataclass
+class OptimizeOptions:
+    """What `optimize` may remove from a recorded path.
+
+    `keys` is the allow-list of keys to keep (None keeps every key); clicks are
+    always kept. Idle means no key held: only idle time at the start of a
+    segment and idle gaps longer than `max_gap_s` are shortened, so time spent
+    walking (a key held) is never changed.
+    """
+
+    keys: Optional[Iterable[str]] = None
+    lead_s: float = 0.0  # idle kept before the first event of a segment
+    max_gap_s: Optional[float] = 1.0  # idle gaps are cut to this; None keeps them
+
+
+@dataclass
+class SegmentReport:
+    events_before: int = 0
+    events_after: int = 0
+    duration_before_s: float = 0.0
+    duration_after_s: float = 0.0
+    dropped_keys: int = 0  # events of keys outside OptimizeOptions.keys
+    repeat_downs: int = 0  # downs of a key already held (auto-repeat)
+    orphan_ups: int = 0  # ups of a key that was not held
+    lead_trimmed_s: float = 0.0
+    gaps_shortened: int = 0
+    gap_trimmed_s: float = 0.0
+
+    @property
+    def saved_s(self) -> float:
+        return self.duration_before_s - self.duration_after_s
+
+
+@dataclass
+class OptimizeReport:
+    segments: List[SegmentReport] = field(default_factory=list)
+
+    @property
+    def duration_before_s(self) -> float:
+        return sum(s.duration_before_s for s in self.segments)
+
+    @property
+    def duration_after_s(self) -> float:
+        return sum(s.duration_after_s for s in self.segments)
+
+    @property
+    def saved_s(self) -> float:
+        return self.duration_before_s - self.duration_after_s
+
+    def summary(self) -> str:
+        events = sum(s.events_before for s in self.segments), sum(s.events_after for s in self.segments)
+        return "%d segment(s), %d -> %d events, %.2fs -> %.2fs replay (saves %.2fs)" % (
+            len(self.segments), events[0], events[1], self.duration_before_s, self.duration_after_s, self.saved_s)
+
+
+def _optimize_segment(src: CompiledPath, start: int, end: int, out: CompiledPath,
+                      allowed: Optional[set], opts: OptimizeOptions) -> SegmentReport:
+    rep = SegmentReport(events_before=end - start, duration_before_s=src.t[end - 1] if end > start else 0.0)
+    # Pass 1: drop stray keys, auto-repeat downs and unmatched ups
+    kept = []
+    held = set()
+    for i in range(start, end):
+        op = src.op[i]
+        name = src.names[src.arg[i]]
+        if op != OP_CLICK:
+            if allowed is not None and name.lower() not in allowed:
+                rep.dropped_keys += 1
+                continue
+            if op == OP_KEY_DOWN:
+                if name in held:
+                    rep.repeat_downs += 1
+                    continue
+                held.add(name)
+            elif op == OP_KEY_UP:
+                if name not in held:
+                    rep.orphan_ups += 1
+                    continue
+                held.discard(name)
+        kept.append(i)
+
+    # Pass 2: shift times left by the idle time removed so far
+    seg_start = len(out)
+    shift = 0.0
+    held.clear()
+    prev_t: Optional[float] = None
+    for i in kept:
+        t = src.t[i]
+        if prev_t is None:
+            rep.lead_trimmed_s = max(0.0, t - opts.lead_s)
+            shift = rep.lead_trimmed_s
+        elif not held and opts.max_gap_s is not None and t - prev_t > opts.max_gap_s:
+            cut = t - prev_t - opts.max_gap_s
+            rep.gaps_shortened += 1
+            rep.gap_trimmed_s += cut
+            shift += cut
+        prev_t = t
+        op = src.op[i]
+        name = src.names[src.arg[i]]
+        if op == OP_KEY_DOWN:
+            held.add(name)
+        elif op == OP_KEY_UP:
+            held.discard(name)
+        out.append(t - shift, op, name, src.x[i], src.y[i])
+    out.end_segment(seg_start)
+    rep.events_after = len(out) - seg_start
+    rep.duration_after_s = out.t[len(out) - 1] if rep.events_after else 0.0
+    return rep
+
+
+def optimize(path: CompiledPath, opts: Optional[OptimizeOptions] = None) -> Tuple[CompiledPath, OptimizeReport]:
+    """Compact a recorded path; returns the new path and what was removed per segment.
+
+    Segments are optimized independently (each starts after a gate's loading
+    screen), and relative timing between kept events is preserved except
+    across the idle time that was cut. A segment ends at its last kept event,
+    so trailing idle and trailing stray keys go with them.
+    """
+    opts = opts or OptimizeOptions()
+    allowed = {str(k).lower() for k in opts.keys} if opts.keys is not None else None
+    out = CompiledPath()
+    report = OptimizeReport()
+    for start, end in path.segments:
+        report.segments.append(_optimize_segment(path, start, end, out, allowed, opts))
+    return out, report
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ..actions.safety import STOP_EVENT
+from ..lazy import optional
+from .compiled import OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, CompiledPath
+
+keyboard = optional("keyboard")
+mouse = optional("mouse")
+
+
+logger = logging.getLogger(__name__)
+
+
+class _WinMouseHook:
+    """Low-level Windows mouse hook (WH_MOUSE_LL) for when the `mouse` module is missing.
+
+    Runs its own message loop thread; the OS calls back on each button down, so
+    nothing polls GetAsyncKeyState.
+    """
+
+    WH_MOUSE_LL = 14
+    WM_QUIT = 0x0012
+    BUTTONS = {0x0201: "left", 0x0204: "right", 0x0207: "middle"}
+
+    def __init__(self, on_click: Callable[[str, int, int], None]) -> None:
+        self.on_click = on_click
+        self._thread: Optional[threading.Thread] = None
+        self._tid = 0
+        self._ready = threading.Event()
+        self._ok = False
+
+    def start(self) -> bool:
+        self._thread = threading.Thread(target=self._run, name="l9-rec-mouse", daemon=True)
+        self._thread.start()
+        self._ready.wait(2.0)
+        return self._ok
+
+    def _run(self) -> None:
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            user32 = ctypes.WinDLL("user32", use_last_error=True)
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            LRESULT = wintypes.LPARAM
+
+            class MSLLHOOKSTRUCT(ctypes.Structure):
+                _fields_ = [("pt", wintypes.POINT), ("mouseData", wintypes.DWORD), ("flags", wintypes.DWORD),
+                            ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_void_p)]
+
+            HOOKPROC = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+            user32.SetWindowsHookExW.argtypes = [ctypes.c_int, HOOKPROC, wintypes.HINSTANCE, wintypes.DWORD]
+            user32.SetWindowsHookExW.restype = wintypes.HHOOK
+            user32.CallNextHookEx.argtypes = [wintypes.HHOOK, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM]
+            user32.CallNextHookEx.restype = LRESULT
+            kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+            buttons = self.BUTTONS
+
+            def proc(code, wparam, lparam):
+                if code == 0 and wparam in buttons:
+                    try:
+                        info = ctypes.cast(lparam, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
+                        self.on_click(buttons[wparam], int(info.pt.x), int(info.pt.y))
+                    except Exception:
+                        pass
+                return user32.CallNextHookEx(None, code, wparam, lparam)
+
+            # Keep a reference: the hook must outlive this frame's locals
+            self._proc = HOOKPROC(proc)
+            hook = user32.SetWindowsHookExW(self.WH_MOUSE_LL, self._proc, kernel32.GetModuleHandleW(None), 0)
+            if not hook:
+                raise OSError(ctypes.get_last_error())
+            self._tid = kernel32.GetCurrentThreadId()
+            self._ok = True
+        except Exception as e:
+            logger.debug("Mouse hook unavailable: %s", e)
+            self._ready.set()
+            return
+        self._ready.set()
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWindowsHookEx(hook)
+
+    def stop(self) -> None:
+        if self._ok and self._tid:
+            try:
+                import ctypes
+
+                ctypes.windll.user32.PostThreadMessageW(self._tid, self.WM_QUIT, 0, 0)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+
+class PathRecorder:
+    """Records a grind path from keyboard and mouse hooks.
+
+    Hook callbacks append to a preallocated, lock-protected event buffer (the
+    CompiledPath arrays, grown by doubling when full) and nothing polls: the
+    stop key sets an event that `run()` waits on, and the split key (or a
+    passed gate) starts a new segment. Timestamps are the hooks' own event
+    times, relative to the start of the segment.
+
+        with PathRecorder(["w", "a", "s", "d"], stop_key="f12") as rec:
+            path = rec.run()
+        save_path(out_path, path)
+    """
+
+    # run() also wakes this often to notice a process-wide stop (GUI stop, panic key)
+    STOP_POLL_S = 0.25
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        stop_key: str = "f12",
+        split_key: Optional[str] = None,
+        record_mouse: bool = True,
+        capacity: int = 4096,
+        on_split: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.keys = {str(k).lower() for k in keys}
+        self.stop_key = str(stop_key).lower()
+        self.split_key = str(split_key).lower() if split_key else None
+        self.record_mouse = record_mouse
+        self.on_split = on_split
+        capacity = max(16, int(capacity))
+        self._t = array("d", bytes(8 * capacity))
+        self._op = array("B", bytes(capacity))
+        self._arg = array("H", bytes(2 * capacity))
+        self._x = array("i", bytes(4 * capacity))
+        self._y = array("i", bytes(4 * capacity))
+        self._n = 0
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._seg_starts: List[int] = []
+        self._seg_base = 0.0
+        self._held: set = set()
+        self._last_activity = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._key_hook = None
+        self._mouse_hook = None
+        self._win_hook: Optional[_WinMouseHook] = None
+        # "mouse", "winhook" or None once started
+        self.mouse_source: Optional[str] = None
+
+    # --- hooks ---
+
+    def start(self) -> "PathRecorder":
+        if not keyboard:
+            raise RuntimeError("keyboard module not installed; cannot record path")
+        now = time.time()
+        with self._lock:
+            self._seg_base = now
+            self._last_activity = now
+        self._key_hook = keyboard.hook(self._on_key)
+        if self.record_mouse:
+            if mouse:
+                try:
+                    self._mouse_hook = mouse.hook(self._on_mouse)
+                    self.mouse_source = "mouse"
+                except Exception as e:
+                    logger.debug("mouse.hook failed: %s", e)
+            if self.mouse_source is None and sys.platform[:3] == "win":
+                self._win_hook = _WinMouseHook(self._on_win_click)
+                if self._win_hook.start():
+                    self.mouse_source = "winhook"
+                else:
+                    self._win_hook = None
+        return self
+
+    def close(self) -> None:
+        if self._key_hook is not None:
+            try:
+                keyboard.unhook(self._key_hook)
+            except Exception:
+                pass
+            self._key_hook = None
+        if self._mouse_hook is not None:
+            try:
+                mouse.unhook(self._mouse_hook)
+            except Exception:
+                pass
+            self._mouse_hook = None
+        if self._win_hook is not None:
+            self._win_hook.stop()
+            self._win_hook = None
+
+    def __enter__(self) -> "PathRecorder":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _on_key(self, e) -> None:
+        try:
+            name = (e.name or "").lower()
+            kind = e.event_type
+        except Exception:
+            return
+        if kind == "down" and name == self.stop_key:
+            self.stop()
+            return
+        if kind == "down" and self.split_key and name == self.split_key:
+            self.split()
+            return
+        if name in self.keys and kind in ("down", "up"):
+            self._add(OP_KEY_DOWN if kind == "down" else OP_KEY_UP, name, 0, 0, getattr(e, "time", None))
+
+    def _on_mouse(self, e) -> None:
+        # ButtonEvent only; moves and wheel come through the same hook
+        if getattr(e, "event_type", None) != "down" or not hasattr(e, "button"):
+            return
+        try:
+            x, y = mouse.get_position()
+        except Exception:
+            return
+        self._add(OP_CLICK, str(e.button or "left"), int(x), int(y), getattr(e, "time", None))
+
+    def _on_win_click(self, button: str, x: int, y: int) -> None:
+        self._add(OP_CLICK, button, x, y, None)
+
+    # --- buffer ---
+
+    def _add(self, op: int, name: str, x: int, y: int, t_event: Optional[float]) -> None:
+        now = time.time()
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            n = self._n
+            if n == len(self._t):
+                for buf in (self._t, self._op, self._arg, self._x, self._y):
+                    buf.extend(buf)
+            i = self._ids.get(name)
+            if i is None:
+                i = self._ids[name] = len(self._names)
+                self._names.append(name)
+            self._t[n] = max(0.0, (t_event if t_event else now) - self._seg_base)
+            self._op[n] = op
+            self._arg[n] = i
+            self._x[n] = x
+            self._y[n] = y
+            self._n = n + 1
+            self._last_activity = now
+            if op == OP_KEY_DOWN:
+                self._held.add(name)
+            elif op == OP_KEY_UP:
+                self._held.discard(name)
+
+    def split(self) -> bool:
+        """Start a new segment now; returns False if the current one was empty (it is reused)."""
+        with self._lock:
+            start = self._seg_starts[-1] if self._seg_starts else 0
+            closed = self._n > start
+            if closed:
+                self._seg_starts.append(self._n)
+            self._seg_base = time.time()
+            count = len(self._seg_starts)
+        if closed and self.on_split is not None:
+            try:
+                self.on_split(count)
+            except Exception:
+                pass
+        return closed
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def idle_s(self) -> float:
+        """Seconds since the last recorded key or click."""
+        with self._lock:
+            return time.time() - self._last_activity
+
+    def keys_held(self) -> bool:
+        with self._lock:
+            return bool(self._held)
+
+    def path(self) -> CompiledPath:
+        """Everything recorded so far; each segment sorted by time (keyboard and mouse hooks run on different threads)."""
+        with self._lock:
+            n = self._n
+            bounds = [0] + [s for s in self._seg_starts if 0 < s < n] + [n]
+            t, op, arg, xs, ys = self._t[:n], self._op[:n], self._arg[:n], self._x[:n], self._y[:n]
+            names = list(self._names)
+        cp = CompiledPath()
+        for name in names:
+            cp.name_id(name)
+        for start, end in zip(bounds, bounds[1:]):
+            seg = len(cp)
+            for i in sorted(range(start, end), key=lambda j: (t[j], j)):
+                cp.append(t[i], op[i], names[arg[i]], xs[i], ys[i])
+            cp.end_segment(seg)
+        return cp
+
+    # --- main loop ---
+
+    def run(
+        self,
+        gate: Optional[Callable[[], bool]] = None,
+        after_gate: Optional[Callable[[], None]] = None,
+        gate_idle_s: float = 0.6,
+        gate_interval_s: float = 0.5,
+    ) -> CompiledPath:
+        """Block until the stop key, `stop()` or a process-wide stop; return the path.
+
+        With `gate`, once no key is held and nothing was recorded for
+        `gate_idle_s`, `gate()` is tried at most every `gate_interval_s`; when it
+        returns True (it found and clicked the gate) a new segment starts and
+        `after_gate()` runs (e.g. waiting out the loading screen).
+        """
+        next_gate = 0.0
+        while not self._stopped.is_set():
+            if STOP_EVENT.is_set():
+                self.stop()
+                break
+            timeout = self.STOP_POLL_S
+            if gate is not None and not self.keys_held():
+                now = time.time()
+                with self._lock:
+                    idle_at = self._last_activity + gate_idle_s
+                due = max(idle_at, next_gate)
+                if now >= due:
+                    next_gate = now + gate_interval_s
+                    if gate():
+                        self.split()
+                        if after_gate is not None:
+                            after_gate()
+                        with self._lock:
+                            self._last_activity = time.time()
+                        continue
+                else:
+                    timeout = min(timeout, due - now)
+            self._stopped.wait(max(0.0, timeout))
+        return self.path()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from .tracing import TRACER
+
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("sleep", "detect", "input")
+
+
+class _Span:
+    """One state visit; buckets are inclusive of nested flows' states."""
+
+    __slots__ = ("flow", "state", "parent", "t", "t0", "acc")
+
+    def __init__(self, flow: str, state: str, parent: Optional["_Span"]) -> None:
+        self.flow = flow
+        self.state = state
+        self.parent = parent
+        self.t = time.time()
+        self.t0 = time.perf_counter()
+        self.acc: Dict[str, float] = dict.fromkeys(BUCKETS, 0.0)
+
+    @property
+    def key(self) -> str:
+        return f"{self.flow}.{self.state}"
+
+
+# Innermost state visit and active bucket of the calling context. Threads started
+# with threading.Thread get an empty context, so background work (watcher, frame
+# stream) is not charged; FlowRuntime copies the context into its flow threads.
+_SPAN: contextvars.ContextVar[Optional[_Span]] = contextvars.ContextVar("l9_span", default=None)
+_BUCKET: contextvars.ContextVar[Optional[Tuple[str, float]]] = contextvars.ContextVar("l9_bucket", default=None)
+
+
+class Profiler:
+    """Per-state cycle-time profiler.
+
+    `StateMachine` opens a span per state visit; `timed` methods (sleeps,
+    detection, input) charge their wall time to the innermost span and its
+    parents. Nested buckets pause the outer one, so a sleep inside a detection
+    poll counts as sleep. Each finished span, and each refill/grind cycle
+    marked with `begin_cycle`/`end_cycle`, is written as a JSON line to a
+    rotating trace file. Disabled, every hook is a single attribute check.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Optional[str] = None
+        self.run_id = ""
+        self._lock = threading.Lock()
+        self._log: Optional[logging.Logger] = None
+        self._cycle: Optional[dict] = None
+        self._cycles = 0
+
+    def configure(self, cfg: dict, enabled: Optional[bool] = None) -> "Profiler":
+        pcfg = cfg.get("profile", {}) or {}
+        on = bool(pcfg.get("enabled", False)) if enabled is None else enabled
+        if not on:
+            self.enabled = False
+            return self
+        path = str(pcfg.get("trace_path", "logs/profile.jsonl"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=int(float(pcfg.get("max_mb", 5)) * 1024 * 1024),
+            backupCount=int(pcfg.get("backups", 5)),
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.getLogger("l9.profile.trace")
+        for h in list(log.handlers):
+            log.removeHandler(h)
+            h.close()
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        self._log = log
+        self.path = path
+        self.run_id = "%s-%d" % (time.strftime("%Y%m%dT%H%M%S"), os.getpid())
+        self.enabled = True
+        logger.info("Profiling to %s (run %s)", path, self.run_id)
+        return self
+
+    def _write(self, rec: dict) -> None:
+        if self._log is not None:
+            self._log.info(json.dumps(rec, separators=(",", ":")))
+
+    def _charge(self, bucket: str, seconds: float) -> None:
+        span = _SPAN.get()
+        with self._lock:
+            while span is not None:
+                span.acc[bucket] += seconds
+                span = span.parent
+            if self._cycle is not None:
+                self._cycle[bucket] += seconds
+
+    @contextmanager
+    def bucket(self, name: str):
+        if not self.enabled or _SPAN.get() is None:
+            yield
+            return
+        now = time.perf_counter()
+        prev = _BUCKET.get()
+        if prev is not None:
+            self._charge(prev[0], now - prev[1])
+        token = _BUCKET.set((name, now))
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._charge(name, now - _BUCKET.get()[1])
+            _BUCKET.reset(token)
+            if prev is not None:
+                _BUCKET.set((prev[0], now))
+
+    @contextmanager
+    def state(self, flow: str, state: str):
+        if not self.enabled:
+            yield
+            return
+        span = _Span(flow, state, _SPAN.get())
+        token = _SPAN.set(span)
+        try:
+            yield
+        finally:
+            _SPAN.reset(token)
+            dur = time.perf_counter() - span.t0
+            with self._lock:
+                cycle = self._cycle["cycle"] if self._cycle is not None else None
+                # Cycle breakdown by the sub-flow states the loop ran (REFILL/GRIND are containers)
+                if self._cycle is not None and span.parent is not None:
+                    self._cycle["states"][span.key] = self._cycle["states"].get(span.key, 0.0) + dur
+            rec = {
+                "type": "state",
+                "run": self.run_id,
+                "flow": flow,
+                "state": state,
+                "parent": span.parent.key if span.parent is not None else None,
+                "cycle": cycle,
+                "t": round(span.t, 3),
+                "dur_s": round(dur, 4),
+            }
+            for b in BUCKETS:
+                rec[b + "_s"] = round(span.acc[b], 4)
+            rec["other_s"] = round(max(0.0, dur - sum(span.acc.values())), 4)
+            self._write(rec)
+
+    def begin_cycle(self) -> None:
+        """Start a refill/grind cycle unless one is open."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._cycle is not None:
+                return
+            self._cycles += 1
+            self._cycle = dict.fromkeys(BUCKETS, 0.0)
+            self._cycle.update(cycle=self._cycles, t=time.time(), t0=time.perf_counter(), states={})
+
+    def end_cycle(self, outcome: str = "done") -> None:
+        """Write the open cycle's record; `outcome` is "done" or why it ended early ("aborted")."""
+        if not self.enabled:
+            return
+        with self._lock:
+            c, self._cycle = self._cycle, None
+        if c is None:
+            return
+        dur = time.perf_counter() - c["t0"]
+        rec = {"type": "cycle", "run": self.run_id, "cycle": c["cycle"], "outcome": outcome, "t": round(c["t"], 3), "dur_s": round(dur, 4)}
+        for b in BUCKETS:
+            rec[b + "_s"] = round(c[b], 4)
+        rec["other_s"] = round(max(0.0, dur - sum(c[b] for b in BUCKETS)), 4)
+        rec["states"] = {k: round(v, 4) for k, v in c["states"].items()}
+        self._write(rec)
+
+
+PROFILER = Profiler()
+
+
+def timed(bucket: str):
+    """Charge the decorated call's wall time to `bucket` of the current state.
+
+    When tracing, the call is also a span named after the function.
+    """
+
+    def deco(fn):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not (PROFILER.enabled or TRACER.enabled):
+                return fn(*args, **kwargs)
+            with TRACER.span(name, bucket), PROFILER.bucket(bucket):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from .config_loader import load_config
+from .settings import adopt, changed_sections, compile_config, settings_for
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """Applies edits of the config file to a running process.
+
+    A background thread checks the file's mtime every `reload.poll_ms` and, on
+    a change, loads and compiles the new config off the flow thread. Nothing is
+    applied there: `StateMachine` calls `apply_pending()` before each state, so
+    a change lands between flow states, all at once. Applying updates the
+    watched dict in place, swaps the compiled settings and calls
+    `apply_settings(s, changed)` on every subscriber (Vision, Actions, Safety,
+    flows) built from that dict; each refreshes only what the changed sections
+    affect, keeping its caches otherwise.
+
+        RELOADER.watch("l9/config.yaml", cfg)
+    """
+
+    # A file changed this recently may still be being written; check again after this
+    SETTLE_S = 0.05
+
+    def __init__(self) -> None:
+        self.path: Optional[str] = None
+        self.cfg: Optional[Dict[str, Any]] = None
+        self.reloads = 0
+        self._subscribers: "weakref.WeakSet" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        # (new cfg, compiled settings, perf_counter when the change was seen, parse ms)
+        self._pending: Optional[Tuple[Dict[str, Any], Any, float, float]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    def subscribe(self, obj: Any) -> None:
+        """Call `obj.apply_settings(s, changed)` when `obj.cfg` is reloaded (held weakly)."""
+        self._subscribers.add(obj)
+
+    def watch(self, path: str, cfg: Dict[str, Any], poll_s: Optional[float] = None) -> bool:
+        """Start watching `path`, the file `cfg` was loaded from; False if reloading is disabled."""
+        r = settings_for(cfg).reload
+        if not r.enabled:
+            return False
+        self.stop()
+        self.path = path
+        self.cfg = cfg
+        self._stamp = self._stat()
+        self._stop.clear()
+        interval = max(0.05, poll_s if poll_s is not None else r.poll_ms / 1000.0)
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="l9-config-watch", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s for changes", path)
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            stamp = self._stat()
+            if stamp is None or stamp == self._stamp:
+                continue
+            seen = time.perf_counter()
+            if self._stop.wait(self.SETTLE_S) or self._stat() != stamp:
+                continue
+            self._stamp = stamp
+            self._load(seen)
+
+    def _load(self, seen: float) -> None:
+        t0 = time.perf_counter()
+        try:
+            new = load_config(self.path)
+            s = compile_config(new)
+        except Exception as e:
+            logger.warning("Config reload skipped, %s is invalid: %s", self.path, e)
+            return
+        with self._lock:
+            self._pending = (new, s, seen, 1000.0 * (time.perf_counter() - t0))
+
+    def check_now(self) -> None:
+        """Load the file now if it changed (tests, or callers without the watch thread)."""
+        stamp = self._stat()
+        if stamp is not None and stamp != self._stamp:
+            self._stamp = stamp
+            self._load(time.perf_counter())
+
+    def apply_pending(self) -> bool:
+        """Apply a loaded change, if any; call from the flow thread between states."""
+        if self._pending is None:
+            return False
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None or self.cfg is None:
+            return False
+        new, s, seen, parse_ms = pending
+        t0 = time.perf_counter()
+        old = settings_for(self.cfg)
+        changed = changed_sections(old, s)
+        if changed:
+            # Update in place, never through an empty dict: other threads may read cfg meanwhile
+            self.cfg.update(new)
+            for key in [k for k in self.cfg if k not in new]:
+                del self.cfg[key]
+            adopt(self.cfg, s)
+            for obj in list(self._subscribers):
+                if getattr(obj, "cfg", None) is not self.cfg:
+                    continue
+                try:
+                    obj.apply_settings(s, changed)
+                except Exception as e:
+                    logger.warning("%s could not apply reloaded config: %s", type(obj).__name__, e)
+            self.reloads += 1
+        done = time.perf_counter()
+        logger.info(
+            "Config reloaded: %s; parse %.1f ms, apply %.2f ms, %.0f ms from file change to applied",
+            ", ".join(sorted(changed)) or "no changes", parse_ms, 1000.0 * (done - t0), 1000.0 * (done - seen),
+        )
+        return bool(changed)
+
+
+RELOADER = ConfigReloader()
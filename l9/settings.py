@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import keyword
+import logging
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from .config_loader import DEFAULT_CONFIG
+
+
+logger = logging.getLogger(__name__)
+
+# Sections whose keys are chosen by the user (ROI names, template paths, gate
+# lists): compiled to read-only mappings instead of fixed fields
+FREE_FORM = frozenset({"rois", "threshold_overrides", "dungeon"})
+
+_TRUE = {"true", "yes", "on", "1"}
+_FALSE = {"false", "no", "off", "0"}
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only copy of a YAML value: dicts become mappings, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _coerce(where: str, value: Any, default: Any, problems: List[str]) -> Any:
+    """`value` as the type of `default`; mistyped values are reported and replaced by the default."""
+    if default is None:
+        return _freeze(value)
+    if value is None:
+        problems.append(f"{where}: null; using {default!r}")
+        return _freeze(default)
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        if _is_number(value) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+            problems.append(f"{where}: expected true/false, got {value!r}")
+            return value.strip().lower() in _TRUE
+    elif isinstance(default, int):
+        if _is_number(value):
+            # Fractional values are kept (e.g. 62.5 ms); whole floats become ints
+            return int(value) if float(value).is_integer() else float(value)
+        if isinstance(value, str):
+            try:
+                n = float(value)
+                problems.append(f"{where}: expected a number, got {value!r}")
+                return int(n) if n.is_integer() else n
+            except ValueError:
+                pass
+    elif isinstance(default, float):
+        if _is_number(value):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                n = float(value)
+                problems.append(f"{where}: expected a number, got {value!r}")
+                return n
+            except ValueError:
+                pass
+    elif isinstance(default, str):
+        if isinstance(value, str):
+            return value
+        if _is_number(value):
+            # YAML reads `inventory: 1` as an int
+            return str(value)
+    elif isinstance(default, (list, tuple)):
+        if isinstance(value, (list, tuple)):
+            sample = next((d for d in default if not isinstance(d, (dict, list))), None)
+            if sample is None:
+                return _freeze(value)
+            item_problems: List[str] = []
+            items = tuple(_coerce(f"{where}[{i}]", v, sample, item_problems) for i, v in enumerate(value))
+            if not item_problems:
+                return items
+    elif isinstance(default, dict):
+        if isinstance(value, dict):
+            return _freeze(value)
+    else:
+        return value
+    problems.append(f"{where}: expected {type(default).__name__}, got {value!r}; using {default!r}")
+    return _freeze(default)
+
+
+def _class_name(path: Tuple[str, ...]) -> str:
+    return "".join(p.title().replace("_", "") for p in path) + "Settings"
+
+
+def _fixed(path: Tuple[str, ...], defaults: Mapping[str, Any]) -> bool:
+    return (
+        ".".join(path) not in FREE_FORM
+        and all(isinstance(k, str) and k.isidentifier() and not keyword.iskeyword(k) and not k.startswith("_") for k in defaults)
+    )
+
+
+def _section(path: Tuple[str, ...], defaults: Mapping[str, Any]) -> type:
+    """NamedTuple class for one config section, with a nested class per fixed sub-section."""
+    children: Dict[str, type] = {}
+    fields = []
+    for k, v in defaults.items():
+        if isinstance(v, dict) and _fixed(path + (k,), v):
+            children[k] = _section(path + (k,), v)
+            fields.append((k, children[k]))
+        else:
+            fields.append((k, Any if v is None else type(v)))
+    cls = NamedTuple(_class_name(path), fields)
+    cls._defaults = defaults
+    cls._children = children
+    cls._path = ".".join(path)
+    return cls
+
+
+def _compile(cls: type, raw: Any, problems: List[str]) -> Any:
+    prefix = cls._path + "." if cls._path else ""
+    if not isinstance(raw, dict):
+        if raw is not None:
+            problems.append(f"{cls._path}: expected a mapping, got {raw!r}; using defaults")
+        raw = {}
+    values = []
+    for k in cls._fields:
+        default = cls._defaults[k]
+        child = cls._children.get(k)
+        if child is not None:
+            values.append(_compile(child, raw.get(k), problems))
+        elif k in raw:
+            values.append(_coerce(prefix + k, raw[k], default, problems))
+        else:
+            values.append(_freeze(default))
+    for k in raw:
+        if k not in cls._defaults:
+            problems.append(f"{prefix}{k}: unknown key")
+    return cls(*values)
+
+
+# Root of the tree: one field per top-level config key, generated from
+# DEFAULT_CONFIG so the defaults stay in one place
+Settings = _section((), DEFAULT_CONFIG)
+
+
+def compile_config(cfg: Dict[str, Any], problems: Optional[List[str]] = None) -> Any:
+    """Typed, read-only `Settings` tree for a config dict.
+
+    Every section of DEFAULT_CONFIG becomes a NamedTuple (immutable, no
+    per-instance dict) whose fields hold values of the default's type, so hot
+    paths read `s.timings.detection_timeout_s` instead of chained `.get` calls
+    with casts. Missing keys take the default, lists become tuples and
+    free-form sections (FREE_FORM, `grind.spots`) read-only mappings. Mistyped
+    values that can be converted are, anything else falls back to the default;
+    both, and keys the code doesn't know, are appended to `problems`.
+    """
+    return _compile(Settings, cfg, problems if problems is not None else [])
+
+
+def validate(cfg: Dict[str, Any]) -> List[str]:
+    """Problems `compile_config` finds in `cfg` (unknown keys, mistyped values)."""
+    problems: List[str] = []
+    compile_config(cfg, problems)
+    return problems
+
+
+# id(cfg) -> (cfg, settings) for the last few config dicts. Holding each dict keeps
+# its id from being reused by another config; a handful covers the runner, the
+# reloader and the simulators alternating between dicts.
+_cached: "OrderedDict[int, Tuple[dict, Any]]" = OrderedDict()
+_CACHE_SIZE = 8
+_cache_lock = threading.Lock()
+
+
+def _remember(cfg: Dict[str, Any], s: Any) -> None:
+    with _cache_lock:
+        _cached[id(cfg)] = (cfg, s)
+        _cached.move_to_end(id(cfg))
+        while len(_cached) > _CACHE_SIZE:
+            _cached.popitem(last=False)
+
+
+def settings_for(cfg: Dict[str, Any]) -> Any:
+    """Compiled settings for `cfg`, shared by everything built from the same dict.
+
+    Compiled on first use: scripts that adjust the dict after `load_config`
+    (benchmarks, the simulator) must do so before building Vision, Actions or
+    flows from it.
+    """
+    hit = _cached.get(id(cfg))
+    if hit is not None and hit[0] is cfg:
+        return hit[1]
+    s = compile_config(cfg)
+    _remember(cfg, s)
+    return s
+
+
+def adopt(cfg: Dict[str, Any], s: Any) -> None:
+    """Make `s` the settings `settings_for(cfg)` returns (after `cfg` was updated in place)."""
+    _remember(cfg, s)
+
+
+def changed_sections(old: Any, new: Any) -> frozenset:
+    """Top-level keys (sections and scalars) whose compiled values differ."""
+    return frozenset(k for k in new._fields if getattr(old, k) != getattr(new, k))
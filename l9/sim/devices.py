@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import copy
+import logging
+import os
+from typing import Dict, Optional, Set, Tuple
+
+from ..clock import CLOCK
+from ..lazy import optional
+from ..vision.capture import ROI
+from ..vision.match import Vision
+from .game import GameSim
+
+cv2 = optional("cv2")
+
+
+logger = logging.getLogger(__name__)
+
+
+class SimCapture:
+    """ScreenCapture stand-in that grabs from a GameSim; the sim screen is the only monitor, at (0, 0).
+
+    Grabs are read-only views of the game's frames, not copies.
+    """
+
+    available = True
+
+    def __init__(self, game: GameSim) -> None:
+        self.game = game
+        self.last_origin: Tuple[int, int] = (0, 0)
+
+    def fork(self, multi_screen: Optional[bool] = None) -> "SimCapture":
+        return SimCapture(self.game)
+
+    def monitor_rect(self, multi_screen: Optional[bool] = None) -> dict:
+        w, h = self.game.opts.size
+        return {"left": 0, "top": 0, "width": int(w), "height": int(h)}
+
+    def grab(self, roi: Optional[ROI] = None):
+        frame = self.game.frame()
+        if roi is None:
+            self.last_origin = (0, 0)
+            return frame
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, roi.x), max(0, roi.y)
+        x2, y2 = min(w, roi.x + roi.w), min(h, roi.y + roi.h)
+        self.last_origin = (x1, y1)
+        return frame[y1:y2, x1:x2]
+
+    def grab_region(self, region: Optional[Tuple[int, int, int, int]] = None):
+        if region is None:
+            return self.grab()
+        return self.grab(ROI(*(int(v) for v in region)))
+
+    def save(self, image, path: str) -> None:
+        if not cv2:
+            raise RuntimeError("Saving screenshots requires 'opencv-python' to be installed.")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        cv2.imwrite(path, image)
+
+
+class SimVision(Vision):
+    """Vision over a GameSim that matches each (frame, template, ROI) only once.
+
+    The game renders a handful of distinct screens and hands out the same array
+    for each, so results are memoized by the identity of the frame (or view)
+    being searched. Memoized calls skip the detect metrics.
+    """
+
+    def __init__(self, cfg: dict, game: GameSim) -> None:
+        super().__init__(cfg)
+        self.game = game
+        self.capture = SimCapture(game)
+        self._memo: Dict[tuple, object] = {}
+        self.memo_hits = 0
+
+    def _key(self, image, *args) -> Optional[tuple]:
+        if not self.game.owns(image):
+            return None
+        return (image.__array_interface__["data"][0], image.shape, image.strides) + args
+
+    def best_in(self, image, template_path, roi_name=None, origin=None, confidence=None):
+        origin = origin if origin is not None else self.capture.last_origin
+        key = self._key(image, "best", template_path, roi_name, origin)
+        if key is None:
+            return super().best_in(image, template_path, roi_name=roi_name, origin=origin, confidence=confidence)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._memo[key] = super().best_in(image, template_path, roi_name=roi_name, origin=origin, confidence=confidence)
+        else:
+            self.memo_hits += 1
+        return hit
+
+    def _match(self, frame, template_path, thr, return_all=False, capture_s=0.0):
+        key = self._key(frame, "match", template_path, thr, return_all)
+        if key is None:
+            return super()._match(frame, template_path, thr, return_all, capture_s=capture_s)
+        if key in self._memo:
+            self.memo_hits += 1
+        else:
+            self._memo[key] = super()._match(frame, template_path, thr, return_all, capture_s=capture_s)
+        # Callers shift detections into frame space in place
+        return copy.deepcopy(self._memo[key])
+
+
+class SimInput:
+    """Actions backend that feeds clicks and key presses to a GameSim.
+
+    Move and hold times pass on CLOCK, like on a real backend.
+    """
+
+    def __init__(self, game: GameSim) -> None:
+        self.game = game
+        w, h = game.opts.size
+        self.pos: Tuple[int, int] = (w // 2, h // 2)
+        self.held: Set[str] = set()
+
+    def position(self) -> Tuple[int, int]:
+        return self.pos
+
+    def move(self, x: int, y: int, duration: float = 0.0) -> None:
+        if duration > 0:
+            CLOCK.sleep(duration)
+        self.pos = (int(x), int(y))
+
+    def click(self, x: int, y: int, button: str = "left", hold_s: float = 0.0, move_s: float = 0.0, wiggle: bool = False) -> None:
+        self.move(x, y, move_s)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        # The game acts on release
+        self.game.click(self.pos[0], self.pos[1], button=button)
+
+    def key_down(self, key: str) -> None:
+        if key not in self.held:
+            self.held.add(key)
+            self.game.key(key)
+
+    def key_up(self, key: str) -> None:
+        self.held.discard(key)
+
+    def press(self, key: str, hold_s: float = 0.0) -> None:
+        self.key_down(key)
+        if hold_s > 0:
+            CLOCK.sleep(hold_s)
+        self.key_up(key)
+
+    def hotkey(self, *keys: str) -> None:
+        for k in keys:
+            self.key_down(k)
+        for k in reversed(keys):
+            self.key_up(k)
+
+    def type_text(self, text: str) -> None:
+        for ch in text:
+            self.press(ch)
@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from ..clock import CLOCK
+from ..lazy import optional
+from ..settings import settings_for
+
+cv2 = optional("cv2")
+np = optional("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+
+class Screen(Enum):
+    FIELD = auto()  # grind spot, HUD up
+    TOWN = auto()  # HUD plus the merchant icon
+    LOADING = auto()  # teleport / revive; no HUD
+    SHOP = auto()
+    SHOP_CONFIRM = auto()
+    INVENTORY = auto()
+    DISMANTLE = auto()
+    DISMANTLE_RESULT = auto()
+    MAP = auto()
+    DEAD = auto()
+
+
+# Overlays drawn on top of the world screen they were opened from
+OVERLAYS = (Screen.SHOP, Screen.SHOP_CONFIRM, Screen.INVENTORY, Screen.DISMANTLE, Screen.DISMANTLE_RESULT, Screen.MAP)
+
+
+@dataclass
+class SimOptions:
+    size: Tuple[int, int] = (1920, 1080)
+    potion_s: float = 8.0  # battle time until bought potions run out
+    loading_s: float = 2.5  # teleport / revive loading screen
+    pathing_s: float = 1.0  # auto-path from the merchant icon to the shop
+    death_every: int = 0  # every Nth battle ends in death instead of empty potions (0: never)
+    seed: int = 0
+
+
+@dataclass
+class SimCycle:
+    """One refill/grind cycle as the game saw it: from potions out (or death) to the next battle."""
+
+    index: int
+    reason: str  # "start", "empty" or "died"
+    start_t: float
+    marks: Dict[str, float] = field(default_factory=dict)  # event -> clock time of its first occurrence
+
+    @property
+    def end_t(self) -> Optional[float]:
+        return self.marks.get("battle")
+
+    @property
+    def dur_s(self) -> Optional[float]:
+        return None if self.end_t is None else self.end_t - self.start_t
+
+
+# Widget name -> top-left position on a 1920x1080 screen (scaled to SimOptions.size)
+LAYOUT: Dict[str, Tuple[int, int]] = {
+    "bag": (1800, 1000),
+    "potion": (900, 990),
+    "merchant": (1700, 150),
+    "auto_purchase": (848, 700),
+    "shop_close": (1480, 240),
+    "shop_confirm": (875, 520),
+    "dismantle_icon": (1300, 780),
+    "close_inventory": (1450, 230),
+    "quick_add": (1100, 700),
+    "dismantle_has": (1050, 760),
+    "dismantle_none": (1044, 746),
+    "region": (600, 400),
+    "area": (700, 500),
+    "teleporter": (700, 600),
+    "fast_travel": (1500, 900),
+    "map_confirm": (865, 520),
+    "revive": (868, 600),
+}
+
+
+def _templates(cfg: dict) -> Dict[str, str]:
+    """Template paths the flows will look for, resolved from `cfg` the way they resolve them."""
+    g = settings_for(cfg).grind
+    r = settings_for(cfg).revive
+    spot: Mapping = {}
+    for s in g.spots or ():
+        try:
+            if int(s.get("id")) == int(g.active_spot_id):
+                spot = s
+        except Exception:
+            continue
+
+    def spot_templ(key: str, fallback: str) -> str:
+        if isinstance(spot.get(key), str) and spot.get(key):
+            return str(spot[key])
+        return str(getattr(g, key, None) or fallback)
+
+    return {
+        "bag": g.bag_icon_template,
+        "potion": "l9/assets/ui/hud/potion_empty.png",
+        "merchant": "l9/assets/npc/general_merchant_icon.png",
+        "auto_purchase": "l9/assets/shop/auto_purchase_button.png",
+        "shop_close": "l9/assets/shop/close_button.png",
+        "shop_confirm": "l9/assets/shop/confirm_button.png",
+        "dismantle_icon": "l9/assets/dismantle/icon.png",
+        "close_inventory": "l9/assets/dismantle/close_inventory.png",
+        "quick_add": "l9/assets/dismantle/quick_add.png",
+        "dismantle_has": "l9/assets/dismantle/dismantle_has.png",
+        "dismantle_none": "l9/assets/dismantle/dismantle_none.png",
+        "region": spot_templ("region_template", "l9/assets/grind/region.png"),
+        "area": spot_templ("area_template", "l9/assets/grind/area.png"),
+        "teleporter": spot_templ("teleporter_template", "l9/assets/grind/teleporter.png"),
+        "fast_travel": spot_templ("fast_travel_template", "l9/assets/grind/fast_travel.png"),
+        "map_confirm": spot_templ("confirm_template", "l9/assets/grind/confirm.png"),
+        "revive": r.revive_button,
+    }
+
+
+class GameSim:
+    """Headless stand-in for the game: a screen state machine that renders frames.
+
+    Frames are composed from the same `l9/assets` templates the flows match, at
+    fixed positions on textured backgrounds, so detection runs for real.
+    Clicks are hit-tested against the widgets on screen and keys are mapped
+    through `cfg["keybinds"]`; both arrive through `l9.sim.devices`. Loading
+    screens, auto-pathing and potion use advance with `clock` (the process
+    CLOCK, so a virtual clock runs the game as fast as the flows sleep)
+    whenever the game is looked at or touched. Thread-safe: the flow, frame stream and watcher
+    share one instance.
+
+    The game starts at the grind spot with empty potions. A cycle runs from
+    potions out (or death) to the next auto-battle start; `cycles` holds the
+    finished ones with the time of each milestone (town, dismantled,
+    purchased, battle); `on_cycle` is called with each one as it finishes.
+    """
+
+    def __init__(
+        self,
+        cfg: dict,
+        options: Optional[SimOptions] = None,
+        clock: Callable[[], float] = CLOCK.now,
+        on_cycle: Optional[Callable[[SimCycle], None]] = None,
+    ) -> None:
+        if not np or not cv2:
+            raise RuntimeError("The game simulator requires 'opencv-python' and 'numpy'.")
+        self.cfg = cfg
+        self.opts = options or SimOptions()
+        self.clock = clock
+        self.on_cycle = on_cycle
+        self.keys = {k: str(v).lower() for k, v in (cfg.get("keybinds", {}) or {}).items()}
+        self._lock = threading.RLock()
+        w, h = self.opts.size
+        self._sx, self._sy = w / 1920.0, h / 1080.0
+        self._images: Dict[str, object] = {}
+        for name, path in _templates(cfg).items():
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                logger.warning("Sim template missing; %s will not be drawn: %s", name, path)
+                continue
+            self._images[name] = img
+        rng = np.random.default_rng(self.opts.seed)
+        self._bg = {
+            Screen.FIELD: self._texture(rng, (60, 110, 70)),
+            Screen.TOWN: self._texture(rng, (120, 110, 100)),
+            Screen.LOADING: self._texture(rng, (20, 20, 25)),
+            Screen.DEAD: self._texture(rng, (30, 30, 90)),
+        }
+
+        self.screen = Screen.FIELD
+        self.world = Screen.FIELD  # world screen under overlays
+        self.potion_left_s = 0.0
+        self.battling = False
+        self.battles = 0
+        self.map_step = 0
+        self.items_added = False
+        self.clicks = 0
+        self.presses = 0
+        self._battle_t = 0.0
+        self._last_t = self.clock()
+        self._loading_until: Optional[float] = None
+        self._after_loading = Screen.FIELD
+        self._walk_until: Optional[float] = None
+        self.cycles: List[SimCycle] = []
+        self._cycle: Optional[SimCycle] = SimCycle(1, "start", self._last_t)
+        self._version = 0
+        self._frame_version = -1
+        self._frame = None
+        # One read-only array per distinct screen, kept for the whole run
+        self._frames: Dict[tuple, object] = {}
+        self._frame_ids: set = set()
+
+    # -- rendering -----------------------------------------------------------
+
+    def _texture(self, rng, bgr: Tuple[int, int, int]):
+        w, h = self.opts.size
+        small = rng.normal(0.0, 28.0, (h // 8, w // 8, 3))
+        noise = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+        return np.clip(noise + np.array(bgr, dtype=np.float64), 0, 255).astype(np.uint8)
+
+    def _pos(self, name: str) -> Tuple[int, int]:
+        x, y = LAYOUT[name]
+        return int(x * self._sx), int(y * self._sy)
+
+    def _widgets(self) -> List[str]:
+        """Names of the widgets on screen, bottom to top."""
+        s = self.screen
+        out: List[str] = []
+        if s in (Screen.FIELD, Screen.TOWN):
+            out += ["bag"]
+            if self.potion_left_s <= 0:
+                out.append("potion")
+            if s is Screen.TOWN:
+                out.append("merchant")
+        elif s in (Screen.SHOP, Screen.SHOP_CONFIRM):
+            out += ["auto_purchase", "shop_close"]
+            if s is Screen.SHOP_CONFIRM:
+                out.append("shop_confirm")
+        elif s is Screen.INVENTORY:
+            out += ["dismantle_icon", "close_inventory"]
+        elif s is Screen.DISMANTLE:
+            out += ["close_inventory", "quick_add", "dismantle_has" if self.items_added else "dismantle_none"]
+        elif s is Screen.MAP:
+            out += ["region", "area", "teleporter", "fast_travel", "map_confirm"][: self.map_step + 1]
+        elif s is Screen.DEAD:
+            out.append("revive")
+        return [n for n in out if n in self._images]
+
+    def _box(self, name: str) -> Tuple[int, int, int, int]:
+        x, y = self._pos(name)
+        h, w = self._images[name].shape[:2]
+        return x, y, w, h
+
+    def _render(self):
+        base = Screen.LOADING if self.screen is Screen.LOADING else Screen.DEAD if self.screen is Screen.DEAD else self.world
+        frame = self._bg[base].copy()
+        w, h = self.opts.size
+        if self.screen in OVERLAYS:
+            # Dimmed panel behind the UI, like the game's modal windows
+            x1, y1, x2, y2 = int(0.18 * w), int(0.18 * h), int(0.84 * w), int(0.88 * h)
+            frame[y1:y2, x1:x2] = (frame[y1:y2, x1:x2] // 3 + 20).astype(np.uint8)
+        if self.screen is Screen.DISMANTLE_RESULT:
+            cv2.rectangle(frame, (int(0.35 * w), int(0.35 * h)), (int(0.65 * w), int(0.6 * h)), (70, 60, 50), -1)
+        if self.screen in (Screen.FIELD, Screen.TOWN) and self.potion_left_s > 0:
+            # Filled potion slot; there is no template for it, only the empty one is matched
+            x, y = self._pos("potion")
+            cv2.rectangle(frame, (x, y), (x + 20, y + 41), (40, 40, 200), -1)
+        for name in self._widgets():
+            x, y, tw, th = self._box(name)
+            frame[y:y + th, x:x + tw] = self._images[name]
+        return frame
+
+    def _signature(self) -> tuple:
+        # Everything `_render` depends on
+        return (self.screen, self.world, self.potion_left_s > 0, tuple(self._widgets()))
+
+    def frame(self):
+        """Current screen as a read-only BGR ndarray.
+
+        Identical screens are the same array for the whole run, so work done on
+        a frame can be memoized by identity (see `owns`).
+        """
+        with self._lock:
+            self._advance()
+            if self._frame_version != self._version:
+                sig = self._signature()
+                frame = self._frames.get(sig)
+                if frame is None:
+                    frame = self._render()
+                    frame.flags.writeable = False
+                    self._frames[sig] = frame
+                    self._frame_ids.add(id(frame))
+                self._frame = frame
+                self._frame_version = self._version
+            return self._frame
+
+    def owns(self, image) -> bool:
+        """True if `image` is a frame from `frame()` or a view into one."""
+        root = image
+        while getattr(root, "base", None) is not None:
+            root = root.base
+        return id(root) in self._frame_ids
+
+    # -- state ---------------------------------------------------------------
+
+    def _changed(self) -> None:
+        self._version += 1
+
+    def _mark(self, event: str) -> None:
+        now = self.clock()
+        logger.debug("sim %s at %.2f", event, now)
+        if self._cycle is not None:
+            self._cycle.marks.setdefault(event, now)
+            if event == "battle":
+                self.cycles.append(self._cycle)
+                if self.on_cycle is not None:
+                    self.on_cycle(self._cycle)
+                self._cycle = None
+        elif event in ("empty", "died"):
+            self._cycle = SimCycle(len(self.cycles) + 1, event, now)
+
+    def _go(self, screen: Screen) -> None:
+        if screen in (Screen.FIELD, Screen.TOWN):
+            self.world = screen
+        if screen is not self.screen:
+            self.screen = screen
+            self._changed()
+
+    def _load(self, target: Screen) -> None:
+        self.battling = False
+        self._walk_until = None
+        self._loading_until = self.clock() + self.opts.loading_s
+        self._after_loading = target
+        self._go(Screen.LOADING)
+
+    def _advance(self) -> None:
+        now = self.clock()
+        dt, self._last_t = now - self._last_t, now
+        if self.screen is Screen.LOADING and self._loading_until is not None and now >= self._loading_until:
+            self._loading_until = None
+            self._go(self._after_loading)
+            if self.screen is Screen.TOWN:
+                self._mark("town")
+        if self._walk_until is not None and now >= self._walk_until:
+            self._walk_until = None
+            if self.screen is Screen.TOWN:
+                self._go(Screen.SHOP)
+        if self.battling and self.world is Screen.FIELD and self.potion_left_s > 0:
+            dies = self.opts.death_every > 0 and self.battles % self.opts.death_every == 0
+            if dies and now - self._battle_t >= self.opts.potion_s / 2:
+                self.battling = False
+                self._go(Screen.DEAD)
+                self._mark("died")
+                return
+            self.potion_left_s = max(0.0, self.potion_left_s - dt)
+            if self.potion_left_s <= 0:
+                self._changed()
+                self._mark("empty")
+
+    # -- input ---------------------------------------------------------------
+
+    def click(self, x: int, y: int, button: str = "left") -> Optional[str]:
+        """Apply a click at screen (x, y); returns the widget hit, if any."""
+        with self._lock:
+            self._advance()
+            self.clicks += 1
+            if self.screen is Screen.DISMANTLE_RESULT:
+                # Any click dismisses the result popup
+                self.items_added = False
+                self._go(Screen.DISMANTLE)
+                return "result"
+            hit = None
+            for name in reversed(self._widgets()):
+                bx, by, bw, bh = self._box(name)
+                if bx <= x < bx + bw and by <= y < by + bh:
+                    hit = name
+                    break
+            if hit is not None:
+                logger.debug("sim click %s on %s", hit, self.screen.name)
+                self._on_widget(hit)
+            return hit
+
+    def _on_widget(self, name: str) -> None:
+        s = self.screen
+        if name == "merchant" and self._walk_until is None:
+            self._walk_until = self.clock() + self.opts.pathing_s
+        elif name == "auto_purchase" and s is Screen.SHOP:
+            self._go(Screen.SHOP_CONFIRM)
+        elif name == "shop_confirm":
+            self.potion_left_s = self.opts.potion_s
+            self._mark("purchased")
+            self._go(Screen.SHOP)
+            self._changed()
+        elif name == "shop_close":
+            self._go(self.world)
+        elif name == "dismantle_icon":
+            self.items_added = False
+            self._go(Screen.DISMANTLE)
+        elif name == "quick_add":
+            if not self.items_added:
+                self.items_added = True
+                self._changed()
+        elif name in ("dismantle_has", "dismantle_none"):
+            if name == "dismantle_has":
+                self._mark("dismantled")
+            self._go(Screen.DISMANTLE_RESULT)
+        elif name == "close_inventory":
+            self._go(self.world)
+        elif name in ("region", "area", "teleporter", "fast_travel"):
+            step = ("region", "area", "teleporter", "fast_travel").index(name) + 1
+            if step > self.map_step:
+                self.map_step = step
+                self._changed()
+        elif name == "map_confirm":
+            self._mark("teleport")
+            self._load(Screen.FIELD)
+        elif name == "revive":
+            self._load(Screen.TOWN)
+
+    def key(self, key: str) -> None:
+        """Apply a key press (the down edge; releases carry no meaning here)."""
+        k = str(key).lower()
+        with self._lock:
+            self._advance()
+            self.presses += 1
+            s = self.screen
+            if s in (Screen.LOADING, Screen.DEAD):
+                return
+            if k == self.keys.get("return_to_town", "r") and s is Screen.FIELD:
+                self._load(Screen.TOWN)
+            elif k == self.keys.get("map", "m"):
+                if s is Screen.MAP:
+                    self._go(self.world)
+                elif s in (Screen.FIELD, Screen.TOWN):
+                    self.map_step = 0
+                    self._go(Screen.MAP)
+            elif k == self.keys.get("inventory", "i"):
+                if s in (Screen.INVENTORY, Screen.DISMANTLE):
+                    self._go(self.world)
+                elif s in (Screen.FIELD, Screen.TOWN):
+                    self._go(Screen.INVENTORY)
+            elif k == self.keys.get("close_ui", "esc"):
+                if s in OVERLAYS and s is not Screen.DISMANTLE_RESULT:
+                    self._go(self.world)
+            elif k == self.keys.get("autobattle", "g") and s is Screen.FIELD and not self.battling:
+                self.battling = True
+                self.battles += 1
+                self._battle_t = self.clock()
+                self._mark("battle")
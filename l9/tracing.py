@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import atexit
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "t0")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Optional[dict]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        t1 = time.perf_counter()
+        self.tracer._emit(self.name, self.cat, self.t0, t1, self.args)
+        return False
+
+
+class Tracer:
+    """Trace Event Format recorder (chrome://tracing, Perfetto).
+
+    Spans are complete ("X") events appended to an in-memory deque; a
+    background thread drains it to the output file every `flush_s`, so the
+    traced thread only pays two perf_counter() calls and an append. The file
+    is a JSON array written incrementally; `stop()` closes it, and viewers also
+    accept a file cut off by a crash.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Optional[str] = None
+        self._buf: "collections.deque[dict]" = collections.deque()
+        self._t0 = 0.0
+        self._pid = os.getpid()
+        self._threads: set = set()
+        self._file = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit = False
+
+    def start(self, path: str, flush_s: float = 0.5) -> "Tracer":
+        if self.enabled:
+            self.stop()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self.path = path
+        self._t0 = time.perf_counter()
+        self._threads = set()
+        self._stop.clear()
+        self._buf.append({"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": "l9"}})
+        self.enabled = True
+        self._thread = threading.Thread(target=self._run, args=(flush_s,), name="l9-trace", daemon=True)
+        self._thread.start()
+        if not self._atexit:
+            atexit.register(self.stop)
+            self._atexit = True
+        logger.info("Tracing to %s", path)
+        return self
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        self._flush()
+        # Closing metadata event avoids a trailing comma before "]"
+        self._file.write(json.dumps({"name": "trace_end", "ph": "M", "pid": self._pid, "tid": 0, "args": {}}) + "\n]\n")
+        self._file.close()
+        self._file = None
+        logger.info("Trace written to %s", self.path)
+
+    def span(self, name: str, cat: str = "", args: Optional[dict] = None):
+        """Context manager timing one span; a shared no-op when tracing is off."""
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, cat, args)
+
+    def _emit(self, name: str, cat: str, t0: float, t1: float, args: Optional[dict]) -> None:
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads.add(tid)
+            self._buf.append({
+                "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                "args": {"name": threading.current_thread().name},
+            })
+        ev = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (t0 - self._t0) * 1e6,
+            "dur": (t1 - t0) * 1e6,
+            "pid": self._pid,
+            "tid": tid,
+        }
+        if args:
+            ev["args"] = args
+        self._buf.append(ev)
+
+    def _flush(self) -> None:
+        f = self._file
+        if f is None:
+            return
+        lines = []
+        while True:
+            try:
+                ev = self._buf.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps(ev, separators=(",", ":")))
+        if lines:
+            f.write(",\n".join(lines) + ",\n")
+            f.flush()
+
+    def _run(self, flush_s: float) -> None:
+        while not self._stop.wait(flush_s):
+            try:
+                self._flush()
+            except Exception as e:  # pragma: no cover
+                logger.warning("Trace flush failed: %s", e)
+
+
+TRACER = Tracer()
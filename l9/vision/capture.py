@@ -3,23 +3,13 @@ from __future__ import annotations
 import logging
 import os
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
+from ..lazy import optional
 
-try:
-    import mss  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover - optional at runtime
-    mss = None
-
-try:
-    import numpy as np  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    np = None
-
-try:
-    import cv2  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    cv2 = None
+mss = optional("mss")
+np = optional("numpy")
+cv2 = optional("cv2")
 
 
 logger = logging.getLogger(__name__)
@@ -40,14 +30,67 @@ class ScreenCapture:
         self.debug_dir = debug_dir
         self.multi_screen = multi_screen
         self.last_origin: Tuple[int, int] = (0, 0)  # absolute screen origin (left, top) of last grab
+        self._monitors: Dict[bool, dict] = {}
         os.makedirs(self.debug_dir, exist_ok=True)
 
-        if mss is None:
+        if not mss:
             # Silent failure for stealth
             pass
 
+    def reconfigure(self, monitor_index: int, dpi_scale: float, multi_screen: bool) -> None:
+        """Switch monitor/scale settings; drops the cached monitor rects that ROIs are mapped onto."""
+        self.monitor_index = monitor_index
+        self.dpi_scale = dpi_scale
+        self.multi_screen = multi_screen
+        self._monitors.clear()
+
+    @property
+    def available(self) -> bool:
+        """True if frames can be grabbed (mss and numpy installed)."""
+        return bool(mss and np)
+
+    def fork(self, multi_screen: Optional[bool] = None) -> "ScreenCapture":
+        """Independent capture of the same screen, with its own `last_origin` (for background grabbers)."""
+        return ScreenCapture(
+            monitor_index=self.monitor_index,
+            dpi_scale=self.dpi_scale,
+            debug_dir=self.debug_dir,
+            multi_screen=self.multi_screen if multi_screen is None else multi_screen,
+        )
+
+    def monitor_rect(self, multi_screen: Optional[bool] = None) -> dict:
+        """Bounding box of the configured monitor, or of all screens (cached; grabs no pixels).
+
+        `multi_screen` defaults to this capture's setting; pass False for the
+        configured monitor alone, which is what ROI fractions refer to.
+        """
+        multi = self.multi_screen if multi_screen is None else bool(multi_screen)
+        if multi not in self._monitors:
+            if not mss:
+                raise RuntimeError("Screen capture requires 'mss' and 'numpy' to be installed.")
+            with mss.mss() as sct:
+                monitors = sct.monitors
+                idx = 0 if multi else max(1, min(self.monitor_index, len(monitors) - 1))
+                mon = monitors[idx]
+                self._monitors[multi] = {k: int(mon[k]) for k in ("left", "top", "width", "height")}
+        return dict(self._monitors[multi])
+
+    def grab_region(self, region: Optional[Tuple[int, int, int, int]] = None):
+        """Grab an absolute (left, top, width, height) region; None means all screens."""
+        if not mss or not np:
+            raise RuntimeError("Screen capture requires 'mss' and 'numpy' to be installed.")
+        with mss.mss() as sct:
+            if region is None:
+                mon = sct.monitors[0]
+                bbox = {"left": mon["left"], "top": mon["top"], "width": mon["width"], "height": mon["height"]}
+            else:
+                bbox = {"left": int(region[0]), "top": int(region[1]), "width": int(region[2]), "height": int(region[3])}
+            self.last_origin = (int(bbox["left"]), int(bbox["top"]))
+            frame = np.asarray(sct.grab(bbox))
+            return frame[:, :, :3]
+
     def grab(self, roi: Optional[ROI] = None):
-        if mss is None or np is None:
+        if not mss or not np:
             raise RuntimeError("Screen capture requires 'mss' and 'numpy' to be installed.")
         with mss.mss() as sct:
             monitors = sct.monitors
@@ -82,7 +125,40 @@ class ScreenCapture:
             return frame
 
     def save(self, image, path: str) -> None:
-        if cv2 is None:
+        if not cv2:
             raise RuntimeError("Saving screenshots requires 'opencv-python' to be installed.")
         os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         cv2.imwrite(path, image)
+
+
+def pyautogui_all_screens(pag) -> None:
+    """Make pyautogui's locate*OnScreen search every monitor, not just the primary one.
+
+    The pyautogui fallbacks (no mss/OpenCV, GUI and recorder helpers) must
+    find the game on a secondary monitor, but locateOnScreen has no option for
+    it. pyscreeze >= 0.1.29 grabs all screens when asked, so its screenshot
+    function is bound to that; older versions grab through PIL's ImageGrab,
+    which gets the same binding. Runs once, when pyautogui is first imported
+    (see `actions.backends`), instead of as a side effect of importing flows.
+    """
+    import inspect
+    from functools import partial
+
+    try:
+        import pyscreeze  # type: ignore
+    except ModuleNotFoundError:  # pragma: no cover
+        pyscreeze = None
+    shot = getattr(pyscreeze, "screenshot", None)
+    try:
+        if shot is not None and "allScreens" in inspect.signature(shot).parameters:
+            pyscreeze.screenshot = partial(shot, allScreens=True)
+            return
+    except (TypeError, ValueError):
+        pass
+    try:
+        from PIL import ImageGrab  # type: ignore
+    except ModuleNotFoundError:  # pragma: no cover
+        return
+    if not isinstance(ImageGrab.grab, partial):
+        ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
+    logger.debug("pyautogui locate: all screens via ImageGrab")
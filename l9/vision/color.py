@@ -3,13 +3,10 @@ from __future__ import annotations
 import logging
 from typing import Tuple
 
-try:
-    import cv2  # type: ignore
-    import numpy as np  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    cv2 = None
-    np = None
+from ..lazy import optional
 
+cv2 = optional("cv2")
+np = optional("numpy")
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +16,7 @@ def red_ratio_bgr(img_bgr, sat_thresh: int = 60, val_thresh: int = 50) -> float:
 
     Red mask is defined in HSV as hue near 0/180 with sufficient saturation/value.
     """
-    if cv2 is None or np is None:
+    if not cv2 or not np:
         raise RuntimeError("opencv-python and numpy are required for color analysis")
     hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
     h, s, v = cv2.split(hsv)
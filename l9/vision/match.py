@@ -5,23 +5,35 @@ import math
 import os
 import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
+from .capture import ScreenCapture, ROI
+from . import metrics
+from .metrics import METRICS
+from .. import events
+from ..events import EVENTS
+from ..lazy import optional
+from ..tracing import TRACER
+from ..profiling import timed
+from ..reload import RELOADER
+from ..settings import settings_for
 
-try:
-    import cv2  # type: ignore
-    import numpy as np  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    cv2 = None
-    np = None
+cv2 = optional("cv2")
+np = optional("numpy")
 
-from .capture import ScreenCapture, ROI
 
 logger = logging.getLogger(__name__)
 
 
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return -1.0
+
+
 def _cv2_method(name: str) -> int:
-    if cv2 is None:
+    if not cv2:
         raise RuntimeError("OpenCV is required for template matching.")
     name = name.strip().upper()
     if not name.startswith("TM_"):
@@ -32,7 +44,7 @@ def _cv2_method(name: str) -> int:
 
 
 def non_max_suppression(rects: List[Tuple[int, int, int, int]], scores: List[float], iou_thresh: float) -> List[int]:
-    if np is None:
+    if not np:
         raise RuntimeError("numpy is required for non-max suppression")
     if not rects:
         return []
@@ -68,23 +80,90 @@ class Detection:
     scale: float
 
 
+class Box(NamedTuple):
+    """Absolute screen box, field-compatible with pyautogui's Box."""
+
+    left: int
+    top: int
+    width: int
+    height: int
+
+
+@dataclass(frozen=True)
+class MatchSpec:
+    """One template to look for: path plus optional ROI name and threshold.
+
+    `name` identifies the spec in results and logs; defaults to the template basename.
+    """
+
+    template: str
+    roi_name: Optional[str] = None
+    threshold: Optional[float] = None
+    name: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return self.name or os.path.basename(self.template)
+
+
 class Vision:
     def __init__(self, cfg: Dict, dry_run: bool = False) -> None:
         self.cfg = cfg
+        self.s = settings_for(cfg)
         self.capture = ScreenCapture(
-            monitor_index=cfg.get("monitor_index", 1),
-            dpi_scale=cfg.get("dpi_scale", 1.0),
-            debug_dir=cfg.get("debug", {}).get("dir", "./debug"),
-            multi_screen=cfg.get("multi_screen", False),
+            monitor_index=self.s.monitor_index,
+            dpi_scale=self.s.dpi_scale,
+            debug_dir=self.s.debug.dir,
+            multi_screen=self.s.multi_screen,
         )
         self.dry_run = dry_run
-        os.makedirs(self.cfg.get("debug", {}).get("dir", "./debug"), exist_ok=True)
+        self._templates: Dict[str, object] = {}
+        # mtime of each cached template file, so a reload drops only templates replaced on disk
+        self._template_mtimes: Dict[str, float] = {}
+        os.makedirs(self.s.debug.dir, exist_ok=True)
+        metrics.configure(cfg)
+        events.configure(cfg)
+        RELOADER.subscribe(self)
+
+    def apply_settings(self, s, changed) -> None:
+        """Take a reloaded config.
+
+        ROIs, thresholds and match options are read per call; only the capture's
+        monitor geometry and templates whose files changed on disk are dropped.
+        """
+        self.s = s
+        if changed & {"monitor_index", "dpi_scale", "multi_screen"}:
+            self.capture.reconfigure(s.monitor_index, s.dpi_scale, s.multi_screen)
+        if "metrics" in changed:
+            metrics.configure(self.cfg)
+        if "events" in changed:
+            events.configure(self.cfg)
+        stale = [p for p, m in self._template_mtimes.items() if _mtime(p) != m]
+        for p in stale:
+            self._templates.pop(p, None)
+            self._template_mtimes.pop(p, None)
+        if stale:
+            logger.info("Reloading %d changed template(s)", len(stale))
 
     def _roi_from_frac(self, frac: Optional[List[float]]) -> Optional[ROI]:
         if frac is None:
             return None
-        # Without knowing screen size ahead, grab one frame to compute ROI
-        frame = self.capture.grab()
+        # Monitor size is cached by the capture; no need to grab a frame for it
+        mon = self.capture.monitor_rect()
+        H, W = mon["height"], mon["width"]
+        x1 = int(frac[0] * W)
+        y1 = int(frac[1] * H)
+        x2 = int(frac[2] * W)
+        y2 = int(frac[3] * H)
+        return ROI(x1, y1, x2 - x1, y2 - y1)
+
+    def _roi_in_frame(self, roi_name: Optional[str], frame) -> Optional[ROI]:
+        """Resolve a named ROI against an already captured frame (no extra grab)."""
+        if not roi_name:
+            return None
+        frac = self.s.rois.get(roi_name)
+        if not frac:
+            return None
         H, W = frame.shape[:2]
         x1 = int(frac[0] * W)
         y1 = int(frac[1] * H)
@@ -92,21 +171,110 @@ class Vision:
         y2 = int(frac[3] * H)
         return ROI(x1, y1, x2 - x1, y2 - y1)
 
+    @timed("detect")
     def grab_roi_image(self, roi_name: str):
-        frac = (self.cfg.get("rois", {}) or {}).get(roi_name)
+        frac = self.s.rois.get(roi_name)
         roi = self._roi_from_frac(frac) if frac else None
-        return self.capture.grab(roi)
+        t0 = time.perf_counter()
+        img = self.capture.grab(roi)
+        METRICS.record_capture(time.perf_counter() - t0)
+        return img
+
+    @timed("detect")
+    def grab_frame(self):
+        """Capture the whole configured monitor once, for matching several templates."""
+        t0 = time.perf_counter()
+        img = self.capture.grab()
+        METRICS.record_capture(time.perf_counter() - t0)
+        return img
 
     def _load_image(self, path: str):
-        if cv2 is None:
+        if not cv2:
             raise RuntimeError("OpenCV is required to load images.")
+        img = self._templates.get(path)
+        if img is not None:
+            return img
         if not os.path.exists(path):
             raise FileNotFoundError(f"Template not found: {path}")
         img = cv2.imread(path, cv2.IMREAD_COLOR)
         if img is None:
             raise RuntimeError(f"Failed to read image: {path}")
+        self._templates[path] = img
+        self._template_mtimes[path] = _mtime(path)
         return img
 
+    def preload(self, paths) -> int:
+        """Load templates into the cache ahead of their first match; returns how many are cached.
+
+        Paths are cache keys, so pass them as flows spell them (e.g. "l9/assets/...").
+        """
+        n = 0
+        for p in paths:
+            try:
+                self._load_image(p)
+                n += 1
+            except Exception as e:
+                logger.debug("Not preloading %s: %s", p, e)
+        return n
+
+    @timed("detect")
+    def best_in(
+        self,
+        image,
+        template_path: str,
+        roi_name: Optional[str] = None,
+        origin: Optional[Tuple[int, int]] = None,
+        confidence: Optional[float] = None,
+    ) -> Tuple[float, Optional[Box]]:
+        """Best single-scale color match score and its screen box (None if the template doesn't fit).
+
+        `image` is a BGR frame, optionally narrowed to a named ROI. The box is
+        mapped to screen coordinates through `origin` (the absolute top-left of
+        `image`), defaulting to `capture.last_origin`. `confidence`, if given,
+        only decides whether detect metrics count the call as a hit.
+        """
+        t0 = time.perf_counter()
+        roi = self._roi_in_frame(roi_name, image)
+        if roi is not None:
+            image = image[roi.y:roi.y + roi.h, roi.x:roi.x + roi.w]
+        templ = self._load_image(template_path)
+        th, tw = templ.shape[:2]
+        if th > image.shape[0] or tw > image.shape[1]:
+            return 0.0, None
+        res = cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        score = float(max_val)
+        hit = None if confidence is None else score >= confidence
+        METRICS.record(template_path, score, time.perf_counter() - t0, hit=hit)
+        EVENTS.detect(template_path, score, hit)
+        ox, oy = origin if origin is not None else self.capture.last_origin
+        if roi is not None:
+            ox, oy = ox + roi.x, oy + roi.y
+        return score, Box(int(max_loc[0]) + ox, int(max_loc[1]) + oy, tw, th)
+
+    def locate_in(
+        self,
+        image,
+        template_path: str,
+        confidence: float,
+        roi_name: Optional[str] = None,
+        origin: Optional[Tuple[int, int]] = None,
+    ) -> Optional[Box]:
+        """`best_in` with pyautogui `locate(confidence=...)` semantics: the box, or None below `confidence`."""
+        score, box = self.best_in(image, template_path, roi_name=roi_name, origin=origin, confidence=confidence)
+        return box if score >= confidence else None
+
+    def _threshold_for(self, template_path: str, threshold: Optional[float]) -> float:
+        # Per-template threshold override (exact path or basename)
+        if threshold:
+            return threshold
+        thr_map = self.s.threshold_overrides
+        if not thr_map:
+            return self.s.match.default_threshold
+        base = os.path.basename(template_path)
+        return float(thr_map.get(template_path, thr_map.get(base, self.s.match.default_threshold)))
+
+    @timed("detect")
     def detect(
         self,
         template_path: str,
@@ -118,31 +286,67 @@ class Vision:
             logger.info("[dry] detect template=%s roi=%s", template_path, roi_name)
             return None if not return_all else []
 
-        method = _cv2_method(self.cfg.get("match", {}).get("method", "TM_CCOEFF_NORMED"))
-        use_color = bool(self.cfg.get("match", {}).get("use_color", False))
-        multi_scale = bool(self.cfg.get("match", {}).get("multi_scale", True))
-        scales = list(self.cfg.get("match", {}).get("scales", [1.0]))
-        # Per-template threshold override (exact path or basename)
-        thr_map = self.cfg.get("threshold_overrides", {}) or {}
-        base = os.path.basename(template_path)
-        thr = (
-            threshold
-            or float(thr_map.get(template_path, thr_map.get(base, self.cfg.get("match", {}).get("default_threshold", 0.85))))
-        )
-        nms_iou = float(self.cfg.get("match", {}).get("nms_iou", 0.3))
-        max_results = int(self.cfg.get("match", {}).get("max_results", 5))
-
         roi = None
         if roi_name:
-            frac = self.cfg.get("rois", {}).get(roi_name)
+            frac = self.s.rois.get(roi_name)
             roi = self._roi_from_frac(frac) if frac else None
 
-        frame = self.capture.grab(roi)
+        t0 = time.perf_counter()
+        with TRACER.span("capture", "detect"):
+            frame = self.capture.grab(roi)
+        capture_s = time.perf_counter() - t0
+        return self._match(frame, template_path, self._threshold_for(template_path, threshold), return_all, capture_s=capture_s)
+
+    @timed("detect")
+    def detect_in(
+        self,
+        frame,
+        template_path: str,
+        roi_name: Optional[str] = None,
+        threshold: Optional[float] = None,
+        return_all: bool = False,
+    ) -> Optional[Detection] | List[Detection]:
+        """Like `detect`, but match against a frame from `grab_frame()`.
+
+        The named ROI is cropped from the frame; returned coordinates are in frame
+        space, so `capture.last_origin` still maps them to screen coordinates.
+        """
+        if self.dry_run:
+            logger.info("[dry] detect template=%s roi=%s", template_path, roi_name)
+            return None if not return_all else []
+        roi = self._roi_in_frame(roi_name, frame)
+        view = frame[roi.y:roi.y + roi.h, roi.x:roi.x + roi.w] if roi else frame
+        found = self._match(view, template_path, self._threshold_for(template_path, threshold), return_all)
+        if roi is None or not found:
+            return found
+        for d in (found if return_all else [found]):
+            d.x += roi.x
+            d.y += roi.y
+        return found
+
+    def _match(
+        self,
+        frame,
+        template_path: str,
+        thr: float,
+        return_all: bool = False,
+        capture_s: float = 0.0,
+    ) -> Optional[Detection] | List[Detection]:
+        t0 = time.perf_counter()
+        m = self.s.match
+        method = _cv2_method(m.method)
+        use_color = m.use_color
+        multi_scale = m.multi_scale
+        scales = m.scales
+        nms_iou = m.nms_iou
+        max_results = int(m.max_results)
+
         templ = self._load_image(template_path)
 
         if not use_color:
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            templ_gray = cv2.cvtColor(templ, cv2.COLOR_BGR2GRAY)
+            with TRACER.span("convert", "detect"):
+                frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                templ_gray = cv2.cvtColor(templ, cv2.COLOR_BGR2GRAY)
         else:
             frame_gray = frame
             templ_gray = templ
@@ -157,8 +361,9 @@ class Vision:
                 t = templ_gray
             if t.shape[0] >= frame_gray.shape[0] or t.shape[1] >= frame_gray.shape[1]:
                 continue
-            res = cv2.matchTemplate(frame_gray, t, method)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
+            with TRACER.span("match", "detect", {"template": template_path, "scale": s}):
+                res = cv2.matchTemplate(frame_gray, t, method)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(res)
             if method in (cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED):
                 score = 1.0 - float(min_val)
                 loc = min_loc
@@ -170,6 +375,15 @@ class Vision:
                 best = cand
             if score >= thr:
                 detections.append(cand)
+        # Best score whether or not it cleared the threshold, for threshold tuning
+        METRICS.record(
+            template_path,
+            best.score if best is not None else 0.0,
+            time.perf_counter() - t0,
+            hit=bool(detections),
+            capture_s=capture_s,
+        )
+        EVENTS.detect(template_path, best.score if best is not None else 0.0, bool(detections))
 
         if not detections:
             # Detection missed - no logging for stealth
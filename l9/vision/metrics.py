@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..lazy import optional
+
+np = optional("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+
+class DetectMetrics:
+    """Per-template detection telemetry in preallocated numpy arrays.
+
+    Every match records a call, the best score of the frame (hit or miss) into a
+    fixed-bucket histogram over [0, 1], and the time spent matching; `detect()`
+    also records the time its own capture took. Hits are counted only for calls
+    that knew their threshold ("judged"), so `hit_rate` is hits / judged.
+    Frames grabbed once and matched against several templates are counted in
+    `frames` / `frame_capture_s` instead of per template.
+
+    Recording is a dict lookup plus a few array increments under a lock; a
+    template beyond `capacity` is dropped (logged once).
+    """
+
+    def __init__(self, capacity: int = 256, bins: int = 20) -> None:
+        self.capacity = max(1, int(capacity))
+        self.bins = max(2, int(bins))
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._overflow = False
+        self.started = time.time()
+        self.frames = 0
+        self.frame_capture_s = 0.0
+        # The arrays are allocated by the first record, so importing l9 doesn't import numpy
+        self._allocated = False
+
+    def _allocate(self) -> bool:
+        """Allocate the counters (lock held); turns metrics off if numpy is missing."""
+        if not np:
+            self.enabled = False
+            return False
+        n = self.capacity
+        self.calls = np.zeros(n, dtype=np.int64)
+        self.judged = np.zeros(n, dtype=np.int64)
+        self.hits = np.zeros(n, dtype=np.int64)
+        self.capture_s = np.zeros(n, dtype=np.float64)
+        self.match_s = np.zeros(n, dtype=np.float64)
+        self.match_max_s = np.zeros(n, dtype=np.float64)
+        self.score_sum = np.zeros(n, dtype=np.float64)
+        self.hist = np.zeros((n, self.bins), dtype=np.int64)
+        self._allocated = True
+        return True
+
+    def _slot(self, template: str) -> int:
+        i = self._slots.get(template)
+        if i is None:
+            if len(self._slots) >= self.capacity:
+                if not self._overflow:
+                    logger.warning("Detect metrics full (%d templates); not tracking %s", self.capacity, template)
+                    self._overflow = True
+                return -1
+            i = self._slots[template] = len(self._slots)
+        return i
+
+    def record(
+        self,
+        template: str,
+        score: float,
+        match_s: float,
+        hit: Optional[bool] = None,
+        capture_s: float = 0.0,
+    ) -> None:
+        if not self.enabled:
+            return
+        b = min(self.bins - 1, max(0, int(score * self.bins)))
+        with self._lock:
+            if not self._allocated and not self._allocate():
+                return
+            i = self._slot(template)
+            if i < 0:
+                return
+            self.calls[i] += 1
+            if hit is not None:
+                self.judged[i] += 1
+                self.hits[i] += 1 if hit else 0
+            self.capture_s[i] += capture_s
+            self.match_s[i] += match_s
+            if match_s > self.match_max_s[i]:
+                self.match_max_s[i] = match_s
+            self.score_sum[i] += score
+            self.hist[i, b] += 1
+
+    def record_capture(self, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.frames += 1
+            self.frame_capture_s += seconds
+
+    def reset(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._slots = {}
+            self._overflow = False
+            if self._allocated:
+                for a in (self.calls, self.judged, self.hits, self.capture_s, self.match_s, self.match_max_s, self.score_sum, self.hist):
+                    a.fill(0)
+            self.frames = 0
+            self.frame_capture_s = 0.0
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Copy of the counters as plain JSON-able values, templates sorted by match time."""
+        if not self.enabled:
+            return {"templates": []}
+        with self._lock:
+            rows: List[dict] = []
+            for templ, i in self._slots.items():
+                calls = int(self.calls[i])
+                judged = int(self.judged[i])
+                rows.append({
+                    "template": templ,
+                    "calls": calls,
+                    "hits": int(self.hits[i]),
+                    "hit_rate": round(int(self.hits[i]) / judged, 4) if judged else None,
+                    "capture_ms": round(float(self.capture_s[i]) * 1000.0, 3),
+                    "match_ms": round(float(self.match_s[i]) * 1000.0, 3),
+                    "match_mean_ms": round(float(self.match_s[i]) * 1000.0 / calls, 3) if calls else 0.0,
+                    "match_max_ms": round(float(self.match_max_s[i]) * 1000.0, 3),
+                    "score_mean": round(float(self.score_sum[i]) / calls, 4) if calls else 0.0,
+                    "score_hist": self.hist[i].tolist(),
+                })
+            out = {
+                "since": round(self.started, 3),
+                "bins": self.bins,
+                "frames": self.frames,
+                "frame_capture_ms": round(self.frame_capture_s * 1000.0, 3),
+            }
+        rows.sort(key=lambda r: r["match_ms"], reverse=True)
+        out["templates"] = rows
+        return out
+
+    def dump(self, path: str) -> Optional[str]:
+        """Write `snapshot()` as JSON to `path`; returns the path, or None if nothing was recorded."""
+        snap = self.snapshot()
+        if not snap["templates"]:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snap, f, indent=2)
+        return path
+
+    def log_summary(self, top: int = 10) -> None:
+        for r in self.snapshot()["templates"][:top]:
+            logger.info(
+                "detect %s: calls=%d hit_rate=%s match=%.0fms (mean %.1fms) capture=%.0fms score_mean=%.3f",
+                os.path.basename(r["template"]), r["calls"],
+                "%.2f" % r["hit_rate"] if r["hit_rate"] is not None else "-",
+                r["match_ms"], r["match_mean_ms"], r["capture_ms"], r["score_mean"],
+            )
+
+
+# Process-wide registry shared by every Vision instance
+METRICS = DetectMetrics()
+_exit_path: Optional[str] = None
+_exit_registered = False
+
+
+def _dump_at_exit() -> None:
+    if _exit_path is None:
+        return
+    try:
+        path = METRICS.dump(_exit_path)
+        if path:
+            logger.info("Detect metrics written to %s", path)
+    except Exception as e:  # pragma: no cover
+        logger.warning("Could not write detect metrics: %s", e)
+
+
+def configure(cfg: dict) -> DetectMetrics:
+    """Apply the `metrics` config section to METRICS (enable, exit dump path)."""
+    global _exit_path, _exit_registered
+    mcfg = cfg.get("metrics", {}) or {}
+    METRICS.enabled = bool(mcfg.get("enabled", True))
+    new_path = str(mcfg.get("dump_path", "logs/detect_metrics.json")) if mcfg.get("dump_at_exit", True) else None
+    if new_path and not _exit_registered:
+        atexit.register(_dump_at_exit)
+        _exit_registered = True
+    _exit_path = new_path
+    return METRICS
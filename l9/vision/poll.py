@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from ..clock import CLOCK
+from ..lazy import optional
+from ..profiling import timed
+from ..settings import settings_for
+
+np = optional("numpy")
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class PollStats:
+    """What one `AdaptivePoller.run` call did, for latency tuning."""
+
+    label: str = ""
+    frames: int = 0
+    probes: int = 0
+    skipped: int = 0
+    hit: bool = False
+    elapsed_s: float = 0.0
+    # Time from grabbing the frame that contained the element to the result.
+    capture_to_hit_s: float = 0.0
+    # The element appeared somewhere between the previous frame and the hit frame;
+    # worst-case detection latency is capture_to_hit_s + appear_window_s.
+    appear_window_s: float = 0.0
+    # True when the element was already visible on the first frame (no latency to report).
+    first_frame: bool = False
+
+
+def frame_changed(prev, cur, thresh: float, stride: int = 8, block: int = 4) -> bool:
+    """Cheap change test: largest per-tile mean absolute difference over a strided subsample.
+
+    The subsample is cut into `block` x `block` tiles (32x32 px with the
+    defaults). A small element appearing, such as a button or a dialog,
+    raises its tile's mean well above `thresh` even though it hardly moves
+    the mean of the whole frame.
+    """
+    if prev is None or cur is None or not np:
+        return True
+    if getattr(prev, "shape", None) != getattr(cur, "shape", None):
+        return True
+    a = prev[::stride, ::stride].astype(np.int16)
+    b = cur[::stride, ::stride].astype(np.int16)
+    diff = np.abs(a - b)
+    channels = 1
+    if diff.ndim == 3:
+        # Adding the channel planes is much faster than a sum over the (strided) last axis
+        channels = diff.shape[2]
+        total = diff[..., 0].copy()
+        for c in range(1, channels):
+            total += diff[..., c]
+        diff = total
+    h, w = diff.shape
+    ph, pw = -h % block, -w % block
+    if ph or pw:
+        # Edge tiles repeat their last row/column rather than being diluted by padding
+        diff = np.pad(diff, ((0, ph), (0, pw)), mode="edge")
+    hb, wb = diff.shape[0] // block, diff.shape[1] // block
+    rows = diff.reshape(hb, block, wb * block).sum(axis=1, dtype=np.int32)
+    tiles = rows.reshape(hb, wb, block).sum(axis=2)
+    return int(tiles.max()) > thresh * channels * block * block
+
+
+class AdaptivePoller:
+    """Frame-driven wait loop.
+
+    Each iteration grabs a frame. The (expensive) probe only runs when the frame
+    differs from the last probed one, or when `refresh_s` has passed without a
+    probe. The sleep between iterations starts at `min_interval_s`, grows by
+    `backoff` while nothing changes (up to `max_interval_s`), and is never shorter
+    than what keeps probe time under `cpu_budget` of wall time.
+    """
+
+    def __init__(
+        self,
+        min_interval_s: float = 0.02,
+        max_interval_s: float = 0.25,
+        backoff: float = 1.5,
+        cpu_budget: float = 0.5,
+        change_thresh: float = 2.0,
+        refresh_s: float = 1.0,
+    ) -> None:
+        self.min_interval_s = max(0.0, min_interval_s)
+        self.max_interval_s = max(self.min_interval_s, max_interval_s)
+        self.backoff = max(1.0, backoff)
+        self.cpu_budget = min(1.0, max(0.05, cpu_budget))
+        self.change_thresh = change_thresh
+        self.refresh_s = refresh_s
+        self.last: Optional[PollStats] = None
+
+    @classmethod
+    def from_cfg(cls, cfg: dict, max_interval_s: Optional[float] = None) -> "AdaptivePoller":
+        return cls.from_settings(settings_for(cfg), max_interval_s)
+
+    @classmethod
+    def from_settings(cls, s, max_interval_s: Optional[float] = None) -> "AdaptivePoller":
+        """Poller paced by `s.timings.poll_*` (`s` from `l9.settings.settings_for`)."""
+        t = s.timings
+        return cls(
+            min_interval_s=t.poll_min_ms / 1000.0,
+            max_interval_s=max_interval_s if max_interval_s is not None else t.poll_max_ms / 1000.0,
+            backoff=t.poll_backoff,
+            cpu_budget=t.poll_cpu_budget,
+            change_thresh=t.poll_change_thresh,
+            refresh_s=t.poll_refresh_ms / 1000.0,
+        )
+
+    @timed("detect")
+    def run(
+        self,
+        probe: Callable[[object], Optional[T]],
+        timeout_s: float,
+        grab: Optional[Callable[[], object]] = None,
+        on_tick: Optional[Callable[[], None]] = None,
+        label: str = "",
+        sleep: Optional[Callable[[float], None]] = None,
+    ) -> Optional[T]:
+        """Poll until `probe(frame)` returns something truthy or `timeout_s` passes.
+
+        `grab` supplies frames; without it every iteration probes (with `None`)
+        and only the backoff/budget pacing applies. `sleep` replaces `CLOCK.sleep`
+        between iterations (e.g. a cancellable one).
+        """
+        sleep = sleep or CLOCK.sleep
+        stats = PollStats(label=label)
+        self.last = stats
+        start = CLOCK.now()
+        deadline = start + max(0.0, timeout_s)
+        interval = self.min_interval_s
+        prev_probed = None
+        prev_grab_t: Optional[float] = None
+        last_probe_t = 0.0
+        while True:
+            if on_tick is not None:
+                on_tick()
+            t_grab = CLOCK.now()
+            frame = grab() if grab is not None else None
+            stats.frames += 1
+            changed = grab is None or frame_changed(prev_probed, frame, self.change_thresh)
+            stale = (t_grab - last_probe_t) >= self.refresh_s
+            cost = CLOCK.now() - t_grab
+            if changed or stale:
+                t_probe = CLOCK.now()
+                res = probe(frame)
+                now = CLOCK.now()
+                cost = now - t_grab
+                stats.probes += 1
+                last_probe_t = t_probe
+                prev_probed = frame
+                if res:
+                    stats.hit = True
+                    stats.elapsed_s = now - start
+                    stats.capture_to_hit_s = now - t_grab
+                    stats.first_frame = prev_grab_t is None
+                    stats.appear_window_s = 0.0 if prev_grab_t is None else t_grab - prev_grab_t
+                    self._report(stats)
+                    return res
+                interval = self.min_interval_s if changed else min(self.max_interval_s, interval * self.backoff)
+            else:
+                stats.skipped += 1
+                interval = min(self.max_interval_s, interval * self.backoff)
+            prev_grab_t = t_grab
+            now = CLOCK.now()
+            if now >= deadline:
+                break
+            # Keep busy time (grab + probe) within the CPU budget.
+            budget_floor = cost * (1.0 - self.cpu_budget) / self.cpu_budget
+            sleep(min(max(interval, budget_floor), deadline - now))
+        stats.elapsed_s = CLOCK.now() - start
+        return None
+
+    def _report(self, stats: PollStats) -> None:
+        if stats.first_frame:
+            logger.info(
+                "detect latency %s: visible on first frame (%.0f ms)",
+                stats.label, stats.capture_to_hit_s * 1000.0,
+            )
+            return
+        logger.info(
+            "detect latency %s: %.0f-%.0f ms after appearance (frames=%d probes=%d skipped=%d waited=%.2fs)",
+            stats.label,
+            stats.capture_to_hit_s * 1000.0,
+            (stats.capture_to_hit_s + stats.appear_window_s) * 1000.0,
+            stats.frames,
+            stats.probes,
+            stats.skipped,
+            stats.elapsed_s,
+        )
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ..clock import CLOCK, Timer
+from ..reload import RELOADER
+from ..settings import settings_for
+from .capture import ScreenCapture
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Frame:
+    seq: int
+    t: float  # CLOCK.now() at grab
+    image: object  # BGR ndarray of the whole configured monitor
+    origin: Tuple[int, int]  # absolute screen (left, top) of image[0, 0]
+
+
+class FrameStream:
+    """Background capture of the configured monitor at a fixed rate.
+
+    Consumers read the newest frame with `latest()` or block for the next one
+    with `wait_next()`. The stream owns its ScreenCapture, so it never touches
+    the `last_origin` of the capture used by flows. Pass `capture` (e.g.
+    `vision.capture.fork(multi_screen=False)`) to grab from another source.
+
+    Under a virtual CLOCK there is no thread: frames are grabbed on a clock
+    timer, i.e. inline whenever the flow thread sleeps past the next slot.
+    """
+
+    def __init__(self, cfg: dict, fps: float = 10.0, capture=None) -> None:
+        self.cfg = cfg
+        s = settings_for(cfg)
+        self.capture = capture or ScreenCapture(
+            monitor_index=s.monitor_index,
+            dpi_scale=s.dpi_scale,
+            debug_dir=s.debug.dir,
+            # Watch conditions use monitor-relative ROIs, like the pyautogui checks
+            multi_screen=False,
+        )
+        self.period_s = 1.0 / max(0.5, float(fps))
+        self._cond = threading.Condition()
+        self._frame: Optional[Frame] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[Timer] = None
+        RELOADER.subscribe(self)
+
+    def apply_settings(self, s, changed) -> None:
+        """Take a reloaded config: a new monitor or scale applies from the next grab."""
+        if changed & {"monitor_index", "dpi_scale"}:
+            self.capture.reconfigure(s.monitor_index, s.dpi_scale, self.capture.multi_screen)
+
+    def start(self) -> "FrameStream":
+        if self._timer is not None or (self._thread is not None and self._thread.is_alive()):
+            return self
+        # Fail fast in the caller's thread if capture is unavailable
+        self._publish(self.capture.grab())
+        self._stop.clear()
+        if CLOCK.virtual:
+            self._timer = CLOCK.schedule(self.period_s, self._tick, period=self.period_s)
+            return self
+        self._thread = threading.Thread(target=self._run, name="l9-frames", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def latest(self) -> Optional[Frame]:
+        with self._cond:
+            return self._frame
+
+    def wait_next(self, after_seq: int, timeout_s: float) -> Optional[Frame]:
+        """Block until a frame newer than `after_seq` exists (or timeout/stop)."""
+        if self._timer is not None:
+            return self._wait_virtual(after_seq, timeout_s)
+        deadline = CLOCK.now() + max(0.0, timeout_s)
+        with self._cond:
+            while not self._stop.is_set():
+                if self._frame is not None and self._frame.seq > after_seq:
+                    return self._frame
+                remaining = deadline - CLOCK.now()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        return None
+
+    def _wait_virtual(self, after_seq: int, timeout_s: float) -> Optional[Frame]:
+        # Sleeping the clock runs the capture timer, which publishes the next frame
+        deadline = CLOCK.now() + max(0.0, timeout_s)
+        while not self._stop.is_set():
+            frame = self._frame
+            if frame is not None and frame.seq > after_seq:
+                return frame
+            remaining = deadline - CLOCK.now()
+            if remaining <= 0:
+                return None
+            CLOCK.sleep(min(self.period_s, remaining))
+        return None
+
+    def _publish(self, image) -> None:
+        with self._cond:
+            seq = self._frame.seq + 1 if self._frame is not None else 1
+            self._frame = Frame(seq=seq, t=CLOCK.now(), image=image, origin=self.capture.last_origin)
+            self._cond.notify_all()
+
+    def _tick(self) -> None:
+        try:
+            self._publish(self.capture.grab())
+        except Exception as e:
+            logger.warning("Frame stream capture failed: %s", e)
+
+    def _run(self) -> None:
+        next_t = CLOCK.now()
+        while not self._stop.is_set():
+            self._tick()
+            next_t += self.period_s
+            delay = next_t - CLOCK.now()
+            if delay < 0:
+                # Capture slower than the target rate; don't try to catch up
+                next_t = CLOCK.now()
+                delay = 0.0
+            self._stop.wait(delay)
@@ -0,0 +1,69 @@
+"""Convert recorded grind paths between JSON (v2/v3) and the binary v4 format.
+
+Each input is written next to itself with the other extension (`spot1.json`
+-> `spot1.l9p`, or back with `--to json`); the source file is kept. Once a
+`.l9p` file exists it is the one replay and the recorders use. Without inputs,
+every JSON path in l9/data/grind_paths is converted.
+
+Usage:
+  python scripts/convert_path.py [FILE ...] [--to v4|json] [--out PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from l9.paths.binary import EXT, save_path
+from l9.paths.compiled import load_path
+
+
+def convert(src: str, dst: str) -> None:
+    t0 = time.perf_counter()
+    cp = load_path(src)
+    load_ms = 1000 * (time.perf_counter() - t0)
+    save_path(dst, cp)
+    t0 = time.perf_counter()
+    load_path(dst)
+    reload_ms = 1000 * (time.perf_counter() - t0)
+    print("%s -> %s: %d segment(s), %d event(s), %d -> %d bytes, load %.2f -> %.2f ms" % (
+        src, dst, cp.segment_count, len(cp), os.path.getsize(src), os.path.getsize(dst), load_ms, reload_ms))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Convert grind path files between JSON and binary v4")
+    ap.add_argument("files", nargs="*", help="path files (default: l9/data/grind_paths/*.json)")
+    ap.add_argument("--to", choices=("v4", "json"), default="v4")
+    ap.add_argument("--out", default=None, help="output file (single input only)")
+    args = ap.parse_args(argv)
+
+    files = args.files or sorted(glob.glob(os.path.join(REPO_ROOT, "l9", "data", "grind_paths", "*.json")))
+    if not files:
+        print("No path files to convert")
+        return 1
+    if args.out and len(files) != 1:
+        ap.error("--out needs exactly one input file")
+    ext = EXT if args.to == "v4" else ".json"
+    failed = 0
+    for src in files:
+        dst = args.out or os.path.splitext(src)[0] + ext
+        if os.path.abspath(dst) == os.path.abspath(src):
+            print(f"{src}: already {args.to}")
+            continue
+        try:
+            convert(src, dst)
+        except Exception as e:
+            print(f"{src}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
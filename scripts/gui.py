@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import importlib.util
 import os
 import queue
+import signal
 import subprocess
 import sys
 import threading
@@ -9,13 +11,6 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 from tkinter import ttk
 import time
-try:
-    # Ensure multi-monitor screenshots for potion check
-    from PIL import ImageGrab  # type: ignore
-    from functools import partial
-    ImageGrab.grab = partial(ImageGrab.grab, all_screens=True)
-except Exception:
-    pass
 import shutil
 
 try:
@@ -81,6 +76,12 @@ if REPO_ROOT not in sys.path:
 
 from l9.config_loader import load_config
 from l9.actions.window import WindowManager
+from l9.daemon import RECORD_FLOW, TEST_PATH_FLOW, RunnerClient, ensure_runner
+from l9.events import RunStats, parse_line
+from l9.paths.binary import resolve_path_file, save_path
+from l9.paths.compiled import OP_CLICK
+from l9.paths.recorder import PathRecorder
+from l9.settings import settings_for
 
 
 def repo_path(*parts: str) -> str:
@@ -128,6 +129,15 @@ class LauncherGUI:
         self.log_queue: queue.Queue[str] = queue.Queue()
         self.reader_thread: threading.Thread | None = None
         self._stop_event = threading.Event()
+        # Warm runner (run_flow.py --serve): flows, recording and path tests run there
+        self.runner: RunnerClient | None = None
+        self._runner_lock = threading.Lock()
+        self._runner_active = False
+        self._run_done = threading.Event()
+        self._run_outcome: str | None = None
+        # Live dashboard totals, folded from the runner's event batches off the Tk thread
+        self.stats = RunStats()
+        self._dash_version = -1
 
         # Internal config path reference
         self.cfg_path = repo_path("l9", "config.yaml")
@@ -249,6 +259,24 @@ class LauncherGUI:
         self.asset_status_label.pack(side=tk.RIGHT)
         self._update_asset_status()
 
+        # Live status (event stream from the runner)
+        dash_frame = tk.Frame(main_frame, bg='#f5f5f5')
+        dash_frame.pack(fill=tk.X, pady=(0, 15))
+
+        tk.Frame(dash_frame, height=1, bg='#cccccc').pack(fill=tk.X, pady=(0, 10))
+        tk.Label(dash_frame, text="Live Status", font=("Roboto", 12, "bold"),
+                 fg='#333333', bg='#f5f5f5').pack(anchor=tk.W, pady=(0, 6))
+
+        self.dash_state_var = tk.StringVar(value="State: idle")
+        self.dash_cycles_var = tk.StringVar(value="Cycles: 0")
+        self.dash_detect_var = tk.StringVar(value="")
+        tk.Label(dash_frame, textvariable=self.dash_state_var, font=("Roboto", 10),
+                 fg='#333333', bg='#f5f5f5', anchor=tk.W).pack(fill=tk.X)
+        tk.Label(dash_frame, textvariable=self.dash_cycles_var, font=("Roboto", 10),
+                 fg='#333333', bg='#f5f5f5', anchor=tk.W).pack(fill=tk.X)
+        tk.Label(dash_frame, textvariable=self.dash_detect_var, font=("Consolas", 9),
+                 fg='#666666', bg='#f5f5f5', anchor=tk.W, justify=tk.LEFT).pack(fill=tk.X, pady=(4, 0))
+
         # Console Output Section
         console_frame = tk.Frame(main_frame, bg='#f5f5f5')
         console_frame.pack(fill=tk.BOTH, expand=True)
@@ -271,6 +299,7 @@ class LauncherGUI:
         # Close handler and log polling
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.after(100, self._poll_log_queue)
+        self.root.after(500, self._poll_dashboard)
 
         # Safety & ToS reminder removed
 
@@ -299,8 +328,14 @@ class LauncherGUI:
             messagebox.showerror("Config", "PyYAML not installed. Install with: python -m pip install pyyaml")
             return False
         try:
-            with open(self.cfg_path, "w", encoding="utf-8") as f:
+            # Write then rename, so a running flow's config watcher never reads a half-written file
+            tmp = self.cfg_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
                 yaml.safe_dump(cfg, f, sort_keys=False)
+            os.replace(tmp, self.cfg_path)
+            if self.runner is not None:
+                # Applied now if the runner is idle, else at the running flow's next state
+                self.runner.call("reload", timeout_s=1.0)
             return True
         except Exception as e:
             messagebox.showerror("Config", str(e))
@@ -351,7 +386,7 @@ class LauncherGUI:
             if self._save_cfg(cfg):
                 self._append_log(f"Monitor selection changed to Monitor {selected_monitor} (1920x1080)\n")
                 self._append_log(f"Config updated: monitor_index={selected_monitor}, force_to_monitor_index={selected_monitor}\n")
-                self._append_log("Click 'Start' to apply the new monitor setting.\n")
+                self._append_log("A running flow picks it up at its next state; otherwise it applies on Start.\n")
         except Exception as e:
             self._append_log(f"Error changing monitor: {e}\n")
 
@@ -509,7 +544,12 @@ class LauncherGUI:
             for line in iter(proc.stdout.readline, ""):
                 if not line:
                     break
-                self.log_queue.put(line)
+                # run_flow.py --events interleaves event batches with the log lines
+                batch = parse_line(line)
+                if batch is not None:
+                    self.stats.apply(batch)
+                else:
+                    self.log_queue.put(line)
         except Exception as e:
             self.log_queue.put(f"[reader error] {e}\n")
 
@@ -522,6 +562,122 @@ class LauncherGUI:
             pass
         self.root.after(100, self._poll_log_queue)
 
+    def _poll_dashboard(self):
+        # Repaint at most twice a second, and only when a batch arrived since the last paint
+        view = self.stats.view()
+        if view["version"] != self._dash_version:
+            self._dash_version = view["version"]
+            self._render_dashboard(view)
+        self.root.after(500, self._poll_dashboard)
+
+    def _render_dashboard(self, view: dict) -> None:
+        self.dash_state_var.set(f"State: {view['state'] or 'idle'}")
+        parts = [f"Cycles: {view['cycles']}" + (f" (+{view['aborted']} aborted)" if view["aborted"] else "")]
+        if view["cycles_per_hour"] is not None:
+            parts.append(f"{view['cycles_per_hour']:.1f}/h")
+        if view["cycle_avg_s"] is not None:
+            parts.append(f"avg cycle {view['cycle_avg_s']:.1f}s")
+        if view["refill_avg_s"] is not None:
+            parts.append(f"avg refill {view['refill_avg_s']:.1f}s")
+        self.dash_cycles_var.set("   ".join(parts))
+        rows = []
+        for d in view["detect"]:
+            rate = f"{100.0 * d['hit_rate']:3.0f}%" if d["hit_rate"] is not None else "   -"
+            name = os.path.splitext(os.path.basename(d["template"]))[0]
+            rows.append(f"{name[:28]:28s} {d['calls']:6d} calls  hit {rate}  best {d['best']:.2f}  last {d['last']:.2f}")
+        self.dash_detect_var.set("\n".join(rows))
+
+    def _runner_cmd(self) -> list[str]:
+        if getattr(sys, "frozen", False):
+            runner_exe = os.path.join(os.path.dirname(sys.executable), "LordnineRunner.exe")
+            return [runner_exe, "--serve", "--config", self.cfg_path]
+        return [sys.executable, "-u", repo_path("scripts", "run_flow.py"), "--serve", "--config", self.cfg_path]
+
+    def _runner(self) -> RunnerClient | None:
+        """Client for the warm runner, starting it if needed; None if it won't start.
+
+        Starting takes as long as a cold run_flow.py, so call this off the Tk thread.
+        """
+        with self._runner_lock:
+            if self.runner is not None and not self.runner.closed.is_set():
+                return self.runner
+            d = settings_for(self._load_cfg()).daemon
+            client = ensure_runner(
+                self._runner_cmd(),
+                repo_path(d.state_path),
+                self.cfg_path,
+                timeout_s=d.spawn_timeout_s,
+                cwd=REPO_ROOT,
+                log_path=repo_path(d.log_path),
+                on_message=self._on_runner_message,
+            )
+            if client is None:
+                self.log_queue.put(f"[warn] Runner did not start (see {d.log_path}); using a new process per run\n")
+                return None
+            client.call("subscribe")
+            self.runner = client
+            return client
+
+    def _on_runner_message(self, msg: dict) -> None:
+        # Runner client's reader thread: log text goes to the Tk thread through log_queue,
+        # event batches into self.stats, which the Tk thread samples in _poll_dashboard
+        kind = msg.get("type")
+        if kind == "log":
+            self.log_queue.put(msg.get("text", ""))
+        elif kind == "events":
+            self.stats.apply(msg.get("events") or [])
+        elif kind == "run" and msg.get("event") == "finished":
+            if msg.get("error"):
+                self.log_queue.put(f"[error] {msg.get('flow')}: {msg.get('error')}\n")
+            self._run_outcome = msg.get("outcome")
+            self._run_done.set()
+        elif kind == "disconnected":
+            if self._runner_active:
+                self.log_queue.put("[error] Lost connection to the runner\n")
+            self._run_done.set()
+
+    def _run_in_runner(self, flow: str) -> str | None:
+        """Run `flow` in the warm runner and wait for it; its outcome, or None without a runner."""
+        client = self._runner()
+        if client is None:
+            return None
+        self._run_outcome = None
+        self._run_done.clear()
+        r = client.call("start", flow=flow)
+        if not r.get("ok"):
+            self.log_queue.put(f"[error] Runner did not start {flow}: {r.get('error')}\n")
+            return "failed"
+        self._runner_active = True
+        try:
+            self._run_done.wait()
+        finally:
+            self._runner_active = False
+        return self._run_outcome or "failed"
+
+    def _run_in_process(self, flow: str) -> int:
+        """Fallback without a runner: run `flow` in a new run_flow.py process; its exit code."""
+        if getattr(sys, "frozen", False):
+            runner_exe = os.path.join(os.path.dirname(sys.executable), "LordnineRunner.exe")
+            cmd = [runner_exe, "--flow", flow, "--config", self.cfg_path, "--events"]
+        else:
+            cmd = [sys.executable, "-u", repo_path("scripts", "run_flow.py"), "--flow", flow, "--config", self.cfg_path, "--events"]
+        self.proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            cwd=REPO_ROOT,
+            # Own process group so stop() can send CTRL_BREAK to the runner only
+            creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0),
+        )
+        self.reader_thread = threading.Thread(target=self._reader, args=(self.proc,), daemon=True)
+        self.reader_thread.start()
+        return self.proc.wait()
+
+    def _is_running(self) -> bool:
+        return self._runner_active or (self.proc is not None and self.proc.poll() is None)
+
     def _apply_current_monitor_selection(self):
         """Apply the current monitor selection from dropdown to config."""
         try:
@@ -562,7 +718,7 @@ class LauncherGUI:
             self._append_log(f"Error applying monitor selection: {e}\n")
 
     def start(self):
-        if self.proc and self.proc.poll() is None:
+        if self._is_running():
             messagebox.showwarning("Already running", "Automation is already running.")
             return
         
@@ -626,9 +782,8 @@ class LauncherGUI:
         # Dependencies check
         missing = []
         for mod in ("mss", "cv2", "numpy", "pyautogui", "yaml"):
-            try:
-                __import__(mod)
-            except Exception:
+            # find_spec doesn't import: the GUI process never needs OpenCV itself
+            if importlib.util.find_spec(mod) is None:
                 missing.append(mod)
         if missing:
             messagebox.showerror(
@@ -667,62 +822,25 @@ class LauncherGUI:
             pass
 
         # Kick off the fixed sequence on a background thread to avoid blocking the GUI
+        self.stats.reset()
         self.start_btn.configure(state=tk.DISABLED)
         self.stop_btn.configure(state=tk.NORMAL)
         self.running_btn.config(text="Running", fg='white', bg='#333333')
 
         def run_sequence():
             try:
-                def build_cmd(flow_str: str) -> list[str]:
-                    is_frozen = getattr(sys, "frozen", False)
-                    if is_frozen:
-                        runner_exe = os.path.join(os.path.dirname(sys.executable), "LordnineRunner.exe")
-                        return [runner_exe, "--flow", flow_str, "--config", cfg]
-                    else:
-                        return [
-                            sys.executable,
-                            "-u",
-                            repo_path("scripts", "run_flow.py"),
-                            "--flow",
-                            flow_str,
-                            "--config",
-                            cfg,
-                        ]
-
-                # Check potion status first
-                def is_potion_empty() -> bool:
-                    try:
-                        import pyautogui as pag  # type: ignore
-                    except ModuleNotFoundError:
-                        return False
-                    t_path = os.path.join(REPO_ROOT, "l9", "assets", "ui", "hud", "potion_empty.png")
-                    conf = float((self._load_cfg().get("buy_potions", {}) or {}).get("pyauto_threshold", 0.9))
-                    try:
-                        box = pag.locateOnScreen(t_path, confidence=conf)
-                        return box is not None
-                    except Exception:
-                        return False
-
                 # Defer all checks and refill logic to GrindRefillLoop only
                 flows = [
                     "l9.flows.grind_refill_loop:GrindRefillLoop",
                 ]
                 for idx, fstr in enumerate(flows, start=1):
                     self.log_queue.put(f"\n=== Step {idx}/{len(flows)}: {fstr} ===\n")
-                    cmd = build_cmd(fstr)
-                    self.proc = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                        bufsize=1,
-                        cwd=REPO_ROOT,
-                    )
-                    self.reader_thread = threading.Thread(target=self._reader, args=(self.proc,), daemon=True)
-                    self.reader_thread.start()
-                    rc = self.proc.wait()
-                    if rc not in (0, 130):
-                        self.log_queue.put(f"Step failed with code {rc}. Aborting.\n")
+                    outcome = self._run_in_runner(fstr)
+                    if outcome is None:
+                        rc = self._run_in_process(fstr)
+                        outcome = "failed" if rc not in (0, 130) else "done"
+                    if outcome == "failed":
+                        self.log_queue.put("Step failed. Aborting.\n")
                         break
             except Exception as e:
                 # marshal error to UI thread via log
@@ -893,21 +1011,15 @@ class LauncherGUI:
             area_id = str(g.get("area_id") or "default")
         root = os.path.join(REPO_ROOT, "l9", "data", "grind_paths")
         os.makedirs(root, exist_ok=True)
-        return os.path.join(root, f"{area_id}.json")
+        return resolve_path_file(root, area_id, str(g.get("path_format", "v4")))
 
     def _record_path_direct(self, spot_id: int, auto_gates: bool = False):
-        """Record path directly without launching external scripts."""
-        try:
-            import keyboard  # type: ignore
-        except ModuleNotFoundError:
-            self._append_log("[ERROR] The 'keyboard' module is required. Install with: python -m pip install keyboard\n")
-            return
-        
-        try:
-            import mouse  # type: ignore
-        except ModuleNotFoundError:
-            mouse = None  # type: ignore
-        
+        """Record the active spot's path, in the warm runner when it is available.
+
+        The runner records with RecordPathFlow; without one the shared
+        hook-driven recorder runs on a background thread here. Either way the
+        window stays responsive and progress goes to the log.
+        """
         cfg = self._load_cfg()
         gcfg = cfg.get("grind", {}) or {}
         stop_key = str(gcfg.get("record_stop_key", "f12"))
@@ -926,75 +1038,33 @@ class LauncherGUI:
         # Get output path
         out_path = self._grind_path_file(cfg)
         
-        allowed = set(rec_keys)
-        start = time.perf_counter()
-        events = []
-        
-        def on_key(e):
-            try:
-                name = (e.name or "").lower()
-                if name in allowed and e.event_type in ("down", "up"):
-                    t = time.perf_counter() - start
-                    events.append({"t": t, "type": e.event_type, "key": name})
-            except Exception:
-                pass
-        
-        def on_mouse_click(e=None):
-            if mouse is None:
-                return
-            try:
-                t = time.perf_counter() - start
-                events.append({"t": t, "type": "mclick", "x": e.x, "y": e.y, "button": e.button})
-            except Exception:
-                pass
+        def _record():
+            outcome = self._run_in_runner(RECORD_FLOW)
+            if outcome is None:
+                self._record_local(rec_keys, stop_key, out_path)
+            elif outcome == "done" and os.path.exists(out_path):
+                self.log_queue.put(f"Saved path to {out_path}\n")
         
-        # Set up hooks
-        recording = True
-        
-        def on_key_with_stop(e):
-            # Check for stop key first
-            if e.name and e.name.lower() == stop_key.lower() and e.event_type == "down":
-                nonlocal recording
-                recording = False
-                return
-            # Otherwise handle normal key recording
-            on_key(e)
-        
-        keyboard.hook(on_key_with_stop)
-        mouse_hook = None
-        if mouse is not None:
-            try:
-                mouse_hook = mouse.hook(on_mouse_click)
-            except Exception:
-                pass
-        
-        # Wait for stop key
+        threading.Thread(target=_record, name="l9-record-path", daemon=True).start()
+
+    def _record_local(self, rec_keys: list[str], stop_key: str, out_path: str) -> None:
+        rec = PathRecorder(rec_keys, stop_key=stop_key)
         try:
-            while recording:
-                time.sleep(0.01)
-        except KeyboardInterrupt:
-            pass
+            rec.start()
+        except RuntimeError:
+            self.log_queue.put("[ERROR] The 'keyboard' module is required. Install with: python -m pip install keyboard\n")
+            return
+        try:
+            path = rec.run()
         finally:
-            try:
-                keyboard.unhook_all()
-            except Exception:
-                pass
-            if mouse is not None and mouse_hook is not None:
-                try:
-                    if hasattr(mouse, "unhook"):
-                        mouse.unhook(mouse_hook)
-                except Exception:
-                    pass
-        
-        # Save the recorded path
-        with open(out_path, "w", encoding="utf-8") as f:
-            import json
-            json.dump({"version": 2, "events": events}, f, indent=2)
-        
-        n_clicks = sum(1 for e in events if e.get("type") == "mclick")
-        n_keys = sum(1 for e in events if e.get("type") in ("down", "up", "kdown", "kup"))
-        self._append_log(f"Saved path to {out_path} ({len(events)} events; {n_clicks} clicks, {n_keys} key events)\n")
-
+            rec.close()
+        try:
+            save_path(out_path, path)
+        except Exception as e:
+            self.log_queue.put(f"[ERROR] Failed to save path: {e}\n")
+            return
+        n_clicks = sum(1 for o in path.op if o == OP_CLICK)
+        self.log_queue.put(f"Saved path to {out_path} ({len(path)} events; {n_clicks} clicks, {len(path) - n_clicks} key events)\n")
 
     def open_manage_spots(self):
         cfg = self._load_cfg_raw()
@@ -1105,36 +1175,14 @@ class LauncherGUI:
                 if not os.path.exists(pth):
                     messagebox.showwarning("Test Path", f"No recorded path found: {pth}\nRecord one first.")
                     return
-                try:
-                    self._append_log(f"Testing recorded path: {pth}\n")
-                    cmd = [
-                        sys.executable,
-                        "-u",
-                        repo_path("scripts", "run_flow.py"),
-                        "--flow",
-                        "l9.flows.test_path:TestPathFlow",
-                        "--config",
-                        self.cfg_path,
-                    ]
-                    proc = subprocess.Popen(
-                        cmd,
-                        cwd=REPO_ROOT,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                        bufsize=1,
-                    )
-                    def _reader3():
-                        for line in iter(proc.stdout.readline, ""):
-                            if not line:
-                                break
-                            self._append_log(line)
-                    t3 = threading.Thread(target=_reader3, daemon=True)
-                    t3.start()
-                    proc.wait()
-                    self._append_log("Test path finished.\n")
-                except Exception as e:
-                    messagebox.showerror("Test Path", str(e))
+                self._append_log(f"Testing recorded path: {pth}\n")
+
+                def _test():
+                    if self._run_in_runner(TEST_PATH_FLOW) is None:
+                        self._run_in_process(TEST_PATH_FLOW)
+                    self.log_queue.put("Test path finished.\n")
+
+                threading.Thread(target=_test, name="l9-test-path", daemon=True).start()
 
             tk.Button(win, text="Record Path", command=record_for_this_spot).grid(row=row, column=3, sticky="w", padx=(8,0))
             tk.Button(win, text="Record Auto", command=record_auto_for_this_spot).grid(row=row, column=4, sticky="w", padx=(8,0))
@@ -1158,32 +1206,50 @@ class LauncherGUI:
     def stop(self):
         # signal any waiting loops to stop
         self._stop_event.set()
+        if self._runner_active and self.runner is not None:
+            # The runner unwinds the flow (releasing held keys) and stays up for the next run
+            self.runner.call("stop", wait_s=3.0, timeout_s=4.0)
+            self.start_btn.configure(state=tk.NORMAL)
+            self.stop_btn.configure(state=tk.DISABLED)
+            self.running_btn.config(text="Idle", fg='#666666', bg='#e0e0e0')
+            return
         if not self.proc or self.proc.poll() is not None:
             self.start_btn.configure(state=tk.NORMAL)
             self.stop_btn.configure(state=tk.DISABLED)
             self.running_btn.config(text="Idle", fg='#666666', bg='#e0e0e0')
             return
-        # Stopping automation
+        # Stopping automation: ask the runner to stop cooperatively (it releases
+        # held keys and exits within a poll interval), then escalate
         try:
-            self.proc.terminate()
+            if hasattr(signal, "CTRL_BREAK_EVENT"):
+                self.proc.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                self.proc.terminate()  # SIGTERM; handled by run_flow
         except Exception:
             pass
         try:
             self.proc.wait(timeout=3)
         except Exception:
             try:
-                self.proc.kill()
+                self.proc.terminate()
+                self.proc.wait(timeout=2)
             except Exception:
-                pass
+                try:
+                    self.proc.kill()
+                except Exception:
+                    pass
         self.start_btn.configure(state=tk.NORMAL)
         self.stop_btn.configure(state=tk.DISABLED)
         self.running_btn.config(text="Idle", fg='#666666', bg='#e0e0e0')
 
     def on_close(self):
-        if self.proc and self.proc.poll() is None:
+        if self._is_running():
             if not messagebox.askyesno("Quit", "Automation is running. Stop and exit?"):
                 return
             self.stop()
+        if self.runner is not None:
+            # The runner exits by itself after daemon.idle_exit_s without a client
+            self.runner.close()
         self.root.destroy()
 
 
@@ -0,0 +1,106 @@
+"""Compact recorded grind paths and report the replay time saved per spot.
+
+Removes what recording leaves behind without changing how the character
+moves: idle time before the first event of each segment, auto-repeat key
+downs, unmatched key ups, keys outside the allow-list (`grind.record_keys`
+by default, or --keys) and idle gaps (no key held) longer than --max-gap-s.
+Time between kept events is otherwise unchanged. See l9/paths/optimize.py.
+
+Without --write only the report is printed. --write replaces each file in its
+own format; --out writes a single input elsewhere.
+
+Usage:
+  python scripts/optimize_path.py [FILE ...] [--keys w,a,s,d] [--drop-keys esc]
+                                  [--max-gap-s 1.0] [--lead-s 0] [--write | --out PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from l9.config_loader import load_config
+from l9.paths.binary import EXT, save_path
+from l9.paths.compiled import load_path
+from l9.paths.optimize import OptimizeOptions, optimize
+
+
+def default_files() -> list:
+    # One file per spot; a .l9p recording wins over a .json one of the same name
+    root = os.path.join(REPO_ROOT, "l9", "data", "grind_paths")
+    by_name = {}
+    for f in sorted(glob.glob(os.path.join(root, "*.json"))) + sorted(glob.glob(os.path.join(root, "*" + EXT))):
+        by_name[os.path.splitext(os.path.basename(f))[0]] = f
+    return [by_name[k] for k in sorted(by_name)]
+
+
+def split(arg) -> list:
+    return [k.strip().lower() for k in str(arg).split(",") if k.strip()] if arg else []
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compact recorded grind paths")
+    ap.add_argument("files", nargs="*", help="path files (default: every spot in l9/data/grind_paths)")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--keys", default=None, help="comma list of keys to keep (default: grind.record_keys)")
+    ap.add_argument("--drop-keys", default=None, help="comma list of keys to drop even if allowed, e.g. esc")
+    ap.add_argument("--all-keys", action="store_true", help="keep every key (only --drop-keys are removed)")
+    ap.add_argument("--max-gap-s", type=float, default=1.0, help="cut idle gaps to this (negative: keep gaps)")
+    ap.add_argument("--lead-s", type=float, default=0.0, help="idle kept before each segment's first event")
+    ap.add_argument("--write", action="store_true", help="overwrite the input files")
+    ap.add_argument("--out", default=None, help="output file (single input only)")
+    args = ap.parse_args(argv)
+
+    files = args.files or default_files()
+    if not files:
+        print("No path files found")
+        return 1
+    if args.out and len(files) != 1:
+        ap.error("--out needs exactly one input file")
+
+    cfg = load_config(args.config)
+    rec_keys = (cfg.get("grind", {}) or {}).get("record_keys")
+    keys = split(args.keys) if args.keys else [str(k).lower() for k in rec_keys] if isinstance(rec_keys, list) else None
+    drop = set(split(args.drop_keys))
+    if args.all_keys:
+        keys = None
+    if drop:
+        if keys is None:
+            # Allow everything recorded except the dropped keys
+            keys = {n.lower() for f in files for n in load_path(f).names}
+        keys = [k for k in keys if k not in drop]
+    opts = OptimizeOptions(keys=keys, lead_s=max(0.0, args.lead_s),
+                           max_gap_s=args.max_gap_s if args.max_gap_s >= 0 else None)
+
+    failed = 0
+    total_saved = 0.0
+    for src in files:
+        try:
+            new, report = optimize(load_path(src), opts)
+        except Exception as e:
+            print(f"{src}: {e}")
+            failed += 1
+            continue
+        total_saved += report.saved_s
+        print(f"{os.path.basename(src)}: {report.summary()}")
+        for i, s in enumerate(report.segments):
+            print("  segment %d: %.2fs -> %.2fs (lead %.2fs, %d gap(s) %.2fs; dropped %d stray key, %d repeat, %d orphan up)" % (
+                i + 1, s.duration_before_s, s.duration_after_s, s.lead_trimmed_s, s.gaps_shortened, s.gap_trimmed_s,
+                s.dropped_keys, s.repeat_downs, s.orphan_ups))
+        dst = args.out or (src if args.write else None)
+        if dst:
+            save_path(dst, new)
+            print(f"  wrote {dst}")
+    if len(files) > 1:
+        print("total replay time saved: %.2fs" % total_saved)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Summarize profiler traces: p50/p95 per state and per refill/grind cycle.
+
+Reads the JSONL trace written with `profile.enabled` (or `run_flow.py --profile`),
+including rotated files, across all runs it contains. States are sorted by total
+time so the waits worth attacking first are on top; the sleep/detect/input
+columns are each bucket's share of that state's time.
+
+Usage:
+  python scripts/profile_summary.py [--trace logs/profile.jsonl] [--run RUN_ID] [--flow GrindFlow]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from l9.profiling import BUCKETS
+
+
+def trace_files(path: str) -> List[str]:
+    # Oldest rotation first: profile.jsonl.5 ... profile.jsonl.1, profile.jsonl
+    rotated = [p for p in glob.glob(path + ".*") if p.rsplit(".", 1)[1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    return [p for p in rotated + [path] if os.path.isfile(p)]
+
+
+def read_records(paths: Iterable[str]) -> Iterable[dict]:
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def pct(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, math.ceil(q / 100.0 * len(s)) - 1))
+    return s[k]
+
+
+def row(name: str, recs: List[dict]) -> str:
+    durs = [r["dur_s"] for r in recs]
+    total = sum(durs)
+    shares = ["%5.0f%%" % (100.0 * sum(r.get(b + "_s", 0.0) for r in recs) / total if total > 0 else 0.0) for b in BUCKETS]
+    return "%-40s %6d %9.1f %8.2f %8.2f %s" % (name[:40], len(recs), total, pct(durs, 50), pct(durs, 95), " ".join(shares))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Summarize l9 profiler traces")
+    ap.add_argument("--trace", default="logs/profile.jsonl")
+    ap.add_argument("--run", default=None, help="only this run id")
+    ap.add_argument("--flow", default=None, help="only states of this flow class")
+    args = ap.parse_args(argv)
+
+    paths = trace_files(args.trace)
+    if not paths:
+        print(f"No trace found at {args.trace}")
+        return 2
+    states: Dict[str, List[dict]] = defaultdict(list)
+    cycles: List[dict] = []
+    aborted = 0
+    runs = set()
+    for r in read_records(paths):
+        if args.run and r.get("run") != args.run:
+            continue
+        runs.add(r.get("run"))
+        if r.get("type") == "cycle":
+            if r.get("outcome", "done") == "done":
+                cycles.append(r)
+            else:
+                aborted += 1
+        elif r.get("type") == "state" and (not args.flow or r.get("flow") == args.flow):
+            states["%s.%s" % (r.get("flow"), r.get("state"))].append(r)
+
+    header = "%-40s %6s %9s %8s %8s %s" % ("state", "n", "total_s", "p50_s", "p95_s", " ".join("%6s" % b for b in BUCKETS))
+    extra = f" (+{aborted} aborted)" if aborted else ""
+    print(f"{len(runs)} run(s), {len(cycles)} cycle(s){extra} from {len(paths)} file(s)\n")
+    print(header)
+    for name, recs in sorted(states.items(), key=lambda kv: -sum(r["dur_s"] for r in kv[1])):
+        print(row(name, recs))
+    if cycles:
+        print()
+        print(row("cycle (refill + grind)", cycles))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import sys
 import time
@@ -12,6 +11,9 @@ if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
 from l9.config_loader import load_config
+from l9.paths.binary import resolve_path_file, save_path
+from l9.paths.compiled import OP_CLICK
+from l9.paths.recorder import PathRecorder
 
 
 def path_file(cfg: dict) -> str:
@@ -20,149 +22,55 @@ def path_file(cfg: dict) -> str:
     area_id = str(g.get("area_id") or f"spot{int(g.get('active_spot_id', 1))}")
     root = os.path.join("l9", "data", "grind_paths")
     os.makedirs(root, exist_ok=True)
-    return os.path.join(root, f"{area_id}.json")
+    return resolve_path_file(root, area_id, str(g.get("path_format", "v4")))
 
 
-def record(cfg: dict, out_path: str) -> int:
+def _rec_keys(g: dict, default_keys: list) -> list:
+    cfg_keys = g.get("record_keys") if isinstance(g.get("record_keys"), list) else None
+    return [str(k).lower() for k in (cfg_keys or default_keys)]
+
+
+def _start(rec: PathRecorder) -> bool:
     try:
-        import keyboard  # type: ignore
-    except ModuleNotFoundError:
+        rec.start()
+    except RuntimeError:
         print("[ERROR] The 'keyboard' module is required. Install with: python -m pip install keyboard")
-        return 2
-    try:
-        import mouse  # type: ignore
-    except ModuleNotFoundError:
-        mouse = None  # type: ignore
+        return False
+    if rec.record_mouse:
+        if rec.mouse_source is not None:
+            print("- Mouse clicks will also be recorded")
+        else:
+            print("- Mouse clicks are not recorded; install 'mouse' for mouse hooks")
+    return True
+
+
+def _counts(path) -> tuple[int, int]:
+    n_clicks = sum(1 for o in path.op if o == OP_CLICK)
+    return n_clicks, len(path) - n_clicks
+
+
+def record(cfg: dict, out_path: str) -> int:
     g = (cfg.get("grind", {}) or {})
     stop_key = str(g.get("record_stop_key", "f12"))
     # Keys to record (configurable)
-    default_keys = ["w", "a", "s", "d"]
-    cfg_keys = g.get("record_keys") if isinstance(g.get("record_keys"), list) else None
-    rec_keys = [str(k).lower() for k in (cfg_keys or default_keys)]
+    rec_keys = _rec_keys(g, ["w", "a", "s", "d"])
     print("\n=== Grind Path Recorder ===")
     print("- Focus the game window")
     print("- Teleport to your grind area")
     print(f"- Walk to the spot using: {', '.join(rec_keys).upper()}")
-    if mouse is not None:
-        print("- Mouse clicks will also be recorded")
-    else:
-        print("- Mouse clicks recorded via Windows fallback; or install 'mouse' for full hooks")
     print(f"- Press {stop_key} to finish recording\n")
 
-    allowed = set(rec_keys)
-    start = time.perf_counter()
-    events = []
-
-    def on_key(e):
-        try:
-            name = (e.name or "").lower()
-            if name in allowed and e.event_type in ("down", "up"):
-                t = time.perf_counter() - start
-                events.append({"t": t, "type": e.event_type, "key": name})
-        except Exception:
-            pass
-
-    def on_mouse_click(e=None):  # type: ignore[no-redef]
-        if mouse is None:
-            return
-        try:
-            x, y = mouse.get_position()  # type: ignore[attr-defined]
-            btn = None
-            try:
-                btn = getattr(e, "button", None)
-            except Exception:
-                btn = None
-            if not btn:
-                btn = "left"
-            t = time.perf_counter() - start
-            events.append({"t": t, "type": "mclick", "button": str(btn), "x": int(x), "y": int(y)})
-        except Exception:
-            pass
-
-    keyboard.hook(on_key)
-    mouse_hook = None
+    rec = PathRecorder(rec_keys, stop_key=stop_key)
+    if not _start(rec):
+        return 2
     try:
-        if mouse is not None:
-            try:
-                if hasattr(mouse, "on_click"):
-                    mouse_hook = mouse.on_click(on_mouse_click)  # type: ignore[attr-defined]
-                else:
-                    def _mouse_any(ev):
-                        try:
-                            if getattr(ev, "event_type", "") == "down":
-                                on_mouse_click(ev)
-                        except Exception:
-                            pass
-                    mouse_hook = mouse.hook(_mouse_any)  # type: ignore[attr-defined]
-            except Exception:
-                mouse_hook = None
-        # WinAPI polling fallback for mouse clicks (no deps)
-        last_l = 0
-        last_r = 0
-        def _cursor_pos() -> tuple[int, int] | None:
-            try:
-                import pyautogui as pag  # type: ignore
-                p = pag.position()
-                return int(p.x), int(p.y)
-            except Exception:
-                pass
-            try:
-                import ctypes
-                from ctypes import wintypes
-                class POINT(ctypes.Structure):
-                    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
-                pt = POINT()
-                ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
-                return int(pt.x), int(pt.y)
-            except Exception:
-                return None
-        def _poll_clicks_win():
-            nonlocal last_l, last_r
-            try:
-                import ctypes
-                user32 = ctypes.windll.user32
-                VK_LBUTTON = 0x01
-                VK_RBUTTON = 0x02
-                def down(vk):
-                    return (user32.GetAsyncKeyState(vk) & 0x8000) != 0
-                l = 1 if down(VK_LBUTTON) else 0
-                r = 1 if down(VK_RBUTTON) else 0
-                if l and not last_l:
-                    pos = _cursor_pos()
-                    if pos:
-                        t = time.perf_counter() - start
-                        events.append({"t": t, "type": "mclick", "button": "left", "x": pos[0], "y": pos[1]})
-                if r and not last_r:
-                    pos = _cursor_pos()
-                    if pos:
-                        t = time.perf_counter() - start
-                        events.append({"t": t, "type": "mclick", "button": "right", "x": pos[0], "y": pos[1]})
-                last_l, last_r = l, r
-            except Exception:
-                pass
-        while True:
-            if keyboard.is_pressed(stop_key):
-                break
-            if mouse is None:
-                _poll_clicks_win()
-            time.sleep(0.01)
+        path = rec.run()
     finally:
-        try:
-            keyboard.unhook(on_key)
-        except Exception:
-            pass
-        if mouse is not None and mouse_hook is not None:
-            try:
-                if hasattr(mouse, "unhook"):
-                    mouse.unhook(mouse_hook)  # type: ignore[attr-defined]
-            except Exception:
-                pass
+        rec.close()
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump({"version": 2, "events": events}, f, indent=2)
-    n_clicks = sum(1 for e in events if e.get("type") == "mclick")
-    n_keys = sum(1 for e in events if e.get("type") in ("down", "up", "kdown", "kup"))
-    print(f"Saved path to {out_path} ({len(events)} events; {n_clicks} clicks, {n_keys} key events)")
+    save_path(out_path, path)
+    n_clicks, n_keys = _counts(path)
+    print(f"Saved path to {out_path} ({len(path)} events; {n_clicks} clicks, {n_keys} key events)")
     return 0
 
 
@@ -199,26 +107,17 @@ def record_auto_gates(cfg: dict, out_path: str) -> int:
     - When keys idle for a short time, try to detect an OK/confirm button.
       If found, click it, wait for loading (teleport wait + bag icon), then
       finalize current segment and start a new one. Repeat until F12 is pressed.
-    - Writes version 3 JSON with segments.
+    - Writes one segment per gate (v4, or v3 JSON with grind.path_format: json).
     """
-    try:
-        import keyboard  # type: ignore
-    except ModuleNotFoundError:
-        print("[ERROR] The 'keyboard' module is required. Install with: python -m pip install keyboard")
-        return 2
-    try:
-        import pyautogui as pag  # type: ignore
-    except ModuleNotFoundError:
-        pag = None  # type: ignore
+    from l9.actions.backends import pyautogui as pag  # searches every monitor
     g = (cfg.get("grind", {}) or {})
     dcfg = (cfg.get("dungeon", {}) or {})
     stop_key = str(g.get("record_stop_key", "f12"))
     # Keys & timings
-    default_keys = ["w", "a", "s", "d", "e", "z"]
-    cfg_keys = g.get("record_keys") if isinstance(g.get("record_keys"), list) else None
-    rec_keys = [str(k).lower() for k in (cfg_keys or default_keys)]
-    allowed = set(rec_keys)
-    idle_ms = 600  # idle threshold before gate detect
+    rec_keys = _rec_keys(g, ["w", "a", "s", "d", "e", "z"])
+    # Gate detection starts once keys are idle this long, then runs at most every interval
+    idle_s = float(g.get("record_gate_idle_ms", 600)) / 1000.0
+    interval_s = float(g.get("record_gate_interval_ms", 500)) / 1000.0
     # Gate detection
     ok_templates = []
     # Prefer a flat list if provided
@@ -250,36 +149,6 @@ def record_auto_gates(cfg: dict, out_path: str) -> int:
     print("- When you stop, I will try to click OK and wait for loading")
     print(f"- Press {stop_key.upper()} to finish. Supports multiple entrances in sequence.\n")
 
-    start_seg = time.perf_counter()
-    segments: list[dict] = []
-    events: list[dict] = []
-    pressed: set[str] = set()
-    last_activity = time.perf_counter()
-    gate_counter = 0
-
-    def push_segment():
-        nonlocal events
-        if events:
-            segments.append({"id": f"segment{len(segments)+1}", "events": list(events)})
-            events.clear()
-
-    def on_key(e):
-        nonlocal last_activity
-        try:
-            name = (e.name or "").lower()
-            if name in allowed and e.event_type in ("down", "up"):
-                t = time.perf_counter() - start_seg
-                events.append({"t": t, "type": e.event_type, "key": name})
-                last_activity = time.perf_counter()
-                if e.event_type == "down":
-                    pressed.add(name)
-                else:
-                    pressed.discard(name)
-        except Exception:
-            pass
-
-    keyboard.hook(on_key)
-
     def try_click_ok() -> bool:
         # Quick scan: check templates once; if visible, click
         if not pag or not ok_templates:
@@ -323,194 +192,52 @@ def record_auto_gates(cfg: dict, out_path: str) -> int:
                 pass
             time.sleep(0.2)
 
+    rec = PathRecorder(rec_keys, stop_key=stop_key, record_mouse=False)
+    if not _start(rec):
+        return 2
     try:
-        while True:
-            if keyboard.is_pressed(stop_key):
-                push_segment()
-                break
-            # If idle and previously active, try a gate
-            idle_for = (time.perf_counter() - last_activity) * 1000.0
-            if not pressed and idle_for >= idle_ms:
-                # Attempt gate detection/click
-                clicked = try_click_ok()
-                if clicked:
-                    gate_counter += 1
-                    push_segment()
-                    # reset segment timer
-                    start_seg = time.perf_counter()
-                    wait_loading()
-                    last_activity = time.perf_counter()
-                    continue
-            time.sleep(0.01)
+        path = rec.run(gate=try_click_ok, after_gate=wait_loading, gate_idle_s=idle_s, gate_interval_s=interval_s)
     finally:
-        try:
-            keyboard.unhook(on_key)
-        except Exception:
-            pass
+        rec.close()
 
-    if not segments:
+    if not len(path):
         print("No segments recorded.")
         return 1
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump({"version": 3, "segments": segments}, f, indent=2)
-    n_clicks = sum(1 for s in segments for e in s.get("events", []) if e.get("type") == "mclick")
-    n_keys = sum(1 for s in segments for e in s.get("events", []) if e.get("type") in ("down", "up", "kdown", "kup"))
-    print(f"Saved auto-gated path to {out_path} ({len(segments)} segments; {n_keys} key events)")
+    save_path(out_path, path)
+    n_clicks, n_keys = _counts(path)
+    print(f"Saved auto-gated path to {out_path} ({path.segment_count} segments; {n_keys} key events)")
     return 0
+
+
 def record_multi(cfg: dict, out_path: str) -> int:
-    try:
-        import keyboard  # type: ignore
-    except ModuleNotFoundError:
-        print("[ERROR] The 'keyboard' module is required. Install with: python -m pip install keyboard")
-        return 2
-    try:
-        import mouse  # type: ignore
-    except ModuleNotFoundError:
-        mouse = None  # type: ignore
     g = (cfg.get("grind", {}) or {})
     stop_key = str(g.get("record_stop_key", "f12"))
     split_key = str(g.get("record_split_key", "f9")).lower()
     # Keys to record (configurable)
-    default_keys = ["w", "a", "s", "d"]
-    cfg_keys = g.get("record_keys") if isinstance(g.get("record_keys"), list) else None
-    rec_keys = [str(k).lower() for k in (cfg_keys or default_keys)]
-    allowed = set(rec_keys)
+    rec_keys = _rec_keys(g, ["w", "a", "s", "d"])
     print("\n=== Grind Path Recorder (Multi-Segment) ===")
     print("- Focus the game window")
     print("- Walk/click a segment using: " + ", ".join([k.upper() for k in rec_keys]))
     print(f"- Press {split_key.upper()} to start a new segment; press {stop_key.upper()} to finish\n")
-    if mouse is not None:
-        print("- Mouse clicks will also be recorded")
-    else:
-        print("- Mouse clicks recorded via Windows fallback; or install 'mouse' for full hooks")
-
-    start = time.perf_counter()
-    segments = []  # list of dicts: {id, events}
-    current_events = []
-
-    def on_key(e):
-        try:
-            name = (e.name or "").lower()
-            if name == split_key and e.event_type == "down":
-                if current_events:
-                    segments.append({"id": f"segment{len(segments)+1}", "events": list(current_events)})
-                    current_events.clear()
-                    print(f"[split] Started new segment (total: {len(segments)})")
-                return
-            if name in allowed and e.event_type in ("down", "up"):
-                t = time.perf_counter() - start
-                current_events.append({"t": t, "type": e.event_type, "key": name})
-        except Exception:
-            pass
-
-    def on_mouse_click(e=None):  # type: ignore[no-redef]
-        if mouse is None:
-            return
-        try:
-            x, y = mouse.get_position()  # type: ignore[attr-defined]
-            btn = None
-            try:
-                btn = getattr(e, "button", None)
-            except Exception:
-                btn = None
-            if not btn:
-                btn = "left"
-            t = time.perf_counter() - start
-            current_events.append({"t": t, "type": "mclick", "button": str(btn), "x": int(x), "y": int(y)})
-        except Exception:
-            pass
-
-    keyboard.hook(on_key)
-    mouse_hook = None
+
+    def on_split(n: int) -> None:
+        print(f"[split] Started new segment (total: {n})")
+
+    rec = PathRecorder(rec_keys, stop_key=stop_key, split_key=split_key, on_split=on_split)
+    if not _start(rec):
+        return 2
     try:
-        if mouse is not None:
-            try:
-                if hasattr(mouse, "on_click"):
-                    mouse_hook = mouse.on_click(on_mouse_click)  # type: ignore[attr-defined]
-                else:
-                    def _mouse_any(ev):
-                        try:
-                            if getattr(ev, "event_type", "") == "down":
-                                on_mouse_click(ev)
-                        except Exception:
-                            pass
-                    mouse_hook = mouse.hook(_mouse_any)  # type: ignore[attr-defined]
-            except Exception:
-                mouse_hook = None
-        # WinAPI polling fallback for mouse clicks (no deps)
-        last_l = 0
-        last_r = 0
-        def _cursor_pos() -> tuple[int, int] | None:
-            try:
-                import pyautogui as pag  # type: ignore
-                p = pag.position()
-                return int(p.x), int(p.y)
-            except Exception:
-                pass
-            try:
-                import ctypes
-                from ctypes import wintypes
-                class POINT(ctypes.Structure):
-                    _fields_ = [("x", wintypes.LONG), ("y", wintypes.LONG)]
-                pt = POINT()
-                ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
-                return int(pt.x), int(pt.y)
-            except Exception:
-                return None
-        def _poll_clicks_win():
-            nonlocal last_l, last_r
-            try:
-                import ctypes
-                user32 = ctypes.windll.user32
-                VK_LBUTTON = 0x01
-                VK_RBUTTON = 0x02
-                def down(vk):
-                    return (user32.GetAsyncKeyState(vk) & 0x8000) != 0
-                l = 1 if down(VK_LBUTTON) else 0
-                r = 1 if down(VK_RBUTTON) else 0
-                if l and not last_l:
-                    pos = _cursor_pos()
-                    if pos:
-                        t = time.perf_counter() - start
-                        current_events.append({"t": t, "type": "mclick", "button": "left", "x": pos[0], "y": pos[1]})
-                if r and not last_r:
-                    pos = _cursor_pos()
-                    if pos:
-                        t = time.perf_counter() - start
-                        current_events.append({"t": t, "type": "mclick", "button": "right", "x": pos[0], "y": pos[1]})
-                last_l, last_r = l, r
-            except Exception:
-                pass
-        while True:
-            if keyboard.is_pressed(stop_key):
-                break
-            if mouse is None:
-                _poll_clicks_win()
-            time.sleep(0.01)
+        path = rec.run()
     finally:
-        try:
-            keyboard.unhook(on_key)
-        except Exception:
-            pass
-        if mouse is not None and mouse_hook is not None:
-            try:
-                if hasattr(mouse, "unhook"):
-                    mouse.unhook(mouse_hook)  # type: ignore[attr-defined]
-            except Exception:
-                pass
-
-    if current_events:
-        segments.append({"id": f"segment{len(segments)+1}", "events": list(current_events)})
+        rec.close()
 
-    if not segments:
+    if not len(path):
         print("No segments recorded.")
         return 1
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump({"version": 3, "segments": segments}, f, indent=2)
-    n_clicks = sum(1 for s in segments for e in s.get("events", []) if e.get("type") == "mclick")
-    n_keys = sum(1 for s in segments for e in s.get("events", []) if e.get("type") in ("down", "up", "kdown", "kup"))
-    print(f"Saved multi-segment path to {out_path} ({len(segments)} segments; {n_clicks} clicks, {n_keys} key events)")
+    save_path(out_path, path)
+    n_clicks, n_keys = _counts(path)
+    print(f"Saved multi-segment path to {out_path} ({path.segment_count} segments; {n_clicks} clicks, {n_keys} key events)")
     return 0
 
 
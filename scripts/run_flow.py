@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import argparse
-import importlib
 import logging
 import os
+import signal
 import sys
 
 # Ensure repo root on sys.path when running as a script
@@ -14,10 +14,6 @@ REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
 if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
-from l9.config_loader import load_config
-from l9.vision.match import Vision
-from l9.actions.input import Actions
-
 
 def setup_logging(level: str) -> None:
     lvl = getattr(logging, level.upper(), logging.WARNING)  # Default to WARNING for stealth
@@ -27,14 +23,27 @@ def setup_logging(level: str) -> None:
     )
 
 
-def load_flow(flow_path: str):
-    if ":" in flow_path:
-        mod_name, cls_name = flow_path.split(":", 1)
-    else:
-        mod_name, cls_name = flow_path, "Flow"
-    mod = importlib.import_module(mod_name)
-    cls = getattr(mod, cls_name)
-    return cls
+def install_stop_handlers(on_stop=None) -> None:
+    """Turn Ctrl+C, SIGTERM and (Windows) CTRL_BREAK into a cooperative stop.
+
+    The flow unwinds through its own finally blocks (releasing held keys)
+    instead of being killed mid-action. `on_stop(reason)` replaces the
+    default `request_stop` (the daemon shuts down instead).
+    """
+    from l9.actions.safety import request_stop
+
+    stop = on_stop or request_stop
+
+    def _on_signal(signum, _frame):
+        stop(f"signal {signum}")
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            try:
+                signal.signal(sig, _on_signal)
+            except (OSError, ValueError):
+                pass
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -42,21 +51,65 @@ def main(argv: list[str] | None = None) -> int:
     p.add_argument("--flow", default="l9.flows.example.demo:DemoFlow", help="module:Class of the flow to run")
     p.add_argument("--config", default="l9/config.yaml")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--profile", action="store_true", help="write per-state timings to profile.trace_path")
+    p.add_argument("--trace", default=None, metavar="PATH", help="write a Chrome/Perfetto trace of the run to PATH")
+    p.add_argument("--no-reload", action="store_true", help="ignore config file changes while running")
+    p.add_argument("--serve", action="store_true", help="stay running and take commands from the GUI (see l9/daemon.py)")
+    p.add_argument("--events", action="store_true", help="write live event batches (l9/events.py) to stdout between log lines")
     args = p.parse_args(argv)
 
+    # Imported after parsing so --help and argument errors return without loading l9
+    from l9.config_loader import load_config
+    from l9.vision.match import Vision
+    from l9.actions.input import Actions
+    from l9.flows.runtime import FlowRuntime, Outcome, load_flow
+    from l9.profiling import PROFILER
+    from l9.reload import RELOADER
+    from l9.events import EVENTS, stream_sink
+    from l9.tracing import TRACER
+
     cfg = load_config(args.config)
     setup_logging(cfg.get("debug", {}).get("log_level", "INFO"))
+    PROFILER.configure(cfg, enabled=True if args.profile else None)
+    if args.trace:
+        TRACER.start(args.trace)
+    events_sink = None
 
     try:
+        if args.serve:
+            from l9.daemon import RunnerDaemon
+
+            daemon = RunnerDaemon(cfg, args.config, dry_run=args.dry_run)
+            install_stop_handlers(daemon.shutdown)
+            if not args.no_reload:
+                RELOADER.watch(args.config, cfg)
+            daemon.warm()
+            return daemon.serve()
         vision = Vision(cfg, dry_run=args.dry_run)
         actions = Actions(cfg, dry_run=args.dry_run)
         FlowCls = load_flow(args.flow)
         flow = FlowCls(vision, actions, cfg, dry_run=args.dry_run)
-        flow.run()
+        install_stop_handlers()
+        if not args.no_reload:
+            RELOADER.watch(args.config, cfg)
+        if args.events:
+            events_sink = stream_sink(sys.stdout)
+            EVENTS.subscribe(events_sink)
+        result = FlowRuntime(cfg).run(flow)
+        if result.outcome is Outcome.FAILED and result.error is not None:
+            raise result.error
+        if result.outcome is not Outcome.DONE:
+            logging.getLogger(__name__).info("Flow %s after %.1fs", result.outcome.name.lower(), result.elapsed_s)
+            return 130
         return 0
     except KeyboardInterrupt:
         # Runner interrupted; exiting cleanly
         return 130
+    finally:
+        if events_sink is not None:
+            EVENTS.unsubscribe(events_sink)
+        RELOADER.stop()
+        TRACER.stop()
 
 
 if __name__ == "__main__":
@@ -44,11 +44,14 @@ def guess_potion_region(cfg: dict) -> tuple[int, int, int, int] | None:
         return region
 
     # Else try to locate potion_has or potion_empty templates inside hud_anchor
+    from l9.actions.backends import pyautogui as pag  # searches every monitor
+
     try:
-        import pyautogui as pag  # type: ignore
         import mss  # type: ignore
     except ModuleNotFoundError:
         return to_abs_region(cfg, "hud_anchor")
+    if not pag:
+        return to_abs_region(cfg, "hud_anchor")
     mon_idx = int(cfg.get("monitor_index", 1))
     with mss.mss() as s:
         mons = s.monitors
@@ -0,0 +1,156 @@
+"""Run GrindRefillLoop end to end against the headless game simulator.
+
+No game, display or input devices needed: frames come from `l9.sim.game.GameSim`
+and every click and key press goes back into it. The run stops after
+`--cycles` refill/grind cycles (or `--timeout` seconds of real time) and
+prints each cycle's time from potions out to the next auto-battle, split at the
+game's milestones. Exits 1 if fewer cycles completed, so it can gate CI.
+
+By default the run uses a virtual clock (`l9.clock`): every sleep and timeout
+completes instantly and the frame stream and watcher run inline, so a cycle
+costs only its detection and rendering work. Cycle times are still reported in
+game seconds. `--real-time` runs on the real clock with the usual threads.
+
+Usage:
+  python scripts/sim_run.py [--cycles 3] [--config l9/config.yaml] [--potion-s 8] [--loading-s 2.5]
+                            [--death-every 0] [--real-time] [--profile] [--trace PATH] [--out sim.json]
+
+With --profile, per-state timings go to logs/sim_profile.jsonl; summarize them
+with `python scripts/profile_summary.py --trace logs/sim_profile.jsonl`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from l9.actions.input import Actions
+from l9.actions.safety import clear_stop, request_stop
+from l9.clock import CLOCK
+from l9.config_loader import deep_update, load_config
+from l9.flows.grind_refill_loop import GrindRefillLoop
+from l9.flows.runtime import FlowRuntime, Outcome
+from l9.profiling import PROFILER
+from l9.sim.devices import SimInput, SimVision
+from l9.sim.game import GameSim, SimOptions
+from l9.tracing import TRACER
+
+
+# The simulated screen is one monitor; human-like pauses only add noise to timings
+SIM_CFG = {
+    "multi_screen": False,
+    "window": {"require_foreground": False, "require_maximized": False, "auto_focus": False, "click_to_focus": False},
+    "timings": {"random_action_pause": False},
+    "profile": {"trace_path": "logs/sim_profile.jsonl"},
+    "metrics": {"dump_at_exit": False},
+}
+MILESTONES = ("town", "dismantled", "purchased", "teleport", "battle")
+
+
+def run(cfg: dict, opts: SimOptions, cycles: int, timeout_s: float):
+    def on_cycle(cycle) -> None:
+        if cycle.index >= cycles:
+            request_stop("simulated cycles done")
+
+    game = GameSim(cfg, opts, on_cycle=on_cycle)
+    vision = SimVision(cfg, game)
+    actions = Actions(cfg, backend=SimInput(game))
+    loop = GrindRefillLoop(vision, actions, cfg)
+
+    done = threading.Event()
+
+    def watchdog() -> None:
+        if not done.wait(timeout_s):
+            request_stop("simulation timeout")
+
+    clear_stop()
+    t0 = time.perf_counter()
+    threading.Thread(target=watchdog, name="l9-sim-stop", daemon=True).start()
+    try:
+        result = FlowRuntime(cfg).run(loop)
+    finally:
+        done.set()
+        clear_stop()
+    return game, result, time.perf_counter() - t0
+
+
+def report(game: GameSim) -> list:
+    rows = []
+    print("%-6s %-6s %9s  %s" % ("cycle", "from", "total_s", "  ".join("%10s" % m for m in MILESTONES)))
+    for c in game.cycles:
+        marks = {m: round(c.marks[m] - c.start_t, 3) for m in MILESTONES if m in c.marks}
+        rows.append({"cycle": c.index, "reason": c.reason, "dur_s": round(c.dur_s, 3), "marks": marks})
+        cells = "  ".join("%10s" % ("%.2f" % marks[m] if m in marks else "-") for m in MILESTONES)
+        print("%-6d %-6s %9.2f  %s" % (c.index, c.reason, c.dur_s, cells))
+    # The first cycle starts with the simulator, not with potions running out
+    steady = [r["dur_s"] for r in rows if r["reason"] != "start"] or [r["dur_s"] for r in rows]
+    if steady:
+        print("\ncycle time: mean %.2fs  min %.2fs  max %.2fs  (%d cycle(s))" % (
+            sum(steady) / len(steady), min(steady), max(steady), len(steady)))
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Run GrindRefillLoop against the game simulator")
+    ap.add_argument("--config", default="l9/config.yaml")
+    ap.add_argument("--cycles", type=int, default=3, help="stop after this many refill/grind cycles")
+    ap.add_argument("--timeout", type=float, default=600.0, help="give up after this many seconds of real time")
+    ap.add_argument("--potion-s", type=float, default=SimOptions.potion_s, help="battle time until potions run out")
+    ap.add_argument("--loading-s", type=float, default=SimOptions.loading_s)
+    ap.add_argument("--pathing-s", type=float, default=SimOptions.pathing_s)
+    ap.add_argument("--death-every", type=int, default=0, help="every Nth battle ends in death (0: never)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--real-time", action="store_true", help="run on the real clock instead of a virtual one")
+    ap.add_argument("--profile", action="store_true", help="write per-state timings to logs/sim_profile.jsonl")
+    ap.add_argument("--trace", default=None, metavar="PATH", help="write a Chrome/Perfetto trace of the run")
+    ap.add_argument("--out", default=None, help="write the cycle table as JSON")
+    ap.add_argument("--log-level", default="WARNING")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING),
+                        format="%(asctime)s %(levelname)s %(name)s | %(message)s")
+    cfg = deep_update(load_config(args.config), SIM_CFG)
+    PROFILER.configure(cfg, enabled=True if args.profile else None)
+    if args.trace:
+        TRACER.start(args.trace)
+    opts = SimOptions(
+        potion_s=args.potion_s,
+        loading_s=args.loading_s,
+        pathing_s=args.pathing_s,
+        death_every=args.death_every,
+        seed=args.seed,
+    )
+    if not args.real_time:
+        CLOCK.set_virtual()
+    try:
+        game, result, wall = run(cfg, opts, args.cycles, args.timeout)
+    finally:
+        TRACER.stop()
+        CLOCK.set_real()
+
+    print("GrindRefillLoop %s after %.1fs (%.1fs game time): %d cycle(s), %d click(s), %d key press(es)" % (
+        result.outcome.name.lower(), wall, result.elapsed_s, len(game.cycles), game.clicks, game.presses))
+    print("%.2f cycle(s) per real second\n" % (len(game.cycles) / wall if wall > 0 else 0.0))
+    rows = report(game)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"options": vars(opts), "virtual": not args.real_time, "wall_s": round(wall, 3),
+                       "game_s": round(result.elapsed_s, 3), "cycles": rows}, f, indent=2)
+    if result.outcome is Outcome.FAILED:
+        print("Loop failed: %r" % (result.error,))
+        return 1
+    return 0 if len(game.cycles) >= args.cycles else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import ctypes
+import logging
+
+import pytest
+
+from l9.actions.backends import RecordingBackend, SendInputBackend
+
+
+class _User32:
+    def __init__(self, inserted: int) -> None:
+        self.inserted = inserted
+        self.calls = 0
+
+    def SendInput(self, n, arr, size):
+        self.calls += 1
+        return min(n, self.inserted)
+
+
+def _backend(inserted: int, fallback):
+    # SendInputBackend only builds on Windows; wire up the parts click() uses
+    b = SendInputBackend.__new__(SendInputBackend)
+    b._fallback = fallback
+    b._fallen_back = None
+    b.user32 = _User32(inserted)
+    b._INPUT = ctypes.c_int
+    b._size = ctypes.sizeof(ctypes.c_int)
+    b._abs_move = lambda x, y: 1
+    b._mouse = lambda flags, x=0, y=0: 2
+    return b
+
+
+def test_blocked_sendinput_falls_back_once(caplog):
+    rec = RecordingBackend()
+    b = _backend(0, lambda: rec)
+    with caplog.at_level(logging.WARNING, logger="l9.actions.backends"):
+        b.click(10, 20)
+        b.click(30, 40)
+    assert b.user32.calls == 1
+    assert b.name == "record"
+    assert [(e.kind, e.x, e.y) for e in rec.events if e.kind == "down"] == [("down", 10, 20), ("down", 30, 40)]
+    assert sum("SendInput inserted 0 of" in r.getMessage() for r in caplog.records) == 1
+
+
+def test_blocked_sendinput_without_fallback_raises():
+    b = _backend(0, None)
+    with pytest.raises(OSError):
+        b.click(10, 20)
+
+
+def test_unblocked_sendinput_sends():
+    b = _backend(10, lambda: pytest.fail("fallback used"))
+    b.click(10, 20)
+    assert b.user32.calls == 1
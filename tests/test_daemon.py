@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+import pytest
+import yaml
+
+from conftest import REPO_ROOT
+from l9.config_loader import load_config
+from l9.daemon import RunnerClient, RunnerDaemon
+from l9.reload import RELOADER
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch, caplog):
+    # Templates and debug dirs are repo-relative; log at INFO so reload messages reach the forwarder
+    monkeypatch.chdir(REPO_ROOT)
+    caplog.set_level(logging.INFO)
+    with open(os.path.join(REPO_ROOT, "l9", "config.yaml"), "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f) or {}
+    raw.setdefault("daemon", {}).update(state_path=str(tmp_path / "state.json"), idle_exit_s=0)
+    cfg_path = str(tmp_path / "config.yaml")
+    with open(cfg_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(raw, f)
+    cfg = load_config(cfg_path)
+    d = RunnerDaemon(cfg, cfg_path, dry_run=True)
+    RELOADER.watch(cfg_path, cfg)
+    server = threading.Thread(target=d.serve, daemon=True)
+    server.start()
+    deadline = time.monotonic() + 5.0
+    while not os.path.exists(str(tmp_path / "state.json")):
+        assert time.monotonic() < deadline, "daemon did not write its state file"
+        time.sleep(0.02)
+    yield d, cfg_path, raw
+    d.shutdown("test")
+    server.join(5.0)
+    RELOADER.stop()
+
+
+def test_reload_with_subscribed_client(daemon, tmp_path):
+    d, cfg_path, raw = daemon
+    messages = []
+    client = RunnerClient.connect(str(tmp_path / "state.json"), on_message=messages.append)
+    try:
+        assert client.call("subscribe")["ok"]
+        raw["timings"] = dict(raw.get("timings") or {}, detection_timeout_s=4.5)
+        with open(cfg_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(raw, f)
+        # Make sure the mtime differs from the one recorded at watch()
+        os.utime(cfg_path, (time.time() + 5, time.time() + 5))
+        r = client.call("reload", timeout_s=5.0)
+        assert r["ok"], r
+        assert r["applied"]
+        assert client.call("ping", timeout_s=5.0)["ok"]
+        # The "Config reloaded" record went out to the subscriber instead of deadlocking
+        deadline = time.monotonic() + 2.0
+        while not any(m.get("type") == "log" and "reload" in m.get("text", "").lower() for m in messages):
+            assert time.monotonic() < deadline, messages
+            time.sleep(0.02)
+    finally:
+        client.close()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+
+from conftest import REPO_ROOT
+from l9.config_loader import load_config
+from l9.events import EventStream, RunStats
+
+
+def _stream():
+    stream = EventStream()
+    batches = []
+    stream.subscribe(batches.append)
+    stream._stop.set()  # deliver only on explicit flush()
+    return stream, batches
+
+
+def test_configure_reads_compiled_settings():
+    cfg = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    cfg["events"]["flush_ms"] = 500
+    stream = EventStream().configure(cfg)
+    assert stream.flush_s == 0.5
+    cfg2 = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    cfg2["events"]["enabled"] = False
+    stream, _ = _stream()
+    stream.configure(cfg2)
+    assert not stream.enabled
+
+
+def test_detects_and_exits_fold_into_one_entry_per_flush():
+    stream, batches = _stream()
+    for score, hit in ((0.5, False), (0.9, True), (0.7, None), (0.8, True)):
+        stream.detect("revive", score, hit)
+    stream.detect("potion", 0.3, False)
+    for dur in (0.1, 0.2, 0.3):
+        stream.state_enter("Grind", "FIGHT")
+        stream.state_exit("Grind", "FIGHT", dur)
+
+    batch = stream.flush()
+    assert batches == [batch]
+    state = [ev for ev in batch if ev["type"] == "state"]
+    detect = [ev for ev in batch if ev["type"] == "detect"]
+    assert len(state) == 1 and len(detect) == 1
+    assert state[0]["active"] == []
+    assert state[0]["exits"] == {"Grind.FIGHT": [3, 0.6, 0.3]}
+    assert detect[0]["templates"]["revive"] == {"calls": 4, "hits": 2, "judged": 3, "best": 0.9, "last": 0.8}
+    assert detect[0]["templates"]["potion"]["calls"] == 1
+
+    stream.detect("revive", 0.6, True)
+    batch = stream.flush()
+    assert [ev["type"] for ev in batch] == ["detect"]
+    assert batch[0]["templates"]["revive"]["calls"] == 1
+    assert stream.flush() == []
+
+
+def test_run_stats_rates_cover_finished_cycles_only():
+    stats = RunStats()
+    stats.apply([
+        {"type": "cycle", "t": 0.0, "n": 1, "outcome": "done", "dur_s": 30.0, "refill_s": 10.0},
+        {"type": "cycle", "t": 20.0, "n": 2, "outcome": "aborted", "dur_s": 20.0, "refill_s": None},
+        {"type": "cycle", "t": 60.0, "n": 3, "outcome": "done", "dur_s": 40.0, "refill_s": 12.0},
+    ])
+    view = stats.view()
+    assert (view["cycles"], view["aborted"]) == (2, 1)
+    assert view["cycle_avg_s"] == 35.0 and view["refill_avg_s"] == 11.0
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+
+from l9.clock import CLOCK
+from l9.config_loader import DEFAULT_CONFIG
+from l9.events import EventStream
+from l9.flows import grind_refill_loop as loop_mod
+from l9.flows.grind_refill_loop import GrindRefillLoop, LState
+from l9.flows.watch import WatchEvent, WatchKind
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    CLOCK.set_virtual()
+    calls = []
+    monkeypatch.setattr(loop_mod.PROFILER, "begin_cycle", lambda: calls.append("begin"))
+    monkeypatch.setattr(loop_mod.PROFILER, "end_cycle", lambda outcome="done": calls.append(outcome))
+    events = EventStream()
+    events.subscribe(lambda batch: None)
+    events._stop.set()  # deliver only on explicit flush()
+    monkeypatch.setattr(loop_mod, "EVENTS", events)
+    lp = GrindRefillLoop(None, None, dict(DEFAULT_CONFIG))
+    lp._pending, lp._cycles, lp._cycle_t0, lp._refill_s = [], 0, None, None
+    lp.profiler_calls = calls
+    lp.events = events
+    yield lp
+    CLOCK.set_real()
+
+
+def test_preempted_grind_closes_cycle_as_aborted(loop, monkeypatch):
+    died = WatchEvent(WatchKind.REVIVE, None, 1, 0.0, 0.0)
+    results = iter([died, None])
+
+    def run_preemptible(flow, watcher):
+        CLOCK.sleep(2.0)
+        return next(results)
+
+    monkeypatch.setattr(loop, "_run_preemptible", run_preemptible)
+    monkeypatch.setattr(loop, "_check", lambda: LState.GRIND)
+
+    assert loop._s_check() is LState.GRIND
+    assert loop._s_grind() is LState.CHECK
+    assert loop._pending == [died]
+    assert loop._cycle_t0 is None
+    assert loop._s_check() is LState.GRIND
+    assert loop._s_grind() is LState.CHECK
+
+    assert loop.profiler_calls == ["begin", "aborted", "begin", "done"]
+    cycles = [ev for ev in loop.events.flush() if ev["type"] == "cycle"]
+    assert [(c["n"], c["outcome"], c["grind_s"], c["refill_s"]) for c in cycles] == [
+        (1, "aborted", 2.0, None), (2, "done", 2.0, None)]
+
+
+def test_cycle_begins_only_when_check_leaves_for_work(loop, monkeypatch):
+    nxt = iter([LState.WAIT, LState.REFILL])
+    monkeypatch.setattr(loop, "_check", lambda: next(nxt))
+    assert loop._s_check() is LState.WAIT
+    assert loop.profiler_calls == [] and loop._cycle_t0 is None
+    assert loop._s_check() is LState.REFILL
+    assert loop.profiler_calls == ["begin"] and loop._cycle_t0 == CLOCK.time()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from l9.paths.compiled import OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, CompiledPath
+from l9.paths.optimize import OptimizeOptions, SegmentReport, _optimize_segment, optimize
+
+
+def _path(*segments) -> CompiledPath:
+    cp = CompiledPath()
+    for events in segments:
+        start = len(cp)
+        for t, op, name in events:
+            cp.append(t, op, name, *((10, 20) if op == OP_CLICK else ()))
+        cp.end_segment(start)
+    return cp
+
+
+def _run(cp: CompiledPath, opts: OptimizeOptions, allowed=None):
+    out = CompiledPath()
+    rep = _optimize_segment(cp, 0, len(cp), out, allowed, opts)
+    return [(t, op, out.names[a]) for t, op, a in zip(out.t, out.op, out.arg)], rep
+
+
+def test_trims_lead_cuts_idle_gaps_and_drops_stray_events():
+    cp = _path([
+        (2.0, OP_KEY_DOWN, "W"),
+        (2.5, OP_KEY_DOWN, "W"),  # auto-repeat
+        (3.0, OP_KEY_DOWN, "x"),  # not allowed
+        (5.0, OP_KEY_UP, "W"),  # 3 s gap while W is held: kept
+        (5.25, OP_KEY_UP, "a"),  # never pressed
+        (8.0, OP_CLICK, "left"),  # 3 s idle gap: cut to 1 s
+        (8.5, OP_KEY_DOWN, "a"),
+        (8.75, OP_KEY_UP, "a"),
+    ])
+    events, rep = _run(cp, OptimizeOptions(lead_s=0.5, max_gap_s=1.0), allowed={"w", "a"})
+    assert events == [
+        (0.5, OP_KEY_DOWN, "W"),
+        (3.5, OP_KEY_UP, "W"),
+        (4.5, OP_CLICK, "left"),
+        (5.0, OP_KEY_DOWN, "a"),
+        (5.25, OP_KEY_UP, "a"),
+    ]
+    assert rep == SegmentReport(
+        events_before=8, events_after=5, duration_before_s=8.75, duration_after_s=5.25,
+        dropped_keys=1, repeat_downs=1, orphan_ups=1,
+        lead_trimmed_s=1.5, gaps_shortened=1, gap_trimmed_s=2.0,
+    )
+    assert rep.saved_s == 3.5
+
+
+def test_gap_not_cut_while_a_key_is_held():
+    cp = _path([(0.0, OP_KEY_DOWN, "w"), (10.0, OP_KEY_DOWN, "a"), (20.0, OP_KEY_UP, "w"), (20.0, OP_KEY_UP, "a")])
+    events, rep = _run(cp, OptimizeOptions(max_gap_s=1.0))
+    assert [t for t, _, _ in events] == [0.0, 10.0, 20.0, 20.0]
+    assert rep.gaps_shortened == 0 and rep.gap_trimmed_s == 0.0 and rep.saved_s == 0.0
+
+
+def test_lead_kept_when_shorter_and_gaps_kept_without_max_gap():
+    cp = _path([(0.25, OP_CLICK, "left"), (5.0, OP_CLICK, "left")])
+    events, rep = _run(cp, OptimizeOptions(lead_s=1.0, max_gap_s=None))
+    assert [t for t, _, _ in events] == [0.25, 5.0]
+    assert rep.lead_trimmed_s == 0.0 and rep.gaps_shortened == 0
+
+
+def test_optimize_handles_each_segment_separately():
+    cp = _path([(1.0, OP_KEY_DOWN, "w"), (2.0, OP_KEY_UP, "w")], [], [(4.0, OP_CLICK, "left")])
+    out, report = optimize(cp, OptimizeOptions(keys=["W"]))
+    assert out.segments == [(0, 2), (2, 2), (2, 3)]
+    assert list(out.t) == [0.0, 1.0, 0.0]
+    assert [s.events_after for s in report.segments] == [2, 0, 1]
+    assert report.saved_s == 5.0
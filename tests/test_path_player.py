@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from conftest import REPO_ROOT
+from l9.actions.safety import Stopped
+from l9.clock import CLOCK
+from l9.paths.compiled import OP_CLICK, OP_KEY_DOWN, OP_KEY_UP, CompiledPath, PathPlayer
+
+
+def _path() -> CompiledPath:
+    cp = CompiledPath()
+    cp.append(0.0, OP_KEY_DOWN, "w")
+    cp.append(0.0, OP_KEY_DOWN, "a")
+    cp.append(0.1, OP_CLICK, "left", 5, 6)
+    cp.append(0.2, OP_KEY_UP, "w")
+    cp.append(0.3, OP_KEY_UP, "a")
+    cp.end_segment(0)
+    return cp
+
+
+@pytest.mark.parametrize("failing", ["click", "key_up"])
+def test_held_keys_released_when_a_callback_raises(failing):
+    log = []
+
+    def key_up(k):
+        log.append(("up", k))
+        if failing == "key_up" and len(log) == 4:
+            raise RuntimeError("input blocked")
+
+    def click(x, y, btn):
+        log.append(("click", btn))
+        if failing == "click":
+            raise RuntimeError("input blocked")
+
+    player = PathPlayer(lambda k: log.append(("down", k)), key_up, click, sleep=CLOCK.sleep)
+    CLOCK.set_virtual()
+    try:
+        with pytest.raises(RuntimeError):
+            player.play(_path())
+    finally:
+        CLOCK.set_real()
+    ups = [k for kind, k in log if kind == "up"]
+    assert sorted(set(ups)) == ["a", "w"]
+
+
+class _FakeActions:
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+        self.log = []
+
+    def key_down(self, k):
+        self.log.append(("down", k))
+
+    def key_up(self, k):
+        self.log.append(("up", k))
+
+    def click(self, x, y, button="left"):
+        self.log.append(("click", button))
+        raise self.error
+
+
+def _replay(tmp_path, error):
+    from l9.config_loader import load_config
+    from l9.flows.grind import GrindFlow
+    from l9.paths.binary import save_path
+
+    cp = _path()
+    path_file = str(tmp_path / "spot.json")
+    save_path(path_file, cp.to_json())
+    actions = _FakeActions(error)
+    flow = GrindFlow(None, actions, load_config(os.path.join(REPO_ROOT, "l9", "config.yaml")))
+    CLOCK.set_virtual()
+    try:
+        flow._replay_path(path_file)
+    finally:
+        CLOCK.set_real()
+    return actions.log
+
+
+def test_grind_replay_keeps_going_after_a_failed_click(tmp_path):
+    log = _replay(tmp_path, RuntimeError("point off screen"))
+    assert log == [("down", "w"), ("down", "a"), ("click", "left"), ("up", "w"), ("up", "a")]
+
+
+def test_grind_replay_stops_on_stop_request(tmp_path):
+    with pytest.raises(Stopped):
+        _replay(tmp_path, Stopped("stop"))
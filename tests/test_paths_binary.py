@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import importlib.util
+import os
+import struct
+
+import pytest
+
+from conftest import REPO_ROOT
+from l9.paths.binary import EXT, MAGIC, PathReader, dumps, loads, resolve_path_file, save_path
+from l9.paths.compiled import CompiledPath, load_path
+
+
+V2 = {"version": 2, "events": [
+    {"t": 0.0, "type": "down", "key": "w"},
+    {"t": 0.5, "type": "mclick", "button": "left", "x": 640, "y": 360},
+    {"t": 1.25, "type": "up", "key": "w"},
+    {"t": 1.5, "type": "mclick", "button": "right", "x": 12, "y": -7},
+    {"t": 300.000001, "type": "down", "key": "Ω"},
+]}
+V3 = {"version": 3, "segments": [
+    {"id": "a", "events": [{"t": 0.125, "type": "down", "key": "a"}, {"t": 0.375, "type": "up", "key": "a"}]},
+    {"id": "empty", "events": []},
+    {"id": "b", "events": [{"t": 2.0, "type": "mclick", "button": "left", "x": 100, "y": 200}]},
+]}
+
+
+def _rows(cp: CompiledPath):
+    return [list(cp.events(i)) for i in range(cp.segment_count)]
+
+
+def _convert_main():
+    spec = importlib.util.spec_from_file_location("convert_path", os.path.join(REPO_ROOT, "scripts", "convert_path.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.main
+
+
+@pytest.mark.parametrize("data", [V2, V3, {"version": 2, "events": []}], ids=["v2", "v3", "empty"])
+def test_round_trip(data, tmp_path):
+    cp = CompiledPath.from_json(data)
+    back = loads(dumps(cp))
+    assert back.names == cp.names
+    assert back.segments == cp.segments
+    assert _rows(back) == _rows(cp)
+    assert back.to_json() == cp.to_json()
+
+    path = str(tmp_path / ("p" + EXT))
+    save_path(path, data)
+    reader = PathReader(path)
+    assert reader.segment_count == cp.segment_count
+    for i in range(cp.segment_count):
+        seg = reader.read_segment(i)
+        assert list(seg.events(0)) == list(cp.events(i))
+        assert reader.duration(i) == cp.duration(i)
+
+
+def test_truncated_files_raise_value_error(tmp_path):
+    data = dumps(CompiledPath.from_json(V3))
+    header = struct.Struct("<4sHHHHI")
+    n_seg, names_size = header.unpack_from(data)[3], header.unpack_from(data)[5]
+    index_at = header.size + names_size
+    cuts = {
+        "header": header.size - 2,
+        "names": header.size + names_size - 1,
+        "index": index_at + n_seg * struct.calcsize("<IIId") - 1,
+        "segment": len(data) - 1,
+    }
+    for what, n in cuts.items():
+        with pytest.raises(ValueError):
+            loads(data[:n])
+        path = tmp_path / f"{what}{EXT}"
+        path.write_bytes(data[:n])
+        with pytest.raises(ValueError):
+            reader = PathReader(str(path))
+            for i in range(reader.segment_count):
+                reader.read_segment(i)
+
+
+def test_wrong_version_and_magic_rejected(tmp_path):
+    data = bytearray(dumps(CompiledPath.from_json(V2)))
+    struct.pack_into("<H", data, len(MAGIC), 3)
+    with pytest.raises(ValueError, match="version 3"):
+        loads(bytes(data))
+    path = tmp_path / ("old" + EXT)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="version 3"):
+        PathReader(str(path))
+    with pytest.raises(ValueError, match="not a binary path file"):
+        loads(b"XXXX" + bytes(data[len(MAGIC):]))
+
+
+def test_resolve_path_file_prefers_existing_v4_then_json(tmp_path):
+    root = str(tmp_path)
+    binary, legacy = os.path.join(root, "spot" + EXT), os.path.join(root, "spot.json")
+    assert resolve_path_file(root, "spot") == binary
+    assert resolve_path_file(root, "spot", fmt="JSON") == legacy
+    save_path(legacy, V2)
+    assert resolve_path_file(root, "spot") == legacy
+    save_path(binary, V2)
+    assert resolve_path_file(root, "spot", fmt="json") == binary
+
+
+def test_convert_path_script_both_ways(tmp_path):
+    main = _convert_main()
+    src = tmp_path / "spot.json"
+    save_path(str(src), V3)
+    assert main([str(src)]) == 0
+    dst = tmp_path / ("spot" + EXT)
+    assert dst.read_bytes()[:len(MAGIC)] == MAGIC
+    assert src.exists()
+    assert _rows(load_path(str(dst))) == _rows(CompiledPath.from_json(V3))
+
+    out = tmp_path / "back.json"
+    assert main([str(dst), "--to", "json", "--out", str(out)]) == 0
+    assert load_path(str(out)).to_json() == CompiledPath.from_json(V3).to_json()
+    with pytest.raises(SystemExit):
+        main([str(src), str(dst), "--out", str(out)])
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from l9.vision.poll import AdaptivePoller, frame_changed
+
+
+def _frame(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(30, 60, size=(1080, 1920, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("x, y", [(0, 0), (1013, 517), (1880, 1060)])
+def test_small_patch_counts_as_change(x, y):
+    prev = _frame()
+    cur = prev.copy()
+    cur[y:y + 20, x:x + 40] = 220
+    assert frame_changed(prev, cur, 2.0)
+
+
+def test_still_and_noisy_frames_are_unchanged():
+    prev = _frame()
+    assert not frame_changed(prev, prev.copy(), 2.0)
+    noisy = (prev.astype(np.int16) + np.random.default_rng(1).integers(-1, 2, size=prev.shape)).astype(np.uint8)
+    assert not frame_changed(prev, noisy, 2.0)
+
+
+def test_poller_probes_the_frame_a_patch_appears_in():
+    still = _frame()
+    shown = still.copy()
+    shown[517:537, 1013:1053] = 220
+    frames = [still, still, still, shown]
+    grabbed = []
+
+    def grab():
+        grabbed.append(frames[min(len(grabbed), len(frames) - 1)])
+        return grabbed[-1]
+
+    poller = AdaptivePoller(min_interval_s=0.0, max_interval_s=0.0, refresh_s=60.0)
+    res = poller.run(lambda f: f is shown, timeout_s=5.0, grab=grab, sleep=lambda _s: None)
+    assert res
+    assert poller.last.frames == 4
+    assert poller.last.skipped == 2
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import os
+
+import yaml
+
+from conftest import REPO_ROOT
+from l9.actions.backends import RecordingBackend
+from l9.actions.input import Actions
+from l9.config_loader import load_config
+from l9.reload import RELOADER, ConfigReloader
+from l9.settings import settings_for
+from l9.vision.match import Vision
+
+
+class _NeverEmpty(dict):
+    def clear(self):
+        raise AssertionError("config dict emptied during reload")
+
+
+class _Recorder:
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.calls = []
+        RELOADER.subscribe(self)
+
+    def apply_settings(self, s, changed):
+        self.calls.append(changed)
+
+
+def _write(path, cfg):
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(cfg, f)
+    # Distinct stamp even on filesystems with coarse mtimes
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+def test_reload_applies_only_changed_sections(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for attr in ("path", "cfg", "_stamp"):
+        monkeypatch.setattr(RELOADER, attr, getattr(RELOADER, attr))
+    base = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    base["input"]["backend"] = "legacy"
+    path = str(tmp_path / "config.yaml")
+    _write(path, base)
+    cfg = _NeverEmpty(load_config(path))
+    template = tmp_path / "t.png"
+    template.write_bytes(b"png")
+
+    actions = Actions(cfg)
+    vision = Vision(cfg)
+    vision._templates[str(template)] = "cached"
+    vision._template_mtimes[str(template)] = os.path.getmtime(template)
+    reconfigured = []
+    vision.capture.reconfigure = lambda *a: reconfigured.append(a)
+    watcher = _Recorder(cfg)
+    other = _Recorder(load_config(path))
+    assert actions.backend is None
+
+    assert RELOADER.watch(path, cfg, poll_s=3600)
+    try:
+        RELOADER.check_now()
+        assert not RELOADER.apply_pending()  # file untouched: nothing loaded
+
+        edited = load_config(path)
+        edited["input"]["backend"] = "record"
+        edited["rois"]["center_ui"] = [0.1, 0.1, 0.9, 0.9]
+        _write(path, edited)
+        RELOADER.check_now()
+        assert RELOADER.apply_pending()
+
+        assert watcher.calls == [frozenset({"input", "rois"})]
+        assert other.calls == []
+        assert cfg["input"]["backend"] == "record"
+        assert settings_for(cfg).rois["center_ui"] == (0.1, 0.1, 0.9, 0.9)
+        assert isinstance(actions.backend, RecordingBackend)
+        assert vision.s is settings_for(cfg)
+        assert reconfigured == []
+        assert vision._templates == {str(template): "cached"}  # template file unchanged: kept
+
+        # A ROI-only edit keeps the backend; a template replaced on disk is evicted
+        backend = actions.backend
+        st = os.stat(template)
+        os.utime(template, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+        edited["rois"]["center_ui"] = base["rois"]["center_ui"]
+        _write(path, edited)
+        RELOADER.check_now()
+        assert RELOADER.apply_pending()
+    finally:
+        RELOADER.stop()
+    assert watcher.calls[-1] == frozenset({"rois"})
+    assert actions.backend is backend
+    assert vision._templates == {}
+
+
+def test_change_seen_again_after_settle_before_loading(tmp_path):
+    r = ConfigReloader()
+    r.SETTLE_S = 0.0
+    r._stamp = (1, 10)
+    stamps = iter([(2, 10), (3, 12), (3, 12), (3, 12)])
+    r._stat = lambda: next(stamps)
+    loads = []
+
+    def load(seen):
+        loads.append(r._stamp)
+        r._stop.set()
+
+    r._load = load
+    r._run(0.0)
+    # (2, 10) was still being written when re-checked; only the settled (3, 12) loads
+    assert loads == [(3, 12)]
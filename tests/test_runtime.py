@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import pytest
+
+from l9.actions.safety import CANCEL_EVENT, Panic, Stopped, clear_stop, request_stop, stop_requested
+from l9.clock import CLOCK
+from l9.config_loader import DEFAULT_CONFIG
+from l9.flows.base import Flow
+from l9.flows.runtime import AsyncFlow, FlowRuntime, Outcome
+from l9.flows.watch import Watcher, WatchEvent, WatchKind
+
+
+@pytest.fixture(autouse=True)
+def virtual_clock():
+    CLOCK.set_virtual()
+    yield
+    CLOCK.set_real()
+    clear_stop()
+    CANCEL_EVENT.clear()
+
+
+def _event(kind: WatchKind, seq: int) -> WatchEvent:
+    return WatchEvent(kind, None, seq, float(seq), float(seq))
+
+
+def _watcher(*events: WatchEvent) -> Watcher:
+    w = Watcher(None, None, [])
+    for ev in events:
+        w.events.put(ev)
+    return w
+
+
+class Walk(Flow):
+    """Sleeps in 0.1 s steps for `steps` steps."""
+
+    def __init__(self, steps: int = 100) -> None:
+        super().__init__(None, None, dict(DEFAULT_CONFIG))
+        self.steps = steps
+        self.done = 0
+
+    def run(self) -> None:
+        for _ in range(self.steps):
+            self.sleep(0.1)
+            self.done += 1
+
+
+class AsyncWalk(AsyncFlow):
+    def __init__(self, error: BaseException = None) -> None:
+        super().__init__(None, None, dict(DEFAULT_CONFIG))
+        self.error = error
+
+    async def arun(self) -> None:
+        if self.error is not None:
+            raise self.error
+        while True:
+            await self.asleep(0.1)
+
+
+def test_take_keeps_other_events_in_order():
+    w = _watcher(_event(WatchKind.POTION_EMPTY, 1), _event(WatchKind.REVIVE, 2),
+                 _event(WatchKind.DISCONNECT, 3), _event(WatchKind.REVIVE, 4))
+    assert w.take({WatchKind.REVIVE, WatchKind.DISCONNECT}).frame_seq == 2
+    assert [ev.frame_seq for ev in w.drain()] == [1, 3, 4]
+    assert w.take({WatchKind.REVIVE}) is None
+
+
+def test_inline_flow_preempted_by_watcher_event():
+    w = _watcher(_event(WatchKind.POTION_EMPTY, 1))
+    CLOCK.schedule(1.0, lambda: w.events.put(_event(WatchKind.REVIVE, 2)))
+    flow = Walk()
+    res = FlowRuntime(flow.cfg, w, preempt_on=(WatchKind.REVIVE,), tick_s=0.05).run(flow)
+    assert res.outcome is Outcome.PREEMPTED
+    assert res.event.kind is WatchKind.REVIVE
+    assert 9 <= flow.done <= 11
+    assert not CANCEL_EVENT.is_set()
+    assert not stop_requested()
+    assert [ev.kind for ev in w.drain()] == [WatchKind.POTION_EMPTY]
+    assert res.raise_for_outcome() is res.event
+
+
+def test_inline_flow_ignores_events_outside_preempt_on():
+    w = _watcher(_event(WatchKind.POTION_EMPTY, 1))
+    flow = Walk(steps=10)
+    res = FlowRuntime(flow.cfg, w, preempt_on=(WatchKind.REVIVE,)).run(flow)
+    assert res.outcome is Outcome.DONE and res.event is None
+    assert flow.done == 10 and res.elapsed_s == pytest.approx(1.0)
+    assert len(w.drain()) == 1
+
+
+def test_inline_flow_stopped():
+    CLOCK.schedule(0.5, lambda: request_stop("test"))
+    flow = Walk()
+    res = FlowRuntime(flow.cfg).run(flow)
+    assert res.outcome is Outcome.STOPPED
+    assert stop_requested()
+    with pytest.raises(Stopped):
+        res.raise_for_outcome()
+
+
+def test_async_flow_preempted_and_cancel_cleared():
+    w = _watcher()
+    CLOCK.schedule(0.3, lambda: w.events.put(_event(WatchKind.DISCONNECT, 1)))
+    flow = AsyncWalk()
+    res = FlowRuntime(flow.cfg, w, preempt_on=(WatchKind.REVIVE, WatchKind.DISCONNECT)).run(flow)
+    assert res.outcome is Outcome.PREEMPTED
+    assert res.event.kind is WatchKind.DISCONNECT
+    assert not CANCEL_EVENT.is_set() and not stop_requested()
+    assert flow._executor is None
+
+
+def test_async_flow_run_keeps_panic_and_stop_apart():
+    with pytest.raises(Panic) as exc:
+        AsyncWalk(Panic("panic key")).run()
+    assert type(exc.value) is Panic
+    with pytest.raises(Stopped):
+        AsyncWalk(Stopped("stop")).run()
+    with pytest.raises(ValueError):
+        AsyncWalk(ValueError("boom")).run()
+
+
+def test_async_flow_stopped_by_stop_request():
+    CLOCK.schedule(0.2, lambda: request_stop("test"))
+    flow = AsyncWalk()
+    res = FlowRuntime(flow.cfg).run(flow)
+    assert res.outcome is Outcome.STOPPED
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import os
+
+from conftest import REPO_ROOT
+from l9 import settings
+from l9.config_loader import load_config
+from l9.settings import settings_for
+
+
+def test_alternating_configs_compile_once_each(monkeypatch):
+    a = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    b = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    compiled = []
+    real = settings.compile_config
+    monkeypatch.setattr(settings, "compile_config", lambda cfg, problems=None: compiled.append(cfg) or real(cfg, problems))
+    for _ in range(5):
+        sa, sb = settings_for(a), settings_for(b)
+    assert len(compiled) == 2
+    assert settings_for(a) is sa and settings_for(b) is sb
+
+
+def test_frame_stream_reads_compiled_settings_and_reloads():
+    from l9.vision.stream import FrameStream
+
+    cfg = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    stream = FrameStream(cfg)
+    s = settings_for(cfg)
+    assert stream.capture.monitor_index == s.monitor_index
+    stream.apply_settings(s._replace(monitor_index=s.monitor_index + 1), frozenset({"monitor_index"}))
+    assert stream.capture.monitor_index == s.monitor_index + 1
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import enum
+
+import pytest
+
+from l9.clock import CLOCK
+from l9.config_loader import DEFAULT_CONFIG
+from l9.flows.base import StateMachine, StepFailed
+
+
+class S(enum.Enum):
+    A = 1
+    B = 2
+    C = 3
+    FAIL = 4
+    DONE = 5
+
+
+@pytest.fixture
+def sleeps():
+    CLOCK.set_virtual()
+    out = []
+    yield out
+    CLOCK.set_real()
+
+
+def _machine(sleeps, fail=S.FAIL, cfg=None):
+    def sleep(s):
+        sleeps.append(s)
+        CLOCK.sleep(s)
+
+    return StateMachine("Test", S.A, fail=fail, cfg=cfg or dict(DEFAULT_CONFIG), sleep=sleep)
+
+
+def _failing(times, then=S.DONE):
+    calls = []
+
+    def handler():
+        calls.append(CLOCK.time())
+        if len(calls) <= times:
+            raise StepFailed(f"try {len(calls)}")
+        return then
+
+    handler.calls = calls
+    return handler
+
+
+def test_retries_with_linear_backoff_then_succeeds(sleeps):
+    a = _failing(2)
+    sm = _machine(sleeps).add(S.A, a, retries=3, backoff_s=0.5).add(S.DONE, lambda: None)
+    assert sm.run() is S.DONE
+    assert len(a.calls) == 3 and sleeps == [0.5, 1.0]
+    st = sm.stats[S.A]
+    assert (st.entries, st.retries, st.failures) == (1, 2, 0)
+    assert st.total_s == pytest.approx(1.5)
+
+
+def test_exhausted_retries_route_to_on_fail_else_fail_state(sleeps):
+    sm = (
+        _machine(sleeps)
+        .add(S.A, _failing(5), retries=1, backoff_s=0.0, on_fail=S.B)
+        .add(S.B, _failing(5), retries=0)
+        .add(S.FAIL, lambda: None)
+    )
+    assert sm.run() is S.FAIL
+    assert sm.reason == "try 1"
+    assert sm.stats[S.A].failures == 1 and sm.stats[S.A].retries == 1
+    assert sm.stats[S.B].failures == 1 and sm.stats[S.B].retries == 0
+    assert dict(sm.transitions) == {(S.A, S.B): 1, (S.B, S.FAIL): 1}
+
+
+def test_failure_without_fail_state_raises(sleeps):
+    sm = _machine(sleeps, fail=None).add(S.A, _failing(5), retries=0)
+    with pytest.raises(StepFailed, match="try 1"):
+        sm.run()
+    assert [h[0] for h in sm.history] == [S.A]
+
+
+def test_retries_none_uses_configured_policy(sleeps):
+    cfg = dict(DEFAULT_CONFIG, timings=dict(DEFAULT_CONFIG["timings"], action_retry_count=2, action_retry_backoff_s=0.25))
+    a = _failing(5)
+    sm = _machine(sleeps, cfg=cfg).add(S.A, a, retries=None).add(S.FAIL, lambda: None)
+    assert sm.run() is S.FAIL
+    assert len(a.calls) == 3 and sleeps == [0.25, 0.5]
+
+
+def test_retry_window_stops_retrying(sleeps):
+    a = _failing(10)
+    sm = _machine(sleeps).add(S.A, a, retries=10, backoff_s=1.0, retry_window_s=3.5).add(S.FAIL, lambda: None)
+    assert sm.run() is S.FAIL
+    # Retries start at 1 s and 3 s; the next would start at 6 s, past the window
+    assert [t - a.calls[0] for t in a.calls] == [0.0, 1.0, 3.0]
+    assert sm.stats[S.A].retries == 2
+
+
+def test_history_and_transition_counts(sleeps):
+    route = iter([S.B, S.A, S.B, S.C])
+    sm = (
+        _machine(sleeps)
+        .add(S.A, lambda: CLOCK.sleep(1.0) or next(route))
+        .add(S.B, lambda: CLOCK.sleep(0.5) or next(route))
+        .add(S.C, lambda: None)
+    )
+    assert sm.run() is S.C
+    assert [h[0] for h in sm.history] == [S.A, S.B, S.A, S.B, S.C]
+    assert [round(exit - enter, 3) for _, enter, exit in sm.history] == [1.0, 0.5, 1.0, 0.5, 0.0]
+    assert dict(sm.transitions) == {(S.A, S.B): 2, (S.B, S.A): 1, (S.B, S.C): 1}
+    assert (sm.stats[S.A].entries, sm.stats[S.B].entries, sm.stats[S.C].entries) == (2, 2, 1)
+    assert sm.stats[S.A].total_s == pytest.approx(2.0)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from l9.flows.watch import WatchCondition, Watcher, WatchKind
+from l9.vision.match import Box
+from l9.vision.stream import Frame
+
+
+class _Stream:
+    period_s = 0.1
+
+    def __init__(self) -> None:
+        self.frame = None
+
+    def latest(self):
+        return self.frame
+
+
+class _Vision:
+    """locate_in always finds the template; `during` runs inside the first evaluation."""
+
+    def __init__(self) -> None:
+        self.during = None
+
+    def locate_in(self, image, template, confidence, roi_name=None, origin=None):
+        if self.during is not None:
+            during, self.during = self.during, None
+            during()
+        return Box(10, 10, 5, 5)
+
+
+def _watcher():
+    stream, vision = _Stream(), _Vision()
+    cond = WatchCondition(WatchKind.REVIVE, "revive.png", 0.8, interval_s=0.0, cooldown_s=0.0)
+    return Watcher(vision, stream, [cond]), stream, vision
+
+
+def test_reset_during_evaluation_drops_the_old_frame():
+    w, stream, vision = _watcher()
+    old = Frame(seq=1, t=0.0, image=None, origin=(0, 0))
+    stream.frame = old
+    vision.during = w.reset
+    w._process(old)
+    assert w.drain() == []
+    assert not w.is_active(WatchKind.REVIVE)
+
+    # A frame grabbed after the reset publishes normally
+    new = Frame(seq=2, t=0.1, image=None, origin=(0, 0))
+    stream.frame = new
+    w._process(new)
+    events = w.drain()
+    assert [(e.kind, e.frame_seq) for e in events] == [(WatchKind.REVIVE, 2)]
+
+
+def test_frames_grabbed_before_reset_are_skipped():
+    w, stream, _vision = _watcher()
+    stream.frame = Frame(seq=5, t=0.0, image=None, origin=(0, 0))
+    w.reset()
+    w._process(Frame(seq=4, t=0.0, image=None, origin=(0, 0)))
+    w._process(stream.frame)
+    assert w.drain() == []
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+
+from conftest import REPO_ROOT
+from l9.actions.window import WindowManager
+from l9.config_loader import load_config
+
+
+class _User32:
+    def __init__(self) -> None:
+        self.fg = 100
+
+    def GetForegroundWindow(self):
+        return self.fg
+
+
+def _unguarded():
+    cfg = load_config(os.path.join(REPO_ROOT, "l9", "config.yaml"))
+    cfg["window"].update(require_foreground=False, require_maximized=False)
+    wm = WindowManager(cfg)
+    wm._is_windows = True
+    wm.user32 = _User32()
+    return wm
+
+
+def test_unguarded_focus_epoch_follows_the_foreground_window():
+    wm = _unguarded()
+    assert wm.ensure_focus()
+    first = wm.focus_epoch
+    wm.ensure_focus()
+    assert wm.focus_epoch == first  # same foreground window: no new focus click
+
+    wm.user32.fg = 200  # user alt-tabbed away
+    wm.ensure_focus()
+    wm.user32.fg = 100  # and back
+    wm.ensure_focus()
+    assert wm.focus_epoch == first + 2